@@ -30,6 +30,7 @@ class BlendAdmin(admin.ModelAdmin):
             "project_ods",
             "enterprise_ods",
             "cprecordarchive",
+            "cpconsumptionfact",
             "cppricesarchive",
             "admrecordarchive",
             "cpreportformatrow",
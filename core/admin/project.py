@@ -222,6 +222,8 @@ class ProjectAdmin(admin.ModelAdmin):
             "annual_reports",
             "transferred_projects",
             "pcr_projects",
+            "version_timeline",
+            "timeline_entry",
         ]
         return get_final_display_list(Project, exclude)
 
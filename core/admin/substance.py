@@ -48,6 +48,7 @@ class SubstanceAdmin(admin.ModelAdmin):
             "cppricesarchive",
             "cprecord",
             "cprecordarchive",
+            "cpconsumptionfact",
             "cpreportformatrow",
             "enterprise_ods",
             "excludedusage",
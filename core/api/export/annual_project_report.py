@@ -1,11 +1,13 @@
+from calendar import monthrange
 from copy import copy
 from collections import defaultdict
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from datetime import date as date_type, datetime
 from decimal import Decimal
 from io import BytesIO
 
 from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
 from django.http import HttpResponse
 from openpyxl import load_workbook
 from openpyxl.styles import Font
@@ -478,6 +480,230 @@ class APRExportWriter:
         return response
 
 
+def _get_months(start_date, end_date):
+    """
+    Whole months from start_date to end_date, None if either is missing.
+
+    Same as `relativedelta(end_date, start_date)` years * 12 + months, which
+    costs too much for every date of every record.
+    """
+    if not start_date or not end_date:
+        return None
+    months = (end_date.year - start_date.year) * 12 + (
+        end_date.month - start_date.month
+    )
+    # start_date moved by `months`, clipped to the end of the month
+    year, month = divmod(start_date.year * 12 + start_date.month - 1 + months, 12)
+    month += 1
+    shifted = date_type(year, month, min(start_date.day, monthrange(year, month)[1]))
+    if start_date <= end_date < shifted:
+        months -= 1
+    elif shifted < end_date < start_date:
+        months += 1
+    return months
+
+
+def _get_months_since_approval(date_approved, target_date):
+    """
+    Months from approval to `target_date`, 0 when unmeasurable.
+    """
+    if not date_approved or not target_date or target_date < date_approved:
+        return 0
+    return _get_months(date_approved, target_date)
+
+
+def get_apr_record_months(record):
+    """
+    The month spans of an APR record used by the summary tables; each one is
+    None when it cannot be measured.
+
+    The delay is the length of delay in project planned completion, positive
+    or negative: planned completion minus the completion date per proposal,
+    both expressed as months since approval. It only counts when both spans
+    are non-zero, mirroring the MLFS's reference workbook.
+    This deliberately ignores date_of_completion_per_agreement_or_decisions_denorm:
+    that field holds the multi-year agreement's end date, which a single tranche
+    is not expected to reach.
+
+    @param record: AnnualProjectReport or row with the same attributes
+
+    @return: tuple (to first disbursement, to planned completion,
+        to actual completion, delay)
+    """
+    date_approved = record.date_approved_denorm
+    months_to_proposal = _get_months_since_approval(
+        date_approved, record.date_completion_proposal_denorm
+    )
+    months_to_planned = _get_months_since_approval(
+        date_approved, record.date_planned_completion
+    )
+    delay = None
+    if months_to_proposal and months_to_planned:
+        delay = months_to_planned - months_to_proposal
+
+    return (
+        _get_months(date_approved, record.date_first_disbursement),
+        _get_months(date_approved, record.date_planned_completion),
+        _get_months(date_approved, getattr(record, "date_actual_completion", None)),
+        delay,
+    )
+
+
+class APRSummaryGroup:
+    """
+    Running totals of a group of APR records, for the summary tables.
+
+    The records are added one at a time, so the groups of all the sheets are
+    filled in a single pass over the records.
+    """
+
+    PHASEOUT_UNITS = ("odp", "mt", "co2")
+    # (unit, consumption, production, proposal consumption, proposal production)
+    PHASEOUT_FIELDS = [
+        (
+            unit,
+            f"consumption_phased_out_{unit}",
+            f"production_phased_out_{unit}",
+            f"consumption_phased_out_{unit}_proposal_denorm",
+            f"production_phased_out_{unit}_proposal_denorm",
+        )
+        for unit in PHASEOUT_UNITS
+    ]
+    # Indexes in get_apr_record_months()
+    MONTHS_TO_DISBURSEMENT = 0
+    MONTHS_TO_PLANNED_COMPLETION = 1
+    MONTHS_TO_ACTUAL_COMPLETION = 2
+    DELAY = 3
+
+    def __init__(self):
+        self.count = 0
+        # Projects with a COM/FIN project status
+        self.num_completed = 0
+        # Records with a completed APR status
+        self.num_status_completed = 0
+        self.num_disbursing = 0
+        self.approved_funding = 0
+        self.funds_disbursed = 0
+        self.balance = 0
+        # {"consumption_odp": sum, "production_odp": sum, "odp": consumption +
+        # production sum, "proposal_odp": proposal consumption + production sum...}
+        self.phaseout = defaultdict(int)
+        # [[sum of months, count] for each get_apr_record_months() span]
+        self.months = [[0, 0] for _ in range(4)]
+
+    def add(self, record, months, completed=False, status_completed=False):
+        """
+        @param record: AnnualProjectReport or row with the same attributes
+        @param months: tuple - get_apr_record_months(record)
+        @param completed: bool - the project status is COM/FIN
+        @param status_completed: bool - the APR status is a completed one
+        """
+        self.count += 1
+        self.num_completed += completed
+        self.num_status_completed += status_completed
+
+        approved_funding = record.approved_funding_plus_adjustment_denorm
+        funds_disbursed = record.funds_disbursed
+        self.approved_funding += approved_funding or 0
+        self.funds_disbursed += funds_disbursed or 0
+        if approved_funding is not None:
+            self.balance += approved_funding - (funds_disbursed or 0) or 0
+        if funds_disbursed and funds_disbursed > 0:
+            self.num_disbursing += 1
+
+        phaseout = self.phaseout
+        for unit, *fields in self.PHASEOUT_FIELDS:
+            consumption, production, proposal_c, proposal_p = (
+                getattr(record, field, None) or 0 for field in fields
+            )
+            phaseout["consumption_" + unit] += consumption
+            phaseout["production_" + unit] += production
+            phaseout[unit] += consumption + production
+            phaseout["proposal_" + unit] += proposal_c + proposal_p
+
+        for index, value in enumerate(months):
+            if value is not None:
+                self.months[index][0] += value
+                self.months[index][1] += 1
+
+    def get_avg_months(self, index):
+        total, count = self.months[index]
+        return total / count if count > 0 else 0
+
+    def get_data(self, include_odp_co2, sheet_type):
+        """
+        Aggregation data of the group for the sheets (b)-(g)
+
+        @return: dict {field name: value}, see
+            APRSummaryTablesExportWriter._get_column_specs()
+        """
+        data = {}
+        is_ongoing = sheet_type in [
+            "ongoing_investment",
+            "ongoing_non_investment",
+            "ongoing_preparation",
+        ]
+
+        if is_ongoing:
+            data["num_projects"] = self.count
+        else:
+            data["num_completed"] = self.count
+
+        data["total_approved_funding"] = self.approved_funding
+        data["total_funds_disbursed"] = self.funds_disbursed
+
+        data["avg_pct_disbursed"] = (
+            data["total_funds_disbursed"] / data["total_approved_funding"] * 100
+            if data["total_approved_funding"]
+            else 0
+        )
+
+        data["avg_months_to_disbursement"] = self.get_avg_months(
+            self.MONTHS_TO_DISBURSEMENT
+        )
+
+        if is_ongoing:
+            data["avg_months_to_completion"] = self.get_avg_months(
+                self.MONTHS_TO_PLANNED_COMPLETION
+            )
+            data["avg_delay"] = self.get_avg_months(self.DELAY)
+            data["num_disbursing"] = self.num_disbursing
+            data["pct_disbursing"] = (
+                (self.num_disbursing / self.count) if self.count > 0 else 0
+            )
+        else:
+            data["avg_months_to_completion"] = self.get_avg_months(
+                self.MONTHS_TO_ACTUAL_COMPLETION
+            )
+
+        if include_odp_co2:
+            for unit in self.PHASEOUT_UNITS:
+                for kind in ("consumption", "production"):
+                    data[f"total_{kind}_{unit}"] = self.phaseout[f"{kind}_{unit}"]
+
+            total_odp = data["total_consumption_odp"] + data["total_production_odp"]
+            data["cost_effectiveness"] = (
+                data["total_approved_funding"] / (total_odp * 1000) if total_odp else 0
+            )
+
+            if sheet_type == "ongoing_investment":
+                # Cost effectiveness for ongoing projects uses derived (proposal/denorm)
+                # phase-out data rather than agency-reported actuals, since actuals are
+                # often not yet reported and would otherwise make the ratio artificially
+                # large. Completed projects (cumulative sheets) use actual phaseout
+                # above, since actuals are final once a project is complete.
+                data["total_phaseout_combined_kg"] = (
+                    self.phaseout["proposal_odp"] * 1000
+                )
+                data["cost_effectiveness"] = (
+                    data["total_approved_funding"] / data["total_phaseout_combined_kg"]
+                    if data["total_phaseout_combined_kg"]
+                    else 0
+                )
+
+        return data
+
+
 class APRSummaryTablesExportWriter:
     """
     Generates multi-sheet Excel export with summary tables for APR.
@@ -498,15 +724,6 @@ class APRSummaryTablesExportWriter:
 
         return load_workbook(BytesIO(cls._template_bytes))
 
-    @staticmethod
-    def _get_field_value(obj, field_path):
-        """Utility to traverse a double-underscore field path on a Django ORM object"""
-        for part in field_path.split("__"):
-            obj = getattr(obj, part, None)
-            if obj is None:
-                return None
-        return obj
-
     # Sheet name constants
     SHEET_SUMMARY = "I.1 Summary Data "
     SHEET_SUMMARY_CLUSTER = "I.2 Summary data by cluster"
@@ -531,6 +748,59 @@ class APRSummaryTablesExportWriter:
     # Number of template placeholder data rows in the cluster sheets (before Total)
     CLUSTER_TEMPLATE_DATA_ROWS = 5
 
+    COMPLETED_STATUS_CODES = ("COM", "FIN")
+
+    # Sheets (b)-(g) by (project status code, project type code); the project
+    # types other than INV and PRP are all under None
+    FLAT_SHEET_ROUTES = {
+        ("COM", "INV"): SHEET_INVESTMENT,
+        ("FIN", "INV"): SHEET_INVESTMENT,
+        ("COM", None): SHEET_NON_INVESTMENT,
+        ("FIN", None): SHEET_NON_INVESTMENT,
+        ("COM", "PRP"): SHEET_PREPARATION,
+        ("FIN", "PRP"): SHEET_PREPARATION,
+        ("ONG", "INV"): SHEET_ONGOING_INVESTMENT,
+        ("ONG", None): SHEET_ONGOING_NON_INVESTMENT,
+        ("ONG", "PRP"): SHEET_ONGOING_PREPARATION,
+    }
+
+    # APR values read by the summary tables; the records are fetched as rows
+    # of these values instead of model objects
+    RECORD_FIELDS = [
+        "status",
+        "date_approved_denorm",
+        "date_completion_proposal_denorm",
+        "date_first_disbursement",
+        "date_planned_completion",
+        "date_actual_completion",
+        "approved_funding_plus_adjustment_denorm",
+        "funds_disbursed",
+        "consumption_phased_out_odp",
+        "consumption_phased_out_mt",
+        "consumption_phased_out_co2",
+        "production_phased_out_odp",
+        "production_phased_out_mt",
+        "production_phased_out_co2",
+        "consumption_phased_out_odp_proposal_denorm",
+        "consumption_phased_out_mt_proposal_denorm",
+        "consumption_phased_out_co2_proposal_denorm",
+        "production_phased_out_odp_proposal_denorm",
+        "production_phased_out_mt_proposal_denorm",
+        "production_phased_out_co2_proposal_denorm",
+    ]
+    RECORD_ANNOTATIONS = {
+        "project_status_code": F("project__status__code"),
+        "project_type_code": F("project__project_type__code"),
+        "cluster_name": F("project__cluster__name"),
+        "cluster_sort_order": F("project__cluster__sort_order"),
+        "sector_name": F("project__sector__name"),
+        # Country.apr_name
+        "region_name": Coalesce(
+            NullIf(F("main_region__name_for_apr"), Value("")),
+            F("main_region__name"),
+        ),
+    }
+
     @classmethod
     def build_annual_column_mapping(cls):
         """Column mapping for Annual summary sheet (a)"""
@@ -552,19 +822,7 @@ class APRSummaryTablesExportWriter:
         self.annual_column_mapping = self.build_annual_column_mapping()
 
         # Get all APR data
-        queryset = AnnualProjectReport.objects.all().select_related(
-            "project",
-            "project__agency",
-            "project__cluster",
-            "project__country",
-            "project__country__parent",
-            "project__sector",
-            "project__status",
-            "project__project_type",
-            "main_region",
-            "report",
-            "report__progress_report",
-        )
+        queryset = AnnualProjectReport.objects.all()
 
         status_by_code = dict(
             ProjectStatus.objects.filter(code__in=["COM", "FIN", "ONG"]).values_list(
@@ -587,11 +845,85 @@ class APRSummaryTablesExportWriter:
 
         self.queryset = queryset
         # Materialize the queryset once so we don't keep re-querying the DB for each tab
-        self.records = list(queryset)
+        self.records = list(
+            queryset.annotate(**self.RECORD_ANNOTATIONS)
+            .order_by("id")
+            .values_list(
+                *self.RECORD_FIELDS, *self.RECORD_ANNOTATIONS.keys(), named=True
+            )
+        )
+
+        self.summary_group = APRSummaryGroup()
+        # {(cluster sort order, cluster name): APRSummaryGroup}
+        self.cluster_groups = defaultdict(APRSummaryGroup)
+        self.completion_groups = defaultdict(APRSummaryGroup)
+        # {approval year: APRSummaryGroup}
+        self.annual_groups = defaultdict(APRSummaryGroup)
+        # {sheet name: {"total": APRSummaryGroup, "region": {region name: APRSummaryGroup},
+        # "sector": {sector name: APRSummaryGroup}}}
+        self.flat_groups = {
+            sheet: {
+                "total": APRSummaryGroup(),
+                "region": defaultdict(APRSummaryGroup),
+                "sector": defaultdict(APRSummaryGroup),
+            }
+            for sheet in set(self.FLAT_SHEET_ROUTES.values())
+        }
+
+        self._aggregate()
+
+    def _aggregate(self):
+        """
+        Aggregate the records in the groups of all the sheets, in a single pass.
+        The sheets then only write the totals of their groups.
+        """
+        for record in self.records:
+            months = get_apr_record_months(record)
+            completed = record.project_status_code in self.COMPLETED_STATUS_CODES
+            status_completed = record.status in self._completed_status_names
+
+            args = (record, months, completed, status_completed)
+
+            self.summary_group.add(*args)
+
+            cluster_key = None
+            if record.cluster_name is not None:
+                cluster_key = (record.cluster_sort_order or 0, record.cluster_name)
+                self.cluster_groups[cluster_key].add(*args)
+
+            # Use the agency-reported date_actual_completion falling within the
+            # report year, rather than pcr_due_denorm: increase_version() never
+            # updates the effective-date fields (post_excom_decision/meeting/
+            # date_approved), so a plain status-only transition to COM/FIN is
+            # invisible to that version-chain comparison for every year, not just
+            # this one.
+            # Completion is read from the APR row's own status rather than the
+            # project's: the project record only catches up once the APR is endorsed.
+            if (
+                cluster_key
+                and status_completed
+                and (
+                    not self.year
+                    or (
+                        record.date_actual_completion
+                        and record.date_actual_completion.year == self.year
+                    )
+                )
+            ):
+                self.completion_groups[cluster_key].add(*args)
 
-        self.serialized_data = AnnualProjectReportReadSerializer(
-            self.records, many=True
-        ).data
+            if record.date_approved_denorm:
+                self.annual_groups[record.date_approved_denorm.year].add(*args)
+
+            type_code = record.project_type_code
+            if type_code not in ("INV", "PRP"):
+                type_code = None
+            sheet = self.FLAT_SHEET_ROUTES.get((record.project_status_code, type_code))
+            if sheet:
+                groups = self.flat_groups[sheet]
+                groups["total"].add(*args)
+                groups["region"][record.region_name or ""].add(*args)
+                groups["sector"][record.sector_name or ""].add(*args)
 
     def generate(self):
         self.workbook = self._get_template_workbook()
@@ -666,14 +998,10 @@ class APRSummaryTablesExportWriter:
         """Copy all cell styles from source_row to target_row."""
         for col in range(1, ws.max_column + 1):
             src = ws.cell(source_row, col)
-            tgt = ws.cell(target_row, col)
             if src.has_style:
-                tgt.font = copy(src.font)
-                tgt.border = copy(src.border)
-                tgt.fill = copy(src.fill)
-                tgt.number_format = src.number_format
-                tgt.protection = copy(src.protection)
-                tgt.alignment = copy(src.alignment)
+                # The style ids index the workbook's shared styles, so copying
+                # them is the same as copying each style object, only faster.
+                ws.cell(target_row, col)._style = copy(src._style)
 
     def _normalize_section_styles(self, ws, section_start, count):
         """
@@ -707,61 +1035,22 @@ class APRSummaryTablesExportWriter:
     def _write_summary_data_sheet(self):
         """I.1: Overall summary data"""
         ws = self.workbook[self.SHEET_SUMMARY]
-
-        num_approvals = len(self.records)
-        num_completed = sum(
-            1
-            for apr in self.records
-            if apr.project.status and apr.project.status.code in ("COM", "FIN")
-        )
-
-        total_funds_approved = sum(
-            apr.approved_funding_plus_adjustment_denorm or 0 for apr in self.records
-        )
-        total_funds_disbursed = sum(apr.funds_disbursed or 0 for apr in self.records)
-
-        # Approved phase-out = sum of proposal/denorm values (consumption + production)
-        total_approved_odp = sum(
-            (apr.consumption_phased_out_odp_proposal_denorm or 0)
-            + (apr.production_phased_out_odp_proposal_denorm or 0)
-            for apr in self.records
-        )
-        total_actual_odp = sum(
-            (apr.consumption_phased_out_odp or 0) + (apr.production_phased_out_odp or 0)
-            for apr in self.records
-        )
-        total_approved_mt = sum(
-            (apr.consumption_phased_out_mt_proposal_denorm or 0)
-            + (apr.production_phased_out_mt_proposal_denorm or 0)
-            for apr in self.records
-        )
-        total_actual_mt = sum(
-            (apr.consumption_phased_out_mt or 0) + (apr.production_phased_out_mt or 0)
-            for apr in self.records
-        )
-        total_approved_co2 = sum(
-            (apr.consumption_phased_out_co2_proposal_denorm or 0)
-            + (apr.production_phased_out_co2_proposal_denorm or 0)
-            for apr in self.records
-        )
-        total_actual_co2 = sum(
-            (apr.consumption_phased_out_co2 or 0) + (apr.production_phased_out_co2 or 0)
-            for apr in self.records
-        )
+        group = self.summary_group
 
         # Write values to column B, rows 4-13
         # Rows 4-5: counts, 6-7: funding, 8-9: ODP, 10-11: MT, 12-13: CO2
+        # Approved phase-out = sum of proposal/denorm values (consumption + production)
         values_with_formats = [
-            (num_approvals, "#,##0"),
-            (num_completed, "#,##0"),
-            (total_funds_approved, "#,##0"),
-            (total_funds_disbursed, "#,##0"),
-            (total_approved_odp, "#,##0.0"),
-            (total_actual_odp, "#,##0.0"),
-            (total_approved_mt, "#,##0.0"),
-            (total_actual_mt, "#,##0.0"),
-            (total_approved_co2, "#,##0"),
-            (total_actual_co2, "#,##0"),
+            (group.count, "#,##0"),
+            (group.num_completed, "#,##0"),
+            (group.approved_funding, "#,##0"),
+            (group.funds_disbursed, "#,##0"),
+            (group.phaseout["proposal_odp"], "#,##0.0"),
+            (group.phaseout["odp"], "#,##0.0"),
+            (group.phaseout["proposal_mt"], "#,##0.0"),
+            (group.phaseout["mt"], "#,##0.0"),
+            (group.phaseout["proposal_co2"], "#,##0"),
+            (group.phaseout["co2"], "#,##0"),
         ]
 
         for idx, (value, number_format) in enumerate(values_with_formats):
@@ -772,17 +1061,6 @@ class APRSummaryTablesExportWriter:
         """I.2: Summary data by cluster"""
         ws = self.workbook[self.SHEET_SUMMARY_CLUSTER]
 
-        # Group the in-memory objects list by cluster, sorted by (sort_order, name)
-        cluster_buckets = {}
-        for apr in self.records:
-            cluster = apr.project.cluster
-            if cluster is None:
-                continue
-            key = (getattr(cluster, "sort_order", 0) or 0, cluster.name)
-            if key not in cluster_buckets:
-                cluster_buckets[key] = []
-            cluster_buckets[key].append(apr)
-
         # Pre-compute all rows before touching the sheet structure
         rows_data = []
         totals = {
@@ -792,21 +1070,15 @@ class APRSummaryTablesExportWriter:
             "disbursed": 0,
             "balance": 0,
         }
-        for (_, cluster_name), cluster_records in sorted(cluster_buckets.items()):
-            num_approved = len(cluster_records)
-            num_completed = sum(
-                1
-                for apr in cluster_records
-                if apr.project.status and apr.project.status.code in ("COM", "FIN")
-            )
+        # Sorted by cluster (sort_order, name)
+        for (_, cluster_name), group in sorted(self.cluster_groups.items()):
+            num_approved = group.count
+            num_completed = group.num_completed
             pct_completed = (
                 round(num_completed / num_approved * 100) if num_approved else 0
             )
-            approved_funding = sum(
-                apr.approved_funding_plus_adjustment_denorm or 0
-                for apr in cluster_records
-            )
-            disbursed = sum(apr.funds_disbursed or 0 for apr in cluster_records)
+            approved_funding = group.approved_funding
+            disbursed = group.funds_disbursed
             balance = approved_funding - disbursed
             pct_disbursed = (
                 round(disbursed / approved_funding * 100) if approved_funding else 0
@@ -891,59 +1163,15 @@ class APRSummaryTablesExportWriter:
         """Project completion in the reporting year, grouped by cluster"""
         ws = self.workbook[self.SHEET_COMPLETION_YEAR]
 
-        # Filter and group by cluster in-memory, to avoid repeated DB hits.
-        # Use the agency-reported date_actual_completion falling within the report
-        # year, rather than pcr_due_denorm: increase_version() never updates the
-        # effective-date fields (post_excom_decision/meeting/date_approved), so a
-        # plain status-only transition to COM/FIN is invisible to that version-chain
-        # comparison for every year, not just this one.
-        # Completion is read from the APR row's own status rather than the project's:
-        # the project record only catches up once the APR is endorsed.
-        if self.year:
-            completed_records = [
-                apr
-                for apr in self.records
-                if apr.date_actual_completion
-                and apr.date_actual_completion.year == self.year
-                and apr.status in self._completed_status_names
-            ]
-        else:
-            completed_records = [
-                apr
-                for apr in self.records
-                if apr.status in self._completed_status_names
-            ]
-
-        cluster_buckets = {}
-        for apr in completed_records:
-            cluster = apr.project.cluster
-            if cluster is None:
-                continue
-            key = (getattr(cluster, "sort_order", 0) or 0, cluster.name)
-            if key not in cluster_buckets:
-                cluster_buckets[key] = []
-            cluster_buckets[key].append(apr)
-
         # Pre-compute all rows before touching the sheet structure
         rows_data = []
         totals = {"num_completed": 0, "odp": 0, "mt": 0, "co2": 0}
-        for (_, cluster_name), cluster_records in sorted(cluster_buckets.items()):
-            num_completed = len(cluster_records)
-            total_odp = sum(
-                (apr.consumption_phased_out_odp or 0)
-                + (apr.production_phased_out_odp or 0)
-                for apr in cluster_records
-            )
-            total_mt = sum(
-                (apr.consumption_phased_out_mt or 0)
-                + (apr.production_phased_out_mt or 0)
-                for apr in cluster_records
-            )
-            total_co2 = sum(
-                (apr.consumption_phased_out_co2 or 0)
-                + (apr.production_phased_out_co2 or 0)
-                for apr in cluster_records
-            )
+        # The records completed in the reporting year, see _aggregate()
+        for (_, cluster_name), group in sorted(self.completion_groups.items()):
+            num_completed = group.count
+            total_odp = group.phaseout["odp"]
+            total_mt = group.phaseout["mt"]
+            total_co2 = group.phaseout["co2"]
             rows_data.append(
                 (cluster_name, num_completed, total_odp, total_mt, total_co2)
             )
@@ -1013,22 +1241,6 @@ class APRSummaryTablesExportWriter:
 
         self._clear_template_data_rows(ws, self.DATA_START_ROW)
 
-        # Group serialized data by approval year
-        year_data = defaultdict(list)
-        for item in self.serialized_data:
-            date_approved = item.get("date_approved")
-            if date_approved:
-                if isinstance(date_approved, str):
-                    try:
-                        year = datetime.fromisoformat(
-                            date_approved.replace("Z", "+00:00")
-                        ).year
-                    except (ValueError, AttributeError):
-                        continue
-                else:
-                    continue
-                year_data[year].append(item)
-
         # Process each year
         col_map = self.annual_column_mapping
         row = self.DATA_START_ROW
@@ -1042,23 +1254,13 @@ class APRSummaryTablesExportWriter:
             "balance": 0,
         }
 
-        for approval_year in sorted(year_data.keys()):
-            year_projects = year_data[approval_year]
-
-            num_approvals = len(year_projects)
-            num_completed = sum(
-                1
-                for p in year_projects
-                if p.get("status") in self._completed_status_names
-            )
+        for approval_year, group in sorted(self.annual_groups.items()):
+            num_approvals = group.count
+            num_completed = group.num_status_completed
 
-            total_approved_funding = sum(
-                p.get("approved_funding_plus_adjustment") or 0 for p in year_projects
-            )
-            total_balance = sum(p.get("balance") or 0 for p in year_projects)
-            total_funds_disbursed = sum(
-                p.get("funds_disbursed") or 0 for p in year_projects
-            )
+            total_approved_funding = group.approved_funding
+            total_balance = group.balance
+            total_funds_disbursed = group.funds_disbursed
 
             avg_pct_disbursed = (
                 total_funds_disbursed / total_approved_funding * 100
@@ -1121,35 +1323,12 @@ class APRSummaryTablesExportWriter:
             bold=True,
         )
 
-    def _filter_records(
-        self, status_code=None, status_codes=None, type_code=None, exclude_type_codes=()
-    ):
-        """Returns a filtered sub-list of self.records, using in-memory filtering.
-        Pass status_codes (tuple) to match any of several codes, or status_code for one.
-        """
-        _status_codes = status_codes or (({status_code} if status_code else set()))
-        result = []
-        for apr in self.records:
-            if _status_codes and not (
-                apr.project.status and apr.project.status.code in _status_codes
-            ):
-                continue
-            pt_code = (
-                apr.project.project_type.code if apr.project.project_type else None
-            )
-            if type_code and pt_code != type_code:
-                continue
-            if exclude_type_codes and pt_code in exclude_type_codes:
-                continue
-            result.append(apr)
-        return result
-
     def _write_investment_projects_sheet(self):
         """Sheet (b): Cumulative completed investment projects"""
         ws = self.workbook[self.SHEET_INVESTMENT]
         self._write_flat_aggregation_sheet(
             ws,
-            self._filter_records(status_codes=("COM", "FIN"), type_code="INV"),
+            self.flat_groups[self.SHEET_INVESTMENT],
             include_odp_co2=True,
             sheet_type="cumulative",
         )
@@ -1159,9 +1338,7 @@ class APRSummaryTablesExportWriter:
         ws = self.workbook[self.SHEET_NON_INVESTMENT]
         self._write_flat_aggregation_sheet(
             ws,
-            self._filter_records(
-                status_codes=("COM", "FIN"), exclude_type_codes=("INV", "PRP")
-            ),
+            self.flat_groups[self.SHEET_NON_INVESTMENT],
             include_odp_co2=False,
             sheet_type="cumulative",
         )
@@ -1171,7 +1348,7 @@ class APRSummaryTablesExportWriter:
         ws = self.workbook[self.SHEET_PREPARATION]
         self._write_flat_aggregation_sheet(
             ws,
-            self._filter_records(status_codes=("COM", "FIN"), type_code="PRP"),
+            self.flat_groups[self.SHEET_PREPARATION],
             include_odp_co2=False,
             sheet_type="cumulative",
         )
@@ -1181,7 +1358,7 @@ class APRSummaryTablesExportWriter:
         ws = self.workbook[self.SHEET_ONGOING_INVESTMENT]
         self._write_flat_aggregation_sheet(
             ws,
-            self._filter_records(status_code="ONG", type_code="INV"),
+            self.flat_groups[self.SHEET_ONGOING_INVESTMENT],
             include_odp_co2=True,
             sheet_type="ongoing_investment",
         )
@@ -1191,7 +1368,7 @@ class APRSummaryTablesExportWriter:
         ws = self.workbook[self.SHEET_ONGOING_NON_INVESTMENT]
         self._write_flat_aggregation_sheet(
             ws,
-            self._filter_records(status_code="ONG", exclude_type_codes=("INV", "PRP")),
+            self.flat_groups[self.SHEET_ONGOING_NON_INVESTMENT],
             include_odp_co2=False,
             sheet_type="ongoing_non_investment",
         )
@@ -1201,43 +1378,28 @@ class APRSummaryTablesExportWriter:
         ws = self.workbook[self.SHEET_ONGOING_PREPARATION]
         self._write_flat_aggregation_sheet(
             ws,
-            self._filter_records(status_code="ONG", type_code="PRP"),
+            self.flat_groups[self.SHEET_ONGOING_PREPARATION],
             include_odp_co2=False,
             sheet_type="ongoing_preparation",
         )
 
-    def _write_flat_aggregation_sheet(self, ws, records, include_odp_co2, sheet_type):
+    def _write_flat_aggregation_sheet(self, ws, groups, include_odp_co2, sheet_type):
         """
         Write flat aggregation layout, as used by sheets (b)-(g).
         Structure: Total row, "Region" label, region data, "Sector" label, sector data.
         Inserts or deletes rows as needed so the section sizes match the actual data.
+
+        @param groups: dict - the sheet's groups, see _aggregate()
         """
         column_specs = self._get_column_specs(sheet_type, include_odp_co2)
 
         # Pre-compute all data before touching the sheet structure
-        total_data = self._compute_group_data(records, include_odp_co2, sheet_type)
-
-        def _region_label(apr):
-            region = apr.main_region
-            if region is None:
-                return None
-            return region.apr_name
-
-        region_items = list(
-            self._compute_grouped_data(
-                records,
-                _region_label,
-                include_odp_co2,
-                sheet_type,
-            )
+        total_data = groups["total"].get_data(include_odp_co2, sheet_type)
+        region_items = self._get_grouped_data(
+            groups["region"], include_odp_co2, sheet_type
         )
-        sector_items = list(
-            self._compute_grouped_data(
-                records,
-                "project__sector__name",
-                include_odp_co2,
-                sheet_type,
-            )
+        sector_items = self._get_grouped_data(
+            groups["sector"], include_odp_co2, sheet_type
         )
         n_regions = len(region_items)
         n_sectors = len(sector_items)
@@ -1385,188 +1547,29 @@ class APRSummaryTablesExportWriter:
         Helper for computing aggregation data for a list of records;
         used for Total and per-group.
         """
-        data = {}
-        count = len(records)
-
-        is_ongoing = sheet_type in [
-            "ongoing_investment",
-            "ongoing_non_investment",
-            "ongoing_preparation",
-        ]
-
-        if is_ongoing:
-            data["num_projects"] = count
-        else:
-            data["num_completed"] = count
-
-        data["total_approved_funding"] = sum(
-            apr.approved_funding_plus_adjustment_denorm or 0 for apr in records
-        )
-        data["total_funds_disbursed"] = sum(apr.funds_disbursed or 0 for apr in records)
-
-        data["avg_pct_disbursed"] = (
-            data["total_funds_disbursed"] / data["total_approved_funding"] * 100
-            if data["total_approved_funding"]
-            else 0
-        )
-
-        data["avg_months_to_disbursement"] = self._calculate_avg_months(
-            records, "date_approved_denorm", "date_first_disbursement"
-        )
+        group = APRSummaryGroup()
+        for record in records:
+            group.add(record, get_apr_record_months(record))
+        return group.get_data(include_odp_co2, sheet_type)
 
-        if is_ongoing:
-            data["avg_months_to_completion"] = self._calculate_avg_months(
-                records, "date_approved_denorm", "date_planned_completion"
-            )
-            data["avg_delay"] = self._calculate_avg_delay(records)
-            num_disbursing = sum(
-                1 for apr in records if apr.funds_disbursed and apr.funds_disbursed > 0
-            )
-            data["num_disbursing"] = num_disbursing
-            data["pct_disbursing"] = (num_disbursing / count) if count > 0 else 0
-        else:
-            data["avg_months_to_completion"] = self._calculate_avg_months(
-                records, "date_approved_denorm", "date_actual_completion"
-            )
-
-        if include_odp_co2:
-            total_consumption_odp = sum(
-                apr.consumption_phased_out_odp or 0 for apr in records
-            )
-            total_production_odp = sum(
-                apr.production_phased_out_odp or 0 for apr in records
-            )
-            data["total_consumption_odp"] = total_consumption_odp
-            data["total_production_odp"] = total_production_odp
-
-            data["total_consumption_mt"] = sum(
-                apr.consumption_phased_out_mt or 0 for apr in records
-            )
-            data["total_production_mt"] = sum(
-                apr.production_phased_out_mt or 0 for apr in records
-            )
-
-            data["total_consumption_co2"] = sum(
-                apr.consumption_phased_out_co2 or 0 for apr in records
-            )
-            data["total_production_co2"] = sum(
-                apr.production_phased_out_co2 or 0 for apr in records
-            )
-
-            total_odp = total_consumption_odp + total_production_odp
-            data["cost_effectiveness"] = (
-                data["total_approved_funding"] / (total_odp * 1000) if total_odp else 0
-            )
-
-            if sheet_type == "ongoing_investment":
-                # Cost effectiveness for ongoing projects uses derived (proposal/denorm)
-                # phase-out data rather than agency-reported actuals, since actuals are
-                # often not yet reported and would otherwise make the ratio artificially
-                # large. Completed projects (cumulative sheets) use actual phaseout
-                # above, since actuals are final once a project is complete.
-                total_phaseout_combined = sum(
-                    (apr.consumption_phased_out_odp_proposal_denorm or 0)
-                    + (apr.production_phased_out_odp_proposal_denorm or 0)
-                    for apr in records
-                )
-                data["total_phaseout_combined_kg"] = total_phaseout_combined * 1000
-                data["cost_effectiveness"] = (
-                    data["total_approved_funding"] / data["total_phaseout_combined_kg"]
-                    if data["total_phaseout_combined_kg"]
-                    else 0
-                )
-
-        return data
-
-    def _compute_grouped_data(self, records, group_field, include_odp_co2, sheet_type):
+    @staticmethod
+    def _get_grouped_data(groups, include_odp_co2, sheet_type):
         """
         Helper for computing aggregation data grouped by a field.
-        group_field may be a dotted/double-underscore field path string, or a
-        callable that accepts an AnnualProjectReport instance and returns a value.
-        Returns list of (name, data) tuples, sorted by group value.
-        """
-        buckets = {}
-        for apr in records:
-            if callable(group_field):
-                val = group_field(apr)
-            else:
-                val = self._get_field_value(apr, group_field)
-            key = val if val is not None else ""
-            if key not in buckets:
-                buckets[key] = []
-            buckets[key].append(apr)
 
+        @param groups: dict {group value: APRSummaryGroup}; "" for the records
+            without a value
+
+        @return: list of (name, data) tuples, sorted by group value
+        """
         result = []
-        for group_val in sorted(buckets.keys(), key=lambda x: (x == "", str(x))):
+        for group_val in sorted(groups.keys(), key=lambda x: (x == "", str(x))):
             group_name = group_val or "Unknown"
-            group_data = self._compute_group_data(
-                buckets[group_val], include_odp_co2, sheet_type
-            )
+            group_data = groups[group_val].get_data(include_odp_co2, sheet_type)
             result.append((group_name, group_data))
 
         return result
 
-    def _calculate_avg_months(self, records, start_date_field, end_date_field):
-        """Helper for all month averaging performed throughout the file"""
-        total_months = 0
-        count = 0
-
-        for apr in records:
-            start_date = self._get_field_value(apr, start_date_field)
-            end_date = self._get_field_value(apr, end_date_field)
-
-            if start_date and end_date:
-                delta = relativedelta(end_date, start_date)
-                months = delta.years * 12 + delta.months
-                total_months += months
-                count += 1
-
-        return total_months / count if count > 0 else 0
-
-    @staticmethod
-    def _months_since_approval(date_approved, target_date):
-        """
-        Months from approval to `target_date`, 0 when unmeasurable.
-        """
-        if not date_approved or not target_date or target_date < date_approved:
-            return 0
-
-        delta = relativedelta(target_date, date_approved)
-        return delta.years * 12 + delta.months
-
-    def _calculate_avg_delay(self, records):
-        """
-        Average length of delay in project planned completion, positive or negative.
-
-        Measured as planned completion minus the completion date per proposal,
-        both expressed as months since approval.
-
-        Records only count when both spans are non-zero, mirroring the MLFS's reference
-        workbook.
-        This deliberately ignores date_of_completion_per_agreement_or_decisions_denorm:
-        that field holds the multi-year agreement's end date, which a single tranche
-        is not expected to reach.
-        """
-        total_months = 0
-        count = 0
-
-        for apr in records:
-            date_approved = self._get_field_value(apr, "date_approved_denorm")
-            months_to_proposal = self._months_since_approval(
-                date_approved,
-                self._get_field_value(apr, "date_completion_proposal_denorm"),
-            )
-            months_to_planned = self._months_since_approval(
-                date_approved,
-                self._get_field_value(apr, "date_planned_completion"),
-            )
-
-            if months_to_proposal and months_to_planned:
-                total_months += months_to_planned - months_to_proposal
-                count += 1
-
-        return total_months / count if count > 0 else 0
-
     def _create_response(self):
         """Create HTTP response with the workbook"""
         output = BytesIO()
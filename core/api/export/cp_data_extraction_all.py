@@ -1,8 +1,46 @@
-from core.api.export.base import BaseWriter
+from functools import partial
 
+from core.api.export.base import WriteOnlyBase
 
-class BaseExtractionAllWriter(BaseWriter):
-    header_row_start_idx = 1
+
+class ExtractionAllSheetWriter(WriteOnlyBase):
+    """
+    Base writer for the "CP Data Extraction-All" sheets.
+
+    The sheets are written in a write-only workbook, every row is appended
+    as soon as it is produced, so the data can be passed as a generator.
+    """
+
+    sheet_name = None
+
+    def __init__(self, wb, headers):
+        sheet = wb.create_sheet(self.sheet_name)
+        super().__init__(sheet, headers)
+
+    def write(self, data):
+        # Row and column styles need to be set before writing any cell
+        self.sheet.sheet_format.defaultRowHeight = self.ROW_HEIGHT
+        self.sheet.sheet_format.customHeight = True
+        # Freeze so top and side headers always stay visible.
+        self.sheet.freeze_panes = f"B{self.header_row_end_idx + 1}"
+        super().write(data)
+
+    def _write_record_row(self, get_value):
+        self.sheet.append(
+            [
+                self.write_record_cell(
+                    get_value(header["id"]),
+                    align=header.get("align", "left"),
+                )
+                for header in self.headers
+            ]
+        )
+
+
+class BaseExtractionAllWriter(ExtractionAllSheetWriter):
+    """
+    Writes {(country_name, chemical_name): {header_id: value}} data
+    """
 
     def get_record_value_year_headers(self, min_year, max_year, metric="MT"):
         value_headers = []
@@ -18,29 +56,21 @@ class BaseExtractionAllWriter(BaseWriter):
         return value_headers
 
     def write_data(self, data):
-        row_idx = self.header_row_end_idx + 1
         for (country_name, chemical_name), record in data.items():
-            self._write_record_row(row_idx, country_name, chemical_name, record)
-            row_idx += 1
-
-    def _write_record_row(self, row_idx, country_name, chemical_name, record):
-        for header_id, header in self.headers.items():
-            if header_id == "country_name":
-                value = country_name
-            elif header_id == "substance_name":
-                value = chemical_name
-            else:
-                value = record.get(header_id, None)
-
-            self._write_record_cell(
-                row_idx,
-                header["column"],
-                value,
-                align=header.get("align", "left"),
+            self._write_record_row(
+                partial(self.get_value, country_name, chemical_name, record)
             )
 
+    def get_value(self, country_name, chemical_name, record, header_id):
+        if header_id == "country_name":
+            return country_name
+        if header_id == "substance_name":
+            return chemical_name
+        return record.get(header_id, None)
+
 
 class CPPricesExtractionWriter(BaseExtractionAllWriter):
+    sheet_name = "ODSPrice"
 
     def __init__(self, wb, min_year, max_year):
         year_headers = []
@@ -81,34 +111,24 @@ class CPPricesExtractionWriter(BaseExtractionAllWriter):
                 "headerName": "Notes",
             },
         ]
-        sheet = wb.create_sheet("ODSPrice")
-        super().__init__(sheet, headers)
+        super().__init__(wb, headers)
 
-    def _write_record_row(self, row_idx, country_name, chemical_name, record):
-        for header_id, header in self.headers.items():
-            if header_id == "country_name":
-                value = country_name
-            elif header_id == "chemical_name":
-                value = chemical_name
-            elif "price" in header_id:
-                # try to convert the value to float else keep it as it is
-                value = record.get(header_id, None)
-                try:
-                    value = float(value)
-                except (TypeError, ValueError):
-                    pass
-            else:
-                value = record.get(header_id, None)
-
-            self._write_record_cell(
-                row_idx,
-                header["column"],
-                value,
-                align=header.get("align", "left"),
-            )
+    def get_value(self, country_name, chemical_name, record, header_id):
+        if header_id == "chemical_name":
+            return chemical_name
+        value = super().get_value(country_name, chemical_name, record, header_id)
+        if "price" in header_id:
+            # try to convert the value to float else keep it as it is
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                pass
+        return value
 
 
 class CPDetailsExtractionWriter(BaseExtractionAllWriter):
+    sheet_name = "CP-Details"
+
     def __init__(self, wb, min_year, max_year):
         value_headers = self.get_record_value_year_headers(min_year, max_year)
         headers = [
@@ -142,11 +162,11 @@ class CPDetailsExtractionWriter(BaseExtractionAllWriter):
                 "headerName": "Notes",
             },
         ]
-        sheet = wb.create_sheet("CP-Details")
-        super().__init__(sheet, headers)
+        super().__init__(wb, headers)
 
 
 class CPConsumptionODPWriter(BaseExtractionAllWriter):
+    sheet_name = "CPConsumption(ODP)"
 
     def __init__(self, wb, min_year, max_year):
         value_headers = self.get_record_value_year_headers(min_year, max_year, "ODP")
@@ -165,11 +185,12 @@ class CPConsumptionODPWriter(BaseExtractionAllWriter):
                 "headerName": "Notes",
             },
         ]
-        sheet = wb.create_sheet("CPConsumption(ODP)")
-        super().__init__(sheet, headers)
+        super().__init__(wb, headers)
 
 
 class CPHFCConsumptionMTCO2Writer(BaseExtractionAllWriter):
+    sheet_name = "HFC-Consumption(MTvsCO₂Equi)"
+
     def __init__(self, wb, min_year, max_year):
         consump_headers = []
         for year in range(min_year, max_year + 1):
@@ -228,12 +249,11 @@ class CPHFCConsumptionMTCO2Writer(BaseExtractionAllWriter):
                 "headerName": "Notes",
             },
         ]
-        sheet = wb.create_sheet("HFC-Consumption(MTvsCO₂Equi)")
-        super().__init__(sheet, headers)
+        super().__init__(wb, headers)
 
 
-class HFC23GenerationWriter(BaseWriter):
-    header_row_start_idx = 1
+class HFC23GenerationWriter(ExtractionAllSheetWriter):
+    sheet_name = "HFC-23Generation"
 
     def __init__(self, wb):
         headers = [
@@ -293,11 +313,9 @@ class HFC23GenerationWriter(BaseWriter):
                 "headerName": "Notes",
             },
         ]
-        sheet = wb.create_sheet("HFC-23Generation")
-        super().__init__(sheet, headers)
+        super().__init__(wb, headers)
 
     def write_data(self, data):
-        row_idx = self.header_row_end_idx + 1
         for record in data:
             # check if there is a column with non-zero value
             non_zero_value = False
@@ -307,31 +325,20 @@ class HFC23GenerationWriter(BaseWriter):
                     break
             # write the record only if there is a column with non-zero value
             if non_zero_value:
-                self._write_record_row(row_idx, record)
-                row_idx += 1
-
-    def _write_record_row(self, row_idx, record):
-        # write the record data
-        for header_id, header in self.headers.items():
-            if header_id == "country_name":
-                value = record.country_programme_report.country.name
-            elif header_id == "year":
-                value = record.country_programme_report.year
-            elif header_id == "substance_name":
-                value = "HFC-23"
-            else:
-                value = getattr(record, header_id, None)
-
-            self._write_record_cell(
-                row_idx,
-                header["column"],
-                value,
-                align=header.get("align", "left"),
-            )
+                self._write_record_row(partial(self.get_value, record))
 
+    def get_value(self, record, header_id):
+        if header_id == "country_name":
+            return record.country_programme_report.country.name
+        if header_id == "year":
+            return record.country_programme_report.year
+        if header_id == "substance_name":
+            return "HFC-23"
+        return getattr(record, header_id, None)
 
-class HFC23EmissionWriter(BaseWriter):
-    header_row_start_idx = 1
+
+class HFC23EmissionWriter(ExtractionAllSheetWriter):
+    sheet_name = "HFC-23Emission"
 
     def __init__(self, wb):
         headers = [
@@ -420,34 +427,22 @@ class HFC23EmissionWriter(BaseWriter):
                 "headerName": "Notes",
             },
         ]
-        sheet = wb.create_sheet("HFC-23Emission")
-        super().__init__(sheet, headers)
+        super().__init__(wb, headers)
 
     def write_data(self, data):
-        row_idx = self.header_row_end_idx + 1
         for record in data:
-            self._write_record_row(row_idx, record)
-            row_idx += 1
-
-    def _write_record_row(self, row_idx, record):
-        for header_id, header in self.headers.items():
-            if header_id == "country_name":
-                value = record.country_programme_report.country.name
-            elif header_id == "year":
-                value = record.country_programme_report.year
-            else:
-                value = getattr(record, header_id, None)
-
-            self._write_record_cell(
-                row_idx,
-                header["column"],
-                value,
-                align=header.get("align", "left"),
-            )
+            self._write_record_row(partial(self.get_value, record))
 
+    def get_value(self, record, header_id):
+        if header_id == "country_name":
+            return record.country_programme_report.country.name
+        if header_id == "year":
+            return record.country_programme_report.year
+        return getattr(record, header_id, None)
 
-class MbrConsumptionWriter(BaseWriter):
-    header_row_start_idx = 1
+
+class MbrConsumptionWriter(ExtractionAllSheetWriter):
+    sheet_name = "MbrConsumption"
 
     def __init__(self, wb, min_year, max_year):
         mbr_headers = []
@@ -481,5 +476,4 @@ class MbrConsumptionWriter(BaseWriter):
             },
             *mbr_headers,
         ]
-        sheet = wb.create_sheet("MbrConsumption")
-        super().__init__(sheet, headers)
+        super().__init__(wb, headers)
@@ -1,4 +1,5 @@
 import datetime
+import logging
 from functools import cached_property
 from functools import partial
 from itertools import chain
@@ -10,6 +11,7 @@ from typing import TYPE_CHECKING
 import openpyxl
 from django.db.models import JSONField
 from django.db.models import Prefetch
+from django.db.models.functions import Coalesce
 from django.db.models.fields import BooleanField
 from django.db.models.fields import CharField
 from django.db.models.fields import DateField
@@ -32,6 +34,19 @@ from core.models.project_metadata import ProjectField
 if TYPE_CHECKING:
     from core.api.views import ProjectV2ViewSet
 
+logger = logging.getLogger(__name__)
+
+# Number of projects fetched (and prefetched) at once while streaming the dump
+DUMP_CHUNK_SIZE = 500
+
+# Fields of the other versions needed to compute the approved funds
+VERSION_MAP_FIELDS = [
+    "total_fund",
+    "fund_transferred",
+    "support_cost_psc",
+    "psc_transferred",
+]
+
 
 def get_field_value(project, header):
     field_name = header["id"]
@@ -106,10 +121,15 @@ def get_value_component_field(project, header):
 class SheetWriter:
     def __init__(self, sheet):
         self.sheet = sheet
+        self.rows_written = 0
         self.sheet.append(
             [h["headerName"] for h in chain(self.project_headers, self.headers)]
         )
 
+    def append(self, row):
+        self.sheet.append(row)
+        self.rows_written += 1
+
     @property
     def headers(self) -> Sequence[dict]:
         """Subclasses need to implement this."""
@@ -160,11 +180,15 @@ class SheetWriter:
 
 class ProjectsFundsWriter(SheetWriter):
     def __init__(self, sheet, version_map):
+        """
+        @param version_map: dict {(final version id, version): row} with the
+            VERSION_MAP_FIELDS of every version in the dump
+        """
         super().__init__(sheet)
         self.version_map = version_map
 
     def get_version(self, p, version):
-        key = (p.final_version.id, version)
+        key = (p.latest_project_id or p.id, version)
         return self.version_map.get(key)
 
     def calc_total_fund(self, p, _):
@@ -295,7 +319,7 @@ class ProjectsFundsWriter(SheetWriter):
 
     def write(self, p):
         base_row = self.get_base_row(p)
-        self.sheet.append(base_row)
+        self.append(base_row)
 
 
 class ProjectsMeetingUpdatesWriter(SheetWriter):
@@ -326,7 +350,7 @@ class ProjectsMeetingUpdatesWriter(SheetWriter):
 
     def write(self, p):
         base_row = self.get_base_row(p)
-        self.sheet.append(base_row)
+        self.append(base_row)
 
 
 class ProjectsOdsOdpWriter(SheetWriter):
@@ -342,7 +366,7 @@ class ProjectsOdsOdpWriter(SheetWriter):
                     row.append(getattr(odsodp, i))
                 else:
                     row.append(getattr(p, i))
-            self.sheet.append(row)
+            self.append(row)
 
     @cached_property
     def headers(self):
@@ -399,11 +423,21 @@ class ProjectsV2DumpWriter:
         return p.support_cost_psc or 0
 
     def write(self, projects, *with_project):
+        """
+        Write a row for each project, calling the `with_project` writers
+        for each of them
+
+        @param projects: iterable of Project objects, consumed only once
+        @return: int - number of projects written
+        """
         self.sheet.append([h["headerName"] for h in self.headers])
+        count = 0
         for p in projects:
             self.sheet.append([h["method"](p, h) for h in self.headers])
             for writer in with_project:
                 writer(p)
+            count += 1
+        return count
 
     def _build_headers(self, fields, source=None):
         result = []
@@ -565,29 +599,64 @@ class ProjectsV2Dump:
             result.insert(idx_before + 1, result.pop(idx_after))
         return result
 
+    def get_version_map(self):
+        """
+        Get the fields needed by the funds sheet for every project version in
+        the dump, with a single query
+
+        @return: dict {(final version id, version): row}
+        """
+        versions = (
+            self.queryset.prefetch_related(None)
+            .select_related(None)
+            .order_by()
+            .annotate(final_id=Coalesce("latest_project_id", "id"))
+            .values_list("final_id", "version", *VERSION_MAP_FIELDS, named=True)
+        )
+        return {(v.final_id, v.version): v for v in versions}
+
     def export(self):
+        """
+        Stream the projects into the write-only workbook, fetching them
+        in chunks of DUMP_CHUNK_SIZE (each chunk with its own prefetch)
+        """
         t0 = time()
 
-        # Do this once here, since we need to iterate over
-        # the queryset twice (once to build the version map).
-        projects = list(self.queryset)
-        print(f"Projects queried in {time() - t0:.2f} seconds.")
+        version_map = self.get_version_map()
+        t_version_map = time() - t0
 
-        version_map = {(p.final_version.id, p.version): p for p in projects}
         odp_writer = ProjectsOdsOdpWriter(self._make_sheet("Substances"))
         funds_writer = ProjectsFundsWriter(self._make_sheet("Funds"), version_map)
         # meeting_updates_writer = ProjectsMeetingUpdatesWriter(
         #     self._make_sheet("Meeting updates")
         # )
-        ProjectsV2DumpWriter(
+        projects_count = ProjectsV2DumpWriter(
             self.sheet_projects,
             self.project_fields,
             self.metaproject_fields,
         ).write(
-            projects,
+            self.queryset.iterator(chunk_size=DUMP_CHUNK_SIZE),
             odp_writer.write,
             funds_writer.write,
             # meeting_updates_writer.write,
         )
-        print(f"Done in {time() - t0:.2f} seconds.")
-        return workbook_response("Projects database dump", self.wb)
+        t_rows = time() - t0 - t_version_map
+
+        response = workbook_response("Projects database dump", self.wb)
+        logger.info(
+            "Projects database dump: %d projects, %d substance rows, "
+            "%d fund rows in %.2f seconds",
+            projects_count,
+            odp_writer.rows_written,
+            funds_writer.rows_written,
+            time() - t0,
+            extra={
+                "projects_count": projects_count,
+                "substances_count": odp_writer.rows_written,
+                "funds_count": funds_writer.rows_written,
+                "version_map_seconds": round(t_version_map, 3),
+                "rows_seconds": round(t_rows, 3),
+                "total_seconds": round(time() - t0, 3),
+            },
+        )
+        return response
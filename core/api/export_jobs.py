@@ -0,0 +1,301 @@
+import hashlib
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Max
+from django.http import HttpRequest, QueryDict
+from django.urls import NoReverseMatch, resolve, reverse
+from django.utils import timezone
+from django.utils.http import parse_header_parameters
+
+from core.models import ExportJob
+
+CP_DATA_MODELS = (
+    "core.CPReport",
+    "core.CPRecord",
+    "core.CPUsage",
+    "core.CPPrices",
+    "core.CPGeneration",
+    "core.CPEmission",
+    "core.CPHistory",
+    "core.CPReportArchive",
+    "core.CPRecordArchive",
+    "core.CPUsageArchive",
+    "core.CPPricesArchive",
+    "core.CPGenerationArchive",
+    "core.CPEmissionArchive",
+)
+
+# Exports that can be rendered as background jobs, mapped to the models whose
+# data version invalidates a finished result. Exports without a data version
+# only share in-flight runs; their finished files are never reused, because
+# some of the underlying tables are updated in place without a timestamp.
+EXPORT_JOB_VIEWS = {
+    "country-programme-export": CP_DATA_MODELS,
+    "country-programme-print": CP_DATA_MODELS,
+    "country-programme-reports-export": CP_DATA_MODELS,
+    "country-programme-hfc-export": CP_DATA_MODELS,
+    "country-programme-hcfc-export": CP_DATA_MODELS,
+    "country-programme-extraction-all-export": CP_DATA_MODELS,
+    "country-programme-calculated-amount-export": CP_DATA_MODELS,
+    "country-programme-calculated-amount-print": CP_DATA_MODELS,
+    "country-programme-archive-export": CP_DATA_MODELS,
+    "country-programme-archive-print": CP_DATA_MODELS,
+    "apr-export": None,
+    "apr-mlfs-export": None,
+    "apr-summary-tables-export": None,
+    "bpactivity-export": None,
+    "funding-window-export": None,
+    "project-export": None,
+    "project-print": None,
+    "project-v2-export": None,
+    "replenishment-dashboard-export": None,
+    "replenishment-input-data-export": None,
+    "replenishment-statistics-export": None,
+    "replenishment-status-of-contributions-export": None,
+    "replenishment-status-of-contributions-annual-export": None,
+    "replenishment-status-of-contributions-triennial-export": None,
+    "replenishment-status-of-contributions-summary-export": None,
+    "replenishment-status-of-contributions-statistics-export": None,
+    "summary-of-projects-export": None,
+}
+
+
+class ExportJobError(Exception):
+    pass
+
+
+def _hash(value):
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_user_scope(user):
+    """
+    Fingerprint everything that changes what an export shows to a user.
+
+    @param user: User
+    @return: str
+    """
+    return _hash(
+        {
+            "is_superuser": user.is_superuser,
+            "permissions": sorted(user.get_all_permissions()),
+            "agency_id": user.agency_id,
+            "country_id": user.country_id,
+        }
+    )
+
+
+def get_data_version(view_name):
+    """
+    Compute the data version of an export from the row counts, max ids and
+    last update timestamps of the models it reads.
+
+    @param view_name: str - URL name of the export view
+    @return: str | None - None if the export does not declare its models
+    """
+    model_labels = EXPORT_JOB_VIEWS.get(view_name)
+    if not model_labels:
+        return None
+
+    state = {}
+    for label in model_labels:
+        model = apps.get_model(label)
+        aggregates = {"count": Count("pk"), "max_id": Max("pk")}
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False):
+                aggregates[f"max_{field.name}"] = Max(field.name)
+        state[label] = model.objects.aggregate(**aggregates)
+    return _hash(state)
+
+
+def get_export_job_ttl():
+    return timedelta(hours=settings.EXPORT_JOB_TTL_HOURS)
+
+
+def _normalize_params(params):
+    # Sort repeated query params so equivalent requests hash the same
+    return {
+        key: sorted(map(str, value)) if isinstance(value, list) else str(value)
+        for key, value in params.items()
+    }
+
+
+def get_export_path(view_name, url_kwargs):
+    """
+    Build the path of an export view, validating that it can run as a job.
+
+    @param view_name: str
+    @param url_kwargs: dict
+    @return: str
+    """
+    if view_name not in EXPORT_JOB_VIEWS:
+        raise ExportJobError(f"Export {view_name!r} cannot be run as a job.")
+    try:
+        return reverse(view_name, kwargs=url_kwargs or None)
+    except NoReverseMatch as e:
+        raise ExportJobError(f"Invalid URL parameters for {view_name!r}.") from e
+
+
+def submit_export_job(user, view_name, url_kwargs=None, params=None):
+    """
+    Get or create the export job for the given export request.
+
+    Returns an existing job if one with the same key is in flight or finished
+    successfully and has not expired; otherwise creates a new pending job that
+    the caller must enqueue.
+
+    @param user: User
+    @param view_name: str - URL name of the export view
+    @param url_kwargs: dict - URL path parameters
+    @param params: dict - query parameters; list values for repeated params
+    @return: tuple (ExportJob, bool) - the job and whether it was created
+    """
+    url_kwargs = {key: str(value) for key, value in (url_kwargs or {}).items()}
+    params = _normalize_params(params or {})
+    get_export_path(view_name, url_kwargs)
+
+    data_version = get_data_version(view_name)
+    user_scope = get_user_scope(user)
+    key = _hash(
+        {
+            "view_name": view_name,
+            "url_kwargs": url_kwargs,
+            "params": params,
+            "data_version": data_version,
+            "user_scope": user_scope,
+        }
+    )
+
+    # free the keys of the jobs whose worker died
+    ExportJob.objects.fail_stale()
+    job = ExportJob.objects.reusable(key)
+    if job:
+        return job, False
+
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(
+                key=key,
+                view_name=view_name,
+                url_kwargs=url_kwargs,
+                params=params,
+                data_version=data_version,
+                user_scope=user_scope,
+                created_by=user,
+                # Deleted (with the file) once this passes
+                expires_at=timezone.now() + get_export_job_ttl(),
+            )
+    except IntegrityError:
+        # An identical job was submitted concurrently
+        return ExportJob.objects.in_flight().get(key=key), False
+
+    return job, True
+
+
+def _get_response_filename(response, default):
+    disposition = response.get("Content-Disposition")
+    if disposition:
+        _, params = parse_header_parameters(disposition)
+        if params.get("filename"):
+            return params["filename"]
+    return default
+
+
+def get_export_request(job):
+    """
+    Build the GET request of a job's export, authenticated as the user who
+    submitted it (like the authentication middleware does for the session
+    user, which the API accepts).
+
+    @param job: ExportJob
+    @return: HttpRequest
+    """
+    request = HttpRequest()
+    request.method = "GET"
+    request.path = request.path_info = get_export_path(job.view_name, job.url_kwargs)
+    request.GET = QueryDict(mutable=True)
+    for key, value in job.params.items():
+        request.GET.setlist(key, value if isinstance(value, list) else [value])
+    request.user = job.created_by
+    return request
+
+
+@contextmanager
+def export_job_heartbeat(job):
+    """
+    Update the heartbeat of a running job from a background thread, every
+    EXPORT_JOB_HEARTBEAT_SECONDS, while the body of the `with` block runs.
+
+    @param job: ExportJob
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.EXPORT_JOB_HEARTBEAT_SECONDS):
+                ExportJob.objects.filter(
+                    id=job.id, status=ExportJob.ExportJobStatus.RUNNING
+                ).update(heartbeat_at=timezone.now())
+        finally:
+            # the thread has its own database connection
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def render_export_job(job):
+    """
+    Render the export of a job by calling its view as the user who submitted
+    it, so the view checks permissions and filters the data as usual.
+
+    @param job: ExportJob
+    """
+    request = get_export_request(job)
+    match = resolve(request.path_info)
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response.render()
+
+    if response.status_code != 200:
+        content = b"" if response.streaming else response.content
+        raise ExportJobError(
+            f"Export returned {response.status_code}: "
+            f"{content.decode(errors='replace')[:500]}"
+        )
+
+    with tempfile.TemporaryFile() as tmp:
+        if response.streaming:
+            for chunk in response.streaming_content:
+                tmp.write(chunk)
+        else:
+            tmp.write(response.content)
+        # Not response.close(): that fires request_finished, which closes the
+        # database connection the caller is still using.
+        if getattr(response, "file_to_stream", None):
+            response.file_to_stream.close()
+        tmp.seek(0)
+
+        job.filename = _get_response_filename(response, f"export-{job.id}")
+        job.content_type = response.get("Content-Type", "")
+        job.file.save(job.filename, File(tmp), save=False)
+
+    job.status = ExportJob.ExportJobStatus.SUCCESS
+    job.finished_at = timezone.now()
+    job.expires_at = job.finished_at + get_export_job_ttl()
+    job.save()
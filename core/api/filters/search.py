@@ -0,0 +1,80 @@
+import operator
+import re
+from functools import reduce
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import models
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from core.models.search_document import SEARCH_CONFIG
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Search filter that matches the search terms against the indexed search
+    documents of the view (`search_document_model`) instead of scanning the
+    searched fields: a term matches the documents that contain it (e.g. "CFC"
+    matches "HCFC-22", "81/INV" matches "BRA/FOA/81/INV/02") or whose
+    consecutive words start with the words of the term. The `search_fields`
+    of the view are still matched with `icontains` (for the fields that are
+    not part of the documents).
+
+    Unless an ordering is requested, the results are ranked by relevance (the
+    words starting with the words of the terms), the default ordering deciding
+    between equally relevant results.
+    """
+
+    def get_search_query(self, term):
+        """
+        @param term: str - search term
+
+        @return: SearchQuery matching consecutive words that start with the
+            words of the term; None if the term has no words
+        """
+        words = re.findall(r"\w+", term)
+        if not words:
+            return None
+        return SearchQuery(
+            " <-> ".join(f"{word}:*" for word in words),
+            search_type="raw",
+            config=SEARCH_CONFIG,
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        documents = view.search_document_model.objects.all()
+        orm_lookups = [
+            self.construct_search(str(search_field), queryset)
+            for search_field in self.get_search_fields(view, request) or []
+        ]
+        conditions = []
+        search_queries = []
+        for term in search_terms:
+            term_lookups = [models.Q(**{lookup: term}) for lookup in orm_lookups]
+            document_lookup = models.Q(text__icontains=term)
+            search_query = self.get_search_query(term)
+            if search_query is not None:
+                search_queries.append(search_query)
+                document_lookup |= models.Q(vector=search_query)
+            term_lookups.append(
+                models.Q(pk__in=documents.filter(document_lookup).values("pk"))
+            )
+            conditions.append(reduce(operator.or_, term_lookups))
+        queryset = queryset.filter(reduce(operator.and_, conditions))
+
+        if not search_queries or api_settings.ORDERING_PARAM in request.query_params:
+            return queryset
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return queryset.annotate(
+            search_rank=models.Subquery(
+                documents.filter(pk=models.OuterRef("pk")).values(
+                    rank=SearchRank(
+                        models.F("vector"), reduce(operator.and_, search_queries)
+                    )
+                )
+            )
+        ).order_by("-search_rank", *ordering)
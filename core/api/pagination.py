@@ -0,0 +1,146 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value)} in a cursor")
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination
+
+    Pages are fetched with a `WHERE (ordering) > (last row)` condition instead
+    of an OFFSET, so every page costs the same whatever its position. The
+    ordering must be unique and its fields must not be null; the cursor holds
+    the ordering values of the last row of the previous page.
+    """
+
+    # unique, non null ordering fields; prefix with "-" for descending order
+    ordering = ()
+    page_size = 1000
+    max_page_size = 10000
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def __init__(self):
+        self.request = None
+        self.next_cursor = None
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, values):
+        return base64.urlsafe_b64encode(
+            json.dumps(values, default=_json_default).encode()
+        ).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError) as e:
+            raise NotFound("Invalid cursor") from e
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound("Invalid cursor")
+        return values
+
+    def get_seek_filter(self, values):
+        """
+        Build the condition for the rows after the given ordering values
+
+        (a, -b, c) > (x, y, z) is expanded to
+            a > x OR (a = x AND b < y) OR (a = x AND b = y AND c > z)
+
+        @param values: list of values, one for each ordering field
+        @return: Q
+        """
+        seek_filter = Q()
+        equal_filter = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            seek_filter |= equal_filter & Q(**{f"{name}__{lookup}": value})
+            equal_filter &= Q(**{name: value})
+        return seek_filter
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        values = self.decode_cursor(request)
+        if values is not None:
+            queryset = queryset.filter(self.get_seek_filter(values))
+
+        # fetch one more row to know if there is a next page
+        page = list(queryset[: page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(
+                [getattr(page[-1], field.lstrip("-")) for field in self.ordering]
+            )
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor,
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def to_html(self):
+        # no page controls in the browsable API
+        return ""
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
@@ -1,9 +1,14 @@
-from django.db import transaction
+from collections import Counter, defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import F
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import serializers
 
 from core.models import (
+    APREndorsementJob,
     AnnualProgressReport,
     AnnualAgencyProjectReport,
     AnnualProjectReport,
@@ -11,8 +16,12 @@ from core.models import (
     Meeting,
 )
 from core.api.serializers.agency import AgencySerializer
+from core.api.utils import bulk_update_values
+
+# pylint: disable=C0302, W0223, W0613
 
-# pylint: disable=W0223, W0613
+# Rows written by each UPDATE of the bulk update (copy-paste from Excel)
+APR_BULK_UPDATE_BATCH_SIZE = 500
 
 
 class AnnualProjectReportReadSerializer(serializers.ModelSerializer):
@@ -551,60 +560,158 @@ class AnnualProjectReportBulkUpdateSerializer(serializers.Serializer):
             )
 
         # Check for duplicate project codes
-        project_codes = [pr.get("project_code") for pr in value]
-        duplicates = [
+        code_counts = Counter(pr.get("project_code") for pr in value)
+        duplicates = sorted(
             code
-            for code in project_codes
-            if code is not None and project_codes.count(code) > 1
-        ]
+            for code, count in code_counts.items()
+            if code is not None and count > 1
+        )
 
         if duplicates:
-            unique_duplicates = list(set(duplicates))
             raise serializers.ValidationError(
-                f"Duplicate project codes found: {', '.join(unique_duplicates)}"
+                f"Duplicate project codes found: {', '.join(duplicates)}"
             )
 
         return value
 
+    @staticmethod
+    def get_changed_fields(project_report, pr_data):
+        """
+        Set the pasted values on the project report and validate them in memory
+
+        @param project_report: AnnualProjectReport object
+        @param pr_data: dict {field name: value} (without the project code)
+
+        @return: list of the names of the fields whose value changed
+        @raise ValidationError: if a changed value is not valid for the model
+            field; the project report is left unchanged
+        """
+        old_values = {
+            field: getattr(project_report, field)
+            for field, value in pr_data.items()
+            if field != "id" and getattr(project_report, field) != value
+        }
+        for field in old_values:
+            setattr(project_report, field, pr_data[field])
+
+        try:
+            project_report.clean_fields(
+                exclude=[
+                    f.name
+                    for f in AnnualProjectReport._meta.concrete_fields
+                    if f.name not in old_values
+                ]
+            )
+        except ValidationError:
+            for field, value in old_values.items():
+                setattr(project_report, field, value)
+            raise
+
+        return list(old_values)
+
+    @staticmethod
+    def bulk_update_reports(project_reports_by_fields, errors):
+        """
+        Write the changed project reports, one UPDATE per batch of reports
+        with the same changed fields. If a batch fails, its reports are saved
+        one by one to find the failing ones.
+
+        @param project_reports_by_fields: dict {changed fields: [reports]};
+            the reports are annotated with their project_code
+        @param errors: list the errors of the failing reports are added to
+
+        @return: set of the ids of the failing reports
+        """
+        failed_ids = set()
+        for fields, project_reports in project_reports_by_fields.items():
+            fields = [*fields, "updated_at"]
+            for i in range(0, len(project_reports), APR_BULK_UPDATE_BATCH_SIZE):
+                batch = project_reports[i : i + APR_BULK_UPDATE_BATCH_SIZE]
+                try:
+                    with transaction.atomic():
+                        bulk_update_values(
+                            AnnualProjectReport,
+                            batch,
+                            fields,
+                            batch_size=APR_BULK_UPDATE_BATCH_SIZE,
+                        )
+                    continue
+                except DatabaseError:
+                    pass
+
+                for project_report in batch:
+                    try:
+                        with transaction.atomic():
+                            project_report.save(update_fields=fields)
+                    except DatabaseError as e:
+                        failed_ids.add(project_report.id)
+                        errors.append(
+                            {
+                                "project_code": project_report.project_code,
+                                "error": str(e),
+                            }
+                        )
+        return failed_ids
+
     def update(self, instance, validated_data):
         """
         Update multiple AnnualProjectReport records.
+
+        Only the reports with changed values are written, with bulk updates;
+        the values are validated against the model fields in memory.
         """
         project_reports_data = validated_data["project_reports"]
         project_reports_map = {}
-        for pr in instance.project_reports.select_related("project").all():
-            project_reports_map[pr.project.code] = pr
+        for pr in instance.project_reports.annotate(project_code=F("project__code")):
+            project_reports_map[pr.project_code] = pr
 
-        updated_reports = []
+        matched_reports = []
+        project_reports_by_fields = defaultdict(list)
         errors = []
+        now = timezone.now()
 
-        with transaction.atomic():
-            for pr_data in project_reports_data:
-                project_code = pr_data.pop("project_code")
-
-                if project_code not in project_reports_map:
-                    errors.append(
-                        {
-                            "project_code": project_code,
-                            "error": (
-                                f"Project with code `{project_code}` not found "
-                                "in this agency report."
-                            ),
-                        }
-                    )
-                    continue
+        for pr_data in project_reports_data:
+            project_code = pr_data.pop("project_code")
 
-                project_report = project_reports_map[project_code]
+            if project_code not in project_reports_map:
+                errors.append(
+                    {
+                        "project_code": project_code,
+                        "error": (
+                            f"Project with code `{project_code}` not found "
+                            "in this agency report."
+                        ),
+                    }
+                )
+                continue
 
-                for field, value in pr_data.items():
-                    setattr(project_report, field, value)
+            project_report = project_reports_map[project_code]
 
-                try:
-                    project_report.save()
-                    updated_reports.append(project_report)
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    errors.append({"project_code": project_code, "error": str(e)})
+            try:
+                changed_fields = self.get_changed_fields(project_report, pr_data)
+            except ValidationError as e:
+                errors.append(
+                    {
+                        "project_code": project_code,
+                        "error": "; ".join(
+                            f"{field}: {' '.join(messages)}"
+                            for field, messages in e.message_dict.items()
+                        ),
+                    }
+                )
+                continue
+
+            matched_reports.append(project_report)
+            if changed_fields:
+                project_report.updated_at = now
+                project_reports_by_fields[tuple(sorted(changed_fields))].append(
+                    project_report
+                )
+
+        with transaction.atomic():
+            failed_ids = self.bulk_update_reports(project_reports_by_fields, errors)
 
+        updated_reports = [pr for pr in matched_reports if pr.id not in failed_ids]
         return updated_reports, errors
 
 
@@ -773,6 +880,24 @@ class AnnualProgressReportSerializer(serializers.ModelSerializer):
         return obj.agency_project_reports.count()
 
 
+class APREndorsementJobSerializer(serializers.ModelSerializer):
+    """Progress of the project updates after an APR endorsement."""
+
+    class Meta:
+        model = APREndorsementJob
+        fields = [
+            "status",
+            "total",
+            "processed",
+            "failed",
+            "failed_project_ids",
+            "started_at",
+            "updated_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+
 class AnnualProgressReportEndorseSerializer(AnnualProgressReportSerializer):
     """Write serializer for endorsing `AnnualProgressReport`s."""
 
@@ -25,7 +25,7 @@ from core.models import (
     ProjectType,
     Substance,
 )
-from core.models.business_plan import BPFile
+from core.models.business_plan import BPActivitySearchDocument, BPFile
 from core.models.meeting import Decision, Meeting
 
 # pylint: disable=R0902,R0915
@@ -638,10 +638,17 @@ class BusinessPlanCreateSerializer(serializers.ModelSerializer):
         bp_activities = bp_activities.exclude(id__in=update_activity_ids)
         bp_activities.delete()
 
+    def _refresh_search_documents(self, business_plan):
+        # the bulk operations do not send the signals that refresh them
+        BPActivitySearchDocument.objects.refresh(
+            BPActivity.objects.filter(business_plan=business_plan).values("id")
+        )
+
     def create(self, validated_data):
         activities = validated_data.pop("activities", [])
         business_plan = super().create(validated_data)
         self._create_bp_activities(business_plan, activities)
+        self._refresh_search_documents(business_plan)
         return business_plan
 
     def update(self, instance, validated_data):
@@ -651,6 +658,7 @@ class BusinessPlanCreateSerializer(serializers.ModelSerializer):
         instance = super().update(instance, validated_data)
         # update existing activities
         self._update_bp_activities(instance, activities, from_import=from_import)
+        self._refresh_search_documents(instance)
         return instance
 
 
@@ -1,4 +1,3 @@
-import copy
 from django.db import transaction
 from rest_framework import serializers
 
@@ -182,18 +181,19 @@ class DashboardsCPRecordSerializer(BaseDashboardsSerializer):
         return ret_data
 
     def _get_usages_data(self, obj):
-        usage_dict = copy.deepcopy(self.context["usages_dict"])
+        # {usage_id: quantity}
         existent_usages = self.context["existing_usages_dict"].get(
-            (obj.id, obj.is_archive), []
+            (obj.id, obj.is_archive), {}
         )
-        for usage in existent_usages:
-            usage_dict[usage.usage_id]["quantity"] = usage.quantity
 
         final_list = []
-        for _, usage_data in usage_dict.items():
+        for usage_id, usage_data in self.context["usages_dict"].items():
             final_list.extend(
                 self._get_values_dict(
-                    obj, "sector", usage_data["name"], usage_data["quantity"]
+                    obj,
+                    "sector",
+                    usage_data["name"],
+                    existent_usages.get(usage_id, usage_data["quantity"]),
                 )
             )
         return final_list
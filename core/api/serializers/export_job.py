@@ -0,0 +1,38 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from core.models import ExportJob
+
+# pylint: disable=W0223
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id",
+            "view_name",
+            "url_kwargs",
+            "params",
+            "status",
+            "filename",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "expires_at",
+            "download_url",
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.ExportJobStatus.SUCCESS:
+            return None
+        return reverse("export-job-download", args=(obj.id,))
+
+
+class ExportJobCreateSerializer(serializers.Serializer):
+    view_name = serializers.CharField()
+    url_kwargs = serializers.DictField(required=False, default=dict)
+    params = serializers.DictField(required=False, default=dict)
@@ -1,6 +1,8 @@
 from collections import defaultdict
 
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.urls import reverse
 from rest_framework import serializers
 
@@ -47,6 +49,43 @@ from core.api.utils import (
 # pylint: disable=C0302,R1702,W0707,R0912,E1101
 
 
+PROJECT_FIELD_HISTORY_SELECT_RELATED = [
+    "agency",
+    "bp_activity",
+    "cluster",
+    "component",
+    "country",
+    "decision",
+    "group",
+    "lead_agency",
+    "meeting",
+    "meeting_transf",
+    "meta_project",
+    "post_excom_decision__meeting",
+    "post_excom_meeting",
+    "project_type",
+    "sector",
+    "status",
+    "submission_status",
+    "transfer_decision",
+    "transfer_meeting",
+]
+PROJECT_FIELD_HISTORY_PREFETCH_RELATED = [
+    "comments",
+    "coop_agencies",
+    "funds",
+    # ordered, so that `ods_odp.first()` uses the prefetched entries
+    Prefetch(
+        "ods_odp",
+        queryset=ProjectOdsOdp.objects.select_related(
+            "ods_substance", "ods_blend"
+        ).order_by("id"),
+    ),
+    "rbm_measures__measure",
+    "submission_amounts",
+    "subsectors__sectors",
+]
+
 HISTORY_DESCRIPTION_CREATE = "Create project"
 HISTORY_DESCRIPTION_CREATE_TRANSFER = "Create project (Transferred)"
 HISTORY_DESCRIPTION_UPDATE = "Save project details"
@@ -536,25 +575,102 @@ class ProjectV2OdsOdpEditApprovalFieldsSerializer(ProjectV2OdsOdpListSerializer)
 
 
 class SerializeProjectFieldHistory:
+    """
+    Per-field value timelines of all the versions of a project
+
+    All the versions are loaded with one prefetched queryset and serialized
+    with `ProjectFieldHistorySerializer`. The archived versions never change,
+    so their values are cached per (final project id, max version); only the
+    final version is serialized on every call.
+    """
+
+    cache_timeout = 24 * 60 * 60
+
     @staticmethod
-    def serialize(project_instance):
-        result = defaultdict(list)
+    def get_versions_queryset(final_project):
+        return (
+            Project.objects.really_all()
+            .filter(Q(id=final_project.id) | Q(latest_project_id=final_project.id))
+            .select_related(*PROJECT_FIELD_HISTORY_SELECT_RELATED)
+            .prefetch_related(*PROJECT_FIELD_HISTORY_PREFETCH_RELATED)
+            .order_by("-version", "-id")
+        )
 
-        versions = ProjectDetailsV2Serializer().get_versions(
-            project_instance,
-            with_field_data=True,
+    @classmethod
+    def serialize_versions(cls, versions):
+        """
+        @param versions: list of Project objects
+        @return: list of dicts {"version", "post_excom_meeting", "field_data"}
+        """
+        field_data = ProjectFieldHistorySerializer(many=True).to_representation(
+            versions
         )
+        return [
+            {
+                "version": version.version,
+                "post_excom_meeting": getattr(
+                    version.post_excom_meeting, "number", None
+                ),
+                "field_data": data,
+            }
+            for version, data in zip(versions, field_data)
+        ]
+
+    @classmethod
+    def get_versions(cls, project_instance):
+        """
+        Get the serialized versions of a project, latest version first
+
+        @param project_instance: Project object (any version)
+        @return: list of dicts {"version", "post_excom_meeting", "field_data"}
+        """
+        final_project = project_instance.final_version
+        cache_key = f"project_field_history:{final_project.id}:{final_project.version}"
+
+        archived_versions = cache.get(cache_key)
+        if archived_versions is None:
+            versions = list(cls.get_versions_queryset(final_project))
+            archived_versions = cls.serialize_versions(
+                [version for version in versions if version.id != final_project.id]
+            )
+            cache.set(cache_key, archived_versions, cls.cache_timeout)
+            final_versions = [
+                version for version in versions if version.id == final_project.id
+            ]
+        else:
+            final_versions = list(
+                cls.get_versions_queryset(final_project).filter(id=final_project.id)
+            )
+        return cls.serialize_versions(final_versions) + archived_versions
 
-        for version in versions:
+    @classmethod
+    def serialize(cls, project_instance, changes_only=False):
+        """
+        @param project_instance: Project object (any version)
+        @param changes_only: bool - only include the values of each field that
+            differ from the previous version (the first version has all values)
+
+        @return: dict {field: [{"version", "value", "post_excom_meeting"}, ...]},
+            latest version first
+        """
+        result = defaultdict(list)
+        previous_data = {}
+        for version in reversed(cls.get_versions(project_instance)):
             for field, value in version["field_data"].items():
+                unchanged = field in previous_data and previous_data[field] == value
+                if changes_only and unchanged:
+                    continue
+                previous_data[field] = value
                 result[field].append(
                     {
                         "version": version["version"],
                         "value": value,
-                        "post_excom_meeting": version.get("post_excom_meeting", None),
+                        "post_excom_meeting": version["post_excom_meeting"],
                     }
                 )
 
+        for timeline in result.values():
+            timeline.reverse()
         return result
 
 
@@ -801,6 +917,20 @@ class ProjectDetailsV2Serializer(ProjectListV2Serializer):
         return obj.computed_total_phase_out_co2_tonnes
 
 
+class ProjectFieldHistorySerializer(ProjectDetailsV2Serializer):
+    """
+    Field values of a project version, as shown in the field history
+    (without the versions and history of the project)
+    """
+
+    class Meta(ProjectDetailsV2Serializer.Meta):
+        fields = [
+            field
+            for field in ProjectDetailsV2Serializer.Meta.fields
+            if field not in ["versions", "history"]
+        ]
+
+
 class ProjectV2OdsOdpCreateUpdateSerializer(
     ProjectV2OdsOdpListSerializer, BaseProjectUtilityCreateSerializer
 ):
@@ -7,6 +7,7 @@ from unittest.mock import patch
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.core.management import call_command
 
 from pdfminer.high_level import extract_text
@@ -65,6 +66,7 @@ from core.models.adm import AdmRecordArchive
 from core.models.base import Module
 from core.models.business_plan import BusinessPlan
 from core.models.country_programme_archive import CPReportArchive
+from core.reference_data import invalidate_reference_data
 from core.utils import get_project_sub_code
 
 # pylint: disable=C0302,W0613
@@ -1843,3 +1845,14 @@ def mock_cp_mail_tasks():
         "core.tasks.send_mail_report_create.delay"
     ), patch("core.tasks.send_mail_report_update.delay"):
         yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Clear the cache after each test so that cached reference data does not
+    leak between tests.
+    """
+    yield
+    cache.clear()
+    invalidate_reference_data()
@@ -0,0 +1,184 @@
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.api.tests.factories import (
+    DecisionFactory,
+    MeetingFactory,
+    ProjectFactory,
+    ProjectOdsOdpFactory,
+    ProjectRBMMeasureFactory,
+    SubmissionAmountFactory,
+    UserFactory,
+)
+from core.models.project import (
+    Project,
+    ProjectComment,
+    ProjectFile,
+    ProjectFund,
+    ProjectOdsOdp,
+    ProjectRBMMeasure,
+    ProjectVersionTimeline,
+    SubmissionAmount,
+)
+
+pytestmark = pytest.mark.django_db
+# pylint: disable=W0613
+
+
+def _create_project(subsector, version=1):
+    project = ProjectFactory.create(version=version, legacy_code="LEGACY")
+    project.subsectors.set([subsector])
+    ProjectOdsOdpFactory.create_batch(2, project=project)
+    ProjectRBMMeasureFactory.create(project=project)
+    SubmissionAmountFactory.create(project=project)
+    ProjectFund.objects.create(
+        project=project, fund_type=ProjectFund.FundType.ALLOCATED, amount=42
+    )
+    ProjectComment.objects.create(project=project, agency_response="response")
+    ProjectFile.objects.create(project=project, file="test.pdf", filename="test.pdf")
+    return project
+
+
+def _count_queries(func, *args):
+    with CaptureQueriesContext(connection) as queries:
+        func(*args)
+    return len(queries)
+
+
+class TestProjectVersioning:
+    def test_copy_project(self, subsector):
+        project = _create_project(subsector)
+
+        new_project = project.copy_project(remove_legacy_data=True)
+
+        assert new_project.id != project.id
+        assert new_project.legacy_code is None
+        assert new_project.title == project.title
+        assert new_project.latest_project is None
+        assert list(new_project.subsectors.all()) == [subsector]
+        for model, count in [
+            (ProjectOdsOdp, 2),
+            (ProjectRBMMeasure, 1),
+            (SubmissionAmount, 1),
+            (ProjectFund, 1),
+            (ProjectComment, 1),
+        ]:
+            assert model.objects.filter(project=new_project).count() == count
+            assert model.objects.filter(project=project).count() == count
+        assert not ProjectFile.objects.filter(project=new_project).exists()
+        assert ProjectFile.objects.filter(project=project).exists()
+
+    def test_increase_versions(self, subsector):
+        user = UserFactory.create()
+        projects = [_create_project(subsector, version=v) for v in (1, 3)]
+
+        archived_projects = Project.objects.increase_versions(projects, user)
+
+        for project, old_version in zip(projects, (1, 3)):
+            project.refresh_from_db()
+            assert project.version == old_version + 1
+            assert project.version_created_by == user
+
+            archived = archived_projects[project.id]
+            archived.refresh_from_db()
+            assert archived.version == old_version
+            assert archived.latest_project == project
+            assert list(archived.subsectors.all()) == [subsector]
+            assert archived.ods_odp.count() == 2
+            assert archived.comments.count() == 1
+            # the files are moved to the archived version
+            assert archived.files.count() == 1
+            assert project.files.count() == 0
+            assert project.ods_odp.count() == 2
+
+        assert set(Project.objects.all()) == set(projects)
+
+    def test_increase_versions_query_count(self, subsector):
+        user = UserFactory.create()
+        projects = [_create_project(subsector) for _ in range(5)]
+
+        single_count = _count_queries(
+            Project.objects.increase_versions, projects[:1], user
+        )
+        batch_count = _count_queries(
+            Project.objects.increase_versions, projects[1:], user
+        )
+
+        assert single_count == batch_count
+
+
+def _timeline(project):
+    return list(
+        ProjectVersionTimeline.objects.filter(final_project=project)
+        .order_by("version")
+        .values_list("project_id", "version", "effective_date")
+    )
+
+
+class TestProjectVersionTimeline:
+    def test_project_save(self):
+        project = ProjectFactory.create(version=3, date_approved=date(2020, 5, 1))
+        assert _timeline(project) == [(project.id, 3, date(2020, 5, 1))]
+
+        decision = DecisionFactory.create(meeting__date=date(2022, 6, 1))
+        project.post_excom_decision = decision
+        project.save()
+        assert _timeline(project) == [(project.id, 3, date(2022, 6, 1))]
+
+        # changing the meeting date of the decision changes the effective date
+        decision.meeting.date = date(2022, 7, 1)
+        decision.meeting.save()
+        assert _timeline(project) == [(project.id, 3, date(2022, 7, 1))]
+
+    def test_increase_versions(self, subsector):
+        project = _create_project(subsector, version=3)
+        project.date_approved = date(2020, 5, 1)
+        project.save()
+
+        archived = Project.objects.increase_versions([project], UserFactory.create())[
+            project.id
+        ]
+
+        assert _timeline(project) == [
+            (archived.id, 3, date(2020, 5, 1)),
+            (project.id, 4, date(2020, 5, 1)),
+        ]
+
+    def test_versions_for_year(self):
+        meetings = [
+            MeetingFactory.create(date=date(year, 6, 1)) for year in (2021, 2023)
+        ]
+        project = ProjectFactory.create(version=5, post_excom_meeting=meetings[1])
+        version3 = ProjectFactory.create(
+            version=3, latest_project=project, date_approved=date(2020, 5, 1)
+        )
+        version4 = ProjectFactory.create(
+            version=4, latest_project=project, post_excom_meeting=meetings[0]
+        )
+
+        assert project.latest_version_for_year(2019) is None
+        assert project.latest_version_for_year(2020) == version3
+        assert project.latest_version_for_year(2022) == version4
+        assert project.latest_version_for_year(2023) == project
+        assert list(version3.all_versions_for_year(2021)) == [version4]
+
+    def test_in_effect_for_year_query_count(self):
+        projects = [
+            ProjectFactory.create(version=3, date_approved=date(2020, 5, 1))
+            for _ in range(5)
+        ]
+        for project in projects:
+            ProjectFactory.create(
+                version=4, latest_project=project, date_approved=date(2021, 5, 1)
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            versions = list(Project.objects.really_all().in_effect_for_year(2021))
+
+        assert len(queries) == 1
+        assert sorted((p.latest_project_id, p.version) for p in versions) == sorted(
+            (p.id, 4) for p in projects
+        )
@@ -1,9 +1,19 @@
 import json
+from io import BytesIO
+from zipfile import ZipFile
+
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from decimal import Decimal
 from rest_framework.test import APIClient
 from core.api.serializers.project_metadata import ProjectSubSectorSerializer
+from core.api.serializers.project_v2 import (
+    ProjectDetailsV2Serializer,
+    SerializeProjectFieldHistory,
+)
 
 from core.api.tests.base import BaseTest
 from core.api.tests.factories import (
@@ -13,6 +23,7 @@ from core.api.tests.factories import (
     BlendFactory,
     BusinessPlanFactory,
     BPActivityFactory,
+    MeetingFactory,
     ProjectOdsOdpFactory,
     ProjectFactory,
     ProjectTypeFactory,
@@ -326,6 +337,75 @@ class TestProjectV2List(BaseTest):
         for project in response_data:
             assert project["editable"] is True
 
+    def test_project_list_editable_page_scoped(
+        self,
+        agency_user,
+        _setup_project_list,
+        project_draft_status,
+        country_ro,
+        meeting,
+        project_type,
+        project_status,
+        sector,
+        project_cluster_kpp,
+    ):
+        self.client.force_authenticate(user=agency_user)
+        params = {"limit": 2, "ordering": "title"}
+
+        def _count_list_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url, params)
+            assert response.status_code == 200
+            return len(queries)
+
+        # warm up the permissions cache of the user
+        self.client.get(self.url, params)
+        cache.clear()
+        queries_count = _count_list_queries()
+
+        ProjectFactory.create_batch(
+            5,
+            agency=agency_user.agency,
+            submission_status=project_draft_status,
+            country=country_ro,
+            meeting=meeting,
+            project_type=project_type,
+            status=project_status,
+            sector=sector,
+            cluster=project_cluster_kpp,
+            title="Z project",
+        )
+        cache.clear()
+        assert _count_list_queries() == queries_count
+
+        # the editability of the page is memoised
+        response = self.client.get(self.url, params)
+        assert _count_list_queries() == queries_count - 2
+        for project in response.data["results"]:
+            assert project["editable"] is (project["submission_status"] == "Draft")
+
+    def test_project_list_editable_after_queryset_update(
+        self, agency_user, _setup_project_list, project_submitted_status
+    ):
+        self.client.force_authenticate(user=agency_user)
+        params = {"limit": 2, "ordering": "title"}
+
+        response = self.client.get(self.url, params)
+        assert response.status_code == 200
+        editable_ids = [
+            project["id"] for project in response.data["results"] if project["editable"]
+        ]
+        assert editable_ids
+
+        # queryset updates don't bump date_updated
+        Project.objects.really_all().filter(id__in=editable_ids).update(
+            submission_status=project_submitted_status
+        )
+        response = self.client.get(self.url, params)
+        assert response.status_code == 200
+        for project in response.data["results"]:
+            assert project["editable"] is False
+
     def test_project_list_agency_filter(
         self, admin_user, agency, new_agency, _setup_project_list
     ):
@@ -1368,6 +1448,26 @@ class TestProjectFiles:
         assert response.status_code == 200
         assert response.content == my_file.file.read()
 
+    def test_file_download_all(
+        self, agency_inputter_user, project, test_file1, test_file2
+    ):
+        self.client.force_authenticate(user=agency_inputter_user)
+        url = reverse("project-file-v2-list", args=(project.id,))
+
+        # upload files
+        data = setup_files(((test_file1, "other"), (test_file2, "other")))
+        response = self.client.post(url, data, format="multipart")
+        assert response.status_code == 201
+
+        url = reverse("project-file-v2-download-all", args=(project.id,))
+        response = self.client.get(url)
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/zip"
+        with ZipFile(BytesIO(b"".join(response.streaming_content))) as zipf:
+            assert sorted(zipf.namelist()) == sorted([test_file1.name, test_file2.name])
+            assert zipf.read(test_file1.name) == test_file1.read_bytes()
+
 
 class TestProjectV2FileIncludePreviousVersions:
     client = APIClient()
@@ -1636,3 +1736,101 @@ class TestProjectAPRHistory:
 
         assert response.status_code == 200
         assert response.data == []
+
+
+class TestProjectFieldHistory:
+    client = APIClient()
+
+    def _url(self, project):
+        return reverse("project-v2-field-history", args=(project.id,))
+
+    def _create_versions(self, project, user, count):
+        ProjectOdsOdpFactory.create(project=project, odp=1)
+        for i in range(count):
+            project.increase_version(user)
+            project.title = f"Version {project.version}"
+            if i % 2:
+                project.post_excom_meeting = MeetingFactory.create(
+                    number=100 + project.version
+                )
+            project.save()
+            ProjectOdsOdpFactory.create(project=project, odp=i + 2)
+
+    def test_field_history(self, admin_user, project):
+        self._create_versions(project, admin_user, 4)
+
+        self.client.force_authenticate(user=admin_user)
+        response = self.client.get(self._url(project))
+        assert response.status_code == 200
+
+        # same values as the full serialization of each version
+        expected = {}
+        for version in ProjectDetailsV2Serializer().get_versions(
+            project, with_field_data=True
+        ):
+            for field, value in version["field_data"].items():
+                if field in ["versions", "history"]:
+                    continue
+                expected.setdefault(field, []).append(
+                    {
+                        "version": version["version"],
+                        "value": value,
+                        "post_excom_meeting": version["post_excom_meeting"],
+                    }
+                )
+        assert json.loads(json.dumps(response.data, default=str)) == json.loads(
+            json.dumps(expected, default=str)
+        )
+        assert [item["value"] for item in response.data["title"]] == [
+            "Version 5",
+            "Version 4",
+            "Version 3",
+            "Version 2",
+            "Karma to Burn",
+        ]
+
+        # archived versions are resolved to the final project
+        archived = Project.objects.really_all().get(latest_project=project, version=2)
+        assert SerializeProjectFieldHistory.serialize(archived) == response.data
+
+    def test_changes_only(self, admin_user, project):
+        self._create_versions(project, admin_user, 2)
+
+        self.client.force_authenticate(user=admin_user)
+        response = self.client.get(self._url(project), {"changes_only": "true"})
+        assert response.status_code == 200
+        assert [item["version"] for item in response.data["title"]] == [3, 2, 1]
+        assert [item["version"] for item in response.data["country"]] == [1]
+        assert [item["version"] for item in response.data["post_excom_meeting"]] == [
+            3,
+            1,
+        ]
+
+    def test_query_count(self, admin_user, project):
+        def _count_queries(project):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                SerializeProjectFieldHistory.serialize(project)
+            return len(queries)
+
+        self._create_versions(project, admin_user, 2)
+        queries_count = _count_queries(project)
+        self._create_versions(project, admin_user, 6)
+        assert _count_queries(project) == queries_count
+
+    def test_cached_archived_versions(self, admin_user, project):
+        self._create_versions(project, admin_user, 3)
+        SerializeProjectFieldHistory.serialize(project)
+
+        # the final version is always up to date
+        project.title = "New title"
+        project.save()
+        result = SerializeProjectFieldHistory.serialize(project)
+        assert result["title"][0]["value"] == "New title"
+        assert result["title"][1]["value"] == "Version 3"
+
+        # a new version invalidates the cached versions
+        project.increase_version(admin_user)
+        result = SerializeProjectFieldHistory.serialize(project)
+        assert [item["version"] for item in result["title"]] == [5, 4, 3, 2, 1]
+        assert result["title"][1]["value"] == "New title"
@@ -377,6 +377,46 @@ class TestProjectV2ExportXLSX(BaseTest):  # pylint: disable=too-many-public-meth
         assert response.status_code == HTTPStatus.OK
         validate_projects_export(project, response)
 
+    def test_export_really_all_dump(
+        self, project, secretariat_viewer_user, project_approved_status, caplog
+    ):
+        project.submission_status = project_approved_status
+        project.total_fund = 100
+        project.save()
+        for total_fund in (150, 250, 400):
+            project.increase_version(secretariat_viewer_user)
+            project.total_fund = total_fund
+            project.save()
+        ProjectOdsOdp.objects.create(project=project, odp=1)
+
+        self.client.force_authenticate(user=secretariat_viewer_user)
+        with caplog.at_level("INFO", logger="core.api.export.projects_v2_dump"):
+            response: FileResponse = self.client.get(self.url, {"really_all": "true"})
+        assert response.status_code == HTTPStatus.OK
+
+        wb = openpyxl.load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        assert wb.sheetnames == ["Projects", "Substances", "Funds"]
+        assert wb["Projects"].max_row == 5
+
+        funds = list(wb["Funds"].iter_rows(values_only=True))
+        headers = funds[0]
+        rows = {
+            row[headers.index("Project version")]: dict(zip(headers, row))
+            for row in funds[1:]
+        }
+        assert set(rows) == {1, 2, 3, 4}
+        assert rows[4]["Project ID"] == project.id
+        assert rows[4]["Total funds"] == 400
+        # the funds approved are the difference from the previous version
+        assert rows[4]["Funds approved"] == 150
+        assert rows[3]["Funds approved"] == 250
+        assert rows[2]["Funds approved"] is None
+
+        record = next(r for r in caplog.records if r.name.endswith("v2_dump"))
+        assert record.projects_count == 4
+        assert record.substances_count == 1
+        assert record.funds_count == 4
+
     # pylint: disable-next=too-many-statements
     def test_export_inventory_report_reads_project_objects_directly(
         self, admin_user, project_approved_status
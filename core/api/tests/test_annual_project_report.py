@@ -8,6 +8,8 @@ from zipfile import ZipFile
 
 import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
@@ -21,9 +23,11 @@ from core.models import (
     AnnualAgencyProjectReport,
     AnnualProjectReport,
     AnnualProjectReportFile,
+    APREndorsementJob,
     Project,
     ProjectHistory,
 )
+from core.models.project import ProjectManager, ProjectVersionTimeline
 from core.api.tests.factories import (
     AgencyFactory,
     AnnualProgressReportFactory,
@@ -816,6 +820,108 @@ class TestAPRBulkUpdateView(BaseTest):
             project_data["implementation_delays_status_report_decisions"] == delay_text
         )
 
+    def test_bulk_update_writes_changed_reports_only(
+        self,
+        apr_agency_inputter_user,
+        annual_agency_report,
+        multiple_projects_for_apr,
+    ):
+        unchanged, changed, invalid = [
+            AnnualProjectReportFactory(
+                report=annual_agency_report,
+                project=project,
+                funds_disbursed=100.0,
+                last_year_remarks="",
+            )
+            for project in multiple_projects_for_apr[:3]
+        ]
+
+        self.client.force_authenticate(user=apr_agency_inputter_user)
+        url = reverse(
+            "apr-update",
+            kwargs={
+                "year": annual_agency_report.progress_report.year,
+                "agency_id": annual_agency_report.agency.id,
+            },
+        )
+        response = self.client.post(
+            url,
+            {
+                "project_reports": [
+                    {
+                        "project_code": unchanged.project.code,
+                        "funds_disbursed": 100.0,
+                    },
+                    {
+                        "project_code": changed.project.code,
+                        "funds_disbursed": 200.0,
+                    },
+                    {
+                        "project_code": invalid.project.code,
+                        "funds_disbursed": 300.0,
+                        "last_year_remarks": None,
+                    },
+                ]
+            },
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["updated_count"] == 2
+        assert response.data["error_count"] == 1
+        assert response.data["errors"][0]["project_code"] == invalid.project.code
+        assert "last_year_remarks" in response.data["errors"][0]["error"]
+
+        for report, funds_disbursed, is_updated in [
+            (unchanged, 100.0, False),
+            (changed, 200.0, True),
+            (invalid, 100.0, False),
+        ]:
+            updated_at = report.updated_at
+            report.refresh_from_db()
+            assert report.funds_disbursed == funds_disbursed
+            assert (report.updated_at != updated_at) == is_updated
+
+    def test_bulk_update_query_count(
+        self,
+        apr_agency_inputter_user,
+        annual_agency_report,
+        multiple_projects_for_apr,
+    ):
+        reports = [
+            AnnualProjectReportFactory(report=annual_agency_report, project=project)
+            for project in multiple_projects_for_apr
+        ]
+
+        self.client.force_authenticate(user=apr_agency_inputter_user)
+        url = reverse(
+            "apr-update",
+            kwargs={
+                "year": annual_agency_report.progress_report.year,
+                "agency_id": annual_agency_report.agency.id,
+            },
+        )
+
+        def count_queries(reports, funds_disbursed):
+            data = {
+                "project_reports": [
+                    {
+                        "project_code": report.project.code,
+                        "funds_disbursed": funds_disbursed,
+                        "date_first_disbursement": "2024-01-15",
+                    }
+                    for report in reports
+                ]
+            }
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, data, format="json")
+            assert response.data["updated_count"] == len(reports)
+            return len(queries)
+
+        # the first request also caches the user permissions
+        count_queries(reports[:1], 1.0)
+        assert count_queries(reports[1:2], 2.0) == count_queries(reports[2:], 3.0)
+
 
 @pytest.mark.django_db
 class TestAPRFileUploadView(BaseTest):
@@ -4800,7 +4906,7 @@ class TestAPRFilesDownloadAllView(BaseTest):
         )
         assert annual_agency_report.agency.name[:10] in response["Content-Disposition"]
 
-        zip_content = BytesIO(response.content)
+        zip_content = BytesIO(b"".join(response.streaming_content))
         with ZipFile(zip_content, "r") as zipf:
             file_list = zipf.namelist()
             assert len(file_list) == 2
@@ -4843,7 +4949,7 @@ class TestAPRFilesDownloadAllView(BaseTest):
         assert response.status_code == status.HTTP_200_OK
         assert response["Content-Type"] == "application/zip"
 
-        zip_content = BytesIO(response.content)
+        zip_content = BytesIO(b"".join(response.streaming_content))
         # This should be an empty zip, no files were created for the agency report
         with ZipFile(zip_content, "r") as zipf:
             assert len(zipf.namelist()) == 0
@@ -4889,7 +4995,7 @@ class TestAPRFilesDownloadAllView(BaseTest):
 
         assert response.status_code == status.HTTP_200_OK
 
-        zip_content = BytesIO(response.content)
+        zip_content = BytesIO(b"".join(response.streaming_content))
         with ZipFile(zip_content, "r") as zipf:
             file_list = zipf.namelist()
             assert len(file_list) == 3
@@ -5750,6 +5856,19 @@ class TestAPRSyncFromProjectsView(BaseTest):
         assert response.data["error"] is None
         mock_delay.assert_called_once_with(annual_progress_report.year)
 
+    def test_post_incremental(self, apr_mlfs_full_access_user, annual_progress_report):
+        with patch("core.tasks.sync_apr_from_projects.delay") as mock_delay:
+            mock_delay.return_value = MagicMock(id="test-task-uuid-1234")
+
+            self.client.force_authenticate(user=apr_mlfs_full_access_user)
+            url = self._url(annual_progress_report.year)
+            response = self.client.post(f"{url}?incremental=true")
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        mock_delay.assert_called_once_with(
+            annual_progress_report.year, incremental=True
+        )
+
     def test_get_without_task_id_returns_400(
         self, apr_mlfs_full_access_user, annual_progress_report
     ):
@@ -6197,6 +6316,153 @@ class TestSyncAprFromProjectsTask:
         assert apr.adjustment_denorm == version4.total_fund - version3.total_fund
         assert apr.approved_funding_plus_adjustment_denorm == version4.total_fund
 
+    def _make_agency_reports(self, progress_report, titles):
+        agency = AgencyFactory()
+        agency_report = AnnualAgencyProjectReportFactory(
+            progress_report=progress_report, agency=agency
+        )
+        projects = [
+            ProjectFactory(agency=agency, title=title, version=3) for title in titles
+        ]
+        aprs = [
+            AnnualProjectReportFactory(report=agency_report, project=project)
+            for project in projects
+        ]
+        return projects, aprs
+
+    def test_first_incremental_sync_is_full(self, annual_progress_report):
+        self._make_agency_reports(annual_progress_report, ["A", "B"])
+
+        result = sync_apr_from_projects(annual_progress_report.year, incremental=True)
+
+        assert result["mode"] == "full"
+        assert result["updated_count"] == 2
+        assert result["projects_count"] is None
+        annual_progress_report.refresh_from_db()
+        assert annual_progress_report.projects_synced_at is not None
+
+    def test_incremental_sync_only_changed_projects(self, annual_progress_report):
+        projects, aprs = self._make_agency_reports(annual_progress_report, ["A", "B"])
+        sync_apr_from_projects(annual_progress_report.year)
+
+        projects[0].title = "New A"
+        projects[0].save()
+        # not tracked: date_updated is not changed
+        Project.objects.filter(id=projects[1].id).update(title="New B")
+
+        result = sync_apr_from_projects(annual_progress_report.year, incremental=True)
+
+        assert result["mode"] == "incremental"
+        assert result["projects_count"] == 1
+        assert result["updated_count"] == 1
+        assert result["changed_count"] == 1
+        for apr in aprs:
+            apr.refresh_from_db()
+        assert aprs[0].project_title_denorm == "New A"
+        assert aprs[1].project_title_denorm == "B"
+
+        # the full sync is the fallback for the untracked changes
+        result = sync_apr_from_projects(annual_progress_report.year)
+
+        assert result["mode"] == "full"
+        assert result["changed_count"] == 1
+        aprs[1].refresh_from_db()
+        assert aprs[1].project_title_denorm == "New B"
+
+    def test_incremental_sync_new_version(self, annual_progress_report):
+        projects, aprs = self._make_agency_reports(annual_progress_report, ["A"])
+        sync_apr_from_projects(annual_progress_report.year)
+
+        Project.objects.increase_versions(projects, UserFactory())
+        Project.objects.filter(id=projects[0].id).update(title="New A")
+
+        result = sync_apr_from_projects(annual_progress_report.year, incremental=True)
+
+        assert result["updated_count"] == 1
+        aprs[0].refresh_from_db()
+        assert aprs[0].project_id == projects[0].id
+        assert aprs[0].project_title_denorm == "New A"
+
+    def test_incremental_sync_adds_new_project(
+        self, annual_agency_report, annual_project_report, project_ongoing_status
+    ):
+        year = annual_agency_report.progress_report.year
+        sync_apr_from_projects(year)
+
+        new_project = ProjectFactory(
+            agency=annual_agency_report.agency,
+            status=project_ongoing_status,
+            version=3,
+            date_approved=date(year, 1, 15),
+        )
+
+        result = sync_apr_from_projects(year, incremental=True)
+
+        assert result["mode"] == "incremental"
+        assert result["updated_count"] == 0
+        assert result["added_count"] == 1
+        assert AnnualProjectReport.objects.filter(
+            report=annual_agency_report, project=new_project
+        ).exists()
+
+    def test_incremental_sync_without_changes(self, annual_progress_report):
+        self._make_agency_reports(annual_progress_report, ["A"])
+        sync_apr_from_projects(annual_progress_report.year)
+        annual_progress_report.refresh_from_db()
+        synced_at = annual_progress_report.projects_synced_at
+
+        with CaptureQueriesContext(connection) as queries:
+            result = sync_apr_from_projects(
+                annual_progress_report.year, incremental=True
+            )
+
+        assert result["mode"] == "incremental"
+        assert result["projects_count"] == 0
+        assert result["updated_count"] == 0
+        assert len(queries) == 3
+        annual_progress_report.refresh_from_db()
+        assert annual_progress_report.projects_synced_at > synced_at
+
+    def test_sync_result_shape(self, annual_progress_report):
+        full_result = sync_apr_from_projects(annual_progress_report.year)
+        assert full_result["message"] == "No project reports to sync."
+
+        self._make_agency_reports(annual_progress_report, ["A"])
+        sync_apr_from_projects(annual_progress_report.year)
+        incremental_result = sync_apr_from_projects(
+            annual_progress_report.year, incremental=True
+        )
+        assert (
+            incremental_result["message"] == "No projects changed since the last sync."
+        )
+
+        annual_progress_report.endorsed = True
+        annual_progress_report.save()
+        endorsed_result = sync_apr_from_projects(annual_progress_report.year)
+
+        for result in (full_result, incremental_result, endorsed_result):
+            assert set(result) == {
+                "mode",
+                "projects_count",
+                "updated_count",
+                "changed_count",
+                "added_count",
+                "deleted_count",
+                "agencies_count",
+                "duration_seconds",
+                "message",
+            }
+        assert full_result["mode"] == endorsed_result["mode"] == "full"
+        assert full_result["projects_count"] is None
+
+    def test_dry_run_keeps_watermark(self, annual_progress_report):
+        self._make_agency_reports(annual_progress_report, ["A"])
+
+        sync_apr_from_projects(annual_progress_report.year, dry_run=True)
+
+        annual_progress_report.refresh_from_db()
+        assert annual_progress_report.projects_synced_at is None
+
 
 @pytest.mark.django_db
 class TestAPREndorseProjectVersioning:
@@ -6258,6 +6524,15 @@ class TestAPREndorseProjectVersioning:
         assert project.version == initial_version + 1
         assert project.status == project_completed_status
         assert project.version_created_by == user
+        # the timeline has the new status of the latest version only
+        assert dict(
+            ProjectVersionTimeline.objects.filter(final_project=project).values_list(
+                "version", "status"
+            )
+        ) == {
+            initial_version: project_ongoing_status.id,
+            initial_version + 1: project_completed_status.id,
+        }
 
         history = ProjectHistory.objects.filter(project=project).first()
         assert history is not None
@@ -6270,6 +6545,39 @@ class TestAPREndorseProjectVersioning:
         assert archived is not None
         assert archived.status == project_ongoing_status
 
+    def test_projects_versioned_in_batch(
+        self, project_ongoing_status, project_completed_status
+    ):
+        progress_report = self._make_progress_report(year=2025)
+        user = UserFactory()
+        agency_report = self._make_submitted_agency_report(
+            progress_report, submitted_by=user
+        )
+        projects = ProjectFactory.create_batch(
+            3, status=project_ongoing_status, version=3
+        )
+        for project in projects:
+            AnnualProjectReportFactory(
+                report=agency_report,
+                project=project,
+                status=project_completed_status.name,
+            )
+
+        with patch.object(
+            ProjectManager,
+            "increase_versions",
+            autospec=True,
+            side_effect=ProjectManager.increase_versions,
+        ) as mock_increase_versions:
+            update_project_statuses_after_apr_endorsement(progress_report.id)
+
+        mock_increase_versions.assert_called_once()
+        for project in projects:
+            project.refresh_from_db()
+            assert project.version == 4
+            assert project.status == project_completed_status
+            assert ProjectHistory.objects.filter(project=project).count() == 1
+
     def test_status_unchanged_skips_new_version(self, project_ongoing_status):
         progress_report = self._make_progress_report(year=2025)
         user = UserFactory()
@@ -6377,16 +6685,19 @@ class TestAPREndorseProjectVersioning:
 
         initial_version_good = project_good.version
 
-        original_increase_version = Project.increase_version
+        original_increase_versions = ProjectManager.increase_versions
 
-        def failing_for_bad_project(proj_self, increase_user):
-            if proj_self.id == project_bad.id:
+        def failing_for_bad_project(manager, projects, increase_user):
+            if any(project.id == project_bad.id for project in projects):
                 raise RuntimeError("Simulated failure")
-            return original_increase_version(proj_self, increase_user)
+            return original_increase_versions(manager, projects, increase_user)
 
-        with patch.object(Project, "increase_version", failing_for_bad_project):
+        with patch.object(ProjectManager, "increase_versions", failing_for_bad_project):
             update_project_statuses_after_apr_endorsement(progress_report.id)
 
+        project_bad.refresh_from_db()
+        assert project_bad.version == 3
+        assert not ProjectHistory.objects.filter(project=project_bad).exists()
         project_good.refresh_from_db()
         assert project_good.version == initial_version_good + 1
         assert ProjectHistory.objects.filter(project=project_good).exists()
@@ -6409,7 +6720,7 @@ class TestAPREndorseProjectVersioning:
 
         with patch("core.tasks.send_mail") as mock_send_mail:
             with patch.object(
-                Project, "increase_version", side_effect=RuntimeError("fail")
+                ProjectManager, "increase_versions", side_effect=RuntimeError("fail")
             ):
                 update_project_statuses_after_apr_endorsement(progress_report.id)
 
@@ -6506,6 +6817,132 @@ class TestAPREndorseProjectVersioning:
         assert response.status_code == status.HTTP_200_OK
         mock_task.delay.assert_called_once_with(annual_progress_report.id)
 
+    def _make_status_changes(self, count, old_status, new_status):
+        progress_report = self._make_progress_report(year=2025)
+        agency_report = self._make_submitted_agency_report(
+            progress_report, submitted_by=UserFactory()
+        )
+        projects = ProjectFactory.create_batch(count, status=old_status, version=3)
+        entries = [
+            AnnualProjectReportFactory(
+                report=agency_report, project=project, status=new_status.name
+            )
+            for project in projects
+        ]
+        return progress_report, projects, entries
+
+    def test_endorsement_job_progress(
+        self, project_ongoing_status, project_completed_status
+    ):
+        progress_report, projects, _ = self._make_status_changes(
+            3, project_ongoing_status, project_completed_status
+        )
+
+        with patch("core.tasks.APR_ENDORSEMENT_CHUNK_SIZE", 2), patch.object(
+            ProjectManager,
+            "increase_versions",
+            autospec=True,
+            side_effect=ProjectManager.increase_versions,
+        ) as mock_increase_versions:
+            update_project_statuses_after_apr_endorsement(progress_report.id)
+
+        # one batch per chunk
+        assert mock_increase_versions.call_count == 2
+        job = APREndorsementJob.objects.get(progress_report=progress_report)
+        assert job.status == APREndorsementJob.JobStatus.SUCCESS
+        assert job.total == 3
+        assert job.processed == 3
+        assert job.failed == 0
+        assert job.failed_project_ids == []
+        assert job.started_at is not None
+        assert job.finished_at is not None
+        for project in projects:
+            project.refresh_from_db()
+            assert project.status == project_completed_status
+
+    def test_endorsement_job_resumes_after_last_chunk(
+        self, project_ongoing_status, project_completed_status
+    ):
+        progress_report, projects, entries = self._make_status_changes(
+            3, project_ongoing_status, project_completed_status
+        )
+        # interrupted after the first entry
+        APREndorsementJob.objects.create(
+            progress_report=progress_report,
+            status=APREndorsementJob.JobStatus.RUNNING,
+            total=3,
+            processed=1,
+            last_entry_id=entries[0].id,
+        )
+
+        update_project_statuses_after_apr_endorsement(progress_report.id)
+
+        job = APREndorsementJob.objects.get(progress_report=progress_report)
+        assert job.status == APREndorsementJob.JobStatus.SUCCESS
+        assert job.processed == 3
+        projects[0].refresh_from_db()
+        assert projects[0].version == 3
+        assert projects[0].status == project_ongoing_status
+        for project in projects[1:]:
+            project.refresh_from_db()
+            assert project.version == 4
+            assert project.status == project_completed_status
+
+    def test_endorsement_job_not_run_again(
+        self, project_ongoing_status, project_completed_status
+    ):
+        progress_report, projects, _ = self._make_status_changes(
+            1, project_ongoing_status, project_completed_status
+        )
+
+        update_project_statuses_after_apr_endorsement(progress_report.id)
+        update_project_statuses_after_apr_endorsement(progress_report.id)
+
+        projects[0].refresh_from_db()
+        assert projects[0].version == 4
+        assert ProjectHistory.objects.filter(project=projects[0]).count() == 1
+
+    def test_endorsement_job_failure(
+        self, project_ongoing_status, project_completed_status
+    ):
+        progress_report, _, _ = self._make_status_changes(
+            1, project_ongoing_status, project_completed_status
+        )
+
+        with patch(
+            "core.tasks._process_apr_endorsement_entries",
+            side_effect=RuntimeError("Worker error"),
+        ), pytest.raises(RuntimeError):
+            update_project_statuses_after_apr_endorsement(progress_report.id)
+
+        job = APREndorsementJob.objects.get(progress_report=progress_report)
+        assert job.status == APREndorsementJob.JobStatus.FAILURE
+        assert job.error == "Worker error"
+        assert job.processed == 0
+
+    def test_endorsement_status_includes_job(
+        self, mlfs_admin_user, project_ongoing_status, project_completed_status
+    ):
+        progress_report, _, _ = self._make_status_changes(
+            2, project_ongoing_status, project_completed_status
+        )
+        client = APIClient()
+        client.force_authenticate(user=mlfs_admin_user)
+        url = reverse("apr-endorse", kwargs={"year": progress_report.year})
+
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["endorsement_job"] is None
+
+        update_project_statuses_after_apr_endorsement(progress_report.id)
+
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        job_data = response.data["endorsement_job"]
+        assert job_data["status"] == APREndorsementJob.JobStatus.SUCCESS
+        assert job_data["total"] == 2
+        assert job_data["processed"] == 2
+
 
 @pytest.mark.django_db
 class TestAPRExportNumberFormats:
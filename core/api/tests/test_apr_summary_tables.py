@@ -7,13 +7,19 @@ from io import BytesIO
 from types import SimpleNamespace
 
 import pytest
+from dateutil.relativedelta import relativedelta
 from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from openpyxl import load_workbook
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.api.export.annual_project_report import APRSummaryTablesExportWriter
+from core.api.export.annual_project_report import (
+    APRSummaryTablesExportWriter,
+    _get_months,
+)
 from core.api.tests.base import BaseTest
 from core.api.tests.factories import (
     AgencyFactory,
@@ -1150,6 +1156,38 @@ def test_avg_delay_skips_records_whose_dates_precede_approval():
     )
 
 
+@pytest.mark.parametrize(
+    "start_date,end_date",
+    [
+        (date(2022, 1, 15), date(2023, 4, 14)),
+        (date(2022, 1, 15), date(2023, 4, 15)),
+        (date(2022, 1, 31), date(2022, 2, 28)),
+        (date(2024, 1, 31), date(2024, 2, 29)),
+        (date(2022, 3, 31), date(2022, 4, 30)),
+        (date(2023, 4, 14), date(2022, 1, 15)),
+        (date(2022, 2, 28), date(2022, 1, 31)),
+        (date(2022, 5, 1), date(2022, 5, 1)),
+    ],
+)
+def test_months_match_relativedelta(start_date, end_date):
+    delta = relativedelta(end_date, start_date)
+    assert _get_months(start_date, end_date) == delta.years * 12 + delta.months
+
+
+@pytest.mark.django_db
+def test_summary_tables_query_count(annual_agency_report, project_ongoing_status):
+    def count_queries():
+        with CaptureQueriesContext(connection) as queries:
+            APRSummaryTablesExportWriter(year=2024).generate()
+        return len(queries)
+
+    AnnualProjectReportFactory(report=annual_agency_report)
+    single_count = count_queries()
+    AnnualProjectReportFactory.create_batch(3, report=annual_agency_report)
+
+    assert count_queries() == single_count
+
+
 @pytest.mark.django_db
 class TestAPRRegionLabels:
     """
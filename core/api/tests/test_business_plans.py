@@ -1,5 +1,6 @@
 from datetime import datetime
 
+import pandas as pd
 import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -17,6 +18,7 @@ from core.api.tests.factories import (
     ProjectTypeFactory,
     SubstanceFactory,
 )
+from core.api.views.business_plan_utils import check_numeric_value, is_numeric
 from core.models.business_plan import BusinessPlan
 
 pytestmark = pytest.mark.django_db
@@ -1007,3 +1009,13 @@ class TestBPGet:
             },
         )
         assert response.status_code == 400
+
+
+def test_bp_import_numeric_values():
+    values = pd.Series(
+        ["100", "1.5e3", "-.5", "", "n/a", "nan", "Infinity", "1_000", " 1 ", "1,5"]
+    )
+
+    assert is_numeric(values).tolist() == [
+        check_numeric_value(value) for value in values
+    ]
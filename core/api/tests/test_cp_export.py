@@ -1,11 +1,31 @@
 import io
+from unittest.mock import patch
 
 import openpyxl
 import pytest
 from django.urls import reverse
+from core import reference_data
 
 from core.api.tests.base import BaseTest
 from core.api.tests.conftest import pdf_text
+from core.api.tests.factories import CountryFactory
+from core.api.tests.factories import CPRecordFactory
+from core.api.tests.factories import CPUsageFactory
+from core.api.tests.factories import SubstanceFactory
+from core.api.tests.factories import UsageFactory
+from core.api.views.cp_consumption_utils import get_records_consumption_frame
+from core.api.views.utils import get_final_records_for_years
+from core.api.views.utils import get_missing_consumption_fact_keys
+from core.api.views.utils import iter_consumption_facts_for_years
+from core.api.views.utils import iter_final_records_for_years
+from core.api.views.utils import refresh_cp_consumption_facts
+from core.api.views.utils import refresh_missing_consumption_facts
+from core.models.country_programme import CPConsumptionFact
+from core.models.country_programme import CPRecord
+from core.models.country_programme import CPReport
+from core.models.country_programme_archive import CPRecordArchive
+from core.models.country_programme_archive import CPReportArchive
+from core.models.usage import Usage
 
 pytestmark = pytest.mark.django_db
 # pylint: disable=C8008, W0221
@@ -276,6 +296,8 @@ class TestCPExtractionALLExport(BaseTest):
     def test_get_cp_export(
         self, secretariat_user, _setup_new_cp_report, _cp_report_format
     ):
+        # the reports are created without the API, so refresh the facts here
+        refresh_cp_consumption_facts(2019, 2019)
         self.client.force_authenticate(user=secretariat_user)
 
         response = self.client.get(self.url, {"min_year": 2019, "max_year": 2019})
@@ -319,6 +341,245 @@ class TestCPExtractionALLExport(BaseTest):
         # country, qps, non-qps, total
         assert wb["MbrConsumption"].max_column == 4
 
+    def test_streaming_records_match_final_records(
+        self, user, substance, _setup_new_cp_report, _cp_report_format
+    ):
+        # a country that only has archived versions for 2019
+        country = CountryFactory.create(name="Archived country")
+        for version in (1, 2):
+            archive_report = CPReportArchive.objects.create(
+                name="Archived",
+                year=2019,
+                country=country,
+                status=CPReport.CPReportStatus.FINAL,
+                version=version,
+                created_by=user,
+            )
+            CPRecordArchive.objects.create(
+                country_programme_report=archive_report,
+                section="A",
+                substance=substance,
+                imports=version,
+            )
+
+        def record_key(record):
+            return (
+                record.country_programme_report.country_id,
+                record.country_programme_report.year,
+                record.id,
+                record.substance_id,
+                record.blend_id,
+            )
+
+        expected = sorted(
+            get_final_records_for_years(2018, 2019),
+            key=lambda r: (
+                r.country_programme_report.year,
+                r.country_programme_report.country_id,
+            ),
+        )
+        streamed = list(iter_final_records_for_years(2018, 2019, chunk_size=2))
+
+        assert [record_key(r) for r in streamed] == [record_key(r) for r in expected]
+        archived = [
+            r for r in streamed if r.country_programme_report.country_id == country.id
+        ]
+        # only the records of the max version are used
+        assert [r.imports for r in archived if r.id] == [2]
+
+    def test_consumption_facts_match_final_records(
+        self, user, substance, _setup_new_cp_report, _cp_report_format
+    ):
+        country = CountryFactory.create(name="Archived country")
+        archive_report = CPReportArchive.objects.create(
+            name="Archived",
+            year=2019,
+            country=country,
+            status=CPReport.CPReportStatus.FINAL,
+            version=1,
+            created_by=user,
+        )
+        CPRecordArchive.objects.create(
+            country_programme_report=archive_report,
+            section="A",
+            substance=substance,
+            imports=5,
+            exports=2,
+        )
+
+        refresh_cp_consumption_facts(2018, 2019)
+
+        records = list(iter_final_records_for_years(2018, 2019))
+        facts = list(CPConsumptionFact.objects.get_for_years(2018, 2019))
+        assert [
+            (
+                f.year,
+                f.country_id,
+                f.substance_id,
+                f.blend_id,
+                f.record_id,
+                f.is_archive,
+            )
+            for f in facts
+        ] == [
+            (
+                r.country_programme_report.year,
+                r.country_programme_report.country_id,
+                r.substance_id,
+                r.blend_id,
+                r.id or None,
+                isinstance(r, CPRecordArchive),
+            )
+            for r in records
+        ]
+
+        archived = [f for f in facts if f.country_id == country.id and f.record_id]
+        assert [f.consumption for f in archived] == [3]
+        substance.refresh_from_db()
+        assert archived[0].consumption_odp == 3 * substance.odp
+        assert all(f.consumption == 0 for f in facts if not f.record_id)
+
+        # refreshing a single country only replaces its facts
+        archive_report.delete()
+        refresh_cp_consumption_facts(2019, 2019, [country.id])
+        assert not CPConsumptionFact.objects.filter(country=country).exists()
+        assert CPConsumptionFact.objects.filter(year=2019).count() == len(
+            [f for f in facts if f.year == 2019 and f.country_id != country.id]
+        )
+
+    def test_missing_consumption_facts(
+        self,
+        substance,
+        _setup_new_cp_report,
+        _cp_report_format,
+        django_capture_on_commit_callbacks,
+    ):
+        def fact_key(fact):
+            return (
+                fact.year,
+                fact.country_id,
+                fact.section,
+                fact.substance_id,
+                fact.blend_id,
+                fact.record_id,
+                fact.consumption,
+                fact.consumption_odp,
+            )
+
+        refresh_cp_consumption_facts(2018, 2019)
+        expected = [
+            fact_key(f)
+            for f in CPConsumptionFact.objects.get_for_years(2018, 2019).filter(
+                section__in=("A", "B")
+            )
+        ]
+        assert expected
+        assert not get_missing_consumption_fact_keys(2018, 2019)
+
+        # e.g. right after the table was deployed
+        CPConsumptionFact.objects.filter(year=2019).delete()
+        assert get_missing_consumption_fact_keys(2018, 2019)
+        facts = list(iter_consumption_facts_for_years(2018, 2019, ("A", "B")))
+        assert [fact_key(f) for f in facts] == expected
+        assert all(f.country.name for f in facts)
+
+        assert refresh_missing_consumption_facts() > 0
+        assert not get_missing_consumption_fact_keys(2018, 2019)
+
+        # a chemical change deletes the facts of the (country, year) reporting it
+        # until the task computes them again
+        substance.odp = 0.5
+        with patch(
+            "core.cp_consumption_facts.refresh_missing_cp_consumption_facts.delay"
+        ) as refresh_task, django_capture_on_commit_callbacks(execute=True):
+            substance.save()
+        refresh_task.assert_called_once()
+        assert not CPConsumptionFact.objects.filter(substance=substance).exists()
+
+        refresh_missing_consumption_facts()
+        facts = CPConsumptionFact.objects.filter(
+            substance=substance, record_id__isnull=False
+        )
+        assert facts.exists()
+        assert [float(f.consumption_odp) for f in facts] == [
+            pytest.approx(float(f.consumption) * 0.5) for f in facts
+        ]
+
+    def test_usage_change_consumption_facts(
+        self,
+        substance,
+        cp_report_2019,
+        _setup_new_cp_report,
+        _cp_report_format,
+        django_capture_on_commit_callbacks,
+    ):
+        prev_report = CPReport.objects.get(country=cp_report_2019.country, year=2018)
+        CPRecordFactory.create(
+            country_programme_report=prev_report, section="A", substance=substance
+        )
+        refresh_cp_consumption_facts(2018, 2019)
+        usage = CPUsageFactory.create(
+            country_programme_record=CPRecord.objects.filter(
+                country_programme_report=cp_report_2019
+            ).first()
+        ).usage
+        other_usage = UsageFactory.create(name="other usage")
+
+        with patch(
+            "core.cp_consumption_facts.refresh_missing_cp_consumption_facts.delay"
+        ) as refresh_task, django_capture_on_commit_callbacks(execute=True):
+            other_usage.full_name = "Other usage servicing"
+            other_usage.save()
+            refresh_task.assert_not_called()
+            assert CPConsumptionFact.objects.filter(year=2019).exists()
+
+            # only the facts of the (country, year) with the usage are deleted
+            usage.full_name = "Refrigeration servicing"
+            usage.save()
+        refresh_task.assert_called_once()
+        assert not CPConsumptionFact.objects.filter(year=2019).exists()
+        assert CPConsumptionFact.objects.filter(year=2018).exists()
+
+        refresh_missing_consumption_facts()
+        with patch(
+            "core.cp_consumption_facts.refresh_missing_cp_consumption_facts.delay"
+        ), django_capture_on_commit_callbacks(execute=True):
+            usage.delete()
+        assert not CPConsumptionFact.objects.filter(year=2019).exists()
+        assert CPConsumptionFact.objects.filter(year=2018).exists()
+
+    def test_outdated_consumption_facts(
+        self, cp_report_2019, _setup_new_cp_report, _cp_report_format
+    ):
+        refresh_cp_consumption_facts(2018, 2019)
+        expected = list(
+            CPConsumptionFact.objects.get_for_years(2019, 2019).values_list(
+                "record_id", "consumption"
+            )
+        )
+        assert not get_missing_consumption_fact_keys(2018, 2019)
+
+        # bulk updates do not refresh the facts
+        CPReport.objects.filter(id=cp_report_2019.id).update(version=2)
+        key = (cp_report_2019.country_id, 2019)
+        assert get_missing_consumption_fact_keys(2018, 2019) == {key}
+        facts = list(iter_consumption_facts_for_years(2019, 2019, ("A", "B", "C")))
+        assert [(f.record_id, f.consumption) for f in facts] == expected
+        assert {f.report_version for f in facts if f.record_id} == {2}
+
+        assert refresh_missing_consumption_facts() == len(expected)
+        assert not get_missing_consumption_fact_keys(2018, 2019)
+
+        # the facts of a report reverted to draft are removed
+        CPReport.objects.filter(id=cp_report_2019.id).update(
+            status=CPReport.CPReportStatus.DRAFT
+        )
+        assert get_missing_consumption_fact_keys(2018, 2019) == {key}
+        assert not list(iter_consumption_facts_for_years(2019, 2019, ("A", "B")))
+        refresh_missing_consumption_facts()
+        assert not CPConsumptionFact.objects.filter(year=2019).exists()
+        assert not get_missing_consumption_fact_keys(2018, 2019)
+
 
 class TestCPCalculatedAmountExport(BaseTest):
     url = reverse("country-programme-calculated-amount-export")
@@ -337,6 +598,62 @@ class TestCPCalculatedAmountExport(BaseTest):
         assert wb["Calculated Amount"].max_row == 10
         assert wb["Calculated Amount"].max_column == 4
 
+    def test_consumption_frame_matches_record_methods(
+        self, cp_report_2019, _setup_new_cp_report, django_assert_num_queries
+    ):
+        methyl_bromide = SubstanceFactory.create(name="Methyl Bromide", odp=0.6)
+        mb_record = CPRecordFactory.create(
+            country_programme_report=cp_report_2019,
+            section="A",
+            substance=methyl_bromide,
+        )
+        for full_name in ("Fumigation QPS", "Fumigation Non-QPS"):
+            CPUsageFactory.create(
+                country_programme_record=mb_record,
+                usage=UsageFactory.create(full_name=full_name),
+                quantity=3,
+            )
+
+        records = list(
+            CPRecord.objects.filter(country_programme_report=cp_report_2019)
+            .select_related("substance", "blend")
+            .prefetch_related("record_usages__usage")
+            .order_by("id")
+        )
+        frame = get_records_consumption_frame(records, {"A"})
+        # the usage names come from the cached reference data
+        with django_assert_num_queries(0):
+            get_records_consumption_frame(records, {"A"})
+
+        assert len(frame) == len(records)
+        for record, values in zip(records, frame.itertuples(index=False)):
+            assert values.sectorial_total == record.get_sectorial_total()
+            assert values.consumption == record.get_consumption_value(
+                record.section == "A"
+            )
+            assert values.odp == record.get_chemical_odp()
+            assert values.gwp == record.get_chemical_gwp()
+        assert frame.iloc[-1].sectorial_total == 3
+        assert frame.iloc[-1].consumption == 3
+
+    def test_consumption_frame_stale_usages(self, cp_report_2019, substance):
+        record = CPRecordFactory.create(
+            country_programme_report=cp_report_2019, section="A", substance=substance
+        )
+        reference_data.get_usages()
+        # created without signals, e.g. by a bulk import
+        usage = Usage.objects.bulk_create(
+            [Usage(name="servicing", full_name="Refrigeration Servicing")]
+        )[0]
+        CPUsageFactory.create(country_programme_record=record, usage=usage, quantity=4)
+
+        records = list(
+            CPRecord.objects.filter(id=record.id).prefetch_related("record_usages")
+        )
+        frame = get_records_consumption_frame(records)
+        assert frame.iloc[0].servicing == 4
+        assert usage in reference_data.get_usages()
+
 
 class TestCPCalculatedAmountExportPDF(BaseTest):
     url = reverse("country-programme-calculated-amount-print")
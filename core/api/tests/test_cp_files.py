@@ -1,3 +1,6 @@
+from io import BytesIO
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
 import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -126,3 +129,30 @@ class TestCPFiles:
 
         assert response.status_code == 200
         assert response.content == my_file.file.read()
+
+    def test_file_download_all(self, secretariat_user, country_ro, test_file):
+        self.client.force_authenticate(user=secretariat_user)
+        base_url = reverse("country-programme-files")
+        params = f"?country_id={country_ro.id}&year=2023"
+
+        # upload files (POST)
+        data = {"adrian.csv": test_file.open(), "adrian.pdf": test_file.open()}
+        response = self.client.post(base_url + params, data, format="multipart")
+        assert response.status_code == 201
+
+        url = reverse("country-programme-files-download-all") + params
+        response = self.client.get(url)
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/zip"
+        with ZipFile(BytesIO(b"".join(response.streaming_content))) as zipf:
+            assert sorted(zipf.namelist()) == ["adrian.csv", "adrian.pdf"]
+            assert zipf.read("adrian.csv") == test_file.read_bytes()
+            assert zipf.getinfo("adrian.csv").compress_type == ZIP_DEFLATED
+            assert zipf.getinfo("adrian.pdf").compress_type == ZIP_STORED
+
+    def test_file_download_all_other_country(self, country_user, new_country):
+        self.client.force_authenticate(user=country_user)
+        url = reverse("country-programme-files-download-all")
+        response = self.client.get(url + f"?country_id={new_country.id}&year=2023")
+        assert response.status_code == 403
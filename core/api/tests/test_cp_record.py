@@ -4,6 +4,18 @@ import pytest
 from django.urls import reverse
 
 from core.api.tests.base import BaseTest
+from core.api.tests.factories import (
+    CPRecordFactory,
+    CPUsageFactory,
+    GroupFactory,
+    UsageFactory,
+)
+from core.models.country_programme import CPReport
+from core.models.country_programme_archive import (
+    CPRecordArchive,
+    CPReportArchive,
+    CPUsageArchive,
+)
 
 pytestmark = pytest.mark.django_db
 # pylint: disable=C8008, W0221
@@ -156,3 +168,112 @@ class TestCPRecordList(BaseTest):
         assert len(response.data["section_d"]) == 1
         assert len(response.data["section_e"]) == 2
         assert len(response.data["section_f"]["remarks"]) == cp_report_2019.comment
+
+
+@pytest.fixture(name="_setup_dashboards_records")
+def setup_dashboards_records(cp_report_2019, substance, blend, user):
+    GroupFactory.create(name="F", annex="F", name_alt="Annex F", group_id="FI")
+    usage = UsageFactory.create(full_name="Refrigeration")
+    cp_report_2019.status = CPReport.CPReportStatus.FINAL
+    cp_report_2019.version = 2
+    cp_report_2019.save()
+    for chemical in (substance, blend):
+        record = CPRecordFactory.create(
+            country_programme_report=cp_report_2019,
+            section="A" if chemical == substance else "B",
+            substance=chemical if chemical == substance else None,
+            blend=chemical if chemical == blend else None,
+        )
+        CPUsageFactory.create(country_programme_record=record, usage=usage, quantity=7)
+
+    cp_ar = CPReportArchive.objects.create(
+        name=cp_report_2019.name,
+        year=cp_report_2019.year,
+        country=cp_report_2019.country,
+        status=CPReport.CPReportStatus.FINAL,
+        version=1,
+        created_by=user,
+    )
+    for imports in (1, 2, 3):
+        record = CPRecordArchive.objects.create(
+            country_programme_report=cp_ar,
+            section="A",
+            substance=substance,
+            imports=imports,
+        )
+        CPUsageArchive.objects.create(
+            country_programme_record=record, usage=usage, quantity=imports
+        )
+    return usage
+
+
+class TestDashboardsCPRecord(BaseTest):
+    url = reverse("country-programme-dashboards-record")
+    keyset_url = reverse("country-programme-dashboards-record-keyset")
+
+    def test_without_login(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        assert response.status_code == 403
+
+    def test_list(self, secretariat_user, _setup_dashboards_records):
+        self.client.force_authenticate(user=secretariat_user)
+
+        response = self.client.get(self.url, {"year": 2019})
+        assert response.status_code == 200
+        assert len(response.data) == 5
+        assert [record["version"] for record in response.data] == [2, 2, 1, 1, 1]
+
+        # only the usages of each record are filled in
+        usage_name = _setup_dashboards_records.full_name
+        usage_values = sorted(
+            item["value"]
+            for record in response.data
+            for item in record["data"]
+            if item["sector_name"] == usage_name and item["measurement_type"] == "mt"
+        )
+        assert usage_values == [1, 2, 3, 7, 7]
+
+    def test_paginated_list(self, secretariat_user, _setup_dashboards_records):
+        self.client.force_authenticate(user=secretariat_user)
+
+        response = self.client.get(self.url, {"limit": 2, "offset": 2})
+        assert response.status_code == 200
+        assert response.data["count"] == 5
+        assert len(response.data["results"]) == 2
+
+    def test_keyset_pagination(self, secretariat_user, _setup_dashboards_records):
+        self.client.force_authenticate(user=secretariat_user)
+        expected = self.client.get(self.url).data
+
+        results = []
+        response = self.client.get(self.keyset_url, {"page_size": 2})
+        while True:
+            assert response.status_code == 200
+            assert len(response.data["results"]) <= 2
+            results.extend(response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        assert len(results) == len(expected)
+        assert sorted(r["data"][-1]["value"] or 0 for r in results) == sorted(
+            r["data"][-1]["value"] or 0 for r in expected
+        )
+        assert [r["year"] for r in results] == [r["year"] for r in expected]
+
+    def test_keyset_invalid_cursor(self, secretariat_user, _setup_dashboards_records):
+        self.client.force_authenticate(user=secretariat_user)
+
+        response = self.client.get(self.keyset_url, {"cursor": "invalid"})
+        assert response.status_code == 404
+
+    def test_columnar_format(self, secretariat_user, _setup_dashboards_records):
+        self.client.force_authenticate(user=secretariat_user)
+        rows = self.client.get(self.url).data
+
+        response = self.client.get(self.url, {"response_format": "columnar"})
+        assert response.status_code == 200
+        assert set(response.data) == set(rows[0])
+        assert response.data["country_id"] == [row["country_id"] for row in rows]
+        assert response.data["data"] == [row["data"] for row in rows]
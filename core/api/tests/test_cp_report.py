@@ -3,11 +3,19 @@ from decimal import Decimal
 import pytest
 
 from django.contrib.auth.models import Group
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from unittest.mock import patch
 
 from core.api.tests.base import BaseTest
 from core.api.tests.factories import (
+    AdmRecordFactory,
+    CPEmissionFactory,
+    CPGenerationFactory,
+    CPPricesFactory,
+    CPRecordFactory,
     CPReportFormatColumnFactory,
     CPReportFormatRowFactory,
     CountryFactory,
@@ -18,7 +26,9 @@ from core.api.tests.factories import (
     TimeFrameFactory,
     UsageFactory,
     UserFactory,
+    CPUsageFactory,
 )
+from core.api.views.utils import clone_cp_report
 from core.models import AdmRecordArchive
 from core.models import Country
 from core.models import CPUsage
@@ -26,18 +36,23 @@ from core.models import CPUsageArchive
 from core.models.adm import AdmRecord
 from core.models.country_programme import (
     CPComment,
+    CPConsumptionFact,
     CPEmission,
     CPGeneration,
     CPPrices,
     CPRecord,
     CPReport,
+    CPReportFormatRow,
+    CPReportSections,
 )
 from core.models.country_programme_archive import (
+    CPCommentArchive,
     CPEmissionArchive,
     CPGenerationArchive,
     CPPricesArchive,
     CPRecordArchive,
     CPReportArchive,
+    CPReportSectionsArchive,
 )
 
 pytestmark = pytest.mark.django_db
@@ -330,6 +345,26 @@ class TestCPReportStatusUpdate(BaseTest):
         assert response.data["status"] == "final"
         assert response.data["id"] == cp_report_2019.id
 
+    def test_update_status_refreshes_consumption_facts(
+        self, second_user, cp_report_2019, _setup_new_cp_report, status_update_url
+    ):
+        facts = CPConsumptionFact.objects.filter(
+            country=cp_report_2019.country, year=2019
+        )
+        self.client.force_authenticate(user=second_user)
+
+        response = self.client.put(status_update_url, {"status": "final"})
+        assert response.status_code == 200
+        assert (
+            facts.filter(record_id__isnull=False).count()
+            == cp_report_2019.cprecords.count()
+        )
+
+        # a draft without an archived final version has no final data
+        response = self.client.put(status_update_url, {"status": "draft"})
+        assert response.status_code == 200
+        assert not facts.exists()
+
 
 @pytest.fixture(name="_setup_section_a_c")
 def setup_section_a_c(substance, blend, usage):
@@ -1485,3 +1520,189 @@ class TestGetEmptyForm(BaseTest):
         assert len(response.data["previous_substances"]["section_a"]) == 2
         assert len(response.data["previous_substances"]["section_b"]) == 1
         assert len(response.data["previous_substances"]["section_c"]) == 2
+
+    def test_conditional_get(
+        self, secretariat_user, cp_report_2019, _setup_get_empty_form, _cp_report_format
+    ):
+        self.client.force_authenticate(user=secretariat_user)
+        params = {"cp_report_id": cp_report_2019.id}
+        response = self.client.get(self.url, params)
+        assert response.status_code == 200
+        etag = response["ETag"]
+        assert "no-cache" in response["Cache-Control"]
+        assert "private" in response["Cache-Control"]
+
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+
+        # the form changes with the format rows
+        CPReportFormatRow.objects.filter(section="C").first().delete()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert len(response.data["substance_rows"]["section_c"]) == 1
+
+    def test_previous_report_changes_etag(
+        self, secretariat_user, country_ro, _setup_get_empty_form, _cp_report_format
+    ):
+        self.client.force_authenticate(user=secretariat_user)
+        params = {"country_id": country_ro.id}
+        response = self.client.get(self.url, params)
+        assert response.status_code == 200
+        assert response.data["previous_substances"] == {}
+
+        CPReportFactory.create(country=country_ro, year=2020)
+        response = self.client.get(
+            self.url, params, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        assert response.status_code == 200
+        assert response.data["previous_substances"] != {}
+
+
+class TestCPReportClone:
+    archive_cls_dict = {
+        "report_cls": CPReportArchive,
+        "record_cls": CPRecordArchive,
+        "usage_cls": CPUsageArchive,
+        "price_cls": CPPricesArchive,
+        "generation_cls": CPGenerationArchive,
+        "emission_cls": CPEmissionArchive,
+        "adm_record_cls": AdmRecordArchive,
+        "section_cls": CPReportSectionsArchive,
+        "comment_cls": CPCommentArchive,
+    }
+
+    @pytest.fixture(autouse=True)
+    def _adm_setup(self, adm_rows, adm_columns):
+        # pylint: disable=W0201
+        self.adm_row = adm_rows[0]
+        self.adm_column = adm_columns[0]
+
+    def _create_report(self, country, substance, records_count):
+        cp_report = CPReportFactory.create(
+            country=country, year=2019, status=CPReport.CPReportStatus.FINAL
+        )
+        usages = UsageFactory.create_batch(2)
+        for index in range(records_count):
+            record = CPRecordFactory.create(
+                country_programme_report=cp_report,
+                section="A",
+                substance=substance,
+                imports=index,
+            )
+            for usage in usages:
+                CPUsageFactory.create(
+                    country_programme_record=record, usage=usage, quantity=index
+                )
+            CPPricesFactory.create(country_programme_report=cp_report)
+            CPEmissionFactory.create(
+                country_programme_report=cp_report, facility=f"Facility {index}"
+            )
+        CPGenerationFactory.create(country_programme_report=cp_report)
+        AdmRecordFactory.create(
+            country_programme_report=cp_report,
+            row=self.adm_row,
+            column=self.adm_column,
+        )
+        CPReportSections.objects.create(
+            country_programme_report=cp_report, reported_section_a=True
+        )
+        CPReportCommentFactory.create(country_programme_report=cp_report)
+        return cp_report
+
+    def test_clone_copies_all_data(self, country_ro, substance):
+        cp_report = self._create_report(country_ro, substance, 3)
+
+        clone = clone_cp_report(cp_report, self.archive_cls_dict)
+
+        assert isinstance(clone, CPReportArchive)
+        assert clone.created_at == cp_report.created_at
+        assert (clone.name, clone.version) == (cp_report.name, cp_report.version)
+
+        records = list(clone.cprecords.order_by("id"))
+        assert [r.imports for r in records] == [0, 1, 2]
+        for record, original in zip(records, cp_report.cprecords.order_by("id")):
+            assert sorted(
+                (u.usage_id, u.quantity) for u in record.record_usages.all()
+            ) == sorted((u.usage_id, u.quantity) for u in original.record_usages.all())
+        assert clone.prices.count() == 3
+        assert clone.cpemissions.count() == 3
+        assert clone.cpgenerations.count() == 1
+        assert clone.adm_records.count() == 1
+        assert clone.cpreportedsections.reported_section_a is True
+        assert clone.cpcomments.count() == 1
+
+        # and back to the current tables
+        restored = clone_cp_report(
+            clone,
+            {
+                "report_cls": CPReport,
+                "record_cls": CPRecord,
+                "usage_cls": CPUsage,
+                "price_cls": CPPrices,
+                "generation_cls": CPGeneration,
+                "emission_cls": CPEmission,
+                "adm_record_cls": AdmRecord,
+                "section_cls": CPReportSections,
+                "comment_cls": CPComment,
+            },
+        )
+        assert restored.cprecords.count() == 3
+        assert (
+            CPUsage.objects.filter(
+                country_programme_record__country_programme_report=restored
+            ).count()
+            == 6
+        )
+
+    def test_clone_signal_and_facts(
+        self, country_ro, substance, django_capture_on_commit_callbacks
+    ):
+        cp_report = self._create_report(country_ro, substance, 2)
+        clone = clone_cp_report(cp_report, self.archive_cls_dict)
+        cp_report.delete()
+        assert not CPConsumptionFact.objects.filter(country=country_ro).exists()
+
+        saved = []
+
+        def _on_save(sender, instance, created, **kwargs):
+            saved.append((sender, instance.id, created))
+
+        post_save.connect(_on_save, sender=CPReport)
+        try:
+            with django_capture_on_commit_callbacks(execute=True):
+                restored = clone_cp_report(
+                    clone,
+                    {
+                        "report_cls": CPReport,
+                        "record_cls": CPRecord,
+                        "usage_cls": CPUsage,
+                        "price_cls": CPPrices,
+                        "generation_cls": CPGeneration,
+                        "emission_cls": CPEmission,
+                        "adm_record_cls": AdmRecord,
+                        "section_cls": CPReportSections,
+                        "comment_cls": CPComment,
+                    },
+                )
+        finally:
+            post_save.disconnect(_on_save, sender=CPReport)
+
+        assert saved == [(CPReport, restored.id, True)]
+        facts = CPConsumptionFact.objects.filter(
+            country=country_ro, year=2019, record_id__isnull=False
+        )
+        assert facts.exists()
+        assert set(facts.values_list("record_id", flat=True)) <= set(
+            restored.cprecords.values_list("id", flat=True)
+        )
+
+    def test_clone_query_count_is_constant(self, country_ro, substance):
+        def count_queries(records_count):
+            cp_report = self._create_report(country_ro, substance, records_count)
+            with CaptureQueriesContext(connection) as queries:
+                clone_cp_report(cp_report, self.archive_cls_dict)
+            return len(queries)
+
+        assert count_queries(2) == count_queries(40)
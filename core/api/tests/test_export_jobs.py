@@ -0,0 +1,199 @@
+import io
+from datetime import timedelta
+from unittest.mock import patch
+
+import openpyxl
+import pytest
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.api.tests.base import BaseTest
+from core.models import ExportJob
+from core.models.country_programme import CPHistory
+from core.tasks import delete_expired_export_jobs, run_export_job
+
+pytestmark = pytest.mark.django_db
+# pylint: disable=C8008, W0221, W0613
+
+
+@pytest.fixture(name="_mock_run_export_job")
+def _mock_run_export_job_fixture():
+    with patch("core.api.views.export_jobs.run_export_job.delay") as mock_delay:
+        yield mock_delay
+
+
+class TestExportJobs(BaseTest):
+    url = reverse("export-job-create")
+
+    def _submit(self, cp_report, view_name="country-programme-export"):
+        return self.client.post(
+            self.url,
+            {"view_name": view_name, "params": {"cp_report_id": cp_report.id}},
+            format="json",
+        )
+
+    def test_submit_enqueues_job(
+        self, secretariat_user, cp_report_2019, _mock_run_export_job
+    ):
+        self.client.force_authenticate(user=secretariat_user)
+
+        response = self._submit(cp_report_2019)
+        assert response.status_code == 202
+        assert response.data["status"] == "pending"
+        assert response.data["download_url"] is None
+        _mock_run_export_job.assert_called_once_with(response.data["id"])
+
+    def test_submit_invalid_view(self, secretariat_user, _mock_run_export_job):
+        self.client.force_authenticate(user=secretariat_user)
+
+        response = self.client.post(self.url, {"view_name": "settings"}, format="json")
+        assert response.status_code == 400
+        _mock_run_export_job.assert_not_called()
+
+    def test_identical_requests_share_job(
+        self, secretariat_user, cp_report_2019, _mock_run_export_job
+    ):
+        self.client.force_authenticate(user=secretariat_user)
+
+        first = self._submit(cp_report_2019)
+        second = self._submit(cp_report_2019)
+        assert second.status_code == 200
+        assert second.data["id"] == first.data["id"]
+        assert _mock_run_export_job.call_count == 1
+
+    def test_run_and_download(
+        self,
+        secretariat_user,
+        cp_report_2019,
+        _setup_new_cp_report,
+        _mock_run_export_job,
+    ):
+        self.client.force_authenticate(user=secretariat_user)
+        job_id = self._submit(cp_report_2019).data["id"]
+
+        assert run_export_job(job_id) == "success"
+
+        response = self.client.get(reverse("export-job", args=(job_id,)))
+        assert response.status_code == 200
+        assert response.data["status"] == "success"
+        assert response.data["filename"] == cp_report_2019.name + ".xlsx"
+
+        response = self.client.get(response.data["download_url"])
+        assert response.status_code == 200
+        wb = openpyxl.load_workbook(io.BytesIO(response.getvalue()))
+        assert wb["Section A"]["A1"].value == "Country: Romania Year: 2019"
+
+        # A finished export is reused until the data changes
+        response = self._submit(cp_report_2019)
+        assert response.status_code == 200
+        assert response.data["id"] == job_id
+
+        CPHistory.objects.create(
+            country_programme_report=cp_report_2019,
+            updated_by=secretariat_user,
+            event_description="Updated",
+        )
+        response = self._submit(cp_report_2019)
+        assert response.status_code == 202
+        assert response.data["id"] != job_id
+
+    def test_failed_export(self, secretariat_user, _mock_run_export_job):
+        self.client.force_authenticate(user=secretariat_user)
+        response = self.client.post(
+            self.url,
+            {"view_name": "country-programme-export", "params": {"cp_report_id": 0}},
+            format="json",
+        )
+
+        assert run_export_job(response.data["id"]) == "failure"
+        response = self.client.get(reverse("export-job", args=(response.data["id"],)))
+        assert response.data["status"] == "failure"
+        assert "Country programme report not found" in response.data["error"]
+        assert response.data["download_url"] is None
+
+    def test_other_scope_cannot_access(
+        self, secretariat_user, country_user, cp_report_2019, _mock_run_export_job
+    ):
+        self.client.force_authenticate(user=secretariat_user)
+        job_id = self._submit(cp_report_2019).data["id"]
+
+        self.client.force_authenticate(user=country_user)
+        response = self.client.get(reverse("export-job", args=(job_id,)))
+        assert response.status_code == 404
+        response = self.client.get(reverse("export-job-download", args=(job_id,)))
+        assert response.status_code == 404
+
+    def test_delete_expired(
+        self,
+        secretariat_user,
+        cp_report_2019,
+        _setup_new_cp_report,
+        _mock_run_export_job,
+    ):
+        self.client.force_authenticate(user=secretariat_user)
+        job_id = self._submit(cp_report_2019).data["id"]
+        run_export_job(job_id)
+        job = ExportJob.objects.get(id=job_id)
+        storage, file_name = job.file.storage, job.file.name
+        assert storage.exists(file_name)
+
+        assert delete_expired_export_jobs() == 0
+        ExportJob.objects.filter(id=job_id).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        assert delete_expired_export_jobs() == 1
+        assert not ExportJob.objects.filter(id=job_id).exists()
+        assert not storage.exists(file_name)
+
+    def test_stale_job_restarted(
+        self, secretariat_user, cp_report_2019, _mock_run_export_job
+    ):
+        self.client.force_authenticate(user=secretariat_user)
+        job_id = self._submit(cp_report_2019).data["id"]
+        # the worker died while rendering the export
+        ExportJob.objects.filter(id=job_id).update(
+            status=ExportJob.ExportJobStatus.RUNNING,
+            started_at=timezone.now() - timedelta(hours=1),
+            heartbeat_at=timezone.now() - timedelta(minutes=30),
+        )
+
+        response = self._submit(cp_report_2019)
+        assert response.status_code == 202
+        assert response.data["id"] != job_id
+        job = ExportJob.objects.get(id=job_id)
+        assert job.status == ExportJob.ExportJobStatus.FAILURE
+        assert job.error == "The export stopped responding."
+
+        # a recent heartbeat keeps the job in flight
+        ExportJob.objects.filter(id=response.data["id"]).update(
+            status=ExportJob.ExportJobStatus.RUNNING,
+            started_at=timezone.now() - timedelta(hours=1),
+            heartbeat_at=timezone.now(),
+        )
+        assert self._submit(cp_report_2019).data["id"] == response.data["id"]
+
+    def test_queued_job_restarted(
+        self, secretariat_user, cp_report_2019, _mock_run_export_job
+    ):
+        self.client.force_authenticate(user=secretariat_user)
+        job_id = self._submit(cp_report_2019).data["id"]
+        # a busy queue keeps the job pending longer than the heartbeat timeout
+        ExportJob.objects.filter(id=job_id).update(
+            created_at=timezone.now()
+            - timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS * 2)
+        )
+        assert self._submit(cp_report_2019).data["id"] == job_id
+        assert ExportJob.objects.get(id=job_id).status == "pending"
+
+        # no worker picked the job up
+        ExportJob.objects.filter(id=job_id).update(
+            created_at=timezone.now()
+            - timedelta(seconds=settings.EXPORT_JOB_QUEUE_TIMEOUT_SECONDS + 60)
+        )
+        response = self._submit(cp_report_2019)
+        assert response.status_code == 202
+        assert response.data["id"] != job_id
+        job = ExportJob.objects.get(id=job_id)
+        assert job.status == ExportJob.ExportJobStatus.FAILURE
+        assert job.error == "The export stopped responding."
@@ -0,0 +1,141 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from core.management.commands import import_all
+from core.management.commands.import_all import ImportStage
+from core.models.country import Country
+from core.models.import_checkpoint import ImportCheckpoint
+
+pytestmark = pytest.mark.django_db
+
+ALL_CHUNKS = [
+    (stage.command, tuple(args)) for stage in import_all.STAGES for args in stage.chunks
+]
+
+
+class ImportRecorder:
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def __call__(self, command, *args):
+        if (command, args) == self.fail_on:
+            raise ValueError("Import error")
+        self.calls.append((command, args))
+
+
+def _run_import_all(recorder, *args):
+    with patch.object(import_all, "call_command", recorder):
+        call_command("import_all", "--workers", "1", *args)
+
+
+class TestImportAll:
+    def test_dependencies_order(self):
+        recorder = ImportRecorder()
+
+        _run_import_all(recorder)
+
+        assert sorted(recorder.calls) == sorted(ALL_CHUNKS)
+        position = {call: index for index, call in enumerate(recorder.calls)}
+        stages = {stage.name: stage for stage in import_all.STAGES}
+        for stage in import_all.STAGES:
+            for dependency in stage.depends_on:
+                last_dependency_chunk = (
+                    stages[dependency].command,
+                    tuple(stages[dependency].chunks[-1]),
+                )
+                first_chunk = (stage.command, tuple(stage.chunks[0]))
+                assert position[last_dependency_chunk] < position[first_chunk]
+
+        # the imports keep the order of the sequential import
+        imports = [command for command, _ in recorder.calls if "import" in command]
+        assert list(dict.fromkeys(imports)) == [
+            "import_resources",
+            "import_records",
+            "import_projects",
+            "import_business_plans",
+            "import_cp_format",
+            "import_replenishments",
+        ]
+        # the checkpoints are deleted once the import is complete
+        assert not ImportCheckpoint.objects.exists()
+
+    def test_resume(self):
+        failed_chunk = ("import_projects", ("comments",))
+        recorder = ImportRecorder(fail_on=failed_chunk)
+        with pytest.raises(ValueError):
+            _run_import_all(recorder)
+        assert ImportCheckpoint.objects.filter(
+            stage="projects", chunk="progress"
+        ).exists()
+
+        resumed = ImportRecorder()
+        _run_import_all(resumed)
+
+        # only the failed chunk and the ones after it are imported again
+        assert resumed.calls[0] == failed_chunk
+        assert not set(recorder.calls) & set(resumed.calls)
+        assert sorted(recorder.calls + resumed.calls) == sorted(ALL_CHUNKS)
+
+        # the next run imports everything again
+        rerun = ImportRecorder()
+        _run_import_all(rerun)
+        assert sorted(rerun.calls) == sorted(ALL_CHUNKS)
+
+        with pytest.raises(ValueError):
+            _run_import_all(ImportRecorder(fail_on=failed_chunk))
+        restarted = ImportRecorder()
+        _run_import_all(restarted, "--restart")
+        assert sorted(restarted.calls) == sorted(ALL_CHUNKS)
+
+    def test_get_ready_stages(self):
+        done = {"resources", "records", "projects"}
+        ready = import_all.get_ready_stages(done, done | {"business_plans"})
+
+        assert [stage.name for stage in ready] == ["project_version_timeline"]
+
+    # serialized_rollback: restore the data migrations after the tables are flushed
+    @pytest.mark.django_db(transaction=True, serialized_rollback=True)
+    def test_parallel_resume(self):
+        # the stages run in spawned worker processes, so the commands cannot
+        # be patched: each chunk creates a country through the shell command
+        def chunk(name, requires=None):
+            code = "from core.models import Country as C; "
+            if requires:
+                code += f"C.objects.get(name='{requires}'); "
+            return ["-c", code + f"C.objects.create(name='{name}')"]
+
+        stages = [
+            ImportStage("first", "shell", [chunk("first 1"), chunk("first 2")]),
+            ImportStage(
+                "second",
+                "shell",
+                [chunk("second 1"), chunk("second 2", requires="Resumed")],
+                depends_on=["first"],
+            ),
+            ImportStage("third", "shell", [chunk("third")], depends_on=["first"]),
+            ImportStage("fourth", "shell", [chunk("fourth")], depends_on=["second"]),
+        ]
+
+        def imported():
+            return list(
+                Country.objects.exclude(name="Resumed")
+                .order_by("id")
+                .values_list("name", flat=True)
+            )
+
+        with patch.object(import_all, "STAGES", stages):
+            with pytest.raises(CommandError, match="second"):
+                call_command("import_all", "--workers", "2")
+        assert sorted(imported()) == ["first 1", "first 2", "second 1", "third"]
+        assert ImportCheckpoint.objects.count() == 4
+
+        Country.objects.create(name="Resumed")
+        with patch.object(import_all, "STAGES", stages):
+            call_command("import_all", "--workers", "2")
+
+        # only the failed chunk and the stages after it are imported again
+        assert imported()[4:] == ["second 2", "fourth"]
+        assert not ImportCheckpoint.objects.exists()
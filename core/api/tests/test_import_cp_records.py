@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+import pytest
+
+from core.api.tests.factories import CPReportFactory, SubstanceFactory, UsageFactory
+from core.import_data.utils import upsert_cp_records
+from core.models.country_programme import CPRecord
+
+pytestmark = pytest.mark.django_db
+
+
+def _get_rows(cp_report, substances, usage, value, imports=None):
+    return [
+        (
+            {
+                "country_programme_report_id": cp_report.id,
+                "substance_id": substance.id,
+                "blend_id": None,
+                "section": "A",
+                "display_name": substance.name,
+                "source_file": "records.xlsx",
+                **({"imports": imports} if imports is not None else {}),
+            },
+            [{"usage": usage, "quantity": Decimal(value)}],
+            index,
+        )
+        for index, substance in enumerate(substances)
+    ]
+
+
+def _get_values(cp_report):
+    return sorted(
+        (record.substance_id, record.imports, usage.quantity)
+        for record in CPRecord.objects.filter(country_programme_report=cp_report)
+        for usage in record.record_usages.all()
+    )
+
+
+class TestUpsertCPRecords:
+    def test_create(self, django_assert_num_queries):
+        cp_report = CPReportFactory.create()
+        substances = SubstanceFactory.create_batch(5)
+        usage = UsageFactory.create()
+
+        # select the records, insert the records and the usages
+        with django_assert_num_queries(3):
+            upsert_cp_records(_get_rows(cp_report, substances, usage, 1))
+
+        assert _get_values(cp_report) == [(s.id, None, Decimal(1)) for s in substances]
+
+    def test_log(self, caplog):
+        cp_report = CPReportFactory.create()
+        substances = SubstanceFactory.create_batch(2)
+        usage = UsageFactory.create()
+        upsert_cp_records(_get_rows(cp_report, substances, usage, 1))
+
+        upsert_cp_records(_get_rows(cp_report, substances, usage, 2, imports=3))
+
+        # the missing values are set, the others are only logged
+        assert _get_values(cp_report) == [
+            (s.id, Decimal(3), Decimal(1)) for s in substances
+        ]
+        warnings = [r.getMessage() for r in caplog.records if r.levelname == "WARNING"]
+        assert len(warnings) == 2
+        assert f"quantity: {usage.name}=1.000000000000000" in warnings[0]
+
+    def test_update(self):
+        cp_report = CPReportFactory.create()
+        substances = SubstanceFactory.create_batch(2)
+        usage = UsageFactory.create()
+        upsert_cp_records(_get_rows(cp_report, substances, usage, 1, imports=1))
+
+        upsert_cp_records(
+            _get_rows(cp_report, substances, usage, 2, imports=3),
+            update_or_log="update",
+        )
+
+        assert _get_values(cp_report) == [
+            (s.id, Decimal(3), Decimal(2)) for s in substances
+        ]
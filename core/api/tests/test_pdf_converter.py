@@ -0,0 +1,121 @@
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.urls import reverse
+
+from core.api.tests.base import BaseTest
+from core.pdf_converter import (
+    OfficeWorker,
+    PDFConversionError,
+    PDFConverter,
+    PDFConverterBusyError,
+)
+
+pytestmark = pytest.mark.django_db
+# pylint: disable=W0108,W0212,W0613
+
+
+class FakeOffice:
+    """
+    Replaces the LibreOffice processes: counts the instances started and
+    stopped and writes the PDF of each conversion
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.stopped = 0
+        self.failures = []
+
+    def start(self, worker):
+        self.started += 1
+        worker.process = MagicMock(poll=MagicMock(return_value=None))
+        worker.jobs_count = 0
+
+    def stop(self, worker):
+        if worker.process is not None:
+            self.stopped += 1
+            worker.process = None
+
+    def run(self, args, timeout, **kwargs):
+        if self.failures:
+            raise self.failures.pop(0)
+        Path(args[4]).write_bytes(b"%PDF")
+
+
+@pytest.fixture(name="office")
+def office_fixture():
+    office = FakeOffice()
+    with patch.object(
+        OfficeWorker, "start", lambda worker: office.start(worker)
+    ), patch.object(OfficeWorker, "stop", lambda worker: office.stop(worker)), patch(
+        "core.pdf_converter._run", office.run
+    ):
+        yield office
+
+
+def convert(converter, tmp_path, name="report"):
+    xlsx_file = tmp_path / f"{name}.xlsx"
+    xlsx_file.touch()
+    converter.convert(xlsx_file, xlsx_file.with_suffix(".pdf"))
+    return xlsx_file.with_suffix(".pdf")
+
+
+class TestPDFConverter:
+    def test_busy(self, office, tmp_path):
+        converter = PDFConverter(1, 5, 0.01, uno_python="python3")
+        worker = converter._idle.get()
+
+        with pytest.raises(PDFConverterBusyError):
+            convert(converter, tmp_path)
+
+        # the worker is used again as soon as it is free
+        converter._idle.put(worker)
+        assert convert(converter, tmp_path).exists()
+        assert office.started == 1
+
+    def test_worker_recycled(self, office, tmp_path, settings):
+        settings.PDF_CONVERTER_MAX_JOBS = 2
+        converter = PDFConverter(1, 5, 1, uno_python="python3")
+
+        for index in range(5):
+            convert(converter, tmp_path, f"report{index}")
+
+        # restarted after the 2nd and the 4th conversion
+        assert office.started == 3
+        assert office.stopped == 2
+
+    def test_crash_recovery(self, office, tmp_path):
+        converter = PDFConverter(1, 5, 1, uno_python="python3")
+        convert(converter, tmp_path, "first")
+
+        office.failures.append(PDFConversionError("PDF conversion timed out."))
+        with pytest.raises(PDFConversionError):
+            convert(converter, tmp_path, "second")
+        # the crashed instance is stopped and the worker returned to the pool
+        assert office.stopped == 1
+        assert converter._idle.qsize() == 1
+
+        assert convert(converter, tmp_path, "third").exists()
+        assert office.started == 2
+
+        # an instance that exited on its own is started again
+        converter.workers[0].process.poll.return_value = 1
+        assert convert(converter, tmp_path, "fourth").exists()
+        assert office.started == 3
+
+
+class TestPDFConverterBusyResponse(BaseTest):
+    url = reverse("country-programme-print")
+
+    def test_busy_response(self, secretariat_user, cp_report_2019, settings):
+        settings.PDF_CONVERTER_QUEUE_TIMEOUT = 25
+        self.client.force_authenticate(user=secretariat_user)
+        converter = MagicMock()
+        converter.convert.side_effect = PDFConverterBusyError("busy")
+
+        with patch("core.api.utils.get_pdf_converter", return_value=converter):
+            response = self.client.get(self.url, {"cp_report_id": cp_report_2019.id})
+
+        assert response.status_code == 503
+        assert response["Retry-After"] == "25"
@@ -0,0 +1,232 @@
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.db.models import Q
+
+from core import reference_data
+from core.api.tests.factories import (
+    BlendAltNameFactory,
+    BlendFactory,
+    CountryFactory,
+    CPReportFormatRowFactory,
+    SubstanceAltNameFactory,
+    SubstanceFactory,
+    UsageFactory,
+)
+from core.api.views.cp_report_empty_form import EmptyFormView
+from core.import_data.utils import (
+    get_chemical_by_name_or_components,
+    hold_chemical_resolver,
+)
+from core.models.blend import Blend, BlendComponents
+from core.models.country import Country
+from core.models.substance import Substance
+from core.models.usage import Usage
+
+pytestmark = pytest.mark.django_db
+# pylint: disable=W0212,W0613
+
+
+class TestReferenceData:
+    def test_cached_in_both_tiers(self, usage, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert reference_data.get_usages() == [usage]
+        # local tier
+        with django_assert_num_queries(0):
+            assert reference_data.get_usages() == [usage]
+        # shared tier (e.g. another process)
+        reference_data.usages.clear_local()
+        with django_assert_num_queries(0):
+            assert reference_data.get_usages() == [usage]
+
+    def test_invalidated_on_save_and_delete(
+        self, usage, django_capture_on_commit_callbacks
+    ):
+        assert reference_data.get_usages()[0].name == "usage"
+
+        with django_capture_on_commit_callbacks(execute=True):
+            usage.name = "new usage"
+            usage.save()
+        assert reference_data.get_usages()[0].name == "new usage"
+
+        with django_capture_on_commit_callbacks(execute=True):
+            new_usage = UsageFactory.create(name="other usage")
+        assert reference_data.get_usages() == [usage, new_usage]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            usage.delete()
+        assert reference_data.get_usages() == [new_usage]
+
+    def test_local_size(self):
+        data = reference_data.ReferenceData(
+            "test_local_size", ["core.Usage"], lambda year: [year], local_size=2
+        )
+        try:
+            for year in (2019, 2020, 2021, 2020, 2022):
+                assert data.get(year) == [year]
+            # the least recently used arguments are dropped from the process
+            assert list(data._local) == [(2020,), (2022,)]
+            # and still found in the shared tier
+            assert data.get(2019) == [2019]
+        finally:
+            reference_data.ReferenceData.registry.pop("test_local_size")
+
+    def test_version_timeout(self, settings, usage, django_assert_num_queries):
+        # without a shared cache, the changes of other processes are not seen
+        settings.REFERENCE_DATA_VERSION_TIMEOUT = 60
+        reference_data.invalidate_reference_data()
+        assert reference_data.get_usages() == [usage]
+        Usage.objects.filter(id=usage.id).update(name="new usage")
+
+        now = time.time()
+        with patch("time.time", return_value=now + 30):
+            with django_assert_num_queries(0):
+                assert reference_data.get_usages()[0].name == "usage"
+        with patch("time.time", return_value=now + 90):
+            assert reference_data.get_usages()[0].name == "new usage"
+
+    def test_invalidate_reference_data(self, django_assert_num_queries):
+        region = CountryFactory.create(
+            name="Region", location_type=Country.LocationType.REGION
+        )
+        country = CountryFactory.create(name="Country", parent=region)
+        assert reference_data.get_country_region_dict() == {
+            region.id: "Region",
+            country.id: "Region",
+        }
+
+        # bulk updates do not send signals
+        Country.objects.filter(id=region.id).update(name="New region")
+        assert reference_data.get_country_region_dict()[country.id] == "Region"
+
+        reference_data.invalidate_reference_data()
+        assert reference_data.get_country_region_dict()[country.id] == "New region"
+
+    def test_cp_format_rows(self, time_frames, substance, blend):
+        row_a = CPReportFormatRowFactory.create(
+            substance=substance,
+            blend=None,
+            section="A",
+            time_frame=time_frames[(2019, None)],
+        )
+        row_c = CPReportFormatRowFactory.create(
+            substance=None,
+            blend=blend,
+            section="C",
+            time_frame=time_frames[(2019, None)],
+        )
+        CPReportFormatRowFactory.create(
+            substance=substance,
+            blend=None,
+            section="A",
+            time_frame=time_frames[(2000, 2011)],
+        )
+
+        assert reference_data.get_cp_format_rows(2019) == [row_a, row_c]
+        assert reference_data.get_cp_format_rows(2019, [Q(section="C")]) == [row_c]
+        assert reference_data.get_cp_format_rows(2019, [Q(section="B")]) == []
+
+        row_c.section = "B"
+        row_c.save()
+        assert reference_data.get_cp_format_rows(2019, [Q(section="B")]) == [row_c]
+
+    def test_empty_form_data_is_a_copy(self, time_frames, substance):
+        CPReportFormatRowFactory.create(
+            substance=substance,
+            blend=None,
+            section="A",
+            time_frame=time_frames[(2019, None)],
+        )
+
+        substance_rows = EmptyFormView.get_substance_rows(2019)
+        assert substance_rows == EmptyFormView.build_substance_rows(2019)
+        substance_rows["section_a"].pop()
+
+        assert len(EmptyFormView.get_substance_rows(2019)["section_a"]) == 1
+
+    def test_chemical_resolver(self, django_assert_num_queries):
+        r22 = SubstanceFactory.create(name="HCFC-22")
+        r125 = SubstanceFactory.create(name="HFC-125")
+        SubstanceAltNameFactory.create(name="R-22", substance=r22)
+        blend = BlendFactory.create(
+            name="R-410A", other_names="Suva 410A", composition="HFC-32=50%"
+        )
+        BlendAltNameFactory.create(name="Puron", blend=blend)
+        custom_blend = BlendFactory.create(name="CustMix-1", other_names=None)
+        BlendComponents.objects.create(
+            blend=custom_blend, substance=r22, percentage=Decimal("0.6")
+        )
+        BlendComponents.objects.create(
+            blend=custom_blend, substance=r125, percentage=Decimal("0.4")
+        )
+
+        names = ["hcfc-22", " R-22 ", "r-410a", "SUVA 410A", "hfc-32=50%", "puron"]
+        resolver = reference_data.get_chemical_resolver()
+        with django_assert_num_queries(0):
+            substances = [resolver.find_substance(name) for name in names]
+            blends = [resolver.find_blend_by_name(name) for name in names]
+            by_components = [
+                resolver.find_blend_by_components(components)
+                for components in (
+                    [("HFC-125", "40"), ("R-22", "60.0")],
+                    [("HFC-125", "40")],
+                    [("HFC-125", "40"), ("R-22", "60"), ("R-22", "60")],
+                    [("HFC-125", "x"), ("R-22", "60")],
+                    [("HFC-404", "40"), ("R-22", "60")],
+                )
+            ]
+
+        # same results as the model lookups
+        assert substances == [Substance.objects.find_by_name(name) for name in names]
+        assert blends == [Blend.objects.find_by_name(name) for name in names]
+        assert by_components == [custom_blend, None, None, None, None]
+        assert resolver.get_blend_by_components(
+            [(r22.id, 0.6), (r125.id, 0.4)]
+        ) == BlendComponents.objects.get_blend_by_components(
+            [(r22.id, 0.6), (r125.id, 0.4)]
+        )
+        assert resolver.find_chemical("R-22") == (r22, "substance")
+        assert resolver.find_chemical(
+            "unknown", [("R-22", "60"), ("HFC-125", "40")]
+        ) == (custom_blend, "blend")
+        assert resolver.find_chemical("unknown") == (None, None)
+
+        SubstanceAltNameFactory.create(name="R-125", substance=r125)
+        assert reference_data.get_chemical_resolver().find_substance("r-125") == r125
+
+    def test_chemical_resolver_non_terminating_percentage(self):
+        substances = [
+            SubstanceFactory.create(name=name)
+            for name in ("HCFC-22", "HFC-125", "HFC-134a")
+        ]
+        blend = BlendFactory.create(name="CustMix-2", other_names=None)
+        for substance, percentage in zip(substances, ("0.33300", "0.33300", "0.334")):
+            BlendComponents.objects.create(
+                blend=blend, substance=substance, percentage=Decimal(percentage)
+            )
+
+        resolver = reference_data.get_chemical_resolver()
+        components = [("HCFC-22", 33.3), ("HFC-125", "33.3"), ("HFC-134a", 33.4)]
+        # 33.3 / 100 == 0.33299999999999996
+        assert resolver.find_blend_by_components(components) == blend
+        assert Blend.objects.find_by_components(components) == blend
+
+    def test_held_chemical_resolver(self, django_assert_num_queries):
+        r22 = SubstanceFactory.create(name="HCFC-22")
+
+        # the shared cache is down: the resolver is built on every access
+        with patch("core.reference_data._shared_call", return_value=None):
+            with hold_chemical_resolver():
+                assert get_chemical_by_name_or_components("hcfc-22")[0] == r22
+                with django_assert_num_queries(0):
+                    for _ in range(3):
+                        assert get_chemical_by_name_or_components("r-22") == (
+                            None,
+                            None,
+                        )
+
+                # rebuilt after a chemical change made by the import
+                SubstanceAltNameFactory.create(name="R-22", substance=r22)
+                assert get_chemical_by_name_or_components("r-22")[0] == r22
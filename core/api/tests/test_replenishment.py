@@ -8,6 +8,8 @@ from decimal import Decimal
 import openpyxl
 import pytest
 from constance import config
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.datetime_safe import datetime
 from rest_framework.test import APIClient
@@ -257,6 +259,75 @@ class TestScalesOfAssessment(BaseTest):
         response = self.client.get(self.url)
         assert response.status_code == 403
 
+    def _create_computed_scales(self, version, count):
+        us = CountryFactory.create(name="United States", iso3="USA")
+        ScaleOfAssessmentFactory.create(
+            country=us, version=version, override_adjusted_scale_of_assessment=None
+        )
+        for index in range(count):
+            ScaleOfAssessmentFactory.create(
+                country=CountryFactory.create(name=f"Party {index}", iso3=f"P{index}"),
+                version=version,
+                un_scale_of_assessment=Decimal(index + 1),
+                override_adjusted_scale_of_assessment=None,
+            )
+
+    def test_scales_of_assessment_computed_amounts(self, stakeholder_user):
+        version = ScaleOfAssessmentVersionFactory.create(
+            replenishment=ReplenishmentFactory.create(
+                start_year=2021, end_year=2023, amount=Decimal(1000)
+            ),
+            version=0,
+        )
+        self._create_computed_scales(version, 3)
+        soa = ScaleOfAssessment.objects.get(country__iso3="P1")
+        self.client.force_authenticate(user=stakeholder_user)
+
+        # the sum of the UN scales is not restricted by the filters
+        response = self.client.get(self.url, {"country_id": soa.country_id})
+        assert response.status_code == 200
+        assert len(response.data) == 1
+        # 2 / (1 + 2 + 3) * (100 - 22)
+        assert Decimal(response.data[0]["adjusted_scale_of_assessment"]) == Decimal(26)
+        for field in [
+            "adjusted_scale_of_assessment",
+            "amount",
+            "amount_local_currency",
+            "yearly_amount",
+            "yearly_amount_local_currency",
+        ]:
+            assert Decimal(response.data[0][field]) == pytest.approx(
+                getattr(soa, field)
+            )
+
+    def test_scales_of_assessment_query_count(self, stakeholder_user):
+        self.client.force_authenticate(user=stakeholder_user)
+        # first request loads the user permissions
+        self.client.get(self.url)
+        query_counts = []
+        for start_year, count in [(2018, 2), (2021, 20)]:
+            version = ScaleOfAssessmentVersionFactory.create(
+                replenishment=ReplenishmentFactory.create(
+                    start_year=start_year, end_year=start_year + 2
+                ),
+                version=0,
+            )
+            self._create_computed_scales(version, count)
+            params = {"start_year": start_year, "version": 0}
+
+            with CaptureQueriesContext(connection) as list_queries:
+                response = self.client.get(self.url, params)
+            assert response.status_code == 200
+            assert len(response.data) == count + 1
+
+            with CaptureQueriesContext(connection) as export_queries:
+                response = self.client.get(self.url + "export/", params)
+            assert response.status_code == 200
+
+            query_counts.append((len(list_queries), len(export_queries)))
+
+        assert query_counts[0] == query_counts[1]
+
 
 class TestStatusOfContributions:
     client = APIClient()
@@ -0,0 +1,232 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.api.filters.search import FullTextSearchFilter
+from core.api.tests.factories import (
+    BPActivityFactory,
+    BPChemicalTypeFactory,
+    ProjectFactory,
+    SubstanceFactory,
+)
+from core.models.business_plan import BPActivitySearchDocument
+from core.models.project import Project, ProjectSearchDocument
+
+pytestmark = pytest.mark.django_db
+# pylint: disable=W0613
+
+
+@pytest.fixture(name="_setup_projects")
+def setup_projects():
+    return [
+        ProjectFactory.create(
+            title="Refrigeration servicing", code="ARG/REF/80/INV/01"
+        ),
+        ProjectFactory.create(title="Foam conversion", code="BRA/FOA/81/INV/02"),
+        ProjectFactory.create(title="Foam and refrigeration", code="CHN/FOA/82/TAS/03"),
+    ]
+
+
+@pytest.fixture(name="_setup_activities")
+def setup_activities(business_plan, substance):
+    activities = [
+        BPActivityFactory.create(
+            business_plan=business_plan,
+            title=title,
+            remarks=remarks,
+            lvc_status="LVC",
+            status="A",
+        )
+        for title, remarks in (
+            ("Foam sector plan", ""),
+            ("Servicing plan", "no foam"),
+            ("Aerosol plan", ""),
+        )
+    ]
+    activities[2].substances.add(substance)
+    return activities
+
+
+class TestProjectSearch:
+    client = APIClient()
+    url = reverse("project-v2-list")
+
+    def search(self, term, **params):
+        response = self.client.get(self.url, {"search": term, **params})
+        assert response.status_code == 200
+        return [project["title"] for project in response.data]
+
+    def test_search_words_and_codes(self, admin_user, _setup_projects):
+        self.client.force_authenticate(user=admin_user)
+
+        # the words of the title match by prefix
+        assert sorted(self.search("refriger")) == [
+            "Foam and refrigeration",
+            "Refrigeration servicing",
+        ]
+        assert self.search("foam refrig") == ["Foam and refrigeration"]
+        # and in the middle of the words and codes
+        assert sorted(self.search("frigeration")) == [
+            "Foam and refrigeration",
+            "Refrigeration servicing",
+        ]
+        assert self.search("81/INV") == ["Foam conversion"]
+        assert self.search("RA/FO") == ["Foam conversion"]
+        # the segments of a term match consecutive words
+        assert self.search("FOA/81") == ["Foam conversion"]
+        assert self.search("FOA-81") == ["Foam conversion"]
+        assert sorted(self.search("foa/8")) == [
+            "Foam and refrigeration",
+            "Foam conversion",
+        ]
+        assert self.search("81/FOA") == []
+        assert sorted(self.search("/inv/")) == [
+            "Foam conversion",
+            "Refrigeration servicing",
+        ]
+
+    def test_ordering(self, admin_user, _setup_projects):
+        self.client.force_authenticate(user=admin_user)
+
+        # a requested ordering replaces the ranking
+        assert self.search("foam", ordering="-title") == [
+            "Foam conversion",
+            "Foam and refrigeration",
+        ]
+        assert self.search("foam", ordering="title") == [
+            "Foam and refrigeration",
+            "Foam conversion",
+        ]
+
+    def test_refreshed_on_save(self, admin_user, _setup_projects):
+        self.client.force_authenticate(user=admin_user)
+        project = _setup_projects[0]
+
+        project.title = "Halon banking"
+        project.save()
+        assert self.search("halon") == ["Halon banking"]
+
+        # the fields that are not searched do not refresh the document
+        ProjectSearchDocument.objects.filter(project=project).delete()
+        project.description = "Updated"
+        project.save(update_fields=["description"])
+        assert not ProjectSearchDocument.objects.filter(project=project).exists()
+
+        call_command("refresh_search_documents")
+        assert self.search("halon") == ["Halon banking"]
+
+    def test_refreshed_on_copy(self, _setup_projects):
+        new_project = Project.objects.copy_projects([_setup_projects[1]])[
+            _setup_projects[1].id
+        ]
+
+        assert ProjectSearchDocument.objects.filter(
+            project=new_project,
+            vector=FullTextSearchFilter().get_search_query("foa/81"),
+        ).exists()
+
+    def test_index_used(self, _setup_projects):
+        queryset = ProjectSearchDocument.objects.filter(
+            vector=FullTextSearchFilter().get_search_query("foa/81")
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+            cursor.execute("SET LOCAL enable_seqscan = on")
+
+        assert "core_projec_vector_8d19dc_gin" in plan
+
+    def test_trigram_index_used(self, _setup_projects):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                pytest.skip("The pg_trgm extension is not available")
+
+        queryset = ProjectSearchDocument.objects.filter(text__icontains="81/inv")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+            cursor.execute("SET LOCAL enable_seqscan = on")
+
+        assert "core_projectsearchdocument_text_trgm" in plan
+
+
+class TestBPActivitySearch:
+    client = APIClient()
+    url = reverse("bpactivity-list")
+
+    def search(self, business_plan, term):
+        response = self.client.get(
+            self.url,
+            {
+                "year_start": business_plan.year_start,
+                "year_end": business_plan.year_end,
+                "bp_status": business_plan.status,
+                "search": term,
+            },
+        )
+        assert response.status_code == 200
+        return [activity["title"] for activity in response.json()]
+
+    def test_ranking(self, bp_viewer_user, business_plan, _setup_activities):
+        self.client.force_authenticate(user=bp_viewer_user)
+
+        # a title match ranks above a remarks match
+        assert self.search(business_plan, "foam") == [
+            "Foam sector plan",
+            "Servicing plan",
+        ]
+
+    def test_refreshed_on_substances_change(
+        self, bp_viewer_user, business_plan, substance, _setup_activities
+    ):
+        self.client.force_authenticate(user=bp_viewer_user)
+        activities = _setup_activities
+
+        assert self.search(business_plan, substance.name) == ["Aerosol plan"]
+
+        activities[2].substances.remove(substance)
+        substance.bpactivity_set.add(activities[0])
+        assert self.search(business_plan, substance.name) == ["Foam sector plan"]
+
+        substance.name = "Renamed substance"
+        substance.save()
+        assert self.search(business_plan, "renamed") == ["Foam sector plan"]
+
+        activities[0].substances.clear()
+        assert self.search(business_plan, "renamed") == []
+
+        substance.bpactivity_set.add(activities[1], activities[2])
+        assert sorted(self.search(business_plan, "renamed")) == [
+            "Aerosol plan",
+            "Servicing plan",
+        ]
+        substance.bpactivity_set.clear()
+        assert self.search(business_plan, "renamed") == []
+
+    def test_substring(self, bp_viewer_user, business_plan, _setup_activities):
+        self.client.force_authenticate(user=bp_viewer_user)
+        activity = _setup_activities[1]
+        activity.substances.add(SubstanceFactory.create(name="HCFC-141b"))
+
+        # "CFC" inside "HCFC"
+        assert self.search(business_plan, "CFC-141") == ["Servicing plan"]
+        assert self.search(business_plan, "rosol") == ["Aerosol plan"]
+
+    def test_refreshed_on_chemical_type_save(
+        self, bp_viewer_user, business_plan, _setup_activities
+    ):
+        self.client.force_authenticate(user=bp_viewer_user)
+        chemical_type = BPChemicalTypeFactory.create(name="Methyl bromide")
+        activity = _setup_activities[1]
+        activity.bp_chemical_type = chemical_type
+        activity.save()
+
+        assert self.search(business_plan, "methyl") == ["Servicing plan"]
+
+        chemical_type.name = "Other chemical"
+        chemical_type.save()
+        assert self.search(business_plan, "methyl") == []
+        assert BPActivitySearchDocument.objects.count() == 3
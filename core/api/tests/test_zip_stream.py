@@ -0,0 +1,58 @@
+import zipfile
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+
+from core.api.zip_stream import stream_zip
+from core.models import CPFile
+
+pytestmark = pytest.mark.django_db
+
+
+def _create_file(country, filename, content):
+    return CPFile.objects.create(
+        country=country,
+        year=2023,
+        filename=filename,
+        file=ContentFile(content, name=filename),
+    )
+
+
+def test_stream_zip(country_ro):
+    pdf_file = _create_file(country_ro, "report.pdf", b"%PDF" * 1000)
+    csv_file = _create_file(country_ro, "data.csv", b"a,b,c\n" * 1000)
+    missing_file = _create_file(country_ro, "missing.csv", b"missing")
+    missing_file.file.storage.delete(missing_file.file.name)
+
+    chunks = list(
+        stream_zip(
+            [
+                ("report.pdf", pdf_file.file),
+                ("missing.csv", missing_file.file),
+                ("data.csv", csv_file.file),
+                ("data.csv", csv_file.file),
+            ]
+        )
+    )
+
+    assert len(chunks) > 1
+    with zipfile.ZipFile(BytesIO(b"".join(chunks))) as zipf:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == ["report.pdf", "data.csv", "data (1).csv"]
+        assert zipf.read("data (1).csv") == b"a,b,c\n" * 1000
+        # already compressed files are stored as they are
+        assert zipf.getinfo("report.pdf").compress_type == zipfile.ZIP_STORED
+        assert zipf.getinfo("data.csv").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_stream_zip_zip64(country_ro, monkeypatch):
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1000)
+    csv_file = _create_file(country_ro, "data.csv", b"a,b,c\n" * 1000)
+
+    content = b"".join(stream_zip([("data.csv", csv_file.file)]))
+
+    with zipfile.ZipFile(BytesIO(content)) as zipf:
+        assert zipf.read("data.csv") == b"a,b,c\n" * 1000
+    # ZIP64 extra field in the local file header
+    assert b"\x01\x00\x10\x00" in content[:100]
@@ -65,6 +65,11 @@ from core.api.views.cp_archive import (
     CPRecordsArchiveListView,
     CPReportVersionsListView,
 )
+from core.api.views.export_jobs import (
+    ExportJobCreateView,
+    ExportJobDownloadView,
+    ExportJobView,
+)
 from core.api.views.funding_window import FundingWindowListCreateView
 from core.api.views.funding_window import FundingWindowExportView
 from core.api.views.funding_window import FundingWindowUpdateView
@@ -75,7 +80,11 @@ from core.api.views.projects_metadata import (
     ProjectFieldView,
 )
 from core.api.views.cp_emissions_generations import DashboardsCPEmissionsView
-from core.api.views.cp_files import CPFilesDownloadView, CPFilesView
+from core.api.views.cp_files import (
+    CPFilesDownloadAllView,
+    CPFilesDownloadView,
+    CPFilesView,
+)
 from core.api.views.cp_prices import DashboardsCPPricesView, CPPricesView
 from core.api.views.cp_records_export import (
     CPCalculatedAmountExportView,
@@ -96,6 +105,7 @@ from core.api.views.cp_reports import (
     CPReportCommentsView,
 )
 from core.api.views.cp_records import (
+    DashboardsCPRecordKeysetView,
     DashboardsCPRecordView,
     CPRecordListByReportView,
     CPRecordListDiffView,
@@ -398,6 +408,11 @@ urlpatterns = [
         DashboardsCPRecordView.as_view(),
         name="country-programme-dashboards-record",
     ),
+    path(
+        "country-programme/dashboards/records/keyset/",
+        DashboardsCPRecordKeysetView.as_view(),
+        name="country-programme-dashboards-record-keyset",
+    ),
     path(
         "country-programme/dashboards/prices/",
         DashboardsCPPricesView.as_view(),
@@ -468,6 +483,11 @@ urlpatterns = [
         CPFilesView.as_view(),
         name="country-programme-files",
     ),
+    path(
+        "country-programme/files/download-all/",
+        CPFilesDownloadAllView.as_view(),
+        name="country-programme-files-download-all",
+    ),
     path(
         "country-programme/files/<int:id>/download/",
         CPFilesDownloadView.as_view(),
@@ -829,6 +849,22 @@ urlpatterns = [
         APRSyncFromProjectsView.as_view(),
         name="apr-sync-from-projects",
     ),
+    # Background exports
+    path(
+        "export-jobs/",
+        ExportJobCreateView.as_view(),
+        name="export-job-create",
+    ),
+    path(
+        "export-jobs/<int:job_id>/",
+        ExportJobView.as_view(),
+        name="export-job",
+    ),
+    path(
+        "export-jobs/<int:job_id>/download/",
+        ExportJobDownloadView.as_view(),
+        name="export-job-download",
+    ),
     # User permissions
     path(
         "user/permissions/",
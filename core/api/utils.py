@@ -1,19 +1,23 @@
-import shutil
-import subprocess
 import tempfile
 from pathlib import Path
 from typing import TypedDict
 
 import django.core.exceptions
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.contrib.auth import get_user_model
-from django.db.models import Exists, OuterRef, Q
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection as db_connection, models
+from django.db.models import Exists, Lookup, OuterRef, Q, Value
 from django.http import FileResponse
 from django_filters import rest_framework as filters
+from rest_framework import status
+from rest_framework.exceptions import APIException
 
 from django_clamd.validators import validate_file_infection
 from openpyxl.worksheet.page import PageMargins
 
+from core.pdf_converter import PDFConverterBusyError, get_pdf_converter
 from core.models import (
     AnnualProgressReport,
     AnnualAgencyProjectReport,
@@ -55,6 +59,76 @@ TOTAL_FUND_OPTIONAL_FOR_PROJECT_SPECIFIC_FIELD_ENTRIES = [
 ]
 
 
+class EqualsAny(Lookup):  # pylint: disable=W0223
+    """
+    `field = ANY(array)` condition, usable directly in `QuerySet.filter()`:
+
+        EqualsAny(F("record_id"), [1, 2, 3])
+
+    Unlike `field__in=[...]`, the values are sent as one array parameter, so
+    the size of the query does not grow with the number of values.
+    """
+
+    lookup_name = "any"
+
+    def __init__(self, lhs, values, base_field=None):
+        super().__init__(
+            lhs,
+            Value(
+                list(values),
+                output_field=ArrayField(base_field or models.IntegerField()),
+            ),
+        )
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} = ANY({rhs})", [*lhs_params, *rhs_params]
+
+
+def bulk_update_values(model, objs, fields, batch_size=500):
+    """
+    Write the given fields of the objects with one
+    `UPDATE ... FROM (VALUES ...)` statement per batch
+
+    Same result as `QuerySet.bulk_update()`, without building a CASE
+    expression for each object and field, which is slow for large batches.
+    Does not send signals or set `auto_now` fields.
+
+    @param model: model class of the objects
+    @param objs: list of saved model objects
+    @param fields: list of field names to write
+    @param batch_size: number of objects written by each statement
+    """
+    quote_name = db_connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in fields]
+    table = quote_name(model._meta.db_table)
+    pk_column = quote_name(model._meta.pk.column)
+    columns = [quote_name(f.column) for f in fields]
+    placeholders = ", ".join(
+        f"%s::{f.db_type(db_connection)}" for f in [model._meta.pk, *fields]
+    )
+    set_sql = ", ".join(f"{column} = v.{column}" for column in columns)
+
+    with db_connection.cursor() as cursor:
+        for i in range(0, len(objs), batch_size):
+            batch = objs[i : i + batch_size]
+            params = []
+            for obj in batch:
+                params.append(obj.pk)
+                params.extend(
+                    f.get_db_prep_save(getattr(obj, f.attname), db_connection)
+                    for f in fields
+                )
+            values_sql = ", ".join([f"({placeholders})"] * len(batch))
+            cursor.execute(
+                f"UPDATE {table} SET {set_sql} "
+                f"FROM (VALUES {values_sql}) AS v({pk_column}, {', '.join(columns)}) "
+                f"WHERE {table}.{pk_column} = v.{pk_column}",
+                params,
+            )
+
+
 class RelatedExistsFilter(filters.BooleanFilter):
     """Filter query based on whether it has at least one row in the specified related field."""
 
@@ -122,6 +196,17 @@ def workbook_response(name, wb):
         return res
 
 
+class PDFConverterUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "All PDF converters are busy, please try again later."
+    default_code = "pdf_converter_busy"
+
+    def __init__(self, wait, detail=None):
+        super().__init__(detail)
+        # sent as the Retry-After header
+        self.wait = wait
+
+
 def workbook_pdf_response(name, wb, orientation=None):
     """Save pdf and return the response"""
 
@@ -137,21 +222,12 @@ def workbook_pdf_response(name, wb, orientation=None):
                 )
 
         wb.save(xlsx_file)
-
-        libreoffice_bin = shutil.which("libreoffice")
-        if libreoffice_bin is None:
-            libreoffice_bin = shutil.which("soffice")
-        subprocess.check_call(
-            [
-                libreoffice_bin,
-                "--headless",
-                "--convert-to",
-                "pdf",
-                str(xlsx_file),
-            ],
-            cwd=tmpdirname,
-            shell=False,
-        )
+        try:
+            get_pdf_converter().convert(xlsx_file, pdf_file)
+        except PDFConverterBusyError as e:
+            raise PDFConverterUnavailable(
+                settings.PDF_CONVERTER_QUEUE_TIMEOUT, str(e)
+            ) from e
         return FileResponse(
             pdf_file.open("rb"),
             as_attachment=True,
@@ -212,6 +288,19 @@ def log_project_history(project, request_user, description):
     )
 
 
+def log_projects_history(project_descriptions, request_user):
+    """
+    Log a history entry for each project of a batch
+
+    @param project_descriptions: list of tuples (project, description)
+    @param request_user: User
+    """
+    ProjectHistory.objects.bulk_create(
+        ProjectHistory(project=project, description=description, user=request_user)
+        for project, description in project_descriptions
+    )
+
+
 def get_previous_year_project_reports(agency_id, year):
     previous_year = year - 1
 
@@ -257,17 +346,14 @@ def get_previous_year_project_reports(agency_id, year):
 def latest_version_base_qs(year):
     """
     Base queryset for the latest archive-project version approved in or before `year`,
-    ordered by effective_date desc then version desc.
-    This way, the first result per project is the most recent.
+    read from the ProjectVersionTimeline: one version per project.
 
     Mirrors Project.latest_version_for_year().
     """
     return (
         Project.objects.really_all()
-        .with_effective_date()
-        .filter(effective_date__isnull=False, effective_date__year__lte=year)
+        .in_effect_for_year(year)
         .select_related("status", "post_excom_decision__meeting")
-        .order_by("-effective_date", "-version")
     )
 
 
@@ -277,10 +363,4 @@ def all_versions_for_year_base_qs(year):
     Mirrors how Project.all_versions_for_year() works.
     """
     # TODO: it's only used for the pcr_due field, so should probably remove.
-    return (
-        Project.objects.really_all()
-        .with_effective_date()
-        .filter(effective_date__year=year)
-        .select_related("status")
-        .order_by("version")
-    )
+    return Project.objects.really_all().effective_in_year(year).select_related("status")
@@ -1,13 +1,12 @@
 import logging
 import os
-from zipfile import ZipFile
 
 from celery.result import AsyncResult
 from constance import config
 from django.db import transaction, models
 from django.utils import timezone
 from django.db.models import Prefetch
-from django.http import Http404, HttpResponse, FileResponse
+from django.http import Http404, FileResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.types import OpenApiTypes
@@ -46,6 +45,7 @@ from core.api.serializers.annual_project_report import (
     AnnualProjectReportFileUploadSerializer,
     AnnualAgencyProjectReportStatusUpdateSerializer,
     AnnualProgressReportSerializer,
+    APREndorsementJobSerializer,
     AnnualProgressReportEndorseSerializer,
     AnnualProjectReportMLFSBulkUpdateSerializer,
     AnnualProjectReportKickStartResponseSerializer,
@@ -58,8 +58,10 @@ from core.api.utils import (
     get_unendorsed_years,
     get_previous_year_project_reports,
 )
+from core.api.zip_stream import zip_file_response
 from core.models import (
     Agency,
+    APREndorsementJob,
     AnnualProgressReport,
     AnnualAgencyProjectReport,
     AnnualProjectReport,
@@ -67,6 +69,7 @@ from core.models import (
     Project,
 )
 from core.tasks import (
+    APR_VERSIONING_START_YEAR,
     auto_submit_empty_agency_reports,
     send_agency_submission_notification,
     sync_apr_from_projects,
@@ -562,16 +565,17 @@ class APRFilesDownloadAllView(APIView):
         safe_agency_name = "_".join(safe_agency_name.split()).replace(" ", "_")
         zip_filename = f"APR_{year}_{safe_agency_name}_Files.zip"
 
-        response = HttpResponse(content_type="application/zip")
-        response["Content-Disposition"] = f'attachment; filename="{zip_filename}"'
-
-        with ZipFile(response, "w") as zipf:
-            for file_obj in files:
-                if file_obj.file and os.path.exists(file_obj.file.path):
-                    arcname = file_obj.file_name or os.path.basename(file_obj.file.name)
-                    zipf.write(file_obj.file.path, arcname=arcname)
-
-        return response
+        return zip_file_response(
+            zip_filename,
+            (
+                (
+                    file_obj.file_name or os.path.basename(file_obj.file.name),
+                    file_obj.file,
+                )
+                for file_obj in files
+                if file_obj.file
+            ),
+        )
 
 
 class APRStatusView(APIView):
@@ -913,6 +917,7 @@ class APREndorseView(APIView):
         )
 
         serializer = AnnualProgressReportSerializer(progress_report)
+        job = APREndorsementJob.objects.filter(progress_report=progress_report).first()
 
         return Response(
             {
@@ -922,6 +927,10 @@ class APREndorseView(APIView):
                 "submitted_agencies": submitted_reports.count(),
                 "draft_agencies": draft_reports.count(),
                 "draft_agency_names": [ar.agency.name for ar in draft_reports],
+                # progress of the project updates, once endorsed
+                "endorsement_job": (
+                    APREndorsementJobSerializer(job).data if job else None
+                ),
             },
             status=status.HTTP_200_OK,
         )
@@ -954,6 +963,9 @@ class APREndorseView(APIView):
         )
         if serializer.is_valid():
             serializer.save()
+            if progress_report.year >= APR_VERSIONING_START_YEAR:
+                # polled through GET until the task is done
+                APREndorsementJob.objects.get_or_create(progress_report=progress_report)
 
             try:
                 update_project_statuses_after_apr_endorsement.delay(progress_report.id)
@@ -1317,6 +1329,8 @@ class APRSyncFromProjectsView(APIView):
     for all agencies, from current Project data. MLFS Full Access only.
 
     POST:   enqueues the job as an async task; returns 202 with task_id.
+            With ?incremental=true, only the projects updated since the last
+            sync are synced.
     GET:    polls the task status; accepts ?task_id=<id> to check its progress.
 
     Both verbs return the same four-key JSON response,
@@ -1324,7 +1338,8 @@ class APRSyncFromProjectsView(APIView):
         {
             "task_id":  "<celery-task-uuid>",
             "status":   "pending" | "success" | "failure",
-            "result":   null | { updated_count, changed_count, agencies_count, message },
+            "result":   null | { mode, updated_count, changed_count, agencies_count,
+                                 duration_seconds, message },
             "error":    null | "<error message>"
         }
     """
@@ -1357,7 +1372,10 @@ class APRSyncFromProjectsView(APIView):
                 f"Cannot sync reports for year {year}. APR has been endorsed."
             )
 
-        task = sync_apr_from_projects.delay(year)
+        if request.query_params.get("incremental", "false") == "true":
+            task = sync_apr_from_projects.delay(year, incremental=True)
+        else:
+            task = sync_apr_from_projects.delay(year)
         return self._task_response(
             task.id, "pending", http_status=status.HTTP_202_ACCEPTED
         )
@@ -19,6 +19,7 @@ from core.api.filters.business_plan import (
     BPFileFilter,
     BPFilterBackend,
 )
+from core.api.filters.search import FullTextSearchFilter
 from core.models import Project
 from core.api.permissions import (
     HasBusinessPlanEditAccess,
@@ -41,7 +42,7 @@ from core.api.views.utils import (
     BPACTIVITY_ORDERING_FIELDS,
 )
 from core.models import BusinessPlan, BPChemicalType, BPActivity
-from core.models.business_plan import BPFile
+from core.models.business_plan import BPActivitySearchDocument, BPFile
 
 
 class BPChemicalTypeListView(generics.ListAPIView):
@@ -220,16 +221,12 @@ class BPActivityViewSet(
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
-        filters.SearchFilter,
-    ]
-    search_fields = [
-        "title",
-        "required_by_model",
-        "lvc_status",
-        "remarks",
-        "bp_chemical_type__name",
-        "substances__name",
+        FullTextSearchFilter,
     ]
+    # title, required by model, LVC status, remarks, chemical type and
+    # substance names
+    search_document_model = BPActivitySearchDocument
+    search_fields = []
     ordering = ["agency__name", "country__abbr", "initial_id"]
     ordering_fields = BPACTIVITY_ORDERING_FIELDS
 
@@ -70,6 +70,11 @@ def strip_str(name):
     return name.lower().strip()
 
 
+def normalise(column):
+    # `strip_str` for a whole column
+    return column.str.lower().str.strip()
+
+
 def check_numeric_value(value):
     try:
         float(value)
@@ -78,215 +83,257 @@ def check_numeric_value(value):
     return True
 
 
-def check_year_values(value_type, value, year, is_after, warning_messages):
-    if not check_numeric_value(value):
-        warning_messages.append(
-            f"Value {value_type} for year {year} (After: {is_after}) "
-            f"is not a number and we will set it to be '0'"
-        )
-        return 0
+def is_numeric(column):
+    """
+    Column-wise `check_numeric_value`
 
-    return value
+    @param column: Series of str
 
+    @return: boolean Series
+    """
+    # the values pandas parses are numbers for `float` too; the other ones
+    # (e.g. "nan", "1_000", " 1 ") are checked once for each distinct value
+    numeric = pd.to_numeric(column, errors="coerce").notna()
+    checked = map_distinct(column[~numeric], check_numeric_value)
+    return numeric | checked.reindex(column.index, fill_value=False).astype(bool)
 
-def get_error_messages(row, agencies, countries):
-    error_messages = []
-    not_found_error = "does not exist in KMS"
 
-    agency_name = AGENCY_NAME_MAPPING.get((row["Agency"]), row["Agency"])
-    agency = agencies.get(strip_str(agency_name))
-    country_name = COUNTRY_NAME_MAPPING.get(row["Country"], row["Country"])
-    country = countries.get(strip_str(country_name))
+def map_distinct(column, func):
+    """
+    Call a function once for each distinct value of a column
 
-    if not agency:
-        error_messages.append(f"Agency '{row['Agency']}' {not_found_error}")
+    @param column: Series
+    @param func: function of one value
 
-    if not country:
-        error_messages.append(f"Country '{row['Country']}' {not_found_error}")
+    @return: Series of the results (object dtype), aligned with the column
+    """
+    codes, uniques = pd.factorize(column)
+    results = np.empty(len(uniques), dtype=object)
+    for index, value in enumerate(uniques):
+        results[index] = func(value)
+    return pd.Series(results[codes], index=column.index, dtype=object)
 
-    return agency, country, error_messages
 
+def lookup(names, objs_dict):
+    """
+    @param names: Series of normalised names
+    @param objs_dict: dict of normalised name: object
 
-def check_cluster_type_sector_mapping(
-    cluster, project_type, sector, types_mapping, sector_mapping, warning_messages
-):
-    if not cluster or not project_type:
-        return
-    entry_exists = types_mapping.get((cluster.id, project_type.id))
-    if not entry_exists and "other" not in project_type.name.lower():
-        warning_messages.append(
-            f"Project type '{project_type.name}' is not linked to the cluster "
-            f"'{cluster.name}'"
-        )
+    @return: Series of the objects, None for the names that are not found
+    """
+    objs = names.map(objs_dict).astype(object)
+    return objs.where(objs.notna(), None)
 
-    if not sector:
-        return
-    entry_exists = sector_mapping.get((cluster.id, project_type.id, sector.id))
-    if not entry_exists and "other" not in sector.name.lower():
-        warning_messages.append(
-            f"Sector '{sector.name}' is not linked to the project type "
-            f"'{project_type.name}' in cluster '{cluster.name}'"
-        )
 
+def get_attr(objs, attr, default=None):
+    return pd.Series(
+        [default if obj is None else getattr(obj, attr) for obj in objs],
+        index=objs.index,
+        dtype=object,
+    )
 
-def get_object(row, field_name, objs_dict, warning_messages):
-    if not row[field_name]:
-        return None
 
-    ret_obj = objs_dict.get(strip_str(row[field_name]))
-    if ret_obj:
-        return ret_obj
+def add_messages(messages, mask, message):
+    """
+    Collect the messages of one check for all the rows
+
+    @param messages: list of DataFrame (row, message), one for each check
+    @param mask: boolean Series of the rows the check failed for
+    @param message: str or Series of str (aligned with the mask)
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if isinstance(message, pd.Series):
+        message = message.to_numpy()[mask]
+    messages.append(pd.DataFrame({"row": np.flatnonzero(mask), "message": message}))
+
+
+def get_row_messages(messages, activity_ids, message_type):
+    """
+    @param messages: list of DataFrame (row, message), one for each check
+    @param activity_ids: Series of the `Activity ID` column
+    @param message_type: "error" or "warning"
+
+    @return: list of message dicts, ordered by row and then by check
+    """
+    if not messages:
+        return []
+    frame = pd.concat(messages, ignore_index=True).sort_values("row", kind="stable")
+    activity_ids = activity_ids.tolist()
+    return [
+        {
+            f"{message_type}_type": f"data {message_type}",
+            "row_number": row + 2,
+            "activity_id": activity_ids[row],
+            f"{message_type}_message": message,
+        }
+        for row, message in zip(frame["row"].tolist(), frame["message"].tolist())
+    ]
+
 
-    ret_obj = objs_dict.get("other")
-    warning_messages.append(
-        f"{field_name} '{row[field_name]}' does not exist "
-        f"in KMS and will be set to 'Other'"
+def check_year_values(df, column_prefix, value_type, year, is_after, warnings):
+    # if these values are not numbers we will set them to be '0'
+    suffix = f"after {year}" if is_after else str(year)
+    values = df[f"{column_prefix} {suffix}"]
+    numeric = is_numeric(values)
+    add_messages(
+        warnings,
+        ~numeric,
+        f"Value {value_type} for year {year} (After: {is_after}) "
+        f"is not a number and we will set it to be '0'",
+    )
+    return values.where(numeric, 0).tolist()
+
+
+def get_objects(df, field_name, objs_dict, warnings):
+    """
+    Get the objects by name; the names that are not found are set to 'Other'
+    and blank names to None
+    """
+    objs = lookup(normalise(df[field_name]), objs_dict)
+    not_found = df[field_name].ne("") & objs.isna()
+    objs = objs.where(~not_found, objs_dict.get("other"))
+    add_messages(
+        warnings,
+        not_found,
+        f"{field_name} '"
+        + df[field_name]
+        + "' does not exist in KMS and will be set to 'Other'",
     )
+    return objs
 
-    return ret_obj
 
+def get_subsectors(df, sectors, subsectors, subsectors_links, warnings):
+    names = normalise(df["Subsector"])
+    links = pd.DataFrame(
+        [(sector, name, obj) for (sector, name), obj in subsectors_links.items()],
+        columns=["sector", "name", "subsector"],
+    )
+    linked = (
+        pd.DataFrame({"sector": get_attr(sectors, "name"), "name": names})
+        .merge(links, how="left", on=["sector", "name"])["subsector"]
+        .set_axis(df.index)
+    )
 
-def get_subsector(row, sector, subsectors, subsectors_links, warning_messages):
-    if not row["Subsector"] or not sector:
-        return None
+    parsed = df["Subsector"].ne("") & sectors.notna()
+    not_found = parsed & ~names.isin(subsectors)
+    not_linked = parsed & ~not_found & linked.isna()
+    add_messages(
+        warnings,
+        not_found,
+        "Subsector '"
+        + df["Subsector"]
+        + "' does not exist in KMS and will be set to 'Other'",
+    )
+    add_messages(
+        warnings,
+        not_linked,
+        "Subsector '"
+        + df["Subsector"]
+        + "' is not linked to the sector and we will set it to be 'Other'",
+    )
 
-    subsector_other_name = "other"
-    subsector_other = subsectors_links.get(("Other", subsector_other_name))
+    objs = linked.astype(object).where(parsed & ~not_found & ~not_linked, None)
+    return objs.where(
+        ~(not_found | not_linked), subsectors_links.get(("Other", "other"))
+    )
 
-    if not strip_str(row["Subsector"]) in subsectors:
-        warning_messages.append(
-            f"Subsector '{row['Subsector']}' does not exist in KMS "
-            f"and will be set to 'Other'"
-        )
-        return subsector_other
 
-    subsector = subsectors_links.get((sector.name, strip_str(row["Subsector"])))
-    if not subsector:
-        warning_messages.append(
-            f"Subsector '{row['Subsector']}' is not linked to the sector "
-            f"and we will set it to be 'Other'"
-        )
-        return subsector_other
-
-    return subsector
-
-
-def get_bp_activity_data(
-    row,
-    year_start,
-    agency,
-    country,
-    project_type,
-    bp_chemical_type,
-    project_cluster,
-    sector,
-    subsector,
-    substances,
-    warning_messages,
+def check_cluster_type_sector_mapping(
+    clusters, project_types, sectors, types_mapping, sector_mapping, warnings
 ):
-    # set warning messages
-    if sector and sector.code in PROJECT_SECTOR_TYPE_MAPPING:
-        if project_type.code not in PROJECT_SECTOR_TYPE_MAPPING[sector.code]:
-            warning_messages.append("Type is not linked to the sector")
-
-    substance_ids = [substance.id for substance in substances]
-    for substance in substances:
-        if substance.name == "Other substances":
-            warning_messages.append(
-                "Some substances do not exist in KMS and will be set to 'Other'"
-            )
-            break
-
-    project_status = row["Project Status (A/P)"].strip()
-    if project_status and project_status not in BPActivity.Status.values:
-        warning_messages.append(
-            f"Project Status '{project_status}' does not exist in KMS "
-            f"and will be set to 'Undefined'"
-        )
-        project_status = BPActivity.Status.undefined
+    cluster_ids = get_attr(clusters, "id", 0)
+    type_ids = get_attr(project_types, "id", 0)
+    sector_ids = get_attr(sectors, "id", 0)
+    cluster_names = get_attr(clusters, "name", "")
+    type_names = get_attr(project_types, "name", "")
+    sector_names = get_attr(sectors, "name", "")
+
+    checked = clusters.notna() & project_types.notna()
+    type_linked = pd.MultiIndex.from_arrays([cluster_ids, type_ids]).isin(
+        list(types_mapping)
+    )
+    add_messages(
+        warnings,
+        checked
+        & ~type_linked
+        & ~type_names.str.lower().str.contains("other", regex=False),
+        "Project type '"
+        + type_names
+        + "' is not linked to the cluster '"
+        + cluster_names
+        + "'",
+    )
 
-    country_status = row["Status"].strip()
-    if country_status and country_status not in BPActivity.LVCStatus.values:
-        warning_messages.append(
-            f"Status '{country_status}' does not exist in KMS "
-            f"and will be set to 'Undefined'"
-        )
-        country_status = BPActivity.LVCStatus.undefined
+    sector_linked = pd.MultiIndex.from_arrays([cluster_ids, type_ids, sector_ids]).isin(
+        list(sector_mapping)
+    )
+    add_messages(
+        warnings,
+        checked
+        & sectors.notna()
+        & ~sector_linked
+        & ~sector_names.str.lower().str.contains("other", regex=False),
+        "Sector '"
+        + sector_names
+        + "' is not linked to the project type '"
+        + type_names
+        + "' in cluster '"
+        + cluster_names
+        + "'",
+    )
 
-    amount_polyol = row["Amount of Polyol in Project (MT)"]
-    if not check_numeric_value(amount_polyol):
-        amount_polyol = 0
-        warning_messages.append(
-            "Amount of Polyol is not a number and we will set it to be '0'"
-        )
+    # the project types available for some sectors
+    sector_codes = get_attr(sectors, "code", "")
+    type_allowed = pd.MultiIndex.from_arrays(
+        [sector_codes, get_attr(project_types, "code", "")]
+    ).isin(
+        [
+            (sector_code, type_code)
+            for sector_code, type_codes in PROJECT_SECTOR_TYPE_MAPPING.items()
+            for type_code in type_codes
+        ]
+    )
+    add_messages(
+        warnings,
+        sector_codes.isin(PROJECT_SECTOR_TYPE_MAPPING) & ~type_allowed,
+        "Type is not linked to the sector",
+    )
 
-    # get `initial_id` from `Activity ID` column
-    activity_id = row["Activity ID"].rsplit("-", 1)
-    initial_id = activity_id[1].lstrip("0") if len(activity_id) > 1 else None
-
-    activity_data = {
-        "initial_id": initial_id if initial_id else None,
-        "title": row["Title"],
-        "agency_id": agency.id if agency else None,
-        "country_id": country.id if country else None,
-        "lvc_status": country_status,
-        "project_type_id": project_type.id if project_type else None,
-        "project_type_code": project_type.code if project_type else "",
-        "bp_chemical_type_id": bp_chemical_type.id if bp_chemical_type else None,
-        "project_cluster_id": project_cluster.id if project_cluster else None,
-        "substances": list(dict.fromkeys(substance_ids)),  # remove duplicates
-        "amount_polyol": amount_polyol,
-        "sector_id": sector.id if sector else None,
-        "sector_code": sector.code if sector else "",
-        "subsector_id": subsector.id if subsector else None,
-        "required_by_model": row["Required by Model"],
-        "status": project_status,
-        "is_multi_year": bool(strip_str(row["Project Category (I/M)"]) == "m"),
-        "remarks": row["Remarks"],
-        "values": [],
-    }
-    for year in range(year_start, year_start + 4):
-        if year == year_start + 3:
-            year_value = year - 1
-            is_after = True
-            value_usd = row[f"Value (US $) after {year_value}"]
-            value_odp = row[f"ODP after {year_value}"]
-            value_mt = row[f"MT for HFC after {year_value}"]
-            value_co2 = row[f"CO₂-eq after {year_value}"]
-        else:
-            year_value = year
-            is_after = False
-            value_usd = row[f"Value (US $) {year_value}"]
-            value_odp = row[f"ODP {year_value}"]
-            value_mt = row[f"MT for HFC {year_value}"]
-            value_co2 = row[f"CO₂-eq {year_value}"]
-        # if these values are not numbers we will set them to be '0'
-
-        value_usd = check_year_values(
-            "usd", value_usd, year_value, is_after, warning_messages
-        )
-        value_odp = check_year_values(
-            "odp", value_odp, year_value, is_after, warning_messages
-        )
-        value_mt = check_year_values(
-            "mt", value_mt, year_value, is_after, warning_messages
-        )
-        value_co2 = check_year_values(
-            "CO₂", value_co2, year_value, is_after, warning_messages
-        )
 
-        activity_data["values"].append(
-            {
-                "year": year_value,
-                "is_after": is_after,
-                "value_usd": value_usd,
-                "value_odp": value_odp,
-                "value_mt": value_mt,
-                "value_co2": value_co2,
-            }
+def get_substances(df, substance_dict, warnings):
+    def _get_substance_ids(chemical_detail):
+        substances = [
+            substance_dict.get(strip_str(name), substance_dict.get("other substances"))
+            for name in (chemical_detail.split("/") if chemical_detail else [])
+        ]
+        substance_ids = [substance.id for substance in substances]
+        has_other = any(
+            substance.name == "Other substances" for substance in substances
         )
-
-    return activity_data
+        # remove duplicates
+        return list(dict.fromkeys(substance_ids)), has_other
+
+    substances = map_distinct(df["Chemical Detail"], _get_substance_ids)
+    add_messages(
+        warnings,
+        [has_other for _, has_other in substances],
+        "Some substances do not exist in KMS and will be set to 'Other'",
+    )
+    # every activity gets its own list
+    return [list(substance_ids) for substance_ids, _ in substances]
+
+
+def get_statuses(df, column, field_name, choices, warnings):
+    statuses = df[column].str.strip()
+    not_found = statuses.ne("") & ~statuses.isin(choices.values)
+    add_messages(
+        warnings,
+        not_found,
+        f"{field_name} '"
+        + statuses
+        + "' does not exist in KMS and will be set to 'Undefined'",
+    )
+    return statuses.where(~not_found, choices.undefined)
 
 
 def parse_bp_file(file, year_start, from_validate=False):
@@ -362,80 +409,138 @@ def parse_bp_file(file, year_start, from_validate=False):
         )
     }
 
-    activities = []
-    errors = []
-    warnings = []
-    for index, row in df.iterrows():
-        # parse every row in Excel, get objects by their name
-        # get error messages
-        agency, country, error_messages = get_error_messages(row, agencies, countries)
-        for error_message in error_messages:
-            if not from_validate:
-                # raise when first error is found and stop parsing entire file
-                raise ValidationError("Data error")
-            errors.append(
-                {
-                    "error_type": "data error",
-                    "row_number": index + 2,
-                    "activity_id": row["Activity ID"],
-                    "error_message": error_message,
-                }
-            )
+    if df.empty:
+        # an empty sheet is not checked against the template
+        return [], [], []
+    activity_ids = df["Activity ID"]
 
-        # get 'Other' if value is not found in db, set `None` if field is blank
-        warning_messages = []
-        project_type = get_object(row, "Type", project_types, warning_messages)
-        bp_chemical_type = get_object(
-            row, "Chemical", bp_chemical_types, warning_messages
-        )
-        project_cluster = get_object(row, "Cluster", project_clusters, warning_messages)
-        sector = get_object(row, "Sector", sectors, warning_messages)
-        subsector = get_subsector(
-            row, sector, subsectors, subsectors_links, warning_messages
-        )
+    # the whole file is parsed column by column; the messages of each check
+    # are collected for all the rows and then listed by row
+    agency_names = map_distinct(
+        df["Agency"], lambda name: AGENCY_NAME_MAPPING.get(name, name)
+    )
+    country_names = map_distinct(
+        df["Country"], lambda name: COUNTRY_NAME_MAPPING.get(name, name)
+    )
+    agency_objs = lookup(normalise(agency_names), agencies)
+    country_objs = lookup(normalise(country_names), countries)
 
-        substance_names = (
-            row["Chemical Detail"].split("/") if row["Chemical Detail"] else []
-        )
-        substances = [
-            substance_dict.get(strip_str(name), substance_dict.get("other substances"))
-            for name in substance_names
-        ]
+    errors = []
+    not_found_error = "does not exist in KMS"
+    add_messages(
+        errors,
+        agency_objs.isna(),
+        "Agency '" + df["Agency"] + f"' {not_found_error}",
+    )
+    add_messages(
+        errors,
+        country_objs.isna(),
+        "Country '" + df["Country"] + f"' {not_found_error}",
+    )
+    errors = get_row_messages(errors, activity_ids, "error")
+    if errors and not from_validate:
+        # stop parsing the entire file
+        raise ValidationError("Data error")
 
-        check_cluster_type_sector_mapping(
-            project_cluster,
-            project_type,
-            sector,
-            types_mapping,
-            sector_mapping,
-            warning_messages,
-        )
+    # get 'Other' if value is not found in db, set `None` if field is blank
+    warnings = []
+    project_type_objs = get_objects(df, "Type", project_types, warnings)
+    bp_chemical_type_objs = get_objects(df, "Chemical", bp_chemical_types, warnings)
+    project_cluster_objs = get_objects(df, "Cluster", project_clusters, warnings)
+    sector_objs = get_objects(df, "Sector", sectors, warnings)
+    subsector_objs = get_subsectors(
+        df, sector_objs, subsectors, subsectors_links, warnings
+    )
+    check_cluster_type_sector_mapping(
+        project_cluster_objs,
+        project_type_objs,
+        sector_objs,
+        types_mapping,
+        sector_mapping,
+        warnings,
+    )
+    substance_ids = get_substances(df, substance_dict, warnings)
+    project_statuses = get_statuses(
+        df, "Project Status (A/P)", "Project Status", BPActivity.Status, warnings
+    )
+    country_statuses = get_statuses(
+        df, "Status", "Status", BPActivity.LVCStatus, warnings
+    )
 
-        # return activity data in serializer format (with object IDs instead of names)
-        activity_data = get_bp_activity_data(
-            row,
-            year_start,
-            agency,
-            country,
-            project_type,
-            bp_chemical_type,
-            project_cluster,
-            sector,
-            subsector,
-            substances,
-            warning_messages,
-        )
-        activities.append(activity_data)
+    polyol_is_numeric = is_numeric(df["Amount of Polyol in Project (MT)"])
+    add_messages(
+        warnings,
+        ~polyol_is_numeric,
+        "Amount of Polyol is not a number and we will set it to be '0'",
+    )
 
-        for warning_message in warning_messages:
-            warnings.append(
+    # the last year is followed by the values after it
+    years = [(year, False) for year in range(year_start, year_start + 3)]
+    years.append((year_start + 2, True))
+    year_values = []
+    for year, is_after in years:
+        year_values.append(
+            (
+                year,
+                is_after,
                 {
-                    "warning_type": "data warning",
-                    "row_number": index + 2,
-                    "activity_id": row["Activity ID"],
-                    "warning_message": warning_message,
-                }
+                    key: check_year_values(
+                        df, column_prefix, value_type, year, is_after, warnings
+                    )
+                    for key, column_prefix, value_type in (
+                        ("value_usd", "Value (US $)", "usd"),
+                        ("value_odp", "ODP", "odp"),
+                        ("value_mt", "MT for HFC", "mt"),
+                        ("value_co2", "CO₂-eq", "CO₂"),
+                    )
+                },
             )
+        )
+
+    # get `initial_id` from `Activity ID` column
+    activity_id_parts = activity_ids.str.rpartition("-")
+    initial_ids = activity_id_parts[2].str.lstrip("0")
+    initial_ids = initial_ids.where(
+        activity_id_parts[1].ne("") & initial_ids.ne(""), None
+    )
+
+    # return activity data in serializer format (with object IDs instead of names)
+    columns = {
+        "initial_id": initial_ids,
+        "title": df["Title"],
+        "agency_id": get_attr(agency_objs, "id"),
+        "country_id": get_attr(country_objs, "id"),
+        "lvc_status": country_statuses,
+        "project_type_id": get_attr(project_type_objs, "id"),
+        "project_type_code": get_attr(project_type_objs, "code", ""),
+        "bp_chemical_type_id": get_attr(bp_chemical_type_objs, "id"),
+        "project_cluster_id": get_attr(project_cluster_objs, "id"),
+        "substances": pd.Series(substance_ids, index=df.index, dtype=object),
+        "amount_polyol": df["Amount of Polyol in Project (MT)"].where(
+            polyol_is_numeric, 0
+        ),
+        "sector_id": get_attr(sector_objs, "id"),
+        "sector_code": get_attr(sector_objs, "code", ""),
+        "subsector_id": get_attr(subsector_objs, "id"),
+        "required_by_model": df["Required by Model"],
+        "status": project_statuses,
+        "is_multi_year": normalise(df["Project Category (I/M)"]).eq("m"),
+        "remarks": df["Remarks"],
+    }
+    activities = [
+        dict(zip(columns, row_values))
+        for row_values in zip(*(column.tolist() for column in columns.values()))
+    ]
+    for row, activity in enumerate(activities):
+        activity["values"] = [
+            {
+                "year": year,
+                "is_after": is_after,
+                **{key: values[row] for key, values in year_value_columns.items()},
+            }
+            for year, is_after, year_value_columns in year_values
+        ]
+    warnings = get_row_messages(warnings, activity_ids, "warning")
     activities_ids = [
         activity["initial_id"] for activity in activities if activity["initial_id"]
     ]
@@ -25,6 +25,7 @@ from core.models.group import Group
 from core.models.project import Project
 from core.models.substance import Substance
 from core.models.usage import ExcludedUsage
+from core.reference_data import get_chemical_resolver
 
 
 class ChemicalBaseListView(mixins.ListModelMixin, generics.GenericAPIView):
@@ -491,8 +492,9 @@ class BlendCreateView(generics.CreateAPIView):
 
         @return: Blend object or None
         """
+        chemical_resolver = get_chemical_resolver()
         if data.get("other_names", None):
-            blend = Blend.objects.find_by_name(name=data["other_names"])
+            blend = chemical_resolver.find_blend_by_name(data["other_names"])
             if blend:
                 return blend
 
@@ -500,11 +502,7 @@ class BlendCreateView(generics.CreateAPIView):
             (vals["substance_id"], vals["percentage"] / 100)
             for vals in data["components"]
         ]
-        blend = BlendComponents.objects.get_blend_by_components(blend_cmp)
-        if blend:
-            return blend
-
-        return None
+        return chemical_resolver.get_blend_by_components(blend_cmp)
 
     @extend_schema(
         request=inline_serializer(
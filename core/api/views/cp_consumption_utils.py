@@ -0,0 +1,111 @@
+import pandas as pd
+
+from core import reference_data
+from core.models.usage import Usage
+
+RECORD_CONSUMPTION_COLUMNS = [
+    "sectorial_total",
+    "usages_total",
+    "servicing",
+    "consumption",
+    "odp",
+    "gwp",
+]
+
+
+def _is_methyl_bromide(record):
+    return bool(record.substance) and "methyl bromide" in record.substance.name.lower()
+
+
+def get_records_consumption_frame(records, sections_with_consumption=None):
+    """
+    Compute the sectorial total, consumption, ODP and GWP of a set of records
+    in one pass (see `AbstractCPRecord.get_sectorial_total` and
+    `AbstractCPRecord.get_consumption_value` for the per record rules)
+
+    The record usages are read from the `record_usages` prefetch cache, so the
+    records should be fetched with `prefetch_related("record_usages")`.
+    Records without an id (0 value records added for the displayed chemicals)
+    have no usages.
+
+    @param records: list of CPRecord / CPRecordArchive objects
+    @param sections_with_consumption: set of sections for which the consumption
+        is computed from imports, exports and production; for the other
+        sections it is the sectorial total. All sections if not provided.
+
+    @return: pandas DataFrame with one row per record, in the same order, and
+        the columns in RECORD_CONSUMPTION_COLUMNS; values are Decimal or 0
+    """
+    usage_names = {
+        usage.id: usage.full_name.lower() for usage in reference_data.get_usages()
+    }
+
+    record_rows = []
+    usage_rows = []
+    for index, record in enumerate(records):
+        chemical = record.substance or record.blend
+        record_rows.append(
+            (
+                record.section,
+                _is_methyl_bromide(record),
+                (record.imports or 0)
+                - (record.exports or 0)
+                + (record.production or 0),
+                chemical.odp or 0,
+                chemical.gwp or 0,
+            )
+        )
+        if not record.id:
+            continue
+        for record_usage in record.record_usages.all():
+            usage_rows.append((index, record_usage.usage_id, record_usage.quantity))
+
+    # usages created since the cache was built (e.g. by another process that
+    # could not reach the shared cache)
+    missing_usage_ids = {usage_id for _, usage_id, _ in usage_rows} - set(usage_names)
+    if missing_usage_ids:
+        reference_data.invalidate_model("core.Usage")
+        usage_names.update(
+            (usage_id, full_name.lower())
+            for usage_id, full_name in Usage.objects.filter(
+                id__in=missing_usage_ids
+            ).values_list("id", "full_name")
+        )
+    usage_rows = [
+        (index, usage_names[usage_id], quantity)
+        for index, usage_id, quantity in usage_rows
+    ]
+
+    frame = pd.DataFrame(
+        record_rows,
+        columns=["section", "is_methyl_bromide", "trade_total", "odp", "gwp"],
+    )
+    usages = pd.DataFrame(usage_rows, columns=["record", "usage_name", "quantity"])
+
+    def sum_usages(mask=None):
+        selected = usages if mask is None else usages[mask]
+        return (
+            selected.groupby("record")["quantity"]
+            .sum()
+            .reindex(frame.index, fill_value=0)
+        )
+
+    frame["usages_total"] = sum_usages()
+    frame["servicing"] = sum_usages(
+        usages["usage_name"].str.contains("servicing", regex=False)
+    )
+    # For Methyl Bromide the sectorial total only contains the non-QPS usages
+    frame["sectorial_total"] = sum_usages(
+        usages["usage_name"].str.contains("non-qps", regex=False)
+    ).where(frame["is_methyl_bromide"], frame["usages_total"])
+
+    use_sectorial_total = frame["is_methyl_bromide"]
+    if sections_with_consumption is not None:
+        use_sectorial_total = use_sectorial_total | ~frame["section"].isin(
+            sections_with_consumption
+        )
+    frame["consumption"] = frame["sectorial_total"].where(
+        use_sectorial_total, frame["trade_total"]
+    )
+
+    return frame[RECORD_CONSUMPTION_COLUMNS]
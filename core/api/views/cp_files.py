@@ -3,6 +3,7 @@ import urllib
 
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, mixins, status
 from rest_framework.response import Response
 
@@ -13,9 +14,22 @@ from core.api.permissions import (
     DenyAll,
 )
 from core.api.serializers.cp_file import CPFileSerializer
+from core.api.zip_stream import zip_file_response
+from core.models.country import Country
 from core.models.country_programme import CPFile
 
 
+def check_country_user(request):
+    user = request.user
+    country_id = request.query_params.get("country_id")
+    country_id = int(country_id) if country_id else None
+    if (
+        user.has_perm("core.can_view_only_own_country")
+        and not user.has_perm("core.can_view_all_countries")
+    ) and user.country_id != country_id:
+        raise PermissionDenied("User represents other country")
+
+
 class CPFilesView(
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
@@ -57,14 +71,7 @@ class CPFilesView(
         return [DenyAll]
 
     def _check_country_user(self):
-        user = self.request.user
-        country_id = self.request.query_params.get("country_id")
-        country_id = int(country_id) if country_id else None
-        if (
-            user.has_perm("core.can_view_only_own_country")
-            and not user.has_perm("core.can_view_all_countries")
-        ) and user.country_id != country_id:
-            raise PermissionDenied("User represents other country")
+        check_country_user(self.request)
 
     def get(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
@@ -142,3 +149,23 @@ class CPFilesDownloadView(generics.RetrieveAPIView):
             f"attachment; filename*=UTF-8''{file_name}; filename=\"{file_name}\""
         )
         return response
+
+
+class CPFilesDownloadAllView(generics.GenericAPIView):
+    """
+    Download all the files of a country programme (country and year)
+    as a ZIP archive
+    """
+
+    permission_classes = [HasCPReportViewPermission]
+    queryset = CPFile.objects.select_related("country").order_by("id")
+    filterset_class = CPFileFilter
+
+    def get(self, request, *args, **kwargs):
+        check_country_user(request)
+        files = self.filter_queryset(self.get_queryset())
+        country = get_object_or_404(Country, id=request.query_params["country_id"])
+        return zip_file_response(
+            f"CP_{country.iso3 or country.id}_{request.query_params['year']}_Files.zip",
+            ((obj.filename, obj.file) for obj in files.iterator()),
+        )
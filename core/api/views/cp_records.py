@@ -1,5 +1,5 @@
 from collections import defaultdict
-from django.db.models import Q
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.types import OpenApiTypes
@@ -10,10 +10,12 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
 from core.api.filters.country_programme import DashboardsCPRecordFilter
+from core.api.pagination import KeysetPagination
 from core.api.serializers.adm import (
     AdmRecordSerializer,
 )
 from core.api.permissions import HasCPReportViewPermission
+from core.api.utils import EqualsAny
 from core.api.serializers.cp_comment import CPCommentSerializer
 from core.api.serializers.cp_emission import CPEmissionSerializer
 from core.api.serializers.cp_generation import CPGenerationSerializer
@@ -49,8 +51,7 @@ from core.models.country_programme_archive import (
     CPRecordArchive,
     CPReportArchive,
 )
-from core.models.group import Group
-from core.models.usage import Usage
+from core.reference_data import get_group, get_usages
 from core.utils import IMPORT_DB_MAX_YEAR, IMPORT_DB_OLDEST_MAX_YEAR
 
 # pylint: disable=E1102
@@ -474,9 +475,72 @@ class CPRecordListDiffView(CPRecordListByReportView):
         )
 
 
+def get_cp_dashboards_reference_data():
+    """
+    Get the usages, country regions and Annex F group used by the CP
+    dashboards (cached, see core.reference_data)
+
+    @return: dict with the usages_dict, country_region_dict and annex_f keys
+    """
+    return {
+        "usages_dict": {
+            usage.id: {"name": usage.full_name, "quantity": 0} for usage in get_usages()
+        },
+        "country_region_dict": get_country_region_dict(),
+        "annex_f": get_group("F"),
+    }
+
+
+def get_existing_usages_dict(records):
+    """
+    Get the usages of the given records with one query, whatever the number of
+    records: the record ids are sent as two arrays (current and archived
+    records) instead of one condition per record.
+
+    @param records: list of AllCPRecordsView objects
+
+    @return: dict {(record_id, is_archive): {usage_id: quantity}}
+    """
+    record_ids = {False: [], True: []}
+    for record in records:
+        record_ids[record.is_archive].append(record.id)
+
+    filters = Q()
+    for is_archive, ids in record_ids.items():
+        if ids:
+            filters |= Q(
+                EqualsAny(F("country_programme_record_id"), ids),
+                is_archive=is_archive,
+            )
+    if not filters:
+        return {}
+
+    usages_dict = defaultdict(dict)
+    for record_id, is_archive, usage_id, quantity in AllCPUsagesView.objects.filter(
+        filters
+    ).values_list("country_programme_record_id", "is_archive", "usage_id", "quantity"):
+        usages_dict[(record_id, is_archive)][usage_id] = quantity
+    return usages_dict
+
+
+def to_columnar(data):
+    """
+    Convert a list of serialized objects to a dict of columns:
+        [{"a": 1, "b": 2}, {"a": 3, "b": 4}] -> {"a": [1, 3], "b": [2, 4]}
+
+    @param data: list of dicts with the same keys
+    @return: dict
+    """
+    if not data:
+        return {}
+    return {key: [item[key] for item in data] for key in data[0]}
+
+
 class DashboardsCPRecordView(generics.ListAPIView):
     """
     API endpoint that allows country programme records to be viewed.
+
+    Pass `response_format=columnar` to get the results as a dict of columns.
     """
 
     filter_backends = [DjangoFilterBackend]
@@ -494,58 +558,61 @@ class DashboardsCPRecordView(generics.ListAPIView):
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
-        usages = Usage.objects.all()
-        usages_dict = {}
-        for usage in usages:
-            usages_dict[usage.id] = {"name": usage.full_name, "quantity": 0}
-        ctx["usages_dict"] = usages_dict
-        ctx["country_region_dict"] = get_country_region_dict()
-        ctx["annex_f"] = Group.objects.get(name="F")
+        ctx.update(get_cp_dashboards_reference_data())
         return ctx
 
-    def get_context_with_existing_usages(self, records_qs):
+    def get_context_with_existing_usages(self, records):
         """
         Get the serializer context with the existing usages for the records
         In other words, add the existing usages to the serializer context
 
-        :param records_qs: the queryset of the records
+        :param records: list of the records
 
         """
-        # create filters list in order to get all usages for the records
-        records_pairs = records_qs.values_list("id", "is_archive")
-        filters = Q()
-        for record_id, is_archive in records_pairs:
-            filters |= Q(country_programme_record_id=record_id, is_archive=is_archive)
-
-        # get all usages for the records
-        usages = AllCPUsagesView.objects.filter(filters)
-
-        # create a dictionary with the usages for each record
-        usages_dict = defaultdict(list)
-        for usage in usages:
-            usages_dict[(usage.country_programme_record_id, usage.is_archive)].append(
-                usage
-            )
-
-        # create the serializer context
         serializer_context = self.get_serializer_context()
-        serializer_context["existing_usages_dict"] = usages_dict
+        serializer_context["existing_usages_dict"] = get_existing_usages_dict(records)
 
         return serializer_context
 
+    def get_serialized_data(self, records):
+        serializer = self.get_serializer(
+            records,
+            many=True,
+            context=self.get_context_with_existing_usages(records),
+        )
+        if self.request.query_params.get("response_format") == "columnar":
+            return to_columnar(serializer.data)
+        return serializer.data
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="response_format",
+                location=OpenApiParameter.QUERY,
+                description="Set to `columnar` to get a dict of columns",
+                type=OpenApiTypes.STR,
+            ),
+        ],
+    )
     def get(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
 
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer_context = self.get_context_with_existing_usages(page)
-            serializer = self.get_serializer(
-                page, many=True, context=serializer_context
-            )
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(self.get_serialized_data(page))
 
-        serializer_context = self.get_context_with_existing_usages(queryset)
-        serializer = self.get_serializer(
-            queryset, many=True, context=serializer_context
-        )
-        return Response(serializer.data)
+        return Response(self.get_serialized_data(list(queryset)))
+
+
+class DashboardsCPRecordKeysetPagination(KeysetPagination):
+    # (is_archive, id) is unique across the records view
+    ordering = ("-report_year", "country_name", "-report_version", "is_archive", "id")
+
+
+class DashboardsCPRecordKeysetView(DashboardsCPRecordView):
+    """
+    API endpoint that allows country programme records to be viewed,
+    paginated with a keyset cursor (see `KeysetPagination`).
+    """
+
+    pagination_class = DashboardsCPRecordKeysetPagination
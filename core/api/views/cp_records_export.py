@@ -30,12 +30,14 @@ from core.api.serializers import BlendSerializer
 from core.api.serializers import SubstanceSerializer
 from core.api.utils import workbook_pdf_response
 from core.api.utils import workbook_response
+from core.api.views.cp_consumption_utils import get_records_consumption_frame
 from core.api.views.cp_records import CPRecordListByReportView
 from core.api.views.cp_report_empty_form import EmptyFormView
 from core.api.views.utils import (
-    get_archive_reports_final_for_years,
+    get_archive_report_ids_final_for_years,
     get_final_records_for_years,
     get_year_params_from_request,
+    iter_consumption_facts_for_years,
 )
 from core.models import Blend
 from core.models import ExcludedUsage
@@ -47,7 +49,6 @@ from core.models.country_programme import (
     CPPrices,
     CPRecord,
     CPReportFormatColumn,
-    CPReportFormatRow,
     CPReport,
 )
 from core.models.country_programme_archive import (
@@ -57,10 +58,16 @@ from core.models.country_programme_archive import (
     CPRecordArchive,
     CPReportArchive,
 )
+from core.reference_data import get_cp_format_rows
 from core.utils import IMPORT_DB_MAX_YEAR
 
 # pylint: disable=C0302(too-many-lines)
 
+# number of rows fetched at once by the server-side cursors of the extraction export
+EXTRACTION_CHUNK_SIZE = 2000
+
+GROUP_HCFC_141B = "HCFC-141b in imported pre-blended polyol"
+
 EXCLUDE_FROM_CONSUMPTION = [
     "HBFC",
     "Other",
@@ -168,7 +175,7 @@ class CPEmptyExportView(CPRecordExportView):
         return CPReport(year=year, name=f"Empty Country Programme {year}")
 
     def get_data(self, cp_report, full_history=False):
-        displayed_chemicals = CPReportFormatRow.objects.get_for_year(cp_report.year)
+        displayed_chemicals = get_cp_format_rows(cp_report.year)
         substances_ids = [x.substance_id for x in displayed_chemicals if x.substance_id]
         blends_ids = [x.blend_id for x in displayed_chemicals if x.blend_id]
         substances = SubstanceSerializer(
@@ -281,6 +288,7 @@ class CPCalculatedAmountExportView(CPRecordListByReportView):
             .prefetch_related("record_usages")
             .all()
         )
+        consumption_frame = get_records_consumption_frame(records)
         # set all consumption to 0
         data = {
             group: {"sectorial_total": 0, "consumption": 0}
@@ -298,7 +306,7 @@ class CPCalculatedAmountExportView(CPRecordListByReportView):
         data = dict(sorted(data.items()))  # sort by key
 
         # calculate the consumption and sectorial total
-        for record in records:
+        for record, values in zip(records, consumption_frame.itertuples(index=False)):
             # set the substance category
             substance_category = get_record_chemical_category(record)
 
@@ -310,19 +318,15 @@ class CPCalculatedAmountExportView(CPRecordListByReportView):
             if substance_category in EXCLUDE_FROM_CONSUMPTION:
                 continue
 
-            # get the sectorial total
-            sectorial_total = record.get_sectorial_total()
-            consumption = record.get_consumption_value()
-
             # convert data
             if "HFC" in substance_category:
                 # convert consumption value to CO₂ equivalent
-                consumption *= record.get_chemical_gwp() or 0
-                sectorial_total *= record.get_chemical_gwp() or 0
+                consumption = values.consumption * values.gwp
+                sectorial_total = values.sectorial_total * values.gwp
             else:
                 # convert consumption value to ODP
-                consumption *= record.get_chemical_odp() or 0
-                sectorial_total *= record.get_chemical_odp() or 0
+                consumption = values.consumption * values.odp
+                sectorial_total = values.sectorial_total * values.odp
 
             data[substance_category]["sectorial_total"] += sectorial_total
             data[substance_category]["consumption"] += consumption
@@ -380,12 +384,7 @@ class CPHFCHCFCExportBaseView(views.APIView):
         final_list = get_final_records_for_years(
             year, year, filter_list, list_sort=False
         )
-        displayed_rows = (
-            CPReportFormatRow.objects.get_for_year(year)
-            .filter(*filter_list)
-            .select_related("substance__group", "blend")
-            .all()
-        )
+        displayed_rows = get_cp_format_rows(year, filter_list)
         existent_reports = (
             CPReport.objects.filter(year=year, status=CPReport.CPReportStatus.FINAL)
             .select_related("country")
@@ -564,179 +563,121 @@ class CPDataExtractionAllExport(views.APIView):
     def get(self, *args, **kwargs):
         min_year, max_year = get_year_params_from_request(self.request)
 
-        wb = openpyxl.Workbook()
-        archive_reports = get_archive_reports_final_for_years(min_year, max_year)
-        using_consumption_value_set = self.get_consumption_set(min_year, max_year)
+        # the archive reports are selected once and shared by all the sheets
+        archive_report_ids = get_archive_report_ids_final_for_years(min_year, max_year)
         existent_reports = self.get_existent_reports(min_year, max_year)
 
+        # CP Details, CPConsumption(ODP) and HFC-Consumption(MTvsCO₂)
+        # are computed in a single pass over the consumption facts
+        cp_details, cp_consumption, hfc_consumption = self.get_consumption_data(
+            min_year, max_year, existent_reports
+        )
+
+        wb = openpyxl.Workbook(write_only=True)
+
         # ODS Price
         exporter = CPPricesExtractionWriter(wb, min_year, max_year)
-        data = self.get_prices(min_year, max_year, archive_reports)
+        data = self.get_prices(min_year, max_year, archive_report_ids)
         exporter.write(data)
 
         # CP Details
         exporter = CPDetailsExtractionWriter(wb, min_year, max_year)
-        data = self.get_cp_details(
-            min_year, max_year, using_consumption_value_set, existent_reports
-        )
-        exporter.write(data)
+        exporter.write(cp_details)
 
         # CPConsumption(ODP)
         exporter = CPConsumptionODPWriter(wb, min_year, max_year)
-        data = self._get_cp_consumption_data(
-            min_year, max_year, using_consumption_value_set, existent_reports
-        )
-        exporter.write(data)
+        exporter.write(cp_consumption)
 
         # HFC-Consumption(MTvsCO₂)
         exporter = CPHFCConsumptionMTCO2Writer(wb, min_year, max_year)
-        data = self._get_hfc_consumption_data(
-            min_year, max_year, using_consumption_value_set, existent_reports
-        )
-        exporter.write(data)
+        exporter.write(hfc_consumption)
 
         # HFC-23Generation
         exporter = HFC23GenerationWriter(wb)
-        data = self._get_generations(min_year, max_year, archive_reports)
+        data = self._get_generations(min_year, max_year, archive_report_ids)
         exporter.write(data)
 
         # HFC23Emission
         exporter = HFC23EmissionWriter(wb)
-        data = self._get_emissions(min_year, max_year, archive_reports)
+        data = self._get_emissions(min_year, max_year, archive_report_ids)
         exporter.write(data)
 
         # MbrConsumption
         exporter = MbrConsumptionWriter(wb, min_year, max_year)
         data = self.get_mbr_consumption_data(
-            min_year, max_year, archive_reports, existent_reports
+            min_year, max_year, archive_report_ids, existent_reports
         )
         exporter.write(data)
 
-        # delete default sheet
-        del wb[wb.sheetnames[0]]
-
         return workbook_response("CP Data Extraction-All", wb)
 
     def get_existent_reports(self, min_year, max_year):
-        final_reports = (
-            CPReport.objects.filter(
-                year__gte=min_year,
-                year__lte=max_year,
-                status=CPReport.CPReportStatus.FINAL,
-            )
-            .select_related("country")
-            .all()
-        )
-        archive_reports = (
-            CPReportArchive.objects.filter(year__gte=min_year, year__lte=max_year)
-            .select_related("country")
-            .all()
-        )
+        final_reports = CPReport.objects.filter(
+            year__gte=min_year,
+            year__lte=max_year,
+            status=CPReport.CPReportStatus.FINAL,
+        ).values_list("country__name", "year")
+        archive_reports = CPReportArchive.objects.filter(
+            year__gte=min_year, year__lte=max_year
+        ).values_list("country__name", "year")
 
         existent_reports = {}
-        for report in list(final_reports) + list(archive_reports):
-            if report.country.name not in existent_reports:
-                existent_reports[report.country.name] = []
+        for country_name, year in itertools.chain(final_reports, archive_reports):
+            if country_name not in existent_reports:
+                existent_reports[country_name] = []
 
-            if report.year not in existent_reports[report.country.name]:
-                existent_reports[report.country.name].append(report.year)
+            if year not in existent_reports[country_name]:
+                existent_reports[country_name].append(year)
 
         return existent_reports
 
-    def get_consumption_set(self, min_year, max_year):
-        """
-        Get the set of country,year,section pairs for which
-            the consumption value should be calculated
-        For methyl bromide, the consumption value should be calculated using the sectorial total
-        """
-        records = get_final_records_for_years(min_year, max_year)
-        return {
-            (
-                record.country_programme_report.country.name,
-                record.country_programme_report.year,
-                record.section,
-            )
-            for record in records
-            if any([record.imports, record.exports, record.production])
-        }
-
     def get_mbr_consumption_data(
-        self, min_year, max_year, archive_reports, existent_reports
+        self, min_year, max_year, archive_report_ids, existent_reports
     ):
-        final_records = (
-            CPRecord.objects.get_for_years(min_year, max_year)
-            .filter(
-                country_programme_report__status=CPReport.CPReportStatus.FINAL,
-                substance__name__iexact="Methyl Bromide",
-            )
-            .annotate(
-                country_name=models.F("country_programme_report__country__name"),
-                year=models.F("country_programme_report__year"),
-                methyl_bromide_qps=models.Sum(
-                    "record_usages__quantity",
-                    filter=models.Q(record_usages__usage__name__iexact="QPS"),
-                    default=0,
-                ),
-                methyl_bromide_non_qps=models.Sum(
-                    "record_usages__quantity",
-                    filter=models.Q(record_usages__usage__name__iexact="Non-QPS"),
-                    default=0,
-                ),
-                total=models.F("methyl_bromide_qps")
-                + models.F("methyl_bromide_non_qps"),
-            )
-        ).values(
+        mbr_annotations = {
+            "country_name": models.F("country_programme_report__country__name"),
+            "year": models.F("country_programme_report__year"),
+            "methyl_bromide_qps": models.Sum(
+                "record_usages__quantity",
+                filter=models.Q(record_usages__usage__name__iexact="QPS"),
+                default=0,
+            ),
+            "methyl_bromide_non_qps": models.Sum(
+                "record_usages__quantity",
+                filter=models.Q(record_usages__usage__name__iexact="Non-QPS"),
+                default=0,
+            ),
+            "total": models.F("methyl_bromide_qps")
+            + models.F("methyl_bromide_non_qps"),
+        }
+        mbr_fields = (
             "country_name",
             "year",
             "methyl_bromide_qps",
             "methyl_bromide_non_qps",
             "total",
         )
+        final_records = (
+            CPRecord.objects.get_for_years(min_year, max_year)
+            .filter(
+                country_programme_report__status=CPReport.CPReportStatus.FINAL,
+                substance__name__iexact="Methyl Bromide",
+            )
+            .annotate(**mbr_annotations)
+        ).values(*mbr_fields)
 
-        if not archive_reports:
+        if not archive_report_ids:
             mbr_list = list(final_records)
         else:
             archive_records = (
                 CPRecordArchive.objects.get_for_years(min_year, max_year)
                 .filter(
                     country_programme_report__status=CPReport.CPReportStatus.FINAL,
+                    country_programme_report_id__in=archive_report_ids,
                     substance__name__iexact="Methyl Bromide",
                 )
-                .filter(
-                    # get the records for the max version of the archive reports
-                    *[
-                        models.Q(
-                            country_programme_report__country_id=c,
-                            country_programme_report__year=y,
-                            country_programme_report__version=v,
-                        )
-                        for c, y, v in archive_reports
-                    ],
-                    _connector=models.Q.OR,
-                )
-                .annotate(
-                    country_name=models.F("country_programme_report__country__name"),
-                    year=models.F("country_programme_report__year"),
-                    methyl_bromide_qps=models.Sum(
-                        "record_usages__quantity",
-                        filter=models.Q(record_usages__usage__name__iexact="QPS"),
-                        default=0,
-                    ),
-                    methyl_bromide_non_qps=models.Sum(
-                        "record_usages__quantity",
-                        filter=models.Q(record_usages__usage__name__iexact="Non-QPS"),
-                        default=0,
-                    ),
-                    total=models.F("methyl_bromide_qps")
-                    + models.F("methyl_bromide_non_qps"),
-                )
-            ).values(
-                "country_name",
-                "year",
-                "methyl_bromide_qps",
-                "methyl_bromide_non_qps",
-                "total",
-            )
+                .annotate(**mbr_annotations)
+            ).values(*mbr_fields)
 
             mbr_list = list(final_records) + list(archive_records)
 
@@ -767,7 +708,16 @@ class CPDataExtractionAllExport(views.APIView):
         mbr_data = dict(sorted(mbr_data.items(), key=lambda x: x[0]))
         return mbr_data.values()
 
-    def get_prices(self, min_year, max_year, archive_reports):
+    def get_prices(self, min_year, max_year, archive_report_ids):
+        has_price = models.Q(current_year_price__isnull=False) | models.Q(
+            previous_year_price__isnull=False
+        )
+        ordering = (
+            "country_programme_report__year",
+            "country_programme_report__country__name",
+            "substance__sort_order",
+            "blend__sort_order",
+        )
         final_prices = (
             CPPrices.objects.select_related(
                 "blend",
@@ -776,24 +726,16 @@ class CPDataExtractionAllExport(views.APIView):
             )
             .prefetch_related("blend__components")
             .filter(
+                has_price,
                 country_programme_report__status=CPReport.CPReportStatus.FINAL,
                 country_programme_report__year__gte=min_year,
                 country_programme_report__year__lte=max_year,
             )
-            .filter(
-                models.Q(current_year_price__isnull=False)
-                | models.Q(previous_year_price__isnull=False)
-            )
-            .order_by(
-                "country_programme_report__year",
-                "country_programme_report__country__name",
-                "substance__sort_order",
-                "blend__sort_order",
-            )
-            .all()
+            .order_by(*ordering)
+            .iterator(chunk_size=EXTRACTION_CHUNK_SIZE)
         )
 
-        if not archive_reports:
+        if not archive_report_ids:
             archive_prices = []
         else:
             archive_prices = (
@@ -804,32 +746,14 @@ class CPDataExtractionAllExport(views.APIView):
                 )
                 .prefetch_related("blend__components")
                 .filter(
-                    models.Q(current_year_price__isnull=False)
-                    | models.Q(previous_year_price__isnull=False)
-                )
-                .filter(
-                    # get the records for the max version of the archive reports
-                    *[
-                        models.Q(
-                            country_programme_report__country_id=c,
-                            country_programme_report__year=y,
-                            country_programme_report__version=v,
-                        )
-                        for c, y, v in archive_reports
-                    ],
-                    _connector=models.Q.OR,
+                    has_price,
+                    country_programme_report_id__in=archive_report_ids,
                 )
-                .order_by(
-                    "country_programme_report__year",
-                    "country_programme_report__country__name",
-                    "substance__sort_order",
-                    "blend__sort_order",
-                )
-                .all()
+                .order_by(*ordering)
+                .iterator(chunk_size=EXTRACTION_CHUNK_SIZE)
             )
         final_prices_dict = {}
-        all_prices = list(final_prices) + list(archive_prices)
-        for price in all_prices:
+        for price in itertools.chain(final_prices, archive_prices):
             key = (
                 price.country_programme_report.country.name,
                 price.get_chemical_display_name(),
@@ -855,15 +779,57 @@ class CPDataExtractionAllExport(views.APIView):
             )
         return dict(sorted(final_prices_dict.items(), key=lambda x: x[0]))
 
-    def get_cp_details(
-        self, min_year, max_year, using_consumption_value_set, existent_reports
-    ):
+    def get_consumption_data(self, min_year, max_year, existent_reports):
         """
-        Get CP details for the given year
-        @param min_year: int
-        @param max_year: int
-        @param using_consumption_value_set: set
-        @param existent_reports: dict
+        Get the CP details, CP consumption (ODP) and HFC consumption data
+        using a single pass over the consumption facts (sections A and B)
+
+        @return: tuple (cp_details, cp_consumption, hfc_consumption)
+            (see get_cp_details, _get_cp_consumption_data and
+            _get_hfc_consumption_data for the structure of each dict)
+        """
+        cp_details = {}
+        cp_consumption = {}
+        hfc_consumption = {}
+
+        facts = iter_consumption_facts_for_years(
+            min_year, max_year, ("A", "B"), chunk_size=EXTRACTION_CHUNK_SIZE
+        )
+        for fact in facts:
+            self.add_cp_details_record(cp_details, fact, existent_reports)
+            if fact.section == "A" and fact.substance:
+                self.add_cp_consumption_record(cp_consumption, fact, existent_reports)
+            if fact.section == "B":
+                self.add_hfc_consumption_record(hfc_consumption, fact, existent_reports)
+
+        return (
+            self.get_cp_details(cp_details),
+            self._get_cp_consumption_data(cp_consumption, existent_reports),
+            self._get_hfc_consumption_data(hfc_consumption),
+        )
+
+    def add_cp_details_record(self, cp_details, fact, existent_reports):
+        country_name = fact.country.name
+        key = (country_name, fact.get_chemical_display_name())
+
+        if key not in cp_details:
+            # initialize the row with default values
+            cp_details[key] = {
+                "substance_group": (
+                    fact.substance.group.group_id if fact.substance else "F"
+                ),
+                "substance_odp": fact.get_chemical_odp(),
+                "substance_gwp": fact.get_chemical_gwp(),
+            }
+            for data_year in existent_reports.get(country_name, []):
+                cp_details[key][f"record_value_{data_year}"] = 0
+
+        cp_details[key][f"record_value_{fact.year}"] = fact.consumption
+
+    def get_cp_details(self, cp_details):
+        """
+        Get CP details sorted by country and substance group
+        @param cp_details: dict
         @return: dict
         structure:
         {
@@ -877,38 +843,6 @@ class CPDataExtractionAllExport(views.APIView):
         }
 
         """
-        filters = [models.Q(section__in=("A", "B"))]
-        records = get_final_records_for_years(min_year, max_year, filters)
-        cp_details = {}
-
-        for record in records:
-            country_name = record.country_programme_report.country.name
-            year = record.country_programme_report.year
-            chemical_name = record.get_chemical_display_name()
-
-            # set consumption value
-            # If Import, Export and Production are not provided for any substance in this report
-            # it should be the TOTAL of Use by Sector
-            cons_value = record.get_consumption_value(
-                (country_name, year, record.section) in using_consumption_value_set
-            )
-
-            key = (country_name, chemical_name)
-
-            if key not in cp_details:
-                # initialize the row with default values
-                cp_details[key] = {
-                    "substance_group": (
-                        record.substance.group.group_id if record.substance else "F"
-                    ),
-                    "substance_odp": record.get_chemical_odp(),
-                    "substance_gwp": record.get_chemical_gwp(),
-                }
-                for data_year in existent_reports.get(country_name, []):
-                    cp_details[key][f"record_value_{data_year}"] = 0
-
-            cp_details[key][f"record_value_{year}"] = cons_value
-
         # sort by country and substance_group
         return dict(
             sorted(
@@ -917,13 +851,31 @@ class CPDataExtractionAllExport(views.APIView):
             )
         )
 
-    def _get_cp_consumption_data(
-        self, min_year, max_year, using_consumption_value_set, existent_reports
-    ):
+    def add_cp_consumption_record(self, country_records, fact, existent_reports):
+        # set the group
+        if fact.substance.name.lower() == GROUP_HCFC_141B.lower():
+            group = GROUP_HCFC_141B
+        else:
+            group = SUBSTANCE_GROUP_ID_TO_CATEGORY.get(fact.substance.group.group_id)
+        if not group:
+            return
+
+        country_name = fact.country.name
+        key = (country_name, group)
+        if key not in country_records:
+            country_records[key] = {}
+            for data_year in existent_reports.get(country_name, []):
+                country_records[key][f"record_value_{data_year}"] = 0
+
+        country_records[key][f"record_value_{fact.year}"] += fact.consumption_odp
+
+    def _get_cp_consumption_data(self, country_records, existent_reports):
         """
-        Get CP consumption data for the given year
+        Get CP consumption data completed with all the groups
+            for each country and sorted
 
-        @param year: int
+        @param country_records: dict
+        @param existent_reports: dict
 
         @return: dict
         structure:
@@ -935,46 +887,8 @@ class CPDataExtractionAllExport(views.APIView):
             ...
         }
         """
-        group_hcfc_141b = "HCFC-141b in imported pre-blended polyol"
-        filters = [
-            models.Q(substance__isnull=False),
-            models.Q(section="A"),
-        ]
-        records = get_final_records_for_years(min_year, max_year, filters)
-        country_records = {}
-        for record in records:
-            # set the group
-            if (
-                record.substance.name.lower()
-                == "hcfc-141b in imported pre-blended polyol"
-            ):
-                group = group_hcfc_141b
-            else:
-                group = SUBSTANCE_GROUP_ID_TO_CATEGORY.get(
-                    record.substance.group.group_id
-                )
-            if not group:
-                continue
-
-            country_name = record.country_programme_report.country.name
-            year = record.country_programme_report.year
-
-            key = (country_name, group)
-            if key not in country_records:
-                country_records[key] = {}
-                for data_year in existent_reports.get(country_name, []):
-                    country_records[key][f"record_value_{data_year}"] = 0
-
-            # set consumption value
-            consumption_value = record.get_consumption_value(
-                (country_name, year, record.section) in using_consumption_value_set
-            )
-            consumption_value *= record.substance.odp
-
-            country_records[key][f"record_value_{year}"] += consumption_value
-
         all_groups = list(set(SUBSTANCE_GROUP_ID_TO_CATEGORY.values()))
-        all_groups.append(group_hcfc_141b)
+        all_groups.append(GROUP_HCFC_141B)
         for group in ("HFC", "HBFC", "Other", "Legacy"):
             all_groups.remove(group)
 
@@ -990,13 +904,39 @@ class CPDataExtractionAllExport(views.APIView):
 
         return dict(sorted(country_records.items(), key=lambda x: x[0]))
 
-    def _get_hfc_consumption_data(
-        self, min_year, max_year, using_consumption_value_set, existent_reports
-    ):
+    def add_hfc_consumption_record(self, country_records, fact, existent_reports):
+        substance_name = get_record_chemical_category(fact)
+        if substance_name == "legacy" or (
+            fact.substance and "HFC" not in fact.substance.name
+        ):
+            return
+
+        country = fact.country
+        country_name = country.name
+        year = fact.year
+
+        key = (country_name, substance_name)
+        if key not in country_records:
+            country_records[key] = {
+                "country_lvc": "LVC" if country.is_lvc else "Non-LVC",
+                "substance_group": country.consumption_group,
+            }
+            for data_year in existent_reports.get(country_name, []):
+                country_records[key][f"consumption_mt_{data_year}"] = 0
+                country_records[key][f"consumption_co2_{data_year}"] = 0
+                country_records[key][f"servicing_{data_year}"] = 0
+                country_records[key][f"usages_total_{data_year}"] = 0
+
+        country_records[key][f"consumption_mt_{year}"] += fact.consumption
+        country_records[key][f"consumption_co2_{year}"] += fact.consumption_co2
+        country_records[key][f"servicing_{year}"] += fact.servicing
+        country_records[key][f"usages_total_{year}"] += fact.usages_total
+
+    def _get_hfc_consumption_data(self, country_records):
         """
-        Get HFC consumption data for the given year
+        Get HFC consumption data sorted by country and substance
 
-        @param year: int
+        @param country_records: dict
         @return: dict
         structure:
         {
@@ -1013,52 +953,9 @@ class CPDataExtractionAllExport(views.APIView):
             ...
         }
         """
-        records = get_final_records_for_years(
-            min_year, max_year, [models.Q(section="B")]
-        )
-        country_records = {}
-        for record in records:
-            substance_name = get_record_chemical_category(record)
-            if substance_name == "legacy" or (
-                record.substance and "HFC" not in record.substance.name
-            ):
-                continue
-
-            country = record.country_programme_report.country
-            country_name = country.name
-            year = record.country_programme_report.year
-
-            key = (country_name, substance_name)
-            if key not in country_records:
-                country_records[key] = {
-                    "country_lvc": "LVC" if country.is_lvc else "Non-LVC",
-                    "substance_group": country.consumption_group,
-                }
-                for data_year in existent_reports.get(country_name, []):
-                    country_records[key][f"consumption_mt_{data_year}"] = 0
-                    country_records[key][f"consumption_co2_{data_year}"] = 0
-                    country_records[key][f"servicing_{data_year}"] = 0
-                    country_records[key][f"usages_total_{data_year}"] = 0
-
-            # get consumption data
-            consumption_value = record.get_consumption_value(
-                (country_name, year, record.section) in using_consumption_value_set
-            )
-            country_records[key][f"consumption_mt_{year}"] += consumption_value
-
-            # convert consumption value to CO₂ equivalent
-            country_records[key][f"consumption_co2_{year}"] += (
-                consumption_value * record.get_chemical_gwp()
-            )
-
-            for rec_us in record.record_usages.all():
-                if "servicing" in rec_us.usage.full_name.lower():
-                    country_records[key][f"servicing_{year}"] += rec_us.quantity
-                country_records[key][f"usages_total_{year}"] += rec_us.quantity
-
         return dict(sorted(country_records.items(), key=lambda x: x[0]))
 
-    def _get_generations(self, min_year, max_year, archive_reports):
+    def _get_generations(self, min_year, max_year, archive_report_ids):
         final_generations = (
             CPGeneration.objects.filter(
                 country_programme_report__status=CPReport.CPReportStatus.FINAL,
@@ -1070,41 +967,28 @@ class CPDataExtractionAllExport(views.APIView):
                 "country_programme_report__year",
                 "country_programme_report__country__name",
             )
-            .all()
+            .iterator(chunk_size=EXTRACTION_CHUNK_SIZE)
         )
 
-        if not archive_reports:
-            return list(final_generations)
+        if not archive_report_ids:
+            return final_generations
 
         archive_generations = (
             CPGenerationArchive.objects.filter(
                 country_programme_report__status=CPReport.CPReportStatus.FINAL,
-                country_programme_report__year__gte=min_year,
-                country_programme_report__year__lte=max_year,
-            )
-            .filter(
-                # get the records for the max version of the archive reports
-                *[
-                    models.Q(
-                        country_programme_report__country_id=c,
-                        country_programme_report__year=y,
-                        country_programme_report__version=v,
-                    )
-                    for c, y, v in archive_reports
-                ],
-                _connector=models.Q.OR,
+                country_programme_report_id__in=archive_report_ids,
             )
             .select_related("country_programme_report__country")
             .order_by(
                 "country_programme_report__year",
                 "country_programme_report__country__name",
             )
-            .all()
+            .iterator(chunk_size=EXTRACTION_CHUNK_SIZE)
         )
 
-        return list(final_generations) + list(archive_generations)
+        return itertools.chain(final_generations, archive_generations)
 
-    def _get_emissions(self, min_year, max_year, archive_reports):
+    def _get_emissions(self, min_year, max_year, archive_report_ids):
         final_emissions = (
             CPEmission.objects.filter(
                 country_programme_report__status=CPReport.CPReportStatus.FINAL,
@@ -1116,32 +1000,19 @@ class CPDataExtractionAllExport(views.APIView):
                 "country_programme_report__year",
                 "country_programme_report__country__name",
             )
-            .all()
+            .iterator(chunk_size=EXTRACTION_CHUNK_SIZE)
         )
 
-        if not archive_reports:
-            return list(final_emissions)
+        if not archive_report_ids:
+            return final_emissions
 
         archive_emissions = (
             CPEmissionArchive.objects.filter(
                 country_programme_report__status=CPReport.CPReportStatus.FINAL,
-                country_programme_report__year__gte=min_year,
-                country_programme_report__year__lte=max_year,
-            )
-            .filter(
-                # get the records for the max version of the archive reports
-                *[
-                    models.Q(
-                        country_programme_report__country_id=c,
-                        country_programme_report__year=y,
-                        country_programme_report__version=v,
-                    )
-                    for c, y, v in archive_reports
-                ],
-                _connector=models.Q.OR,
+                country_programme_report_id__in=archive_report_ids,
             )
             .select_related("country_programme_report__country")
-            .all()
+            .iterator(chunk_size=EXTRACTION_CHUNK_SIZE)
         )
 
-        return list(final_emissions) + list(archive_emissions)
+        return itertools.chain(final_emissions, archive_emissions)
@@ -1,6 +1,8 @@
+import copy
 from datetime import date
 from datetime import datetime
 from django.db.models import Q
+from django.utils.cache import get_conditional_response, patch_cache_control
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter
 from drf_spectacular.utils import extend_schema
@@ -27,6 +29,12 @@ from core.models.country_programme import (
     CPReportFormatColumn,
     CPReportFormatRow,
 )
+from core.reference_data import (
+    ADM_FORMAT_MODELS,
+    CP_FORMAT_COLUMN_MODELS,
+    CP_FORMAT_ROW_MODELS,
+    ReferenceData,
+)
 from core.utils import IMPORT_DB_MAX_YEAR, IMPORT_DB_OLDEST_MAX_YEAR
 
 
@@ -65,7 +73,19 @@ class EmptyFormView(views.APIView):
     @classmethod
     def get_usage_columns(cls, year):
         """
-        Get usage columns for the given year
+        Get usage columns for the given year (cached, see `build_usage_columns`)
+
+        @param year: int - year
+
+        @return: dict of usage columns
+            structure: {section: [Usage serialize data]}
+        """
+        return copy.deepcopy(cp_usage_columns.get(year))
+
+    @classmethod
+    def build_usage_columns(cls, year):
+        """
+        Build usage columns for the given year
 
         @param year: int - year
 
@@ -120,6 +140,18 @@ class EmptyFormView(views.APIView):
 
     @classmethod
     def get_substance_rows(cls, year):
+        """
+        Get substance rows for the given year (cached, see `build_substance_rows`)
+
+        @param year: int - year
+
+        @return: dict of substance rows
+            structure: {section: [row data]}
+        """
+        return copy.deepcopy(cp_substance_rows.get(year))
+
+    @classmethod
+    def build_substance_rows(cls, year):
         cp_report_rows = (
             CPReportFormatRow.objects.get_for_year(year)
             .select_related("substance", "substance__group", "blend")
@@ -199,15 +231,24 @@ class EmptyFormView(views.APIView):
         return prices_rows
 
     @classmethod
-    def get_new_empty_form(cls, year=None, country_id=None):
+    def get_previous_report(cls, country_id):
+        return CPReport.objects.filter(country_id=country_id).order_by("-year").first()
+
+    @classmethod
+    def get_new_empty_form(cls, year=None, country_id=None, previous_report=None):
+        """
+        @param year: int - year (current year if not provided)
+        @param country_id: int - country id, used to get the previous report
+            when it is not provided
+        @param previous_report: CPReport object - last report of the country
+        """
         # for now, we return only the list of columns for usages
         if not year:
             year = datetime.now().year
 
         previous_substances = {}
-        previous_report = (
-            CPReport.objects.filter(country_id=country_id).order_by("-year").first()
-        )
+        if previous_report is None:
+            previous_report = cls.get_previous_report(country_id)
         if previous_report:
             previous_substances = cls.get_cp_records_rows(
                 previous_report
@@ -268,8 +309,8 @@ class EmptyFormView(views.APIView):
         admb_162 = False
         for row in rows:
             serial_row = AdmRowSerializer(row).data
-            serial_row["excluded_columns"] = row.immutable_cells.values_list(
-                "column_id", flat=True
+            serial_row["excluded_columns"] = list(
+                row.immutable_cells.values_list("column_id", flat=True)
             )
             if row.section == AdmRow.AdmRowSection.B:
                 if row.index not in ["1.6.1", "1.6.2"]:
@@ -317,6 +358,45 @@ class EmptyFormView(views.APIView):
 
         return cls.get_new_empty_form(year, country_id)
 
+    @classmethod
+    def build_cached_data(cls, year, cp_report_id, previous_report_id):
+        if IMPORT_DB_OLDEST_MAX_YEAR < year <= IMPORT_DB_MAX_YEAR:
+            cp_report = CPReport.objects.filter(id=cp_report_id).first()
+            return cls.get_old_empty_form(year, cp_report)
+        if year > IMPORT_DB_MAX_YEAR:
+            previous_report = CPReport.objects.filter(id=previous_report_id).first()
+            return cls.get_new_empty_form(year, previous_report=previous_report)
+        return cls.get_04_empty_form(year)
+
+    @classmethod
+    def get_cached_data(cls, year, cp_report, country_id=None):
+        """
+        Get the empty form (see `get_data`) from the reference data cache
+
+        Besides the year, the form depends on
+         - the report, for the old format (adm rows)
+         - the last report of the country, for the new format (previous
+            substances); reports are not edited in place, every update
+            creates a new report, so its id identifies its records
+
+        @param year: int - year
+        @param cp_report: CPReport object or None
+        @param country_id: int - country id
+
+        @return: tuple (token, data); the token changes whenever the data
+            may change (None if the cache is not available); the data must
+            not be modified
+        """
+        cp_report_id = None
+        previous_report_id = None
+        if IMPORT_DB_OLDEST_MAX_YEAR < year <= IMPORT_DB_MAX_YEAR:
+            cp_report_id = cp_report.id if cp_report else None
+        elif year > IMPORT_DB_MAX_YEAR:
+            previous_report = cls.get_previous_report(country_id)
+            previous_report_id = previous_report.id if previous_report else None
+
+        return cp_empty_forms.get_with_token(year, cp_report_id, previous_report_id)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -348,4 +428,29 @@ class EmptyFormView(views.APIView):
             year = cp_report.year
 
         country_id = request.query_params.get("country_id")
-        return Response(self.get_data(year, cp_report, country_id))
+        token, data = self.get_cached_data(year, cp_report, country_id)
+        response = Response(data)
+        if token is None:
+            return response
+
+        # the client keeps the form and revalidates it on every use
+        response["ETag"] = f'"{token}"'
+        patch_cache_control(response, private=True, no_cache=True)
+        return get_conditional_response(
+            request, etag=response["ETag"], response=response
+        )
+
+
+cp_usage_columns = ReferenceData(
+    "cp_usage_columns", CP_FORMAT_COLUMN_MODELS, EmptyFormView.build_usage_columns
+)
+cp_substance_rows = ReferenceData(
+    "cp_substance_rows", CP_FORMAT_ROW_MODELS, EmptyFormView.build_substance_rows
+)
+cp_empty_forms = ReferenceData(
+    "cp_empty_forms",
+    [*CP_FORMAT_ROW_MODELS, *CP_FORMAT_COLUMN_MODELS, *ADM_FORMAT_MODELS],
+    EmptyFormView.build_cached_data,
+    # one form per report: only the most used ones are kept in each process
+    local_size=16,
+)
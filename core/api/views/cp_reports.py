@@ -32,6 +32,7 @@ from core.api.serializers.cp_report import (
     CPReportNoRelatedSerializer,
     CPReportSerializer,
 )
+from core.api.views.utils import clone_cp_report, refresh_cp_consumption_facts
 from core.model_views.country_programme import FinalReportsView
 from core.models.adm import AdmRecord, AdmRecordArchive
 from core.models.country_programme import (
@@ -62,6 +63,14 @@ User = get_user_model()
 # pylint: disable=R0901
 
 
+def refresh_report_consumption_facts(cp_report):
+    """
+    Refresh the consumption facts of the report's country and year
+    after a report was finalised, archived or reverted
+    """
+    refresh_cp_consumption_facts(cp_report.year, cp_report.year, [cp_report.country_id])
+
+
 class BaseCPReportListView(generics.ListAPIView):
     filterset_class = CPReportFilter
     filter_backends = [
@@ -176,6 +185,7 @@ class CPReportView(
 
         if serializer.is_valid():
             self.perform_create(serializer)
+            refresh_report_consumption_facts(serializer.instance)
 
             headers = self.get_success_headers(serializer.data)
             return Response(
@@ -284,133 +294,18 @@ class CPReportView(
 
         return custom_errors
 
-    def _get_data_from_object(self, cls, instance, args=None):
-        """
-        Get archive data for an instance of a model
-          - delete unnecessary fields (id, _state)
-          - add additional data from args
-
-        @param cls: class of the model
-        @param instance: instance of the model
-        @param args: dict of additional data
-
-        @return: instance of the model
-        """
-        data = instance.__dict__.copy()
-        for key in ["_state", "id"]:
-            data.pop(key)
-
-        if args:
-            data.update(args)
-        return cls(**data)
-
     def _clone_report(
         self,
         instance,
         cls_dict,
     ):
         """
-        Clone country programme report
+        Clone country programme report (see `clone_cp_report`)
 
         @param instance: CPReport object
         @param cls_dict: dict of classes for the models to clone
         """
-        # clone cp_report
-        cp_report_clone = self._get_data_from_object(cls_dict["report_cls"], instance)
-        cp_report_clone.save()
-        # Make sure cloned versions keep the `created_at` of the original instance
-        cp_report_clone.created_at = instance.created_at
-        cp_report_clone.save(update_fields=["created_at"])
-
-        # clone cp_records and cp_usages
-        cp_usages = []
-        for cp_record in instance.cprecords.all():
-            cp_record_ar = self._get_data_from_object(
-                cls_dict["record_cls"],
-                cp_record,
-                {"country_programme_report_id": cp_report_clone.id},
-            )
-            cp_record_ar.save()
-            for cp_usage in cp_record.record_usages.all():
-                cp_usages.append(
-                    self._get_data_from_object(
-                        cls_dict["usage_cls"],
-                        cp_usage,
-                        {"country_programme_record_id": cp_record_ar.id},
-                    )
-                )
-        cls_dict["usage_cls"].objects.bulk_create(cp_usages, batch_size=1000)
-
-        # clone cp_prices
-        cp_prices = []
-        for cp_price in instance.prices.all():
-            cp_prices.append(
-                self._get_data_from_object(
-                    cls_dict["price_cls"],
-                    cp_price,
-                    {"country_programme_report_id": cp_report_clone.id},
-                )
-            )
-        cls_dict["price_cls"].objects.bulk_create(cp_prices, batch_size=1000)
-
-        # clone cp_generation
-        cp_generation = []
-        for cp_gen in instance.cpgenerations.all():
-            cp_generation.append(
-                self._get_data_from_object(
-                    cls_dict["generation_cls"],
-                    cp_gen,
-                    {"country_programme_report_id": cp_report_clone.id},
-                )
-            )
-        cls_dict["generation_cls"].objects.bulk_create(cp_generation, batch_size=1000)
-
-        # clone cp_emission
-        cp_emission = []
-        for cp_em in instance.cpemissions.all():
-            cp_emission.append(
-                self._get_data_from_object(
-                    cls_dict["emission_cls"],
-                    cp_em,
-                    {"country_programme_report_id": cp_report_clone.id},
-                )
-            )
-        cls_dict["emission_cls"].objects.bulk_create(cp_emission, batch_size=1000)
-
-        # clone adm records
-        adm_records = []
-        for adm_record in instance.adm_records.all():
-            adm_records.append(
-                self._get_data_from_object(
-                    cls_dict["adm_record_cls"],
-                    adm_record,
-                    {"country_programme_report_id": cp_report_clone.id},
-                )
-            )
-        cls_dict["adm_record_cls"].objects.bulk_create(adm_records, batch_size=1000)
-
-        # clone cp reported sections
-        if hasattr(instance, "cpreportedsections"):
-            cp_reported_sections = self._get_data_from_object(
-                cls_dict["section_cls"],
-                instance.cpreportedsections,
-                {"country_programme_report_id": cp_report_clone.id},
-            )
-            cp_reported_sections.save()
-
-        # clone cp comments
-        cp_comments = []
-        for cp_comment in instance.cpcomments.all():
-            cp_comments.append(
-                self._get_data_from_object(
-                    cls_dict["comment_cls"],
-                    cp_comment,
-                    {"country_programme_report_id": cp_report_clone.id},
-                )
-            )
-        cls_dict["comment_cls"].objects.bulk_create(cp_comments, batch_size=1000)
-
-        return cp_report_clone
+        return clone_cp_report(instance, cls_dict)
 
     def check_readonly_fields(self, serializer, current_obj):
         return (
@@ -507,6 +402,7 @@ class CPReportView(
         CPHistory.objects.bulk_create(history)
 
         current_obj.delete()
+        refresh_report_consumption_facts(new_instance)
 
         if config.SEND_MAIL and new_instance.status == CPReport.CPReportStatus.FINAL:
             send_mail_report_update.delay(new_instance.id)  # send mail to MLFS
@@ -574,6 +470,7 @@ class CPReportView(
         # delete the current draft and previous final version from the archive
         self.perform_destroy(instance)
         self.perform_destroy(prev_version)
+        refresh_report_consumption_facts(new_instance)
 
         serializer = self.get_serializer(new_instance)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -641,6 +538,7 @@ class CPReportStatusUpdateView(generics.GenericAPIView):
         initial_value = cp_report.status
         cp_report.status = cp_status
         cp_report.save()
+        refresh_report_consumption_facts(cp_report)
         CPHistory.objects.create(
             country_programme_report=cp_report,
             report_version=cp_report.version,
@@ -0,0 +1,91 @@
+import urllib
+
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.api.export_jobs import ExportJobError, get_user_scope, submit_export_job
+from core.api.serializers.export_job import (
+    ExportJobCreateSerializer,
+    ExportJobSerializer,
+)
+from core.models import ExportJob
+from core.tasks import run_export_job
+
+
+def get_user_export_job(user, job_id):
+    """
+    Get an export job the user may access: their own, or one shared with them
+    because it was rendered with the same access scope.
+    """
+    job = get_object_or_404(ExportJob, id=job_id)
+    if job.created_by_id != user.id and job.user_scope != get_user_scope(user):
+        raise NotFound()
+    return job
+
+
+class ExportJobCreateView(APIView):
+    """
+    Run an export in the background.
+
+    POST:   {"view_name": "<export URL name>", "url_kwargs": {...}, "params": {...}}
+            Returns 202 with the job if a new run was enqueued, or 200 with the
+            job that already serves an identical request.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = ExportJobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            job, created = submit_export_job(request.user, **serializer.validated_data)
+        except ExportJobError as e:
+            raise ValidationError({"view_name": str(e)}) from e
+
+        if created:
+            run_export_job.delay(job.id)
+        return Response(
+            ExportJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        )
+
+
+class ExportJobView(APIView):
+    """
+    Poll the status of an export job.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_user_export_job(request.user, job_id)
+        return Response(ExportJobSerializer(job).data)
+
+
+class ExportJobDownloadView(APIView):
+    """
+    Download the file produced by a successful export job.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_user_export_job(request.user, job_id)
+        if job.status != ExportJob.ExportJobStatus.SUCCESS or not job.file:
+            raise NotFound("Export is not available.")
+
+        response = FileResponse(
+            job.file.open("rb"),
+            content_type=job.content_type or "application/octet-stream",
+        )
+        file_name = urllib.parse.quote(job.filename)
+        response["Content-Disposition"] = (
+            f"attachment; filename*=UTF-8''{file_name}; filename=\"{file_name}\""
+        )
+        return response
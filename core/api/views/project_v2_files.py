@@ -31,6 +31,7 @@ from core.models.project import (
     ProjectFile,
 )
 from core.api.views.projects_mixins import ProjectFileCreateMixin
+from core.api.zip_stream import zip_file_response
 
 
 # pylint: disable=R1710
@@ -50,6 +51,7 @@ class ProjectFileV2ViewSet(
     def permission_classes(self):
         if self.action in [
             "download",
+            "download_all",
             "include_previous_versions",
             "list",
             "retrieve",
@@ -255,6 +257,18 @@ class ProjectFileV2ViewSet(
         )
         return response
 
+    @extend_schema(
+        description="Download all the files of the project as a ZIP archive.",
+        responses={(200, "application/zip"): OpenApiTypes.BINARY},
+    )
+    @action(methods=["GET"], detail=False)
+    def download_all(self, request, *args, **kwargs):
+        files = self.get_queryset().order_by("id")
+        return zip_file_response(
+            f"Project_{self.kwargs['project_id']}_Files.zip",
+            ((obj.filename, obj.file) for obj in files.iterator()),
+        )
+
     @action(methods=["GET"], detail=False)
     def include_previous_versions(self, request, *args, **kwargs):
         """
@@ -19,6 +19,7 @@ from core.api.filters.meta_project import (
     MetaProjectMyaFilterBackend,
 )
 from core.api.filters.project import MetaProjectFilter, ProjectFilter
+from core.api.filters.search import FullTextSearchFilter
 from core.api.permissions import (
     HasMetaProjectsViewAccess,
     HasProjectMetaInfoViewAccess,
@@ -65,6 +66,7 @@ from core.models.project import (
     ProjectOdsOdp,
     ProjectRBMMeasure,
     ProjectFile,
+    ProjectSearchDocument,
     SubmissionAmount,
 )
 from core.models.project_metadata import (
@@ -520,7 +522,7 @@ class ProjectViewSet(
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
-        filters.SearchFilter,
+        FullTextSearchFilter,
     ]
     ordering_fields = [
         "title",
@@ -530,7 +532,9 @@ class ProjectViewSet(
         "project_type__name",
         "substance_type",
     ]
-    search_fields = ["code", "legacy_code", "meta_project__code", "title"]
+    # code, legacy code and title; the meta project code is not indexed
+    search_document_model = ProjectSearchDocument
+    search_fields = ["meta_project__code"]
 
     @property
     def permission_classes(self):
@@ -264,6 +264,8 @@ class ProjectAssociationMixin:
                 associated_projects, key=lambda p: 0 if p.id == project.id else 1
             )
         context = self.get_serializer_context()
+        associated_projects = list(associated_projects)
+        self.prefetch_editability(context, associated_projects)
         if request.query_params.get("include_validation", "false").lower() == "true":
             # Include validation information for each project
             if project.submission_status.name == "Draft":
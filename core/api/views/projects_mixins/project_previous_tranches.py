@@ -84,6 +84,7 @@ class ProjectListPreviousTranchesMixin:
             "subsectors__sector",
         )
         context = self.get_serializer_context()
+        self.prefetch_editability(context, previous_tranches)
         if request.query_params.get("include_validation", "false").lower() == "true":
             # Include validation information for each project
             data = []
@@ -1,15 +1,20 @@
+import hashlib
+
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter
 from drf_spectacular.utils import extend_schema
+from django.core.cache import cache
 from django.db.models import Case, CharField, F, Q, QuerySet, Value, When
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from core.api.filters.project import ProjectFilter
+from core.api.filters.search import FullTextSearchFilter
 from core.api.permissions import (
     DenyAll,
     HasProjectV2ViewAccess,
@@ -38,6 +43,7 @@ from core.models.annual_project_report import AnnualProjectReport
 from core.models.project import (
     Project,
     ProjectOdsOdp,
+    ProjectSearchDocument,
 )
 from core.api.views.projects_mixins import (
     ProjectApproveRejectMixin,
@@ -53,11 +59,13 @@ from core.api.views.projects_mixins import (
     ProjectWithdrawMixin,
 )
 from core.api.views.utils import get_available_values
-from core.api.utils import log_project_history
+from core.api.utils import EqualsAny, log_project_history
 from core.utils import get_meta_project
 
 # pylint: disable=C0302,R0911,R0904,R1702
 
+PROJECT_EDITABILITY_CACHE_TIMEOUT = 10 * 60
+
 
 def get_blanket_approval_individual_consideration(queryset: QuerySet[Project]):
     values = (
@@ -129,6 +137,108 @@ class ProjectOdsOdpTypeView(APIView):
         return Response(choices)
 
 
+class ProjectEditability:
+    """
+    Set-like lookup of the projects a user can edit (`project_id in editability`)
+
+    Instead of fetching the ids of every editable project, only the serialized
+    projects are checked: the projects registered with `prefetch()` (e.g. the
+    current page) are checked with one query on the first lookup, any other
+    project with one query per lookup.
+
+    The results of the prefetched projects are memoised in the cache per
+    permissions fingerprint and project state: `date_updated` and the fields the
+    permissions queryset filters on, as queryset `.update()` calls (imports,
+    status transitions) don't bump `date_updated`. The state is read when the
+    lookup is resolved, so a project saved after `prefetch()` is not cached
+    under its previous state.
+
+    @param queryset: queryset of the projects the user can edit
+    @param fingerprint: str - identifies the permissions the queryset is built from
+    @param use_cache: bool - memoise the results across requests; otherwise they
+        are only kept for the lifetime of the lookup (e.g. for write requests)
+    """
+
+    STATE_FIELDS = [
+        "date_updated",
+        "version",
+        "status_id",
+        "submission_status_id",
+        "production",
+        "agency_id",
+        "lead_agency_id",
+    ]
+
+    def __init__(self, queryset, fingerprint, use_cache=True):
+        self.queryset = queryset
+        self.fingerprint = fingerprint
+        self.use_cache = use_cache
+        # {project id: editable}
+        self._editable = {}
+        # {project id: Project or None}
+        self._pending = {}
+
+    def prefetch(self, projects):
+        """
+        @param projects: iterable of Project objects that will be looked up
+        """
+        for project in projects:
+            if project.id not in self._editable:
+                self._pending[project.id] = project
+
+    def __contains__(self, project_id):
+        if project_id not in self._editable:
+            self._pending.setdefault(project_id, None)
+            self._resolve()
+        return self._editable[project_id]
+
+    def _get_cache_key(self, project):
+        state = hashlib.sha1(
+            repr(
+                [getattr(project, field, None) for field in self.STATE_FIELDS]
+            ).encode()
+        ).hexdigest()
+        return f"project_editability:{self.fingerprint}:{project.id}:{state}"
+
+    def _resolve(self):
+        pending, self._pending = self._pending, {}
+        cache_keys = {}
+        if self.use_cache:
+            cache_keys = {
+                project_id: self._get_cache_key(project)
+                for project_id, project in pending.items()
+                if project is not None and project.date_updated is not None
+            }
+        cached = cache.get_many(cache_keys.values()) if cache_keys else {}
+
+        missing_ids = []
+        for project_id in pending:
+            cache_key = cache_keys.get(project_id)
+            if cache_key in cached:
+                self._editable[project_id] = cached[cache_key]
+            else:
+                missing_ids.append(project_id)
+        if not missing_ids:
+            return
+
+        editable_ids = set(
+            self.queryset.filter(EqualsAny(F("id"), missing_ids)).values_list(
+                "id", flat=True
+            )
+        )
+        for project_id in missing_ids:
+            self._editable[project_id] = project_id in editable_ids
+        if cache_keys:
+            cache.set_many(
+                {
+                    cache_keys[project_id]: self._editable[project_id]
+                    for project_id in missing_ids
+                    if project_id in cache_keys
+                },
+                PROJECT_EDITABILITY_CACHE_TIMEOUT,
+            )
+
+
 # pylint: disable=R1710
 
 
@@ -157,7 +267,7 @@ class ProjectV2ViewSet(
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
-        filters.SearchFilter,
+        FullTextSearchFilter,
     ]
     ordering_fields = [
         "title",
@@ -176,34 +286,83 @@ class ProjectV2ViewSet(
         "total_fund",
     ]
 
-    search_fields = ["code", "legacy_code", "metacode", "title"]
+    # code, legacy code, metacode and title
+    search_document_model = ProjectSearchDocument
+    search_fields = []
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        # get the queryset for edit permissions to set editable on serializer
-        projects_edit_queryset = self.filter_permissions_queryset(
-            Project.objects.really_all(), results_for_edit=True
-        )
-        projects_edit_for_actual_fields_queryset = self.filter_permissions_queryset(
-            Project.objects.really_all(),
-            results_for_edit_actual_fields=True,
-        )
-        context["edit_queryset_ids"] = set(
-            projects_edit_queryset.values_list("id", flat=True)
-        )
-        context["edit_actual_fields_queryset_ids"] = set(
-            projects_edit_for_actual_fields_queryset.values_list("id", flat=True)
+        # lazy lookups of the edit permissions to set editable on serializer
+        context["edit_queryset_ids"] = self.get_editability(results_for_edit=True)
+        context["edit_actual_fields_queryset_ids"] = self.get_editability(
+            results_for_edit_actual_fields=True
         )
         cluster = self.request.data.get("cluster", None)
-        if not cluster:
-            try:
-                project = self.get_object()
-                cluster = project.cluster_id
-            except AssertionError:
-                cluster = None
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if not cluster and lookup_url_kwarg in self.kwargs:
+            cluster = (
+                Project.objects.really_all()
+                .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+                .values_list("cluster_id", flat=True)
+                .first()
+            )
         context["cluster"] = cluster
         return context
 
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        self.prefetch_editability(serializer.context, serializer.instance)
+        return serializer
+
+    def get_editability(self, **kwargs):
+        """
+        Get the lookup of the projects the user can edit
+
+        @param kwargs: `filter_permissions_queryset` flags
+        @return: ProjectEditability
+        """
+        user = self.request.user
+        is_post_excom_request = self.action == "update" and bool(
+            self.request.data.get("post-excom-update", False)
+        )
+        fingerprint = hashlib.sha1(
+            repr(
+                (
+                    sorted(kwargs.items()),
+                    self.action,
+                    is_post_excom_request,
+                    user.is_superuser,
+                    getattr(user, "agency_id", None),
+                    sorted(user.get_all_permissions()),
+                )
+            ).encode()
+        ).hexdigest()
+        return ProjectEditability(
+            self.filter_permissions_queryset(Project.objects.really_all(), **kwargs),
+            fingerprint,
+            # the projects of write requests change while they are serialized
+            use_cache=self.request.method in SAFE_METHODS,
+        )
+
+    def prefetch_editability(self, context, projects):
+        """
+        Register the projects that will be serialized with the given context,
+        so their edit permissions are checked together
+
+        @param context: serializer context
+        @param projects: Project, iterable of Project objects or None
+        """
+        if projects is None:
+            return
+        if isinstance(projects, Project):
+            projects = [projects]
+        elif not isinstance(projects, (list, tuple, QuerySet)):
+            return
+        projects = [project for project in projects if isinstance(project, Project)]
+        for key in ["edit_queryset_ids", "edit_actual_fields_queryset_ids"]:
+            if isinstance(context.get(key), ProjectEditability):
+                context[key].prefetch(projects)
+
     @property
     def permission_classes(self):
         if self.action in [
@@ -572,11 +731,23 @@ class ProjectV2ViewSet(
                 component.delete()
         return response
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="changes_only",
+                location=OpenApiParameter.QUERY,
+                description="Only include the values of each field that changed "
+                "from the previous version",
+                type=OpenApiTypes.BOOL,
+            ),
+        ],
+    )
     @action(methods=["GET"], detail=True)
     def field_history(self, request, *args, **kwargs):
         project = self.get_object()
+        changes_only = request.query_params.get("changes_only", "false") == "true"
         return Response(
-            SerializeProjectFieldHistory.serialize(project),
+            SerializeProjectFieldHistory.serialize(project, changes_only=changes_only),
             status=status.HTTP_200_OK,
         )
 
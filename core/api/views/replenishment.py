@@ -246,9 +246,7 @@ class ScaleOfAssessmentViewSet(
 
     def get_queryset(self):
         return (
-            ScaleOfAssessment.objects.select_related(
-                "country", "version__replenishment"
-            )
+            ScaleOfAssessment.objects.with_amounts()
             .prefetch_related(
                 models.Prefetch(
                     "version__replenishment__scales_of_assessment_versions",
@@ -351,7 +349,11 @@ class ScaleOfAssessmentViewSet(
             ).delete()
             annual_contributions = []
             triennial_contributions = []
-            # Create Status of Contributions data
+            # Create Status of Contributions data; fetch the saved rows to
+            # get the amounts without one query per row
+            scales_of_assessment = version.scales_of_assessment.with_amounts().order_by(
+                "id"
+            )
             for scale_of_assessment in scales_of_assessment:
                 annual_contributions.extend(
                     [
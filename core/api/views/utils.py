@@ -1,11 +1,15 @@
 # pylint: disable=C0302,R0914
 
+import heapq
+import itertools
 from datetime import datetime
 
-from django.db import models
+from django.db import connection, models, transaction
 
-from django.db.models import Q, F, QuerySet
+from django.db.models import Exists, Max, Min, OuterRef, Q, F, QuerySet
 from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save
+from django.utils import timezone
 from openpyxl.utils import get_column_letter
 from rest_framework.exceptions import ValidationError
 
@@ -16,6 +20,8 @@ from core.api.export.replenishment import (
     StatusOfContributionsWriter,
     StatisticsStatusOfContributionsWriter,
 )
+from core.api.views.cp_consumption_utils import get_records_consumption_frame
+from core import reference_data
 
 from core.models import (
     AnnualContributionStatus,
@@ -30,7 +36,12 @@ from core.models import (
     TriennialContributionView,
 )
 from core.models.business_plan import BusinessPlan
-from core.models.country_programme import CPRecord, CPReport, CPReportFormatRow
+from core.models.country_programme import (
+    CPConsumptionFact,
+    CPRecord,
+    CPReport,
+    CPReportFormatRow,
+)
 from core.models.country_programme_archive import CPRecordArchive, CPReportArchive
 
 
@@ -80,21 +91,11 @@ def get_available_values(
 
 def get_country_region_dict():
     """
-    Get a dictionary of country regions
+    Get a dictionary of country regions (cached, see core.reference_data)
 
     @return: dictionary of country regions
     """
-    countries = Country.objects.all().select_related("parent__parent")
-    country_region_dict = {}
-    for country in countries:
-        if country.parent_id and country.parent.parent_id:
-            country_region_dict[country.id] = country.parent.parent.name
-        elif country.parent_id:
-            country_region_dict[country.id] = country.parent.name
-        else:
-            country_region_dict[country.id] = country.name
-
-    return country_region_dict
+    return reference_data.get_country_region_dict()
 
 
 def get_country_regions() -> dict[str, dict[str, str]]:
@@ -252,6 +253,168 @@ def get_archive_reports_final_for_years(min_year, max_year):
     )
 
 
+def get_archive_report_ids_final_for_years(min_year, max_year, country_ids=None):
+    """
+    Get the ids of the max version archive reports that do not have a final report
+    This will take into account the range of years [min_year, max_year]
+
+    Same selection as `get_archive_reports_final_for_years`, but the result can
+    be used in a single `country_programme_report_id__in` filter instead of
+    one OR branch for every (country, year, version).
+
+    @param min_year: min year
+    @param max_year: max year
+    @param country_ids: list of country ids; all countries if not provided
+
+    @return: list of archive report ids
+    """
+    final_reports = CPReport.objects.filter(
+        country_id=OuterRef("country_id"),
+        year=OuterRef("year"),
+        status=CPReport.CPReportStatus.FINAL,
+    )
+    archive_reports = CPReportArchive.objects.filter(
+        year__gte=min_year,
+        year__lte=max_year,
+        status=CPReport.CPReportStatus.FINAL,
+    )
+    if country_ids is not None:
+        archive_reports = archive_reports.filter(country_id__in=country_ids)
+    return list(
+        archive_reports.exclude(Exists(final_reports))
+        .order_by("country_id", "year", "-version")
+        .distinct("country_id", "year")
+        .values_list("id", flat=True)
+    )
+
+
+def _get_chemical_key(item):
+    return (
+        f"substance_{item.substance_id}"
+        if item.substance_id
+        else f"blend_{item.blend_id}"
+    )
+
+
+def _final_record_sort_key(record):
+    if record.substance:
+        return record.substance.sort_order or float("inf")
+    return record.blend.sort_order or float("inf")
+
+
+def iter_final_records_for_years(
+    min_year,
+    max_year,
+    filter_list=None,
+    archive_report_ids=None,
+    chunk_size=2000,
+    country_ids=None,
+):
+    """
+    Streaming version of `get_final_records_for_years`
+     - the final and archive records are read using server-side cursors,
+        ordered by (year, country)
+     - the records are grouped by (country, year); only one group is kept
+        in memory at a time
+     - each group is completed with the display_substance records (0 values)
+        and sorted by the chemical sort order
+
+    Groups are yielded ordered by year and country id (not country name),
+    the records inside a group have the same order as in
+    `get_final_records_for_years`.
+    The 0 value records are not saved (id=0) and have the `section` of
+    their CPReportFormatRow set.
+
+    @param min_year: min year
+    @param max_year: max year
+    @param filter_list: list of filters to apply to the records
+    @param archive_report_ids: list of archive report ids
+        (see get_archive_report_ids_final_for_years); computed if not provided
+    @param chunk_size: number of records fetched from the database at once
+    @param country_ids: list of country ids; all countries if not provided
+        (unlike filter_list, not applied to the displayed chemicals)
+
+    @return: generator of records (CPRecord objects and CPRecordArchive objects)
+    """
+    if not filter_list:
+        filter_list = []
+
+    if archive_report_ids is None:
+        archive_report_ids = get_archive_report_ids_final_for_years(
+            min_year, max_year, country_ids
+        )
+
+    ordering = (
+        "country_programme_report__year",
+        "country_programme_report__country_id",
+        "substance__sort_order",
+        "blend__sort_order",
+    )
+    final_records = (
+        CPRecord.objects.get_for_years(min_year, max_year)
+        .prefetch_related("record_usages__usage")
+        .filter(
+            country_programme_report__status=CPReport.CPReportStatus.FINAL,
+            *filter_list,
+        )
+        .order_by(*ordering)
+    )
+    if country_ids is not None:
+        final_records = final_records.filter(
+            country_programme_report__country_id__in=country_ids
+        )
+    final_records = final_records.iterator(chunk_size=chunk_size)
+    archive_records = []
+    if archive_report_ids:
+        archive_records = (
+            CPRecordArchive.objects.get_for_years(min_year, max_year)
+            .prefetch_related("record_usages__usage")
+            .filter(
+                *filter_list,
+                country_programme_report_id__in=archive_report_ids,
+            )
+            .order_by(*ordering)
+            .iterator(chunk_size=chunk_size)
+        )
+
+    def _country_year(record):
+        return (
+            record.country_programme_report.year,
+            record.country_programme_report.country_id,
+        )
+
+    displayed_rows = {}
+    records = heapq.merge(final_records, archive_records, key=_country_year)
+    for (year, _), group in itertools.groupby(records, key=_country_year):
+        group_records = list(group)
+        country = group_records[0].country_programme_report.country
+        existent_records = {_get_chemical_key(r): r for r in group_records}
+
+        if year not in displayed_rows:
+            displayed_rows[year] = reference_data.get_cp_format_rows(year, filter_list)
+
+        # if the country does not have the display_substance for the year,
+        # then include a 0 value record
+        group_list = list(existent_records.values())
+        for row in displayed_rows[year]:
+            if _get_chemical_key(row) in existent_records:
+                continue
+            group_list.append(
+                CPRecord(
+                    country_programme_report=CPReport(
+                        country=country, year=year, version=0
+                    ),
+                    substance=row.substance,
+                    blend=row.blend,
+                    section=row.section,
+                    id=0,
+                )
+            )
+
+        group_list.sort(key=_final_record_sort_key)
+        yield from group_list
+
+
 def get_final_records_for_years(min_year, max_year, filter_list=None, list_sort=True):
     """
     Get all the final records for the years in the range [min_year, max_year]
@@ -278,28 +441,16 @@ def get_final_records_for_years(min_year, max_year, filter_list=None, list_sort=
     )
 
     # get the max version for each archive report that does not have a final report
-    archive_reports = get_archive_reports_final_for_years(min_year, max_year)
+    archive_report_ids = get_archive_report_ids_final_for_years(min_year, max_year)
 
     # get all the records for the archive reports
     archive_records = []
-    if archive_reports:
-        archive_records = (
-            CPRecordArchive.objects.get_for_years(min_year, max_year)
-            .filter(
-                *filter_list,
-            )
-            .filter(
-                # get the records for the max version of the archive reports
-                *[
-                    models.Q(
-                        country_programme_report__country_id=c,
-                        country_programme_report__year=y,
-                        country_programme_report__version=v,
-                    )
-                    for c, y, v in archive_reports
-                ],
-                _connector=models.Q.OR,
-            )
+    if archive_report_ids:
+        archive_records = CPRecordArchive.objects.get_for_years(
+            min_year, max_year
+        ).filter(
+            *filter_list,
+            country_programme_report_id__in=archive_report_ids,
         )
 
     # union the final records with the archive records
@@ -319,12 +470,7 @@ def get_final_records_for_years(min_year, max_year, filter_list=None, list_sort=
     # get display_substance for years
     displayed_rows = {}
     for year in range(min_year, max_year + 1):
-        displayed_rows[year] = (
-            CPReportFormatRow.objects.get_for_year(year)
-            .filter(*filter_list)
-            .select_related("substance__group", "blend")
-            .all()
-        )
+        displayed_rows[year] = reference_data.get_cp_format_rows(year, filter_list)
 
     # set the final list of records
     # if the country does not have the display_substance for the year,
@@ -373,6 +519,422 @@ def get_final_records_for_years(min_year, max_year, filter_list=None, list_sort=
     return final_list
 
 
+def _has_consumption(record):
+    return any(getattr(record, field) for field in ("imports", "exports", "production"))
+
+
+def _get_consumption_facts(records):
+    # If Import, Export and Production are not provided for any substance
+    # in a section, the consumption is the TOTAL of Use by Sector
+    sections_with_consumption = {
+        record.section for record in records if record.id and _has_consumption(record)
+    }
+    consumption_frame = get_records_consumption_frame(
+        records, sections_with_consumption
+    )
+
+    facts = []
+    for record, values in zip(records, consumption_frame.itertuples(index=False)):
+        country_programme_report = record.country_programme_report
+        fact = CPConsumptionFact(
+            country=country_programme_report.country,
+            year=country_programme_report.year,
+            section=record.section,
+            substance=record.substance,
+            blend=record.blend,
+            report_version=country_programme_report.version,
+            is_archive=isinstance(record, CPRecordArchive),
+            record_id=record.id or None,
+            imports=record.imports,
+            exports=record.exports,
+            production=record.production,
+        )
+        # 0 value records added for the displayed chemicals keep 0 values
+        if record.id:
+            fact.usages_total = values.usages_total
+            fact.servicing = values.servicing
+            fact.consumption = values.consumption
+            fact.consumption_odp = values.consumption * values.odp
+            fact.consumption_co2 = values.consumption * values.gwp
+        facts.append(fact)
+    return facts
+
+
+@transaction.atomic
+def refresh_cp_consumption_facts(min_year, max_year, country_ids=None):
+    """
+    Rebuild the CPConsumptionFact rows for the years in the range
+    [min_year, max_year] from the final records
+    (see `iter_final_records_for_years`)
+
+    Must be called whenever the final or max version archive report of a
+    (country, year) changes, and for the whole range when the displayed
+    chemicals (CPReportFormatRow) change.
+
+    @param min_year: min year
+    @param max_year: max year
+    @param country_ids: list of country ids; all countries if not provided
+
+    @return: number of facts created
+    """
+    old_facts = CPConsumptionFact.objects.filter(year__gte=min_year, year__lte=max_year)
+    if country_ids is not None:
+        old_facts = old_facts.filter(country_id__in=country_ids)
+    old_facts.delete()
+
+    records = iter_final_records_for_years(min_year, max_year, country_ids=country_ids)
+    facts = []
+    created_count = 0
+    for _, group in itertools.groupby(
+        records,
+        key=lambda r: (
+            r.country_programme_report.year,
+            r.country_programme_report.country_id,
+        ),
+    ):
+        facts.extend(_get_consumption_facts(list(group)))
+        if len(facts) >= 2000:
+            CPConsumptionFact.objects.bulk_create(facts)
+            created_count += len(facts)
+            facts = []
+
+    CPConsumptionFact.objects.bulk_create(facts)
+    return created_count + len(facts)
+
+
+def get_missing_consumption_fact_keys(min_year, max_year):
+    """
+    Get the (country, year) whose CPConsumptionFact rows are missing or
+    outdated:
+     - final records but no facts, e.g. right after the table was deployed or
+        after a reference data change deleted their facts
+        (see `core.cp_consumption_facts`)
+     - facts computed from another report than the current final or max
+        version archive report, e.g. after a report was finalised, archived or
+        deleted without `refresh_cp_consumption_facts` being called
+        (bulk operations, imports)
+
+    @param min_year: min year
+    @param max_year: max year
+
+    @return: set of (country_id, year)
+    """
+    reports = (
+        CPReport.objects.filter(
+            year__gte=min_year,
+            year__lte=max_year,
+            status=CPReport.CPReportStatus.FINAL,
+        )
+        .filter(
+            Exists(CPRecord.objects.filter(country_programme_report=OuterRef("pk")))
+        )
+        .values_list("country_id", "year", "version")
+    )
+    archive_reports = (
+        CPReportArchive.objects.filter(
+            id__in=get_archive_report_ids_final_for_years(min_year, max_year)
+        )
+        .filter(
+            Exists(
+                CPRecordArchive.objects.filter(country_programme_report=OuterRef("pk"))
+            )
+        )
+        .values_list("country_id", "year", "version")
+    )
+    # {(country_id, year): (report_version, is_archive)}
+    sources = {
+        (country_id, year): (version, False) for country_id, year, version in reports
+    }
+    for country_id, year, version in archive_reports:
+        sources.setdefault((country_id, year), (version, True))
+
+    facts_sources = defaultdict(set)
+    for country_id, year, report_version, is_archive in (
+        CPConsumptionFact.objects.filter(
+            year__gte=min_year, year__lte=max_year, record_id__isnull=False
+        )
+        .values_list("country_id", "year", "report_version", "is_archive")
+        .distinct()
+    ):
+        facts_sources[(country_id, year)].add((report_version, is_archive))
+    # the facts of the (country, year) without reported chemicals
+    for key in (
+        CPConsumptionFact.objects.filter(year__gte=min_year, year__lte=max_year)
+        .values_list("country_id", "year")
+        .distinct()
+    ):
+        facts_sources.setdefault(key, set())
+
+    missing_keys = {
+        key for key, source in sources.items() if facts_sources.get(key) != {source}
+    }
+    # facts of the reports that were deleted or reverted to draft
+    missing_keys.update(key for key in facts_sources if key not in sources)
+    return missing_keys
+
+
+def _iter_missing_consumption_facts(missing_keys, sections, chunk_size):
+    country_ids_by_year = defaultdict(list)
+    for country_id, year in missing_keys:
+        country_ids_by_year[year].append(country_id)
+
+    for year in sorted(country_ids_by_year):
+        records = iter_final_records_for_years(
+            year, year, chunk_size=chunk_size, country_ids=country_ids_by_year[year]
+        )
+        for _, group in itertools.groupby(
+            records, key=lambda r: r.country_programme_report.country_id
+        ):
+            for fact in _get_consumption_facts(list(group)):
+                if fact.section in sections:
+                    yield fact
+
+
+def iter_consumption_facts_for_years(min_year, max_year, sections, chunk_size=2000):
+    """
+    Get the CPConsumptionFact rows of the given sections for the years in the
+    range [min_year, max_year], ordered by year and country id
+
+    The facts of the (country, year) that were not computed yet or are outdated
+    (see `get_missing_consumption_fact_keys`) are computed from the final
+    records, without being saved.
+
+    @param min_year: min year
+    @param max_year: max year
+    @param sections: list of sections
+    @param chunk_size: number of facts fetched from the database at once
+
+    @return: generator of CPConsumptionFact objects
+    """
+    facts = (
+        CPConsumptionFact.objects.get_for_years(min_year, max_year)
+        .filter(section__in=sections)
+        .iterator(chunk_size=chunk_size)
+    )
+    missing_keys = get_missing_consumption_fact_keys(min_year, max_year)
+    if not missing_keys:
+        yield from facts
+        return
+
+    # the outdated facts are replaced by the computed ones
+    facts = (fact for fact in facts if (fact.country_id, fact.year) not in missing_keys)
+
+    missing_facts = _iter_missing_consumption_facts(missing_keys, sections, chunk_size)
+    yield from heapq.merge(
+        facts, missing_facts, key=lambda fact: (fact.year, fact.country_id)
+    )
+
+
+def refresh_missing_consumption_facts():
+    """
+    Compute and save the facts of all the (country, year) that do not have any
+    or whose facts are outdated (see `get_missing_consumption_fact_keys`)
+
+    @return: number of facts created
+    """
+    years = [
+        model.objects.aggregate(min_year=Min("year"), max_year=Max("year"))
+        for model in (CPReport, CPReportArchive, CPConsumptionFact)
+    ]
+    min_year = min((y["min_year"] for y in years if y["min_year"]), default=None)
+    max_year = max((y["max_year"] for y in years if y["max_year"]), default=None)
+    if min_year is None or max_year is None:
+        return 0
+
+    created_count = 0
+    country_ids_by_year = defaultdict(list)
+    for country_id, year in get_missing_consumption_fact_keys(min_year, max_year):
+        country_ids_by_year[year].append(country_id)
+    for year, country_ids in sorted(country_ids_by_year.items()):
+        created_count += refresh_cp_consumption_facts(year, year, country_ids)
+    return created_count
+
+
+def _refresh_facts_on_commit(cp_report):
+    # refresh the facts of the report's country and year after the commit,
+    # unless they were refreshed in the same transaction
+    def _refresh():
+        key = (cp_report.country_id, cp_report.year)
+        if key in get_missing_consumption_fact_keys(cp_report.year, cp_report.year):
+            refresh_cp_consumption_facts(
+                cp_report.year, cp_report.year, [cp_report.country_id]
+            )
+
+    transaction.on_commit(_refresh)
+
+
+# (related name on the report, cls_dict key) of the report data cloned with
+# one INSERT ... SELECT each; the records and their usages are cloned together
+CP_REPORT_CLONED_RELATIONS = [
+    ("prices", "price_cls"),
+    ("cpgenerations", "generation_cls"),
+    ("cpemissions", "emission_cls"),
+    ("adm_records", "adm_record_cls"),
+    ("cpreportedsections", "section_cls"),
+    ("cpcomments", "comment_cls"),
+]
+
+
+def _get_insert_select_sql(src_model, dst_model, values=None):
+    """
+    Build an `INSERT INTO dst (...) SELECT ... FROM src` statement copying the
+    fields of src_model rows (aliased as `src`) into dst_model
+
+    Only the fields dst_model shares with src_model are copied; the other
+    dst_model fields get their default value (or NULL). The `auto_now` fields
+    are set to the current time, like on save.
+
+    @param src_model: model to copy from
+    @param dst_model: model to copy into
+    @param values: dict {attname: (SQL expression, params)} of the values that
+        are not copied from src; the primary key is only inserted if given here
+
+    @return: tuple (SQL statement without the WHERE clause, params)
+    """
+    values = values or {}
+    quote_name = connection.ops.quote_name
+    src_fields = {field.attname: field for field in src_model._meta.concrete_fields}
+    now = timezone.now()
+
+    dst_columns = []
+    src_values = []
+    params = []
+    for field in dst_model._meta.concrete_fields:
+        if field.attname in values:
+            sql, value_params = values[field.attname]
+        elif field.primary_key:
+            continue
+        elif getattr(field, "auto_now", False):
+            sql, value_params = "%s", [field.get_db_prep_save(now, connection)]
+        elif field.attname in src_fields:
+            sql = f"src.{quote_name(src_fields[field.attname].column)}"
+            value_params = []
+        elif field.has_default() or field.null:
+            default = field.get_default() if field.has_default() else None
+            sql, value_params = "%s", [field.get_db_prep_save(default, connection)]
+        else:
+            raise ValueError(
+                f"{dst_model.__name__}.{field.name} is not a field of "
+                f"{src_model.__name__} and has no default"
+            )
+        dst_columns.append(quote_name(field.column))
+        src_values.append(sql)
+        params.extend(value_params)
+
+    return (
+        f"INSERT INTO {quote_name(dst_model._meta.db_table)} "
+        f"({', '.join(dst_columns)}) "
+        f"SELECT {', '.join(src_values)} "
+        f"FROM {quote_name(src_model._meta.db_table)} src",
+        params,
+    )
+
+
+def _clone_cp_records(cursor, src_report, dst_report_id, record_cls, usage_cls):
+    """
+    Clone the records of a report and their usages with one statement
+
+    The new record ids are taken from the sequence of record_cls beforehand,
+    so that the usages can be inserted with their new record ids in the same
+    statement.
+    """
+    quote_name = connection.ops.quote_name
+    src_record_cls = src_report._meta.get_field("cprecords").related_model
+    src_usage_cls = src_record_cls._meta.get_field("record_usages").related_model
+
+    # ordered by id to keep the order of the original records
+    mapping_sql = (
+        "SELECT old_id, nextval(pg_get_serial_sequence(%s, 'id')) AS new_id "
+        f"FROM (SELECT id AS old_id FROM {quote_name(src_record_cls._meta.db_table)} "
+        "WHERE country_programme_report_id = %s ORDER BY id) src_records"
+    )
+    records_sql, records_params = _get_insert_select_sql(
+        src_record_cls,
+        record_cls,
+        {
+            "id": ("mapping.new_id", []),
+            "country_programme_report_id": ("%s", [dst_report_id]),
+        },
+    )
+    usages_sql, usages_params = _get_insert_select_sql(
+        src_usage_cls,
+        usage_cls,
+        {"country_programme_record_id": ("mapping.new_id", [])},
+    )
+
+    cursor.execute(
+        f"WITH mapping AS MATERIALIZED ({mapping_sql}), "
+        f"new_records AS ({records_sql} "
+        "JOIN mapping ON mapping.old_id = src.id) "
+        f"{usages_sql} "
+        "JOIN mapping ON mapping.old_id = src.country_programme_record_id",
+        [quote_name(record_cls._meta.db_table), src_report.id]
+        + records_params
+        + usages_params,
+    )
+
+
+@transaction.atomic
+def clone_cp_report(instance, cls_dict):
+    """
+    Clone a country programme report with all its data into another set of
+    tables (e.g. archive a report or restore an archived version)
+
+    Uses a constant number of statements whatever the size of the report;
+    the data is copied in the database without loading it. `post_save` is
+    only sent for the cloned report, not for its data; the consumption facts
+    of its country and year are refreshed once the clone is committed.
+
+    @param instance: CPReport or CPReportArchive object
+    @param cls_dict: dict of classes for the models to clone into
+        (report_cls, record_cls, usage_cls, price_cls, generation_cls,
+        emission_cls, adm_record_cls, section_cls, comment_cls)
+
+    @return: the cloned report object
+    """
+    report_cls = cls_dict["report_cls"]
+    with connection.cursor() as cursor:
+        # created_at is copied as well, cloned versions keep the original one
+        report_sql, report_params = _get_insert_select_sql(type(instance), report_cls)
+        cursor.execute(
+            f"{report_sql} WHERE src.id = %s RETURNING id",
+            report_params + [instance.id],
+        )
+        cp_report_clone_id = cursor.fetchone()[0]
+
+        _clone_cp_records(
+            cursor,
+            instance,
+            cp_report_clone_id,
+            cls_dict["record_cls"],
+            cls_dict["usage_cls"],
+        )
+
+        for related_name, cls_key in CP_REPORT_CLONED_RELATIONS:
+            src_cls = instance._meta.get_field(related_name).related_model
+            insert_sql, insert_params = _get_insert_select_sql(
+                src_cls,
+                cls_dict[cls_key],
+                {"country_programme_report_id": ("%s", [cp_report_clone_id])},
+            )
+            cursor.execute(
+                f"{insert_sql} WHERE src.country_programme_report_id = %s",
+                insert_params + [instance.id],
+            )
+
+    cp_report_clone = report_cls.objects.get(id=cp_report_clone_id)
+    post_save.send(
+        sender=report_cls,
+        instance=cp_report_clone,
+        created=True,
+        update_fields=None,
+        raw=False,
+        using=connection.alias,
+    )
+    _refresh_facts_on_commit(cp_report_clone)
+    return cp_report_clone
+
+
 def set_chemical_items_dict(
     item_cls, existing_items, section, cp_report, append_items=True
 ):
@@ -0,0 +1,132 @@
+"""
+Streaming ZIP archives of uploaded files, for the "download all" endpoints.
+
+The archive is generated while it is sent, so only one chunk of one file is
+in memory at a time, whatever the number and size of the files. The files
+that are already compressed (PDF, Office documents, images, archives) are
+stored as they are; the others are deflated. The ZIP64 extensions are used
+when the archive or one of its files needs them.
+"""
+
+import logging
+import os
+import time
+import zipfile
+
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Deflating these again only costs CPU time
+STORED_EXTENSIONS = {
+    ".7z",
+    ".bz2",
+    ".docx",
+    ".gif",
+    ".gz",
+    ".jpeg",
+    ".jpg",
+    ".mp4",
+    ".odp",
+    ".ods",
+    ".odt",
+    ".pdf",
+    ".png",
+    ".pptx",
+    ".rar",
+    ".xlsx",
+    ".xz",
+    ".zip",
+}
+
+
+class _StreamBuffer:
+    """
+    Write-only, unseekable file object for ZipFile; the written data is
+    taken out with pop()
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _get_unique_name(name, names):
+    stem, extension = os.path.splitext(name)
+    unique_name = name
+    index = 1
+    while unique_name in names:
+        unique_name = f"{stem} ({index}){extension}"
+        index += 1
+    names.add(unique_name)
+    return unique_name
+
+
+def get_compress_type(name):
+    if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def stream_zip(files):
+    """
+    Generate a ZIP archive of the given files, chunk by chunk
+
+    @param files: iterable of (name in the archive, FieldFile) tuples; the
+        files missing from the storage are skipped and the duplicate names
+        get a " (1)", " (2)"... suffix
+
+    @return: generator of bytes
+    """
+    buffer = _StreamBuffer()
+    names = set()
+    with zipfile.ZipFile(buffer, "w") as zipf:
+        for name, field_file in files:
+            try:
+                source = field_file.open("rb")
+                size = field_file.size
+            except (OSError, ValueError):
+                logger.warning("File %s not found, not added to the ZIP", name)
+                continue
+
+            zinfo = zipfile.ZipInfo(
+                _get_unique_name(name, names), date_time=time.localtime()[:6]
+            )
+            zinfo.external_attr = 0o644 << 16
+            zinfo.compress_type = get_compress_type(name)
+            # needed upfront to know if the file needs ZIP64 headers
+            zinfo.file_size = size
+
+            with source, zipf.open(zinfo, "w") as dest:
+                while chunk := source.read(ZIP_CHUNK_SIZE):
+                    dest.write(chunk)
+                    if data := buffer.pop():
+                        yield data
+            if data := buffer.pop():
+                yield data
+    yield buffer.pop()
+
+
+def zip_file_response(filename, files):
+    """
+    @param filename: str - name of the downloaded archive
+    @param files: iterable of (name in the archive, FieldFile) tuples
+
+    @return: StreamingHttpResponse with the ZIP archive
+    """
+    response = StreamingHttpResponse(stream_zip(files), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
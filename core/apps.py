@@ -8,3 +8,18 @@ logger = logging.getLogger(__name__)
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        # connect the reference data invalidation, version timeline, search
+        # document and consumption facts signals
+        # pylint: disable-next=import-outside-toplevel,unused-import
+        import core.reference_data
+
+        # pylint: disable-next=import-outside-toplevel,unused-import
+        import core.project_version_timeline
+
+        # pylint: disable-next=import-outside-toplevel,unused-import
+        import core.search_documents
+
+        # pylint: disable-next=import-outside-toplevel,unused-import
+        import core.cp_consumption_facts
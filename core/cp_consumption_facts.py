@@ -0,0 +1,119 @@
+"""
+Invalidate the CP consumption facts when the reference data they are computed
+from changes: the chemicals (ODP, GWP, group), the usages (servicing) and the
+CP report format (displayed chemicals).
+
+The facts of the affected (country, year) are deleted, so the extractions
+compute them from the final records (see `iter_consumption_facts_for_years`)
+until the `refresh_missing_cp_consumption_facts` task saves them again.
+
+Changes of the source reports are handled by `refresh_cp_consumption_facts`
+calls in the views; the facts left outdated by bulk operations are detected
+by comparing their report version (see `get_missing_consumption_fact_keys`).
+"""
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from core.models.blend import Blend
+from core.models.country_programme import (
+    CPConsumptionFact,
+    CPReportFormatRow,
+    CPUsage,
+)
+from core.models.country_programme_archive import CPUsageArchive
+from core.models.substance import Substance
+from core.models.usage import Usage
+from core.tasks import refresh_missing_cp_consumption_facts
+
+# pylint: disable=W0613
+
+
+def _delete_facts(facts):
+    deleted_count, _ = facts.delete()
+    if deleted_count:
+        transaction.on_commit(refresh_missing_cp_consumption_facts.delay)
+
+
+def _get_country_year_facts(*filters, **kwargs):
+    # all the facts of the (country, year) that have a matching fact
+    return CPConsumptionFact.objects.filter(
+        Exists(
+            CPConsumptionFact.objects.filter(
+                *filters,
+                country_id=OuterRef("country_id"),
+                year=OuterRef("year"),
+                **kwargs,
+            )
+        )
+    )
+
+
+def _get_facts_with_chemical(**chemical):
+    # all the facts of the (country, year) that reported the chemical
+    return _get_country_year_facts(**chemical)
+
+
+def _get_facts_with_usage(usage_id):
+    # all the facts of the (country, year) whose records have the usage
+    return _get_country_year_facts(
+        Q(
+            is_archive=False,
+            record_id__in=CPUsage.objects.filter(usage_id=usage_id).values(
+                "country_programme_record_id"
+            ),
+        )
+        | Q(
+            is_archive=True,
+            record_id__in=CPUsageArchive.objects.filter(usage_id=usage_id).values(
+                "country_programme_record_id"
+            ),
+        )
+    )
+
+
+def _on_substance_change(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    _delete_facts(_get_facts_with_chemical(substance_id=instance.id))
+
+
+def _on_blend_change(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    _delete_facts(_get_facts_with_chemical(blend_id=instance.id))
+
+
+def _on_usage_change(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    _delete_facts(_get_facts_with_usage(instance.id))
+
+
+def _on_format_row_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    time_frame = instance.time_frame
+    facts = CPConsumptionFact.objects.filter(year__gte=time_frame.min_year)
+    if time_frame.max_year:
+        facts = facts.filter(year__lte=time_frame.max_year)
+    _delete_facts(facts)
+
+
+# the usage facts are found by their record usages, so the usages are handled
+# before they are deleted with their record usages
+for _model, _handler, _delete_signal in (
+    (Substance, _on_substance_change, post_delete),
+    (Blend, _on_blend_change, post_delete),
+    (Usage, _on_usage_change, pre_delete),
+    (CPReportFormatRow, _on_format_row_change, post_delete),
+):
+    for _signal in (post_save, _delete_signal):
+        _signal.connect(
+            _handler,
+            sender=_model,
+            weak=False,
+            # pylint: disable-next=W0212
+            dispatch_uid=f"cp_consumption_facts_{_model._meta.label}",
+        )
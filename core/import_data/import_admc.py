@@ -14,6 +14,7 @@ from core.import_data.utils import (
     get_import_user,
     get_or_create_adm_row,
     is_imported_today,
+    hold_chemical_resolver,
 )
 from core.models.adm import AdmRecord, AdmRow
 from core.models.country_programme import CPPrices, CPRecord
@@ -388,6 +389,7 @@ def parse_db_files(dir_path, db_name):
 
 
 @transaction.atomic
+@hold_chemical_resolver()
 def import_admc_items():
     """
     Import records from databases
@@ -20,6 +20,7 @@ from core.import_data.utils import (
     get_object_by_name,
     get_project_type_by_code,
     get_sector_subsector_details,
+    hold_chemical_resolver,
 )
 from core.models.agency import Agency
 from core.models.business_plan import (
@@ -344,6 +345,7 @@ def parse_file(file_path, file_name):
 
 
 @transaction.atomic
+@hold_chemical_resolver()
 def import_business_plans():
     dir_path = settings.IMPORT_DATA_DIR / "business_plans"
     delete_old_data(BusinessPlan)
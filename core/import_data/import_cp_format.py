@@ -5,7 +5,11 @@ import pandas as pd
 from django.conf import settings
 from django.db import transaction
 from core.import_data.mapping_names_dict import CP_FORMAT_FILE_DATA_MAPPING
-from core.import_data.utils import IMPORT_RESOURCES_DIR, get_chemical
+from core.import_data.utils import (
+    IMPORT_RESOURCES_DIR,
+    get_chemical,
+    hold_chemical_resolver,
+)
 from core.models.adm import AdmColumn, AdmEmptyImmutableCell, AdmRow
 from core.models.country_programme import CPReportFormatColumn, CPReportFormatRow
 
@@ -192,6 +196,7 @@ def set_adm_immutable_cells():
 
 
 @transaction.atomic
+@hold_chemical_resolver()
 def import_cp_format():
     logger.info("⏳ importing country programme report format")
     dir_path = settings.IMPORT_DATA_DIR / "cp_format"
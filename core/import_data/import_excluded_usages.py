@@ -7,6 +7,7 @@ from core.import_data.utils import (
     IMPORT_RESOURCES_DIR,
     delete_old_data,
     get_chemical_by_name_or_components,
+    hold_chemical_resolver,
 )
 from core.models.time_frame import TimeFrame
 from core.models.usage import ExcludedUsage, Usage
@@ -80,6 +81,7 @@ def parse_file(file_path):
 
 
 @transaction.atomic
+@hold_chemical_resolver()
 def import_excluded_usages():
     logger.info("⏳ importing excluded usages")
     file_path = IMPORT_RESOURCES_DIR / "excluded_usages.json"
@@ -11,17 +11,17 @@ from core.import_data.mapping_names_dict import (
 from core.import_data.utils import (
     DB_DIR_LIST,
     check_empty_row,
-    create_cp_record,
     get_chemical_by_name_or_components,
     get_country_dict_from_db_file,
     get_cp_report_for_db_import,
     get_import_user,
     get_year_dict_from_db_file,
     is_imported_today,
+    upsert_cp_records,
+    hold_chemical_resolver,
 )
 
 from core.models import Usage
-from core.models.country_programme import CPUsage
 
 logger = logging.getLogger(__name__)
 
@@ -156,7 +156,7 @@ def parse_record_data(
         json_data = json.load(f)
 
     current_usages_dict = {}
-    cp_usages = []
+    records_rows = []
     system_user = get_import_user()
 
     for item in json_data:
@@ -226,11 +226,9 @@ def parse_record_data(
                 }
             )
 
-        cp_usages.extend(
-            create_cp_record(record_data, usages_data, item["ItemAttirbutesId"])
-        )
+        records_rows.append((record_data, usages_data, item["ItemAttirbutesId"]))
 
-    CPUsage.objects.bulk_create(cp_usages, batch_size=1000)
+    upsert_cp_records(records_rows)
 
 
 def parse_db_files(db_dir_path):
@@ -258,6 +256,7 @@ def parse_db_files(db_dir_path):
 
 
 @transaction.atomic
+@hold_chemical_resolver()
 def import_records_from_databases():
     """
     Import records from databases
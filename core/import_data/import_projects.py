@@ -11,6 +11,7 @@ from core.import_data.utils import (
     get_serial_number_from_code,
     parse_date,
     update_or_create_project,
+    hold_chemical_resolver,
 )
 from core.models.project import ProjectFund, ProjectOdsOdp
 from core.models.substance import Substance
@@ -281,6 +282,7 @@ def parse_file(file_path):
 
 
 @transaction.atomic
+@hold_chemical_resolver()
 def import_projects():
     logger.info("⏳ importing projects")
     file_path = IMPORT_PROJECTS_DIR / "tbINVENTORY.json"
@@ -7,7 +7,6 @@ from django.conf import settings
 from core.import_data.utils import (
     check_empty_row,
     check_headers,
-    create_cp_record,
     get_cp_report,
     get_country_by_name,
     get_chemical,
@@ -15,10 +14,10 @@ from core.import_data.utils import (
     get_import_user,
     get_usages_from_sheet,
     is_imported_today,
+    upsert_cp_records,
+    hold_chemical_resolver,
 )
 
-from core.models.country_programme import CPUsage
-
 # pylint: disable=R0914
 logger = logging.getLogger(__name__)
 
@@ -53,7 +52,7 @@ def parse_sheet(df, year, file_name):
         "obj": None,
     }
     current_cp = None
-    cp_usages = []
+    records_rows = []
     system_user = get_import_user()
     for index_row, row in df.iterrows():
         if row["substance"].strip().lower() == "total":
@@ -120,15 +119,8 @@ def parse_sheet(df, year, file_name):
                     "quantity": quantity,
                 }
             )
-        cp_usages.extend(
-            create_cp_record(
-                record_data,
-                usages_data,
-                index_row,
-                update_or_log="update",
-            )
-        )
-    CPUsage.objects.bulk_create(cp_usages, batch_size=1000)
+        records_rows.append((record_data, usages_data, index_row))
+    upsert_cp_records(records_rows, update_or_log="update")
 
     logger.info("✔ sheet parsed")
 
@@ -151,6 +143,7 @@ def parse_file(file_path):
 
 
 @transaction.atomic
+@hold_chemical_resolver()
 def import_records_95_04():
     logger.info("⏳ importing records section from 1995 to 2004")
     file_path = settings.IMPORT_DATA_DIR / "records" / "CPDataSubmitted_94_04.xlsx"
@@ -8,7 +8,6 @@ from django.conf import settings
 from core.import_data.utils import (
     check_empty_row,
     check_headers,
-    create_cp_record,
     get_cp_report,
     get_country_by_name,
     get_chemical,
@@ -17,10 +16,10 @@ from core.import_data.utils import (
     get_import_user,
     get_usages_from_sheet,
     is_imported_today,
+    upsert_cp_records,
+    hold_chemical_resolver,
 )
 
-from core.models.country_programme import CPUsage
-
 logger = logging.getLogger(__name__)
 
 NON_USAGE_COLUMNS = {
@@ -125,7 +124,7 @@ def parse_sheet(df, file_details, year, system_user):
         "obj": None,
     }
     current_cp = None
-    cp_usages = []
+    records_rows = []
     for index_row, row in df.iterrows():
         if row["chemical"].strip().lower() == "total":
             continue
@@ -213,9 +212,9 @@ def parse_sheet(df, file_details, year, system_user):
                 }
             )
 
-        cp_usages.extend(create_cp_record(record_data, usages_data, index_row))
+        records_rows.append((record_data, usages_data, index_row))
 
-    CPUsage.objects.bulk_create(cp_usages, batch_size=1000)
+    upsert_cp_records(records_rows)
 
     logger.info("✔ sheet parsed")
 
@@ -239,6 +238,7 @@ def parse_file(file_path, file_details, system_user):
 
 
 @transaction.atomic
+@hold_chemical_resolver()
 def import_records():
     system_user = get_import_user()
     for file in FILE_LIST:
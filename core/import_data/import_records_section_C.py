@@ -13,6 +13,7 @@ from core.import_data.utils import (
     get_decimal_from_excel_string,
     get_import_user,
     is_imported_today,
+    hold_chemical_resolver,
 )
 from core.models import CPPrices
 
@@ -219,6 +220,7 @@ def parse_file(file_path, system_user):
 
 
 @transaction.atomic
+@hold_chemical_resolver()
 def import_records():
     system_user = get_import_user()
     for file_name in FILE_NAMES:
@@ -2,6 +2,8 @@ import decimal
 import json
 import logging
 import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
 from dateutil.parser import parse, ParserError
@@ -20,7 +22,6 @@ from core.import_data.mapping_names_dict import (
 
 from core.models.adm import AdmColumn, AdmRow
 from core.models.agency import Agency
-from core.models.blend import Blend
 from core.models.country import Country
 from core.models.country_programme import CPHistory, CPRecord, CPReport, CPUsage
 from core.models.country_programme_archive import CPReportArchive
@@ -35,9 +36,13 @@ from core.models.project_metadata import (
     ProjectSubSector,
     ProjectType,
 )
-from core.models.substance import Substance
 from core.models.time_frame import TimeFrame
 from core.models.usage import Usage
+from core.reference_data import (
+    CHEMICAL_MODELS,
+    get_chemical_resolver,
+    get_local_change_count,
+)
 from core.utils import IMPORT_DB_MAX_YEAR
 
 # pylint: disable=C0302,R0913
@@ -220,12 +225,52 @@ def get_meeting_by_number(meeting_number, row_index):
         return None
 
 
+_held_chemical_resolver = threading.local()
+
+
+@contextmanager
+def hold_chemical_resolver():
+    """
+    Resolve the chemicals of all the rows imported in the block with the same
+    chemical names index, instead of getting it from the reference data cache
+    for every row (rebuilt for every row when the shared cache is down).
+    The index is rebuilt after the chemicals are changed by this process.
+
+    Can be used as a decorator of the import functions.
+    """
+    if getattr(_held_chemical_resolver, "active", False):
+        yield
+        return
+    _held_chemical_resolver.active = True
+    _held_chemical_resolver.resolver = None
+    try:
+        yield
+    finally:
+        _held_chemical_resolver.active = False
+        _held_chemical_resolver.resolver = None
+
+
+def _get_chemical_resolver():
+    if not getattr(_held_chemical_resolver, "active", False):
+        return get_chemical_resolver()
+    change_count = get_local_change_count(CHEMICAL_MODELS)
+    if (
+        _held_chemical_resolver.resolver is None
+        or _held_chemical_resolver.change_count != change_count
+    ):
+        _held_chemical_resolver.resolver = get_chemical_resolver()
+        _held_chemical_resolver.change_count = change_count
+    return _held_chemical_resolver.resolver
+
+
 def get_chemical_by_name_or_components(
     chemical_name,
     components=None,
 ):
     """
     get chemical by name or alt name (case insensitive) or components (blends)
+    from the chemical names index, built once for all the rows
+    (see `hold_chemical_resolver`)
     @param chemical_name: string chemical name
     @param components: list of tuples (substance_name, percentage) (for blends)
 
@@ -234,15 +279,7 @@ def get_chemical_by_name_or_components(
     if not chemical_name:
         return None, None
 
-    substance = Substance.objects.find_by_name(chemical_name)
-    if substance:
-        return substance, "substance"
-
-    blend = Blend.objects.find_by_name_or_components(chemical_name, components)
-    if blend:
-        return blend, "blend"
-
-    return None, None
+    return _get_chemical_resolver().find_chemical(chemical_name, components)
 
 
 def get_sector_by_code(sector_code, row_index):
@@ -467,84 +504,155 @@ def get_object_by_code(cls, code, column, index_row, with_log=True):
         return None
 
 
-def create_cp_record(record_data, usages_data, index_row, update_or_log="log"):
+def _get_cp_record_key(record_data):
+    return (
+        record_data["country_programme_report_id"],
+        record_data["substance_id"],
+        record_data["blend_id"],
+        record_data["section"],
+    )
+
+
+def get_existing_cp_records(report_ids):
     """
-    create cp record and usages objects from data
-    -> if the record / usages exists, update it and log inconsistent data
-    -> if the record  doesn't exists, create it
+    get the existing cp records and usages of some reports, with 2 queries
+    @param report_ids = set (cp report ids)
 
+    @return tuple(records, usages)
+        - records = dict ({(report_id, substance_id, blend_id, section): CPRecord})
+        - usages = dict ({(record key, usage_id): CPUsage})
+    """
+    records = {}
+    for record in CPRecord.objects.filter(
+        country_programme_report_id__in=report_ids
+    ).order_by("id"):
+        key = (
+            record.country_programme_report_id,
+            record.substance_id,
+            record.blend_id,
+            record.section,
+        )
+        records.setdefault(key, record)
+
+    record_keys = {record.id: key for key, record in records.items()}
+    usages = {}
+    for cp_usage in CPUsage.objects.filter(
+        country_programme_record_id__in=record_keys
+    ).order_by("id"):
+        usages.setdefault(
+            (record_keys[cp_usage.country_programme_record_id], cp_usage.usage_id),
+            cp_usage,
+        )
+
+    return records, usages
+
+
+def update_cp_record(record, record_data, update_or_log, inconsistent_data):
+    """
+    update an existing cp record from data and log inconsistent data
+    @param record = CPRecord object
     @param record_data = dict (record data)
-    @param usages_data = list (list of usages data)
-    @param index_row = int
     @param update_or_log = str (update or log)
-        (if the record should be updated or logged the inconsistent data)
+    @param inconsistent_data = list (the inconsistent data is appended to it)
 
-    @return cp_usages = list (list of CPUsage objects)
+    @return changed_fields = list (list of the changed field names)
     """
+    changed_fields = []
+    for key, value in record_data.items():
+        old_value = getattr(record, key, None)
+        if update_or_log == "update" and key not in ["source_file"]:
+            # no need to check for inconsistent data, just update the record
+            pass
+        elif old_value:
+            # check for inconsistent data and log it
+            if old_value != value and key not in ["source_file", "display_name"]:
+                inconsistent_data.append(f"{key}={old_value}")
+            continue
 
-    inconsistent_data = []
-    cp_usages = []
-    # get cp record if exists
-    record = CPRecord.objects.filter(
-        country_programme_report_id=record_data["country_programme_report_id"],
-        substance_id=record_data["substance_id"],
-        blend_id=record_data["blend_id"],
-        section=record_data["section"],
-    ).first()
+        # set attribute (update or not set)
+        setattr(record, key, value)
+        if old_value != value:
+            changed_fields.append(key)
 
-    if record:
-        # check for inconsistent data and update record if needed
-        for key, value in record_data.items():
-            if update_or_log == "update" and key not in ["source_file"]:
-                # no need to check for inconsistent data, just update the record
-                setattr(record, key, value)
-                continue
+    return changed_fields
 
-            # check for inconsistent data and log it
-            if not getattr(record, key, None):
-                # set attribute if it's not set
-                setattr(record, key, value)
-            elif getattr(record, key) != value and key not in [
-                "source_file",
-                "display_name",
-            ]:
-                inconsistent_data.append(f"{key}={getattr(record, key)}")
-    else:
-        # create record if it doesn't exist
-        record = CPRecord.objects.create(**record_data)
-
-    # insert records
-    for usage_data in usages_data:
-        usage_data["country_programme_record_id"] = record.id
-
-        # get cp usage if exists
-        cp_usage = CPUsage.objects.filter(
-            country_programme_record_id=usage_data["country_programme_record_id"],
-            usage=usage_data["usage"],
-        ).first()
-        if not cp_usage:
-            cp_usages.append(CPUsage(**usage_data))
-            continue
 
-        if update_or_log == "update":
-            # no need to check for inconsistent data, just update the cp usage
-            cp_usage.quantity = usage_data["quantity"]
-            cp_usage.save()
-            continue
+def upsert_cp_records(rows, update_or_log="log"):
+    """
+    create or update the cp records and usages of a whole sheet, with a
+    constant number of queries
+    -> if the record / usage exists (in the db or in a previous row), update it
+        and log inconsistent data
+    -> if the record / usage doesn't exist, create it
+
+    @param rows = list of tuples (record_data, usages_data, index_row)
+        - record_data = dict (record data)
+        - usages_data = list (list of usages data)
+    @param update_or_log = str (update or log)
+        (if the records should be updated or logged the inconsistent data)
+    """
+    if not rows:
+        return
 
-        # check for inconsistent data and update cp usage if needed
-        if cp_usage.quantity != usage_data["quantity"]:
-            inconsistent_data.append(
-                f"quantity: {usage_data['usage'].name}={cp_usage.quantity}"
+    records, usages = get_existing_cp_records(
+        {record_data["country_programme_report_id"] for record_data, _, _ in rows}
+    )
+    new_records = []
+    updated_records = {}
+    updated_fields = set()
+    new_usages = []
+    updated_usages = {}
+    for record_data, usages_data, index_row in rows:
+        inconsistent_data = []
+        record_key = _get_cp_record_key(record_data)
+        record = records.get(record_key)
+        if not record:
+            # create record if it doesn't exist
+            record = records[record_key] = CPRecord(**record_data)
+            new_records.append(record)
+        else:
+            changed_fields = update_cp_record(
+                record, record_data, update_or_log, inconsistent_data
             )
+            if record.pk and changed_fields:
+                updated_records[record.pk] = record
+                updated_fields.update(changed_fields)
+
+        for usage_data in usages_data:
+            usage_key = (record_key, usage_data["usage"].id)
+            cp_usage = usages.get(usage_key)
+            if not cp_usage:
+                cp_usage = usages[usage_key] = CPUsage(
+                    country_programme_record=record, **usage_data
+                )
+                new_usages.append(cp_usage)
+            elif update_or_log == "update":
+                # no need to check for inconsistent data, just update the cp usage
+                cp_usage.quantity = usage_data["quantity"]
+                if cp_usage.pk:
+                    updated_usages[cp_usage.pk] = cp_usage
+            elif cp_usage.quantity != usage_data["quantity"]:
+                inconsistent_data.append(
+                    f"quantity: {usage_data['usage'].name}={cp_usage.quantity}"
+                )
 
-    # log inconsistent data
-    if inconsistent_data:
-        logger.warning(
-            f"⚠️ [row: {index_row + OFFSET}] The following data is inconsistent: {inconsistent_data}"
-        )
+        # log inconsistent data
+        if inconsistent_data:
+            logger.warning(
+                f"⚠️ [row: {index_row + OFFSET}] The following data is inconsistent: {inconsistent_data}"
+            )
 
-    return cp_usages
+    CPRecord.objects.bulk_create(new_records, batch_size=1000)
+    if updated_records:
+        CPRecord.objects.bulk_update(
+            updated_records.values(), updated_fields, batch_size=1000
+        )
+    # the new usages get the ids of the records created above
+    CPUsage.objects.bulk_create(new_usages, batch_size=1000)
+    if updated_usages:
+        CPUsage.objects.bulk_update(
+            updated_usages.values(), ["quantity"], batch_size=1000
+        )
 
 
 # --- cp databases import utils ---
@@ -0,0 +1,129 @@
+"""
+Compare the bulk update of the APR copy-paste endpoint with saving each pasted
+row, the way AnnualProjectReportBulkUpdateSerializer.update used to.
+
+Adds --rows project reports (for copies of an existing project) to an agency
+report, then pastes new values for all of them through each path and reports
+the time and the number of queries. Everything runs in a transaction that is
+rolled back, so no data is changed.
+"""
+
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.api.serializers.annual_project_report import (
+    AnnualProjectReportBulkUpdateSerializer,
+)
+from core.models import AnnualAgencyProjectReport, AnnualProjectReport, Project
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_project_reports(agency_report, rows):
+    project = Project.objects.really_all().order_by("id").first()
+    if not project:
+        raise CommandError("At least one project is needed.")
+
+    values = {f.attname: getattr(project, f.attname) for f in Project._meta.fields}
+    projects = []
+    for index in range(rows):
+        projects.append(
+            Project(
+                **{
+                    **values,
+                    "id": None,
+                    "code": f"BENCH/{index}",
+                    "latest_project_id": None,
+                }
+            )
+        )
+    Project.objects.bulk_create(projects, batch_size=500)
+    AnnualProjectReport.objects.bulk_create(
+        [AnnualProjectReport(report=agency_report, project=p) for p in projects],
+        batch_size=500,
+    )
+    return [p.code for p in projects]
+
+
+def build_rows(codes, value):
+    return [
+        {
+            "project_code": code,
+            "funds_disbursed": float(value + index),
+            "date_first_disbursement": f"2024-01-{value % 28 + 1:02d}",
+            "last_year_remarks": f"Pasted {value}",
+        }
+        for index, code in enumerate(codes)
+    ]
+
+
+def update_per_row(agency_report, validated_data):
+    project_reports_map = {
+        pr.project.code: pr
+        for pr in agency_report.project_reports.select_related("project")
+    }
+    with transaction.atomic():
+        for pr_data in validated_data["project_reports"]:
+            project_report = project_reports_map[pr_data.pop("project_code")]
+            for field, value in pr_data.items():
+                setattr(project_report, field, value)
+            project_report.save()
+
+
+def update_bulk(agency_report, validated_data):
+    AnnualProjectReportBulkUpdateSerializer().update(agency_report, validated_data)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the APR bulk update against saving each pasted row."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument(
+            "--agency-report",
+            type=int,
+            help="Agency report id; defaults to the latest agency report.",
+        )
+
+    def _run(self, label, update, agency_report, rows):
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as validation_queries:
+            serializer = AnnualProjectReportBulkUpdateSerializer(
+                instance=agency_report, data={"project_reports": rows}
+            )
+            serializer.is_valid(raise_exception=True)
+        validated = time.perf_counter()
+        with CaptureQueriesContext(connection) as update_queries:
+            update(agency_report, serializer.validated_data)
+        end = time.perf_counter()
+
+        self.stdout.write(
+            f"{label:<8} validation {validated - start:6.2f}s "
+            f"({len(validation_queries)} queries)  "
+            f"update {end - validated:6.2f}s ({len(update_queries)} queries)"
+        )
+
+    def handle(self, *args, **options):
+        agency_reports = AnnualAgencyProjectReport.objects.order_by("-id")
+        if options["agency_report"]:
+            agency_reports = agency_reports.filter(id=options["agency_report"])
+        agency_report = agency_reports.first()
+        if not agency_report:
+            raise CommandError("No agency report found.")
+
+        self.stdout.write(f"{options['rows']} pasted rows, {agency_report}")
+        try:
+            with transaction.atomic():
+                codes = create_project_reports(agency_report, options["rows"])
+                self._run(
+                    "per row", update_per_row, agency_report, build_rows(codes, 1)
+                )
+                self._run("bulk", update_bulk, agency_report, build_rows(codes, 2))
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,137 @@
+"""
+Time the business plan Excel parser on a synthetic file.
+
+Generates a BP file of --rows activities from the agencies, countries, types,
+chemicals, clusters, sectors, subsectors and substances in the database (with
+some unknown names and values that are not numbers, so the warnings are also
+generated) and parses it the way the upload validation does.
+"""
+
+import io
+import random
+import time
+
+import pandas as pd
+from django.core.management import BaseCommand, CommandError
+
+from core.api.views.business_plan_utils import parse_bp_file
+from core.models import (
+    Agency,
+    BPChemicalType,
+    Country,
+    ProjectCluster,
+    ProjectSector,
+    ProjectSubSector,
+    ProjectType,
+    Substance,
+)
+
+# share of the cells that get an unknown name (and of the blank names) or a
+# value that is not a number
+INVALID_RATIO = 0.02
+
+
+def get_names(queryset):
+    return list(queryset.values_list("name", flat=True))
+
+
+def build_bp_file(rows, year_start, seed=0):
+    rng = random.Random(seed)
+    names = {
+        "Agency": get_names(Agency.objects.all()),
+        "Country": get_names(Country.get_business_plan_countries()),
+        "Type": get_names(ProjectType.objects.filter(obsolete=False)),
+        "Chemical": get_names(BPChemicalType.objects.filter(obsolete=False)),
+        "Cluster": get_names(ProjectCluster.objects.filter(obsolete=False)),
+        "Sector": get_names(ProjectSector.objects.filter(obsolete=False)),
+        "Subsector": get_names(ProjectSubSector.objects.filter(obsolete=False)),
+    }
+    if not names["Agency"] or not names["Country"]:
+        raise CommandError("At least one agency and one BP country are needed.")
+    substances = get_names(Substance.objects.filter(group_id__in=[6, 10, 11]))
+
+    def _name(column, blank=True):
+        roll = rng.random()
+        if not names[column] or roll < INVALID_RATIO:
+            return f"Unknown {column}"
+        if blank and roll < 2 * INVALID_RATIO:
+            return ""
+        return rng.choice(names[column])
+
+    def _number():
+        if rng.random() < INVALID_RATIO:
+            return "n/a"
+        return round(rng.uniform(0, 100000), 2)
+
+    year_columns = [str(year) for year in range(year_start, year_start + 3)]
+    year_columns.append(f"after {year_start + 2}")
+    data = []
+    for index in range(rows):
+        agency = rng.choice(names["Agency"])
+        row = {
+            "Activity ID": f"{agency}-XXX-{index + 1:09d}",
+            "Country": rng.choice(names["Country"]),
+            "Agency": agency,
+            "Status": rng.choice(["LVC", "NLVC", "Regional", "Other"]),
+            "Type": _name("Type", blank=False),
+            "Chemical": _name("Chemical"),
+            "Chemical Detail": "/".join(
+                rng.sample(substances, min(len(substances), rng.randint(0, 3)))
+            ),
+            "Amount of Polyol in Project (MT)": _number(),
+            "Cluster": _name("Cluster"),
+            "Sector": _name("Sector"),
+            "Subsector": _name("Subsector"),
+            "Title": f"Activity {index}",
+            "Required by Model": "",
+        }
+        for suffix in year_columns:
+            row[f"Value (US $) {suffix}"] = _number()
+            row[f"ODP {suffix}"] = _number()
+            row[f"MT for HFC {suffix}"] = _number()
+            row[f"CO₂-eq {suffix}"] = _number()
+        row.update(
+            {
+                "Project Status (A/P)": rng.choice(["A", "P", "X"]),
+                "Project Category (I/M)": rng.choice(["I", "M"]),
+                "Remarks": "",
+                "Remarks (Additional)": "",
+                "Comment": "",
+            }
+        )
+        data.append(row)
+
+    file = io.BytesIO()
+    pd.DataFrame(data).to_excel(file, index=False)
+    return file
+
+
+class Command(BaseCommand):
+    help = "Benchmark the business plan Excel parser on a synthetic file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--year-start", type=int, default=2025)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        file = build_bp_file(options["rows"], options["year_start"])
+
+        start = time.perf_counter()
+        file.seek(0)
+        pd.read_excel(file, dtype=str)
+        read_duration = time.perf_counter() - start
+        self.stdout.write(f"{options['rows']} rows, read_excel {read_duration:.2f}s")
+
+        for _ in range(options["repeat"]):
+            file.seek(0)
+            start = time.perf_counter()
+            activities, errors, warnings = parse_bp_file(
+                file, options["year_start"], from_validate=True
+            )
+            duration = time.perf_counter() - start
+            self.stdout.write(
+                f"parse {duration:6.2f}s (without read_excel "
+                f"{duration - read_duration:6.2f}s): {len(activities)} activities, "
+                f"{len(errors)} errors, {len(warnings)} warnings"
+            )
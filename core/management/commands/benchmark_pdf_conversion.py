@@ -0,0 +1,92 @@
+"""
+Compare the pooled PDF converter with running a fresh LibreOffice process
+per request, the way workbook_pdf_response used to.
+
+Converts the same generated workbook --requests times, --concurrency at a
+time, through each path and reports throughput and latency percentiles.
+Requires LibreOffice on the host.
+"""
+
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import openpyxl
+from django.core.management import BaseCommand
+
+from core.pdf_converter import get_office_binary, get_pdf_converter
+
+
+def build_workbook(rows):
+    wb = openpyxl.Workbook()
+    sheet = wb.active
+    sheet.append(["Country", "Substance", "Year", "Imports", "Exports", "Production"])
+    for index in range(rows):
+        sheet.append([f"Country {index % 150}", f"HCFC-{index % 40}", 2024, 1, 2, 3])
+    return wb
+
+
+def convert_with_subprocess(xlsx_file):
+    subprocess.check_call(
+        [get_office_binary(), "--headless", "--convert-to", "pdf", str(xlsx_file)],
+        cwd=xlsx_file.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def convert_with_pool(xlsx_file):
+    get_pdf_converter().convert(xlsx_file, xlsx_file.with_suffix(".pdf"))
+
+
+class Command(BaseCommand):
+    help = "Benchmark the pooled PDF converter against subprocess-per-request."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--rows", type=int, default=500, help="Rows in the generated workbook."
+        )
+
+    def _run(self, label, convert, wb, options):
+        with tempfile.TemporaryDirectory(prefix="mlf-bench-") as tmpdirname:
+            # One directory per request, as workbook_pdf_response does
+            files = []
+            for index in range(options["requests"]):
+                request_dir = Path(tmpdirname) / str(index)
+                request_dir.mkdir()
+                files.append(request_dir / "report.xlsx")
+                wb.save(files[-1])
+
+            def timed(xlsx_file):
+                start = time.perf_counter()
+                convert(xlsx_file)
+                return time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                latencies = sorted(executor.map(timed, files))
+            total = time.perf_counter() - start
+
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        self.stdout.write(
+            f"{label:<12} total {total:7.2f}s  "
+            f"{len(latencies) / total:6.2f} req/s  "
+            f"median {statistics.median(latencies):6.2f}s  p95 {p95:6.2f}s"
+        )
+
+    def handle(self, *args, **options):
+        wb = build_workbook(options["rows"])
+        self.stdout.write(
+            f"{options['requests']} requests, concurrency {options['concurrency']}, "
+            f"{options['rows']} rows"
+        )
+
+        # Start the pool's office instances before timing it
+        self._run("pool warmup", convert_with_pool, wb, {**options, "requests": 1})
+        self._run("subprocess", convert_with_subprocess, wb, options)
+        self._run("pool", convert_with_pool, wb, options)
@@ -1,16 +1,271 @@
-"""Import all data: resources, records, projects."""
+"""
+Import all data: resources, records, projects, business plans, replenishments.
 
-from django.core.management import BaseCommand
-from django.core.management import call_command
+The import is split in stages that declare the stages they depend on; the
+independent stages run in parallel, in a pool of worker processes. Each stage
+runs its chunks (one import type or file of the underlying command) in order
+and records a checkpoint for each completed chunk, so running the command
+again after a failure resumes with the failed chunk. The checkpoints are
+deleted once every stage has been imported, so the next run imports
+everything again.
+"""
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connections
+
+from core.management.workers import setup_worker
+from core.models.import_checkpoint import ImportCheckpoint
+from core.reference_data import invalidate_reference_data
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImportStage:
+    name: str
+    command: str
+    # arguments of the command for each chunk, imported in this order
+    chunks: list[list[str]] = field(default_factory=lambda: [[]])
+    depends_on: list[str] = field(default_factory=list)
+
+
+def get_chunk_name(args):
+    return " ".join(args) or "all"
+
+
+# The imports run in the same order as the sequential import: resources,
+# records, projects, business plans, CP format, replenishments; each one
+# depends on the previous one, so it still sees everything imported before it.
+# Only the stages that rebuild derived tables run in parallel with the imports
+# that follow them, as nothing imported after them changes their sources: the
+# version timeline (projects), the search documents (projects and business
+# plan activities) and the CP consumption facts (CP records and format).
+# The chunks of a stage share reports and objects created with get_or_create,
+# so they never run in parallel.
+STAGES = [
+    ImportStage(
+        "resources",
+        "import_resources",
+        [
+            [resource]
+            for resource in (
+                "groups",
+                "substances",
+                "blends",
+                "blend_components",
+                "countries",
+                "time_frames",
+                "usages",
+                "excluded_usages",
+                "adm_columns",
+                "project_resources",
+                "bp_other_objects",
+                "decisions",
+            )
+        ],
+    ),
+    ImportStage(
+        "records",
+        "import_records",
+        [
+            [rec_type]
+            for rec_type in (
+                "section_ab",
+                "section_c",
+                "section_d",
+                "section_e",
+                "item_attributes",
+                "admb_items",
+                "admc_items",
+                "admde_items",
+                "records_95_04",
+            )
+        ],
+        depends_on=["resources"],
+    ),
+    ImportStage(
+        "projects",
+        "import_projects",
+        [
+            [imp_type]
+            for imp_type in (
+                "projects",
+                "proposals",
+                "multi_year_projects",
+                "set_project_clusters",
+                "progress",
+                "comments",
+                "meta_projects",
+                "pcr_activities",
+                "pcr_delay_explanation",
+                "pcr_learned_lessons",
+                "set_serial_numbers",
+            )
+        ],
+        depends_on=["records"],
+    ),
+    ImportStage(
+        "project_version_timeline",
+        "refresh_project_version_timeline",
+        depends_on=["projects"],
+    ),
+    ImportStage("business_plans", "import_business_plans", depends_on=["projects"]),
+    ImportStage(
+        "search_documents",
+        "refresh_search_documents",
+        depends_on=["business_plans"],
+    ),
+    ImportStage("cp_format", "import_cp_format", depends_on=["business_plans"]),
+    ImportStage(
+        "cp_consumption_facts",
+        "refresh_cp_consumption_facts",
+        depends_on=["cp_format"],
+    ),
+    ImportStage(
+        "replenishments",
+        "import_replenishments",
+        [
+            [resource]
+            for resource in (
+                "replenishments",
+                "status_of_contributions",
+                "ferm_interest_disputed",
+            )
+        ],
+        depends_on=["cp_format"],
+    ),
+]
+
+
+def run_stage(stage):
+    """
+    Import the chunks of a stage that do not have a checkpoint yet
+
+    @param stage: ImportStage
+
+    @return: float - import duration in seconds
+    """
+    completed = set(
+        ImportCheckpoint.objects.filter(stage=stage.name).values_list(
+            "chunk", flat=True
+        )
+    )
+
+    stage_start = time.perf_counter()
+    for args in stage.chunks:
+        chunk = get_chunk_name(args)
+        if chunk in completed:
+            logger.info(f"⏩ {stage.name} [{chunk}] already imported, skipped")
+            continue
+
+        start = time.perf_counter()
+        call_command(stage.command, *args)
+        duration = time.perf_counter() - start
+        ImportCheckpoint.objects.create(
+            stage=stage.name, chunk=chunk, duration=duration
+        )
+        logger.info(f"✔ {stage.name} [{chunk}] imported in {duration:.1f}s")
+
+    return time.perf_counter() - stage_start
+
+
+def get_ready_stages(done, started):
+    """
+    @param done: set of the completed stage names
+    @param started: set of the started (or completed) stage names
+
+    @return: list of ImportStage that can start now
+    """
+    return [
+        stage
+        for stage in STAGES
+        if stage.name not in started and set(stage.depends_on) <= done
+    ]
 
 
 class Command(BaseCommand):
     help = __doc__
 
-    def handle(self, *args, **kwargs):
-        call_command("import_resources", "all")
-        call_command("import_records", "all")
-        call_command("import_projects", "all")
-        call_command("import_business_plans")
-        call_command("import_cp_format")
-        call_command("import_replenishments", "all")
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of stages imported in parallel; 1 imports them in "
+            "this process, one after the other",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoints of the previous runs and import everything",
+        )
+
+    def handle(self, *args, **options):
+        if options["restart"]:
+            ImportCheckpoint.objects.all().delete()
+
+        if options["workers"] > 1:
+            durations = self.run_parallel(options["workers"])
+        else:
+            durations = self.run_sequential()
+
+        # the import is complete, the next run starts from the beginning
+        ImportCheckpoint.objects.all().delete()
+
+        # some imports use bulk operations, which do not send model signals
+        invalidate_reference_data()
+
+        for stage in STAGES:
+            self.stdout.write(f"{stage.name:<30} {durations[stage.name]:10.1f}s")
+
+    def run_sequential(self):
+        durations = {}
+        while ready := get_ready_stages(set(durations), set(durations)):
+            durations[ready[0].name] = run_stage(ready[0])
+        return durations
+
+    def run_parallel(self, workers):
+        durations = {}
+        running = {}
+        failed = []
+        # the workers open their own connections
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_worker,
+            initargs=({alias: db["NAME"] for alias, db in settings.DATABASES.items()},),
+        ) as executor:
+            while True:
+                if not failed:
+                    for stage in get_ready_stages(
+                        set(durations), set(durations) | set(running.values())
+                    ):
+                        logger.info(f"⏳ importing {stage.name}")
+                        running[executor.submit(run_stage, stage)] = stage.name
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage_name = running.pop(future)
+                    try:
+                        durations[stage_name] = future.result()
+                    except Exception:  # pylint: disable=W0718
+                        # let the running stages finish, so they are checkpointed
+                        logger.exception(f"❌ {stage_name} import failed")
+                        failed.append(stage_name)
+
+        if failed:
+            raise CommandError(
+                f"Import failed for: {', '.join(failed)}; "
+                "run the command again to resume"
+            )
+        return durations
@@ -80,8 +80,6 @@ class Command(BaseCommand):
             "cp_format",
             "cp_db_records",
             "xlsx_files",
-            "admb_items",
-            "admc_items",
             "all",
         ]:
             import_cp_format()
@@ -0,0 +1,42 @@
+"""
+Rebuild the precomputed CP consumption facts from the final CP records.
+
+The facts are refreshed automatically when a report is finalised, archived or
+reverted through the API; run this after importing CP records or the CP
+report format (displayed chemicals). Until then, the extractions compute the
+facts of the (country, year) that have none from the records.
+"""
+
+from django.core.management import BaseCommand
+from django.db.models import Max, Min
+
+from core.api.views.utils import refresh_cp_consumption_facts
+from core.models.country_programme import CPReport
+from core.models.country_programme_archive import CPReportArchive
+
+
+class Command(BaseCommand):
+    help = "Rebuild the CP consumption facts for the given years (default: all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-year", type=int)
+        parser.add_argument("--max-year", type=int)
+
+    def handle(self, *args, **options):
+        years = [
+            model.objects.aggregate(min_year=Min("year"), max_year=Max("year"))
+            for model in (CPReport, CPReportArchive)
+        ]
+        min_year = options["min_year"] or min(
+            (y["min_year"] for y in years if y["min_year"]), default=None
+        )
+        max_year = options["max_year"] or max(
+            (y["max_year"] for y in years if y["max_year"]), default=None
+        )
+        if min_year is None or max_year is None:
+            self.stdout.write("No CP reports, nothing to refresh")
+            return
+
+        for year in range(min_year, max_year + 1):
+            created_count = refresh_cp_consumption_facts(year, year)
+            self.stdout.write(f"{year}: {created_count} facts")
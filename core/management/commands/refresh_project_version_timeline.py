@@ -0,0 +1,28 @@
+"""
+Rebuild the project version timeline from the project versions.
+
+The timeline is refreshed automatically when a project, meeting or decision is
+saved and when new versions are created; run this after importing projects or
+updating them in bulk.
+"""
+
+from django.core.management import BaseCommand
+
+from core.models.project import Project, ProjectVersionTimeline
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Rebuild the project version timeline of all projects."
+
+    def handle(self, *args, **options):
+        project_ids = list(Project.objects.order_by("id").values_list("id", flat=True))
+        created_count = 0
+        for start in range(0, len(project_ids), BATCH_SIZE):
+            created_count += ProjectVersionTimeline.objects.refresh(
+                project_ids[start : start + BATCH_SIZE]
+            )
+        self.stdout.write(
+            f"{created_count} timeline rows for {len(project_ids)} projects"
+        )
@@ -0,0 +1,28 @@
+"""
+Rebuild the search documents of the projects and business plan activities.
+
+The documents are refreshed automatically when a project or an activity is
+saved and when projects are copied or business plans uploaded; run this after
+importing projects or business plans or updating them in bulk.
+"""
+
+from django.core.management import BaseCommand
+
+from core.models.business_plan import BPActivity, BPActivitySearchDocument
+from core.models.project import Project, ProjectSearchDocument
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search documents of all projects and BP activities."
+
+    def handle(self, *args, **options):
+        for name, objects, document_model in (
+            ("projects", Project.objects.really_all(), ProjectSearchDocument),
+            ("BP activities", BPActivity.objects.all(), BPActivitySearchDocument),
+        ):
+            object_ids = list(objects.order_by("id").values_list("id", flat=True))
+            for start in range(0, len(object_ids), BATCH_SIZE):
+                document_model.objects.refresh(object_ids[start : start + BATCH_SIZE])
+            self.stdout.write(f"search documents of {len(object_ids)} {name}")
@@ -7,7 +7,9 @@ command runs the very same task function in-process so it can be driven directly
 on the app container, with a --dry-run preview and an immediate summary.
 
 sync_apr_from_projects only writes rows whose denorm values actually changed and
-early-returns (no writes) for ENDORSED years, so it is safe to re-run.
+early-returns (no writes) for ENDORSED years, so it is safe to re-run. With
+--incremental, only the projects updated since the last sync are synced; run
+both modes to compare their timings.
 """
 
 from django.core.management import BaseCommand
@@ -34,6 +36,11 @@ class Command(BaseCommand):
             action="store_true",
             help="Compute and report what would change without writing anything.",
         )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only sync the projects updated since the last sync of the year.",
+        )
 
     def handle(self, *args, **options):
         years = options["year"]
@@ -46,13 +53,18 @@ class Command(BaseCommand):
         for year in years:
             self.stdout.write("")
             self.stdout.write(f"Year {year}:")
-            result = sync_apr_from_projects(year, dry_run=dry_run)
+            result = sync_apr_from_projects(
+                year, dry_run=dry_run, incremental=options["incremental"]
+            )
             for key in (
+                "mode",
+                "projects_count",
                 "updated_count",
                 "changed_count",
                 "added_count",
                 "deleted_count",
                 "agencies_count",
+                "duration_seconds",
             ):
                 if key in result:
                     self.stdout.write(f"  {key:<15}: {result[key]}")
@@ -0,0 +1,21 @@
+"""
+Set up of the worker processes started by the management commands.
+
+Kept apart from the commands: the worker processes import this module before
+Django is set up, so it must not import the models.
+"""
+
+import django
+from django.conf import settings
+
+
+def setup_worker(database_names):
+    """
+    Set up Django in a worker process, on the same databases as the parent
+    process (which may not be the ones in the settings, e.g. in the tests)
+
+    @param database_names: dict {database alias: database name}
+    """
+    for alias, name in database_names.items():
+        settings.DATABASES[alias]["NAME"] = name
+    django.setup()
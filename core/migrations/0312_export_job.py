@@ -0,0 +1,94 @@
+# Generated by Django 4.2.17 on 2026-10-18 19:19
+
+import core.models.utils
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0311_add_wmo_external_allocation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(db_index=True, max_length=64)),
+                ("view_name", models.CharField(max_length=128)),
+                ("url_kwargs", models.JSONField(blank=True, default=dict)),
+                ("params", models.JSONField(blank=True, default=dict)),
+                (
+                    "data_version",
+                    models.CharField(blank=True, max_length=64, null=True),
+                ),
+                (
+                    "user_scope",
+                    models.CharField(
+                        help_text="Fingerprint of the permissions the export was rendered with",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("success", "Success"),
+                            ("failure", "Failure"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                    ),
+                ),
+                ("task_id", models.CharField(blank=True, max_length=255, null=True)),
+                (
+                    "file",
+                    models.FileField(
+                        blank=True,
+                        null=True,
+                        storage=core.models.utils.get_protected_storage,
+                        upload_to="export_jobs/",
+                    ),
+                ),
+                ("filename", models.CharField(blank=True, max_length=255)),
+                ("content_type", models.CharField(blank=True, max_length=255)),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("expires_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="exportjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["pending", "running"])),
+                fields=("key",),
+                name="unique_in_flight_export_job_key",
+            ),
+        ),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 4.2.17 on 2026-10-18 19:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0312_export_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CPConsumptionFact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.IntegerField()),
+                ("section", models.CharField(max_length=164)),
+                (
+                    "report_version",
+                    models.FloatField(
+                        default=0,
+                        help_text="Version of the source report; 0 if not reported",
+                    ),
+                ),
+                ("is_archive", models.BooleanField(default=False)),
+                (
+                    "record_id",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="Id of the source CPRecord or CPRecordArchive",
+                        null=True,
+                    ),
+                ),
+                (
+                    "imports",
+                    models.DecimalField(
+                        blank=True, decimal_places=15, max_digits=25, null=True
+                    ),
+                ),
+                (
+                    "exports",
+                    models.DecimalField(
+                        blank=True, decimal_places=15, max_digits=25, null=True
+                    ),
+                ),
+                (
+                    "production",
+                    models.DecimalField(
+                        blank=True, decimal_places=15, max_digits=25, null=True
+                    ),
+                ),
+                (
+                    "usages_total",
+                    models.DecimalField(
+                        decimal_places=15,
+                        default=0,
+                        help_text="Sum of all the usages",
+                        max_digits=25,
+                    ),
+                ),
+                (
+                    "servicing",
+                    models.DecimalField(
+                        decimal_places=15,
+                        default=0,
+                        help_text="Sum of the servicing usages",
+                        max_digits=25,
+                    ),
+                ),
+                (
+                    "consumption",
+                    models.DecimalField(
+                        decimal_places=15,
+                        default=0,
+                        help_text="Imports - exports + production, or the sectorial total if the country reported none of them in this section",
+                        max_digits=25,
+                    ),
+                ),
+                (
+                    "consumption_odp",
+                    models.DecimalField(decimal_places=25, default=0, max_digits=45),
+                ),
+                (
+                    "consumption_co2",
+                    models.DecimalField(decimal_places=25, default=0, max_digits=45),
+                ),
+                (
+                    "blend",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="core.blend",
+                    ),
+                ),
+                (
+                    "country",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.country",
+                    ),
+                ),
+                (
+                    "substance",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="core.substance",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "CP consumption fact",
+                "verbose_name_plural": "CP consumption facts",
+                "db_table": "cp_consumption_fact",
+                "indexes": [
+                    models.Index(
+                        fields=["year", "country"], name="cp_consumpt_year_d89ec3_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.17 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0314_apr_endorsement_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="annualprogressreport",
+            name="projects_synced_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Start of the last sync from the projects; the incremental syncs only process the projects updated since then",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 4.2.17 on 2026-10-18 21:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_project_version_timeline(apps, _schema_editor):
+    """
+    Same rows as ProjectVersionTimeline.objects.refresh(), for all projects
+    """
+    project_model = apps.get_model("core", "Project")
+    timeline_model = apps.get_model("core", "ProjectVersionTimeline")
+
+    versions = project_model.objects.annotate(
+        effective_date=models.Case(
+            models.When(
+                post_excom_decision__isnull=False,
+                then=models.F("post_excom_decision__meeting__date"),
+            ),
+            models.When(
+                post_excom_meeting__isnull=False,
+                then=models.F("post_excom_meeting__date"),
+            ),
+            models.When(
+                transfer_decision__isnull=False,
+                then=models.F("transfer_decision__meeting__date"),
+            ),
+            models.When(
+                transfer_meeting__isnull=False,
+                then=models.F("transfer_meeting__date"),
+            ),
+            default=models.F("date_approved"),
+            output_field=models.DateField(),
+        )
+    ).values_list("id", "latest_project_id", "version", "effective_date", "status_id")
+
+    rows = []
+    for (
+        project_id,
+        latest_project_id,
+        version,
+        effective_date,
+        status_id,
+    ) in versions.iterator(chunk_size=2000):
+        rows.append(
+            timeline_model(
+                project_id=project_id,
+                final_project_id=latest_project_id or project_id,
+                version=version,
+                effective_date=effective_date,
+                status_id=status_id,
+            )
+        )
+        if len(rows) >= 2000:
+            timeline_model.objects.bulk_create(rows)
+            rows = []
+    timeline_model.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0315_apr_projects_synced_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectVersionTimeline",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.IntegerField()),
+                ("effective_date", models.DateField(blank=True, null=True)),
+                (
+                    "final_project",
+                    models.ForeignKey(
+                        help_text="The latest version of the project",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="version_timeline",
+                        to="core.project",
+                    ),
+                ),
+                (
+                    "project",
+                    models.OneToOneField(
+                        help_text="The project version (the final version or an archived one)",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline_entry",
+                        to="core.project",
+                    ),
+                ),
+                (
+                    "status",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="core.projectstatus",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["final_project", "effective_date", "version"],
+                        name="core_projec_final_p_942ee5_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(
+            populate_project_version_timeline, migrations.RunPython.noop
+        ),
+    ]
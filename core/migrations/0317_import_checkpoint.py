@@ -0,0 +1,37 @@
+# Generated by Django 4.2.17 on 2026-10-18 21:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0316_project_version_timeline"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stage", models.CharField(max_length=64)),
+                ("chunk", models.CharField(max_length=128)),
+                ("duration", models.FloatField(help_text="Import duration in seconds")),
+                ("completed_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="importcheckpoint",
+            constraint=models.UniqueConstraint(
+                fields=("stage", "chunk"), name="unique_import_checkpoint"
+            ),
+        ),
+    ]
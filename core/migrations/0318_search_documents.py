@@ -0,0 +1,97 @@
+# Generated by Django 4.2.17 on 2026-10-18 22:23
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0317_import_checkpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectSearchDocument",
+            fields=[
+                ("vector", django.contrib.postgres.search.SearchVectorField()),
+                (
+                    "project",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="core.project",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["vector"], name="core_projec_vector_8d19dc_gin"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="BPActivitySearchDocument",
+            fields=[
+                ("vector", django.contrib.postgres.search.SearchVectorField()),
+                (
+                    "activity",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="core.bpactivity",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["vector"], name="core_bpacti_vector_9108be_gin"
+                    )
+                ],
+            },
+        ),
+        # same documents as SearchDocumentManager.refresh(), for all the objects
+        migrations.RunSQL(
+            sql="""
+            INSERT INTO core_projectsearchdocument (project_id, vector)
+            SELECT id,
+                   to_tsvector('simple', CONCAT_WS(
+                       ' ',
+                       title,
+                       REGEXP_REPLACE(code, '\\W+', ' ', 'g'),
+                       REGEXP_REPLACE(legacy_code, '\\W+', ' ', 'g'),
+                       REGEXP_REPLACE(metacode, '\\W+', ' ', 'g')
+                   ))
+            FROM core_project;
+
+            INSERT INTO core_bpactivitysearchdocument (activity_id, vector)
+            SELECT activity.id,
+                   setweight(to_tsvector('simple', COALESCE(activity.title, '')), 'A')
+                   || setweight(to_tsvector('simple', CONCAT_WS(
+                       ' ',
+                       activity.required_by_model,
+                       activity.lvc_status,
+                       activity.remarks,
+                       chemical_type.name,
+                       (SELECT STRING_AGG(substance.name, ' ')
+                        FROM core_bpactivity_substances activity_substance
+                        JOIN core_substance substance
+                          ON substance.id = activity_substance.substance_id
+                        WHERE activity_substance.bpactivity_id = activity.id)
+                   )), 'B')
+            FROM core_bpactivity activity
+            LEFT JOIN core_bpchemicaltype chemical_type
+              ON chemical_type.id = activity.bp_chemical_type_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.17 on 2026-10-18 23:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0318_search_documents"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Last time the worker rendering the job reported it is alive",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.17 on 2026-10-18 23:37
+
+from django.db import migrations, models
+
+# The trigram indexes of the search document texts, used by the substring
+# search (UPPER(text) LIKE UPPER('%term%')). pg_trgm is a contrib extension;
+# on the servers that do not ship it, the substring search reads the search
+# document tables sequentially.
+CREATE_TRIGRAM_INDEXES = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX core_projectsearchdocument_text_trgm
+            ON core_projectsearchdocument USING gin (UPPER(text) gin_trgm_ops);
+        CREATE INDEX core_bpactivitysearchdocument_text_trgm
+            ON core_bpactivitysearchdocument USING gin (UPPER(text) gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+DROP_TRIGRAM_INDEXES = """
+DROP INDEX IF EXISTS core_projectsearchdocument_text_trgm;
+DROP INDEX IF EXISTS core_bpactivitysearchdocument_text_trgm;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0319_export_job_heartbeat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bpactivitysearchdocument",
+            name="text",
+            field=models.TextField(default=""),
+        ),
+        migrations.AddField(
+            model_name="projectsearchdocument",
+            name="text",
+            field=models.TextField(default=""),
+        ),
+        # same texts as SearchDocumentManager.refresh(), for all the objects
+        migrations.RunSQL(
+            sql="""
+            UPDATE core_projectsearchdocument search_document
+            SET text = CONCAT_WS(
+                ' ', project.title, project.code, project.legacy_code, project.metacode
+            )
+            FROM core_project project
+            WHERE project.id = search_document.project_id;
+            UPDATE core_bpactivitysearchdocument search_document
+            SET text = CONCAT_WS(
+                ' ',
+                activity.title,
+                activity.required_by_model,
+                activity.lvc_status,
+                activity.remarks,
+                chemical_type.name,
+                (SELECT STRING_AGG(substance.name, ' ')
+                 FROM core_bpactivity_substances activity_substance
+                 JOIN core_substance substance
+                   ON substance.id = activity_substance.substance_id
+                 WHERE activity_substance.bpactivity_id = activity.id)
+            )
+            FROM core_bpactivity activity
+            LEFT JOIN core_bpchemicaltype chemical_type
+              ON chemical_type.id = activity.bp_chemical_type_id
+            WHERE activity.id = search_document.activity_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(sql=CREATE_TRIGRAM_INDEXES, reverse_sql=DROP_TRIGRAM_INDEXES),
+    ]
@@ -19,3 +19,5 @@ from .time_frame import *
 from .usage import *
 from .user import *
 from .annual_project_report import *
+from .export_job import *
+from .import_checkpoint import *
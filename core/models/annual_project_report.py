@@ -13,7 +13,7 @@ from core.models.project import Project
 
 logger = logging.getLogger(__name__)
 
-# pylint: disable=R0904
+# pylint: disable=C0302,R0904
 
 
 class AnnualProgressReport(models.Model):
@@ -45,6 +45,12 @@ class AnnualProgressReport(models.Model):
         related_name="created_progress_reports",
         verbose_name="User who initiated this APR",
     )
+    projects_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Start of the last sync from the projects; the incremental "
+        "syncs only process the projects updated since then",
+    )
 
     class Meta:
         constraints = [
@@ -60,6 +66,53 @@ class AnnualProgressReport(models.Model):
         return f"Annual Progress Report for {self.year} ({endorsed})"
 
 
+class APREndorsementJob(models.Model):
+    """
+    Progress of the project updates made after an APR is endorsed.
+
+    The APR entries are processed in chunks ordered by id; `last_entry_id`
+    is saved with the changes of each chunk, so a job interrupted by a
+    worker crash resumes after the last committed chunk.
+    """
+
+    class JobStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        SUCCESS = "success", "Success"
+        FAILURE = "failure", "Failure"
+
+    progress_report = models.OneToOneField(
+        AnnualProgressReport,
+        on_delete=models.CASCADE,
+        related_name="endorsement_job",
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=JobStatus.choices,
+        default=JobStatus.PENDING,
+    )
+    total = models.PositiveIntegerField(
+        default=0, help_text="Number of projects reported in the APR"
+    )
+    processed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    failed_project_ids = models.JSONField(default=list, blank=True)
+    last_entry_id = models.IntegerField(
+        default=0, help_text="Id of the last APR entry processed"
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return (
+            f"APR {self.progress_report.year} endorsement job ({self.status}, "
+            f"{self.processed}/{self.total})"
+        )
+
+
 class AnnualAgencyProjectReport(models.Model):
     class SubmissionStatus(models.TextChoices):
         DRAFT = "draft", "Draft"
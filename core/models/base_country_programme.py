@@ -37,7 +37,7 @@ class CPRecordAbstractManager(models.Manager):
                 "country_programme_report__country",
             )
             .prefetch_related(
-                "record_usages",
+                "record_usages__usage",
                 "blend__components",
             )
             .filter(country_programme_report__year=year)
@@ -56,7 +56,7 @@ class CPRecordAbstractManager(models.Manager):
                 "country_programme_report__country",
             )
             .prefetch_related(
-                "record_usages",
+                "record_usages__usage",
                 "blend__components",
             )
             .filter(
@@ -110,12 +110,13 @@ class AbstractCPRecord(AbstractWChemical):
 
         """
 
+        # Filter in Python so that a `record_usages__usage` prefetch is used;
+        # for a set of records use `get_records_consumption_frame` instead
         if self.substance and "methyl bromide" in self.substance.name.lower():
             return sum(
                 usage.quantity
-                for usage in self.record_usages.filter(
-                    usage__full_name__icontains="non-qps"
-                )
+                for usage in self.record_usages.all()
+                if "non-qps" in usage.usage.full_name.lower()
             )
         return sum(usage.quantity for usage in self.record_usages.all())
 
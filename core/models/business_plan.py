@@ -1,4 +1,7 @@
 from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -11,6 +14,7 @@ from core.models.project_metadata import (
     ProjectSubSector,
     ProjectType,
 )
+from core.models.search_document import SEARCH_CONFIG, JoinedText, SearchDocument
 from core.models.substance import Substance
 from core.models.utils import get_protected_storage
 
@@ -197,6 +201,44 @@ class BPActivityValue(models.Model):
         ]
 
 
+class BPActivitySearchDocument(SearchDocument):
+    """
+    The texts of an activity (the title first), with the names of its chemical
+    type and substances
+    """
+
+    activity = models.OneToOneField(
+        BPActivity, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+
+    class Meta:
+        indexes = [GinIndex(fields=["vector"])]
+
+    @classmethod
+    def get_sources(cls):
+        substance_names = (
+            Substance.objects.filter(bpactivity=models.OuterRef("pk"))
+            .values("bpactivity")
+            .annotate(names=StringAgg("name", " "))
+            .values("names")
+        )
+        other_texts = [
+            "required_by_model",
+            "lvc_status",
+            "remarks",
+            "bp_chemical_type__name",
+            models.Subquery(substance_names),
+        ]
+        return BPActivity.objects.annotate(
+            search_vector=SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector(*other_texts, weight="B", config=SEARCH_CONFIG),
+            search_text=JoinedText("title", *other_texts),
+        )
+
+    def __str__(self):
+        return str(self.activity_id)
+
+
 class BPHistory(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True, help_text="Date of creation of the event"
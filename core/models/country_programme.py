@@ -142,6 +142,88 @@ class CPReportFormatRow(AbstractWChemical):
     objects = BaseWTimeFrameManager()
 
 
+class CPConsumptionFactManager(models.Manager):
+    def get_for_years(self, min_year, max_year):
+        return (
+            self.select_related("country", "substance__group", "blend")
+            .prefetch_related("blend__components")
+            .filter(year__gte=min_year, year__lte=max_year)
+            .order_by("year", "country_id", "id")
+        )
+
+
+class CPConsumptionFact(AbstractWChemical):
+    """
+    Effective final record for a (country, year, chemical), with its
+    consumption values precomputed.
+
+    The record comes from the final CPReport or, if the country has no final
+    report for that year, from the max version final CPReportArchive. The
+    chemicals displayed for the year but not reported by the country have a
+    0 value row. Kept up to date by `refresh_cp_consumption_facts`; the
+    facts of a (country, year) are deleted when the reference data they are
+    computed from changes (see `core.cp_consumption_facts`).
+
+    Rows of a (country, year) are stored in display order, so ordering by id
+    gives the chemical order of the report.
+    """
+
+    country = models.ForeignKey("Country", on_delete=models.CASCADE, related_name="+")
+    year = models.IntegerField()
+    section = models.CharField(max_length=164)
+    report_version = models.FloatField(
+        default=0, help_text="Version of the source report; 0 if not reported"
+    )
+    is_archive = models.BooleanField(default=False)
+    record_id = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="Id of the source CPRecord or CPRecordArchive",
+    )
+    imports = models.DecimalField(
+        max_digits=25, decimal_places=15, null=True, blank=True
+    )
+    exports = models.DecimalField(
+        max_digits=25, decimal_places=15, null=True, blank=True
+    )
+    production = models.DecimalField(
+        max_digits=25, decimal_places=15, null=True, blank=True
+    )
+    usages_total = models.DecimalField(
+        max_digits=25,
+        decimal_places=15,
+        default=0,
+        help_text="Sum of all the usages",
+    )
+    servicing = models.DecimalField(
+        max_digits=25,
+        decimal_places=15,
+        default=0,
+        help_text="Sum of the servicing usages",
+    )
+    consumption = models.DecimalField(
+        max_digits=25,
+        decimal_places=15,
+        default=0,
+        help_text=(
+            "Imports - exports + production, or the sectorial total "
+            "if the country reported none of them in this section"
+        ),
+    )
+    consumption_odp = models.DecimalField(max_digits=45, decimal_places=25, default=0)
+    consumption_co2 = models.DecimalField(max_digits=45, decimal_places=25, default=0)
+
+    objects = CPConsumptionFactManager()
+
+    class Meta:
+        verbose_name = "CP consumption fact"
+        verbose_name_plural = "CP consumption facts"
+        db_table = "cp_consumption_fact"
+        indexes = [
+            models.Index(fields=["year", "country"]),
+        ]
+
+
 class CPReportSections(models.Model):
     country_programme_report = models.OneToOneField(
         "CPReport",
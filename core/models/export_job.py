@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models.utils import get_protected_storage
+
+
+class ExportJobManager(models.Manager):
+    def in_flight(self):
+        return self.filter(status__in=ExportJob.IN_FLIGHT_STATUSES)
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+    def stale(self):
+        """
+        In-flight jobs that stopped responding: running jobs without a
+        heartbeat for EXPORT_JOB_STALE_SECONDS (the worker rendering them died)
+        and pending jobs queued for EXPORT_JOB_QUEUE_TIMEOUT_SECONDS (no worker
+        picked them up)
+        """
+        now = timezone.now()
+        return self.alias(
+            last_seen=Coalesce("heartbeat_at", "started_at", "created_at")
+        ).filter(
+            Q(
+                status=ExportJob.ExportJobStatus.RUNNING,
+                last_seen__lt=now
+                - timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS),
+            )
+            | Q(
+                status=ExportJob.ExportJobStatus.PENDING,
+                created_at__lt=now
+                - timedelta(seconds=settings.EXPORT_JOB_QUEUE_TIMEOUT_SECONDS),
+            )
+        )
+
+    def fail_stale(self):
+        """
+        Mark the stale jobs as failed, so their keys can be used by new jobs
+
+        @return: int - number of failed jobs
+        """
+        return self.stale().update(
+            status=ExportJob.ExportJobStatus.FAILURE,
+            error="The export stopped responding.",
+            finished_at=timezone.now(),
+        )
+
+    def reusable(self, key):
+        """
+        Return the job that can serve a request with the given key: an
+        in-flight job or a successful one that has not expired yet.
+        """
+        return (
+            self.filter(key=key, expires_at__gt=timezone.now())
+            .filter(
+                Q(status__in=ExportJob.IN_FLIGHT_STATUSES)
+                | Q(status=ExportJob.ExportJobStatus.SUCCESS)
+            )
+            .order_by("-created_at")
+            .first()
+        )
+
+
+class ExportJob(models.Model):
+    """
+    An export rendered in the background by a Celery worker.
+
+    Jobs are deduplicated by `key`, a hash of the export view, its params, the
+    data version of the exported models and the requesting user's access scope,
+    so users with the same access may share a job.
+    """
+
+    class ExportJobStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        SUCCESS = "success", "Success"
+        FAILURE = "failure", "Failure"
+
+    IN_FLIGHT_STATUSES = (ExportJobStatus.PENDING, ExportJobStatus.RUNNING)
+
+    key = models.CharField(max_length=64, db_index=True)
+    view_name = models.CharField(max_length=128)
+    url_kwargs = models.JSONField(default=dict, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    data_version = models.CharField(max_length=64, null=True, blank=True)
+    user_scope = models.CharField(
+        max_length=64,
+        help_text="Fingerprint of the permissions the export was rendered with",
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="export_jobs",
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=ExportJobStatus.choices,
+        default=ExportJobStatus.PENDING,
+    )
+    task_id = models.CharField(max_length=255, null=True, blank=True)
+    file = models.FileField(
+        storage=get_protected_storage,
+        upload_to="export_jobs/",
+        null=True,
+        blank=True,
+    )
+    filename = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last time the worker rendering the job reported it is alive",
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ExportJobManager()
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            # Only one run per key may be in flight; identical submissions
+            # made while it runs attach to it instead of starting another.
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=Q(status__in=["pending", "running"]),
+                name="unique_in_flight_export_job_key",
+            )
+        ]
+
+    def __str__(self):
+        return f"Export job {self.id} ({self.view_name}, {self.status})"
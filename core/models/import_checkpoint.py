@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class ImportCheckpoint(models.Model):
+    """
+    A chunk of an `import_all` stage that was imported successfully; it is
+    skipped when `import_all` is run again (e.g. after a failure).
+    """
+
+    stage = models.CharField(max_length=64)
+    chunk = models.CharField(max_length=128)
+    duration = models.FloatField(help_text="Import duration in seconds")
+    completed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["stage", "chunk"], name="unique_import_checkpoint"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.stage} {self.chunk}"
@@ -2,8 +2,11 @@ import os
 import shutil
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models, transaction
+from django.utils import timezone
 from functools import cached_property
 
 from django.db.models import Prefetch
@@ -26,6 +29,12 @@ from core.models.project_metadata import (
 from core.models.substance import Substance
 from core.models.utils import SubstancesType, get_protected_storage
 from core.models.project_pcr_exclusion import ProjectPCRRequiredExclusionRule
+from core.models.search_document import (
+    SEARCH_CONFIG,
+    CodeWords,
+    JoinedText,
+    SearchDocument,
+)
 
 # pylint: disable=C0302
 
@@ -347,8 +356,8 @@ class ProjectQuerySet(models.QuerySet["Project"]):
         post_excom_decision > post_excom_meeting > transfer_decision >
         transfer_meeting > date_approved.
 
-        Used by all_versions_for_year() and latest_version_for_year() instance
-        methods, and by the APR view/task helpers that do the same bulk lookups.
+        Used to build the ProjectVersionTimeline rows; the year based lookups
+        read the effective dates stored there (see `with_timeline_effective_date`).
         """
         return self.annotate(
             effective_date=models.Case(
@@ -373,6 +382,36 @@ class ProjectQuerySet(models.QuerySet["Project"]):
             )
         )
 
+    def with_timeline_effective_date(self):
+        """
+        Annotates each project version with the effective date stored in its
+        ProjectVersionTimeline row, without the joins of `with_effective_date`.
+        """
+        return self.annotate(effective_date=models.F("timeline_entry__effective_date"))
+
+    def in_effect_for_year(self, year):
+        """
+        The version of each project in effect at the end of `year`: the one with
+        the most recent effective date in or before `year`, the highest version
+        first for the same date. One row per final project.
+        """
+        return (
+            self.with_timeline_effective_date()
+            .filter(effective_date__year__lte=year)
+            .order_by("timeline_entry__final_project_id", "-effective_date", "-version")
+            .distinct("timeline_entry__final_project_id")
+        )
+
+    def effective_in_year(self, year):
+        """
+        The project versions whose effective date is in `year`, by version.
+        """
+        return (
+            self.with_timeline_effective_date()
+            .filter(effective_date__year=year)
+            .order_by("version")
+        )
+
 
 class ProjectManager(models.Manager["Project"].from_queryset(ProjectQuerySet)):
     def get_next_serial_number(self, country_id):
@@ -394,6 +433,112 @@ class ProjectManager(models.Manager["Project"].from_queryset(ProjectQuerySet)):
         # this method is used to get all projects, including the archived ones
         return super().get_queryset()
 
+    def copy_projects(self, projects, remove_legacy_data=False, archive=False):
+        """
+        Copy a batch of projects, with their subsectors and linked entries
+        (ODS/ODP, funds, RBM measures, progress reports, submission amounts and
+        comments), using a constant number of queries for the whole batch.
+
+        The copies are made from the saved state of the projects.
+
+        @param projects: list of Project objects (latest versions)
+        @param remove_legacy_data: bool - clear the legacy code of the copies
+        @param archive: bool - set each copy as an archived version of its project
+
+        @return: dict {project id: new Project object}
+        """
+        project_ids = [project.id for project in projects]
+        if not project_ids:
+            return {}
+
+        with transaction.atomic():
+            sources = list(self.filter(id__in=project_ids).order_by("id"))
+            if len(sources) != len(set(project_ids)):
+                raise self.model.DoesNotExist("Project matching query does not exist.")
+
+            source_ids = [source.id for source in sources]
+            for source in sources:
+                if archive:
+                    source.latest_project_id = source.id
+                if remove_legacy_data:
+                    source.legacy_code = None
+                source.pk = None
+                source._state.adding = True  # pylint: disable=W0212
+            # the new pks are set in the same order
+            new_projects = self.bulk_create(sources)
+            new_project_ids = {
+                source_id: new_project.id
+                for source_id, new_project in zip(source_ids, new_projects)
+            }
+
+            # copy the subsectors M2M rows and the linked entries
+            linked_models = [
+                self.model.subsectors.through,
+                ProjectOdsOdp,
+                ProjectFund,
+                ProjectRBMMeasure,
+                ProjectProgressReport,
+                SubmissionAmount,
+                ProjectComment,
+            ]
+            for linked_model in linked_models:
+                entries = list(
+                    linked_model.objects.filter(project_id__in=source_ids).order_by(
+                        "id"
+                    )
+                )
+                for entry in entries:
+                    entry.pk = None
+                    entry._state.adding = True  # pylint: disable=W0212
+                    entry.project_id = new_project_ids[entry.project_id]
+                linked_model.objects.bulk_create(entries)
+
+            ProjectSearchDocument.objects.refresh(list(new_project_ids.values()))
+
+        return dict(zip(source_ids, new_projects))
+
+    def increase_versions(self, projects, user):
+        """
+        Create a new version of each project of a batch: the current state is
+        archived as a copy and the project files are moved to it.
+
+        Only the version fields of the projects are updated, so the projects
+        must be saved before.
+
+        @param projects: list of Project objects (latest versions)
+        @param user: User that created the new versions
+
+        @return: dict {project id: archived Project object}
+        """
+        if not projects:
+            return {}
+
+        with transaction.atomic():
+            archived_projects = self.copy_projects(projects, archive=True)
+
+            date_updated = timezone.now()
+            for project in projects:
+                project.version += 1
+                project.version_created_by = user
+                project.date_updated = date_updated
+            self.bulk_update(
+                projects, ["version", "version_created_by", "date_updated"]
+            )
+
+            ProjectFile.objects.filter(project_id__in=archived_projects).update(
+                project_id=models.Case(
+                    *(
+                        models.When(project_id=project_id, then=archived.id)
+                        for project_id, archived in archived_projects.items()
+                    ),
+                    output_field=models.IntegerField(),
+                )
+            )
+
+            ProjectVersionTimeline.objects.refresh(archived_projects)
+
+        return archived_projects
+
 
 class ProjectComponents(models.Model):
     """
@@ -1580,57 +1725,9 @@ class Project(models.Model):
             return os.path.join(base_dir, new_file_name)
 
         with transaction.atomic():
-            # Duplicate the project
-            new_project = Project.objects.get(pk=self.pk)
-            new_project.pk = None
-            if remove_legacy_data:
-                new_project.legacy_code = None
-            new_project.save()
-
-            # set subsectors M2M field
-            new_project.subsectors.set(self.subsectors.all())
-
-            # Duplicate the linked ProjectOdsOdp entries
-            ods_odp_entries = ProjectOdsOdp.objects.filter(project=self)
-            for entry in ods_odp_entries:
-                entry.pk = None
-                entry.project = new_project
-                entry.save()
-
-            # Duplicate the linked ProjectFund entries
-            fund_entries = ProjectFund.objects.filter(project=self)
-            for entry in fund_entries:
-                entry.pk = None
-                entry.project = new_project
-                entry.save()
-
-            # Duplicate the linked ProjectRBMMeasure entries
-            rbm_entries = ProjectRBMMeasure.objects.filter(project=self)
-            for entry in rbm_entries:
-                entry.pk = None
-                entry.project = new_project
-                entry.save()
-
-            # Duplicate the linked ProjectProgressReport entries
-            progress_report_entries = ProjectProgressReport.objects.filter(project=self)
-            for entry in progress_report_entries:
-                entry.pk = None
-                entry.project = new_project
-                entry.save()
-
-            # Duplicate the linked SubmissionAmount entries
-            submission_amount_entries = SubmissionAmount.objects.filter(project=self)
-            for entry in submission_amount_entries:
-                entry.pk = None
-                entry.project = new_project
-                entry.save()
-
-            # Duplicate the ProjectComment entries
-            comment_entries = ProjectComment.objects.filter(project=self)
-            for entry in comment_entries:
-                entry.pk = None
-                entry.project = new_project
-                entry.save()
+            new_project = Project.objects.copy_projects(
+                [self], remove_legacy_data=remove_legacy_data
+            )[self.id]
 
             if duplicate_files:
                 file_entries = ProjectFile.objects.filter(project=self)
@@ -1652,15 +1749,7 @@ class Project(models.Model):
     def increase_version(self, user):
         # Create an archived copy of the current project. The archived project will have
         # the same code as the current project.
-        archieved_project = self.copy_project(duplicate_files=False)
-        archieved_project.latest_project = self
-        archieved_project.save()
-
-        self.version += 1
-        self.version_created_by = user
-        self.save()
-
-        ProjectFile.objects.filter(project=self).update(project=archieved_project)
+        Project.objects.increase_versions([self], user)
 
     def __str__(self):
         return self.title
@@ -1690,14 +1779,10 @@ class Project(models.Model):
         final = self.final_version
         return (
             Project.objects.really_all()
-            .filter(
-                models.Q(id=final.id) | models.Q(latest_project_id=final.id),
-            )
-            .with_effective_date()
-            .filter(effective_date__year=year)
+            .filter(timeline_entry__final_project_id=final.id)
+            .effective_in_year(year)
             .select_related("status")
             .only("id", "version", "status")
-            .order_by("version")
         )
 
     def latest_version_for_year(self, year):
@@ -1715,13 +1800,9 @@ class Project(models.Model):
         final = self.final_version
         return (
             Project.objects.really_all()
-            .filter(
-                models.Q(id=final.id) | models.Q(latest_project_id=final.id),
-            )
-            .with_effective_date()
-            .filter(effective_date__isnull=False, effective_date__year__lte=year)
+            .filter(timeline_entry__final_project_id=final.id)
+            .in_effect_for_year(year)
             .select_related("status", "post_excom_decision__meeting")
-            .order_by("-effective_date", "-version")
             .first()
         )
 
@@ -1749,6 +1830,121 @@ class Project(models.Model):
         return self.endorsed_apr_records.first()
 
 
+class ProjectVersionTimelineManager(models.Manager):
+    def refresh(self, final_project_ids):
+        """
+        Rebuild the timeline rows of all the versions of the given projects
+
+        Must be called whenever a version is created or one of the fields its
+        effective date is computed from changes (see
+        `ProjectQuerySet.with_effective_date`).
+
+        @param final_project_ids: iterable of final (latest) version ids
+
+        @return: number of rows created
+        """
+        final_project_ids = set(final_project_ids)
+        if not final_project_ids:
+            return 0
+
+        versions = list(
+            Project.objects.really_all()
+            .filter(
+                models.Q(id__in=final_project_ids)
+                | models.Q(latest_project_id__in=final_project_ids)
+            )
+            .with_effective_date()
+            .values_list(
+                "id", "latest_project_id", "version", "effective_date", "status_id"
+            )
+        )
+        # a version moved to another project keeps its row until it is rebuilt
+        self.filter(
+            models.Q(final_project_id__in=final_project_ids)
+            | models.Q(project_id__in=[version[0] for version in versions])
+        ).delete()
+        self.bulk_create(
+            [
+                self.model(
+                    project_id=project_id,
+                    final_project_id=latest_project_id or project_id,
+                    version=version,
+                    effective_date=effective_date,
+                    status_id=status_id,
+                )
+                for project_id, latest_project_id, version, effective_date, status_id in versions
+            ]
+        )
+        return len(versions)
+
+
+class ProjectVersionTimeline(models.Model):
+    """
+    Effective date and status of each project version, so the version in
+    effect at a given year can be looked up for many projects at once
+    (see `ProjectQuerySet.in_effect_for_year`).
+
+    Kept up to date when a project or the meeting/decision it is approved at
+    is saved and when new versions are created; bulk imports must rebuild it
+    with the `refresh_project_version_timeline` command.
+    """
+
+    final_project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="version_timeline",
+        help_text="The latest version of the project",
+    )
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="timeline_entry",
+        help_text="The project version (the final version or an archived one)",
+    )
+    version = models.IntegerField()
+    effective_date = models.DateField(null=True, blank=True)
+    status = models.ForeignKey(
+        ProjectStatus, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+
+    objects = ProjectVersionTimelineManager()
+
+    class Meta:
+        indexes = [models.Index(fields=["final_project", "effective_date", "version"])]
+
+    def __str__(self):
+        return f"{self.final_project_id} v{self.version} ({self.effective_date})"
+
+
+class ProjectSearchDocument(SearchDocument):
+    """
+    The words of the title and of the codes of a project
+    """
+
+    project = models.OneToOneField(
+        Project, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+
+    class Meta:
+        indexes = [GinIndex(fields=["vector"])]
+
+    @classmethod
+    def get_sources(cls):
+        return Project.objects.really_all().annotate(
+            search_vector=SearchVector(
+                "title",
+                CodeWords("code"),
+                CodeWords("legacy_code"),
+                CodeWords("metacode"),
+                config=SEARCH_CONFIG,
+            ),
+            search_text=JoinedText("title", "code", "legacy_code", "metacode"),
+        )
+
+    def __str__(self):
+        return str(self.project_id)
+
+
 class ProjectFile(models.Model):
     class FileType(models.TextChoices):
         PROJECT_PROPOSAL = "project_proposal", "Project proposal"
@@ -3,6 +3,7 @@ from decimal import Decimal
 
 from django.contrib.postgres import fields
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.html import format_html
@@ -80,11 +81,39 @@ class ScaleOfAssessmentVersion(models.Model):
         ]
 
 
+class ScaleOfAssessmentQuerySet(models.QuerySet):
+    def with_amounts(self):
+        """
+        Fetch everything the derived amounts (`adjusted_scale_of_assessment`,
+        `amount`, `yearly_amount` and the local currency variants) need in the
+        same query: the country, the replenishment and `un_assessment_sum`,
+        computed for each version in SQL instead of one aggregate query per
+        scale of assessment.
+        """
+        un_assessment_sums = (
+            ScaleOfAssessment.objects.filter(version=models.OuterRef("version"))
+            .exclude(country__iso3="USA")
+            .order_by()
+            .values("version")
+            .annotate(total=models.Sum("un_scale_of_assessment"))
+            .values("total")
+        )
+        return self.select_related("country", "version__replenishment").annotate(
+            un_assessment_sum=Coalesce(
+                models.Subquery(un_assessment_sums),
+                models.Value(Decimal(0)),
+                output_field=models.DecimalField(max_digits=30, decimal_places=15),
+            )
+        )
+
+
 class ScaleOfAssessment(models.Model):
     """
     Contribution to a replenishment, used in Scale of Assessment.
     """
 
+    objects = ScaleOfAssessmentQuerySet.as_manager()
+
     version = models.ForeignKey(
         ScaleOfAssessmentVersion,
         on_delete=models.PROTECT,
@@ -117,6 +146,7 @@ class ScaleOfAssessment(models.Model):
 
     @cached_property
     def un_assessment_sum(self):
+        # annotated by ScaleOfAssessmentQuerySet.with_amounts() when listing
         return (
             ScaleOfAssessment.objects.filter(version=self.version)
             .exclude(country__iso3="USA")
@@ -0,0 +1,79 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models
+
+# no stemming or stop words: the searched texts are titles, names and codes
+SEARCH_CONFIG = "simple"
+
+
+class CodeWords(models.Func):  # pylint: disable=W0223
+    """
+    The segments of a code as separate words ("ARG/REF/80/INV/01" is parsed as
+    a single file path otherwise)
+    """
+
+    function = "REGEXP_REPLACE"
+    template = "%(function)s(%(expressions)s, '\\W+', ' ', 'g')"
+    output_field = models.TextField()
+
+
+class JoinedText(models.Func):  # pylint: disable=W0223
+    """
+    The texts joined with spaces, skipping the empty ones
+    """
+
+    function = "CONCAT_WS"
+    template = "%(function)s(' ', %(expressions)s)"
+    output_field = models.TextField()
+
+
+class SearchDocumentManager(models.Manager):
+    def refresh(self, object_ids=None):
+        """
+        Compute the search documents of a set of objects with one
+        `INSERT ... SELECT` (the existing documents are updated)
+
+        @param object_ids: ids (list or queryset) of the searched objects;
+            all the objects if None
+        """
+        sources = self.model.get_sources().order_by()
+        if object_ids is not None:
+            sources = sources.filter(pk__in=object_ids)
+        sql, params = sources.values_list(
+            "pk", "search_vector", "search_text"
+        ).query.sql_with_params()
+
+        quote_name = connection.ops.quote_name
+        pk_column = quote_name(self.model._meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote_name(self.model._meta.db_table)} "
+                f"({pk_column}, vector, text) {sql} "
+                f"ON CONFLICT ({pk_column}) DO UPDATE "
+                "SET vector = EXCLUDED.vector, text = EXCLUDED.text",
+                params,
+            )
+
+
+class SearchDocument(models.Model):
+    """
+    The searched words of an object (see `core.api.filters.search`): indexed
+    for full-text search (`vector`) and for substring search (`text`, with a
+    trigram index where the pg_trgm extension is available, see migration
+    0320). The primary key is a one-to-one link to the object.
+    """
+
+    vector = SearchVectorField()
+    text = models.TextField(default="")
+
+    objects = SearchDocumentManager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_sources(cls):
+        """
+        @return: queryset of the searched objects, annotated with their
+            `search_vector` and `search_text`
+        """
+        raise NotImplementedError
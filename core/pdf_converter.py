@@ -0,0 +1,274 @@
+"""
+Pool of LibreOffice workers used to convert exported workbooks to PDF.
+
+Starting LibreOffice costs seconds of CPU and hundreds of MB of memory, so each
+process keeps a bounded pool of long-lived office instances listening on a
+UNO pipe. Conversions wait in a queue for a free worker, are killed when they
+exceed their timeout, and a worker that crashed, timed out or served too many
+jobs is recycled.
+
+When the UNO bindings are not installed, workers fall back to running
+`soffice --convert-to` per job, still bounded by the pool and keeping a warm
+profile per worker so that concurrent conversions do not fight over one.
+
+Memory: every web (gunicorn) and Celery process has its own pool, started on
+its first conversion, and an office instance takes up to about 250 MB once it
+has converted a report. Budget processes x PDF_CONVERTER_POOL_SIZE x 250 MB on
+top of the processes themselves: with the default pool of one instance, each
+gunicorn worker of the app container (2g mem_limit) needs roughly 550 MB, so
+the container fits up to 3 workers. Raise the pool size only together with the
+memory limit (or with fewer workers). Conversions beyond the pool wait in its
+queue; the requests that wait longer than PDF_CONVERTER_QUEUE_TIMEOUT get a 503
+asking the client to retry.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+UNO_CONVERT_SCRIPT = Path(__file__).resolve().parent / "uno_convert.py"
+
+
+class PDFConversionError(Exception):
+    pass
+
+
+class PDFConverterBusyError(PDFConversionError):
+    """All the workers stayed busy for the whole queue timeout"""
+
+
+def get_office_binary():
+    office_bin = shutil.which("libreoffice") or shutil.which("soffice")
+    if office_bin is None:
+        raise PDFConversionError("LibreOffice is not installed.")
+    return office_bin
+
+
+def has_uno_bindings(python_bin):
+    try:
+        subprocess.run(
+            [python_bin, "-c", "import uno"],
+            check=True,
+            timeout=30,
+            capture_output=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return True
+
+
+def _kill_process_group(process):
+    # soffice forks its own children; kill them together
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def _run(args, timeout, **kwargs):
+    """Run a command in its own process group, killing the whole group on timeout."""
+    with subprocess.Popen(
+        args,
+        start_new_session=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        **kwargs,
+    ) as process:
+        try:
+            _, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            _kill_process_group(process)
+            raise PDFConversionError(
+                f"PDF conversion timed out after {timeout}s."
+            ) from e
+    if process.returncode != 0:
+        raise PDFConversionError(
+            f"PDF conversion failed: {stderr.decode(errors='replace')[-500:]}"
+        )
+
+
+class OfficeWorker:
+    """
+    A LibreOffice instance with its own profile.
+
+    Runs as a long-lived listener when `uno_python` is set, otherwise a new
+    office process converts each job using the same (already initialised)
+    profile.
+    """
+
+    def __init__(self, name, uno_python=None):
+        self.name = name
+        self.uno_python = uno_python
+        self.process = None
+        self.profile_dir = None
+        self.jobs_count = 0
+
+    def _profile_url(self):
+        if self.profile_dir is None:
+            self.profile_dir = tempfile.mkdtemp(prefix=f"mlf-office-{self.name}-")
+        return Path(self.profile_dir).as_uri()
+
+    def start(self):
+        self.process = subprocess.Popen(  # pylint: disable=R1732
+            [
+                get_office_binary(),
+                f"-env:UserInstallation={self._profile_url()}",
+                "--headless",
+                "--invisible",
+                "--nologo",
+                "--nodefault",
+                "--norestore",
+                "--nolockcheck",
+                f"--accept=pipe,name={self.name};urp;StarOffice.ComponentContext",
+            ],
+            start_new_session=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self.jobs_count = 0
+
+    def stop(self):
+        if self.process is not None:
+            _kill_process_group(self.process)
+            self.process = None
+        if self.profile_dir is not None:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def convert(self, xlsx_file, pdf_file, timeout):
+        """
+        @param xlsx_file: Path - the workbook to convert
+        @param pdf_file: Path - where to write the PDF; must be next to xlsx_file
+        @param timeout: int - seconds before the job is killed
+        """
+        if self.jobs_count >= settings.PDF_CONVERTER_MAX_JOBS:
+            # Bound the memory an office instance can accumulate
+            self.stop()
+
+        try:
+            if self.uno_python:
+                if self.process is None or self.process.poll() is not None:
+                    self.stop()
+                    self.start()
+                _run(
+                    [
+                        self.uno_python,
+                        str(UNO_CONVERT_SCRIPT),
+                        self.name,
+                        str(xlsx_file),
+                        str(pdf_file),
+                        str(timeout),
+                    ],
+                    timeout,
+                )
+            else:
+                _run(
+                    [
+                        get_office_binary(),
+                        f"-env:UserInstallation={self._profile_url()}",
+                        "--headless",
+                        "--convert-to",
+                        "pdf",
+                        str(xlsx_file),
+                    ],
+                    timeout,
+                    cwd=pdf_file.parent,
+                )
+        except PDFConversionError:
+            # The instance may be hung or corrupted; start from scratch next time
+            logger.exception("Recycling office worker %s", self.name)
+            self.stop()
+            raise
+
+        self.jobs_count += 1
+        if not pdf_file.exists():
+            raise PDFConversionError("PDF conversion produced no output.")
+
+
+class PDFConverter:
+    """
+    Bounded pool of office workers. Jobs wait in a queue for a free worker.
+    """
+
+    def __init__(self, size, job_timeout, queue_timeout, uno_python=None):
+        self.job_timeout = job_timeout
+        self.queue_timeout = queue_timeout
+        self.pid = os.getpid()
+        self.workers = [
+            OfficeWorker(f"mlf-office-{os.getpid()}-{index}", uno_python)
+            for index in range(size)
+        ]
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+
+    def convert(self, xlsx_file, pdf_file):
+        """
+        Convert a workbook file to PDF on the first free worker.
+
+        @param xlsx_file: Path
+        @param pdf_file: Path - must be in the same directory as xlsx_file, with
+            the same name and a .pdf extension
+        """
+        try:
+            worker = self._idle.get(timeout=self.queue_timeout)
+        except queue.Empty as e:
+            raise PDFConverterBusyError(
+                "All PDF converters are busy, please try again later."
+            ) from e
+
+        try:
+            worker.convert(Path(xlsx_file), Path(pdf_file), self.job_timeout)
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        if self.pid != os.getpid():
+            # Inherited through fork; the instances belong to the parent
+            return
+        for worker in self.workers:
+            worker.stop()
+
+
+_converter = None
+_converter_lock = threading.Lock()
+
+
+def get_pdf_converter():
+    """
+    Get the converter of the current process, creating it on first use.
+
+    Forked processes (e.g. web and Celery workers) each get their own pool.
+    """
+    global _converter  # pylint: disable=W0603
+
+    with _converter_lock:
+        if _converter is None or _converter.pid != os.getpid():
+            uno_python = settings.PDF_CONVERTER_UNO_PYTHON
+            if uno_python and not has_uno_bindings(uno_python):
+                logger.warning(
+                    "No UNO bindings for %s, converting PDFs with one-shot "
+                    "LibreOffice processes",
+                    uno_python,
+                )
+                uno_python = None
+            _converter = PDFConverter(
+                settings.PDF_CONVERTER_POOL_SIZE,
+                settings.PDF_CONVERTER_JOB_TIMEOUT,
+                settings.PDF_CONVERTER_QUEUE_TIMEOUT,
+                uno_python,
+            )
+            atexit.register(_converter.close)
+        return _converter
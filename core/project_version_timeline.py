@@ -0,0 +1,82 @@
+"""
+Keep the ProjectVersionTimeline up to date when the data the effective date of
+a project version is computed from is saved.
+
+The bulk operations do not send these signals; they must refresh the timeline
+themselves (see `ProjectManager.increase_versions`) or be followed by the
+`refresh_project_version_timeline` command.
+"""
+
+from django.db import models
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save
+
+from core.models.meeting import Decision, Meeting
+from core.models.project import Project, ProjectVersionTimeline
+
+# pylint: disable=W0613
+
+# the Project fields a timeline row is computed from
+TIMELINE_FIELDS = {
+    "version",
+    "latest_project",
+    "status",
+    "post_excom_decision",
+    "post_excom_meeting",
+    "transfer_decision",
+    "transfer_meeting",
+    "date_approved",
+}
+
+
+def _refresh_projects(projects):
+    ProjectVersionTimeline.objects.refresh(
+        projects.values_list(Coalesce("latest_project_id", "id"), flat=True)
+    )
+
+
+def _on_project_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not TIMELINE_FIELDS.intersection(
+        field.removesuffix("_id") for field in update_fields
+    ):
+        return
+    ProjectVersionTimeline.objects.refresh([instance.latest_project_id or instance.id])
+
+
+def _on_meeting_save(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    _refresh_projects(
+        Project.objects.really_all().filter(
+            models.Q(post_excom_meeting=instance)
+            | models.Q(transfer_meeting=instance)
+            | models.Q(post_excom_decision__meeting=instance)
+            | models.Q(transfer_decision__meeting=instance)
+        )
+    )
+
+
+def _on_decision_save(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    _refresh_projects(
+        Project.objects.really_all().filter(
+            models.Q(post_excom_decision=instance)
+            | models.Q(transfer_decision=instance)
+        )
+    )
+
+
+for _model, _handler in (
+    (Project, _on_project_save),
+    (Meeting, _on_meeting_save),
+    (Decision, _on_decision_save),
+):
+    post_save.connect(
+        _handler,
+        sender=_model,
+        weak=False,
+        dispatch_uid=f"project_version_timeline_{_model._meta.label}",  # pylint: disable=W0212
+    )
@@ -0,0 +1,508 @@
+"""
+Two-tier cache of the reference data used by most CP views and exporters:
+usages, groups, country regions, the CP report formats and the chemical names
+index used by the importers.
+
+This data almost never changes, so each kind of data is built once and kept
+ - in the memory of each process (first tier)
+ - in the "reference_data" cache (second tier, Redis in production), shared by
+   all the web and Celery processes
+
+under the version tokens of the models it is built from. The tokens are stored
+in the shared tier and replaced when an instance of the model is saved or
+deleted, so every process rebuilds or refetches the data on the next access.
+
+Bulk operations (`QuerySet.update`, `bulk_create`, raw SQL) do not send
+signals; call `invalidate_reference_data()` after them.
+
+The shared tier needs REFERENCE_DATA_CACHE_URL. Without it, the cache falls
+back to the memory of each process, where the changes made by the other
+processes are not seen: the version tokens then expire after
+REFERENCE_DATA_VERSION_TIMEOUT, so the data is rebuilt at least that often.
+
+The cached objects are shared between requests and must not be modified.
+"""
+
+import hashlib
+import logging
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+from decimal import Decimal
+from typing import Callable, Generic, TypeVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from core.models.blend import Blend, BlendAltName, BlendComponents
+from core.models.country_programme import CPReportFormatRow
+from core.models.country import Country
+from core.models.group import Group
+from core.models.substance import Substance, SubstanceAltName
+from core.models.usage import Usage
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+REFERENCE_MODELS = [
+    "core.AdmChoice",
+    "core.AdmColumn",
+    "core.AdmEmptyImmutableCell",
+    "core.AdmRow",
+    "core.Blend",
+    "core.BlendAltName",
+    "core.BlendComponents",
+    "core.Country",
+    "core.CPReportFormatColumn",
+    "core.CPReportFormatRow",
+    "core.ExcludedUsage",
+    "core.Group",
+    "core.Substance",
+    "core.SubstanceAltName",
+    "core.TimeFrame",
+    "core.Usage",
+]
+
+# models the CP report format rows depend on (chemicals and time frames)
+CP_FORMAT_ROW_MODELS = [
+    "core.CPReportFormatRow",
+    "core.Substance",
+    "core.Blend",
+    "core.BlendComponents",
+    "core.Group",
+    "core.ExcludedUsage",
+    "core.TimeFrame",
+]
+CP_FORMAT_COLUMN_MODELS = [
+    "core.CPReportFormatColumn",
+    "core.Usage",
+    "core.TimeFrame",
+]
+CHEMICAL_MODELS = [
+    "core.Substance",
+    "core.SubstanceAltName",
+    "core.Blend",
+    "core.BlendAltName",
+    "core.BlendComponents",
+]
+ADM_FORMAT_MODELS = [
+    "core.AdmChoice",
+    "core.AdmColumn",
+    "core.AdmEmptyImmutableCell",
+    "core.AdmRow",
+    "core.TimeFrame",
+]
+
+
+if not settings.REFERENCE_DATA_CACHE_URL and not settings.DEBUG:
+    logger.warning(
+        "REFERENCE_DATA_CACHE_URL is not set: the reference data is cached per "
+        "process and rebuilt every %s seconds",
+        settings.REFERENCE_DATA_VERSION_TIMEOUT,
+    )
+
+
+def _shared_call(method, *args, **kwargs):
+    """
+    Call a method of the shared cache; if the cache is not available, log the
+    error and return None (the data is then built on every access)
+    """
+    try:
+        return getattr(caches["reference_data"], method)(*args, **kwargs)
+    except Exception:  # pylint: disable=W0718
+        logger.exception("Reference data cache %s failed", method)
+        return None
+
+
+def _get_version_key(model):
+    return f"version:{model}"
+
+
+def get_versions(models):
+    """
+    Get the version tokens of the given models, creating the missing ones
+
+    @param models: list of "app_label.ModelName"
+    @return: str - the tokens joined, or None if the shared cache is down
+    """
+    keys = [_get_version_key(model) for model in models]
+    versions = _shared_call("get_many", keys)
+    if versions is None:
+        return None
+    for key in keys:
+        if key not in versions:
+            # another process may set it at the same time; keep the first one
+            _shared_call(
+                "add", key, uuid.uuid4().hex, settings.REFERENCE_DATA_VERSION_TIMEOUT
+            )
+            versions[key] = _shared_call("get", key)
+            if versions[key] is None:
+                return None
+    return ":".join(versions[key] for key in keys)
+
+
+# {model: number of changes made by this process}
+_local_changes: defaultdict[str, int] = defaultdict(int)
+
+
+def get_local_change_count(models):
+    """
+    Number of changes of the given models made by this process (saves, deletes
+    and `invalidate_reference_data()` calls); unlike the version tokens, it
+    does not need the shared cache
+
+    @param models: list of "app_label.ModelName"
+    @return: int
+    """
+    return sum(_local_changes[model] for model in models)
+
+
+def invalidate_model(model):
+    """
+    @param model: str - "app_label.ModelName"
+    """
+    _local_changes[model] += 1
+    _shared_call(
+        "set",
+        _get_version_key(model),
+        uuid.uuid4().hex,
+        settings.REFERENCE_DATA_VERSION_TIMEOUT,
+    )
+
+
+class ReferenceData(Generic[T]):
+    """
+    Cached value built by `build(*args)`, invalidated when an instance of
+    one of `models` is saved or deleted
+
+    @param name: unique name, used as prefix for the cache keys
+    @param models: list of "app_label.ModelName" from REFERENCE_MODELS the data
+        is built from
+    @param build: function that builds the value from the accessor arguments;
+        the arguments must have a stable repr and the value must be picklable
+    @param local_size: number of argument tuples kept in the memory of the
+        process (the least recently used are dropped first); the others are
+        only kept in the shared cache
+    """
+
+    registry: dict[str, "ReferenceData"] = {}
+
+    def __init__(
+        self,
+        name: str,
+        models: list[str],
+        build: Callable[..., T],
+        local_size: int = 64,
+    ):
+        self.name = name
+        self.models = list(dict.fromkeys(models))
+        self.build = build
+        self.local_size = local_size
+        # {args: (token, value)}, the most recently used last
+        self._local: OrderedDict[tuple, tuple[str, T]] = OrderedDict()
+        self._local_lock = threading.Lock()
+        ReferenceData.registry[name] = self
+
+    def get(self, *args) -> T:
+        """
+        Get the value for the given arguments, building it if needed
+
+        @return: the cached value (must not be modified)
+        """
+        return self.get_with_token(*args)[1]
+
+    def get_with_token(self, *args) -> tuple[str | None, T]:
+        """
+        Get the value for the given arguments and a token that changes
+        whenever the value may change (e.g. for an ETag)
+
+        @return: tuple (token, cached value); token is None if the shared
+            cache is not available
+        """
+        version = get_versions(self.models)
+        if version is None:
+            # without the shared versions the local tier could be stale
+            return None, self.build(*args)
+
+        token = hashlib.sha1(f"{version}:{args!r}".encode()).hexdigest()
+        local = self._get_local(args)
+        if local is not None and local[0] == token:
+            return token, local[1]
+
+        key = f"{self.name}:{token}"
+        value = _shared_call("get", key)
+        if value is None:
+            value = self.build(*args)
+            _shared_call("set", key, value, settings.REFERENCE_DATA_CACHE_TIMEOUT)
+        self._set_local(args, (token, value))
+        return token, value
+
+    def _get_local(self, args):
+        with self._local_lock:
+            local = self._local.get(args)
+            if local is not None:
+                self._local.move_to_end(args)
+            return local
+
+    def _set_local(self, args, local):
+        with self._local_lock:
+            self._local[args] = local
+            self._local.move_to_end(args)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def clear_local(self):
+        with self._local_lock:
+            self._local.clear()
+
+
+def invalidate_reference_data():
+    for model in REFERENCE_MODELS:
+        invalidate_model(model)
+    for reference_data in ReferenceData.registry.values():
+        reference_data.clear_local()
+
+
+def _on_change(sender, **kwargs):
+    model = sender._meta.label  # pylint: disable=W0212
+    # invalidate now for this transaction, and again after the commit in case
+    # another process cached the old data in the meantime
+    invalidate_model(model)
+    transaction.on_commit(lambda: invalidate_model(model))
+
+
+for _model in REFERENCE_MODELS:
+    for _signal in (post_save, post_delete):
+        _signal.connect(
+            _on_change,
+            sender=_model,
+            weak=False,
+            dispatch_uid=f"reference_data_{_model}",
+        )
+
+
+def _get_name_key(name):
+    return name.strip().upper()
+
+
+# the precision of BlendComponents.percentage (5 decimal places)
+PERCENTAGE_QUANTUM = Decimal("0.00001")
+
+
+def _get_components_key(components_list):
+    """
+    @param components_list: list of tuples (substance_id, percentage), the
+        percentage as a fraction of 1
+    @return: tuple - the same components in a canonical order, the
+        percentages rounded like the BlendComponents values
+        (e.g. 33.3 / 100 -> 0.33300)
+    """
+    return tuple(
+        sorted(
+            (substance_id, Decimal(str(percentage)).quantize(PERCENTAGE_QUANTUM))
+            for substance_id, percentage in components_list
+        )
+    )
+
+
+class ChemicalResolver:
+    """
+    Index of the substances and blends by name, alternative name and
+    components, to resolve the chemicals of the imported rows without queries.
+
+    Finds the same chemicals as the `find_by_name*` methods of the Substance
+    and Blend managers (case insensitive names, the lowest id on duplicates).
+    """
+
+    def __init__(self):
+        self.substances = {}
+        self.blends = {}
+        self.blends_by_components = {}
+
+    @classmethod
+    def build(cls):
+        resolver = cls()
+        substances = {}
+        for substance in Substance.objects.order_by("id"):
+            substances[substance.id] = substance
+            resolver.substances.setdefault(substance.name.upper(), substance)
+        for alt_name in SubstanceAltName.objects.order_by("id"):
+            resolver.substances.setdefault(
+                alt_name.name.upper(), substances[alt_name.substance_id]
+            )
+
+        blends = {}
+        for blend in Blend.objects.order_by("id"):
+            blends[blend.id] = blend
+            for name in (
+                blend.name,
+                blend.other_names,
+                blend.composition,
+                blend.composition_alt,
+            ):
+                if name:
+                    resolver.blends.setdefault(name.upper(), blend)
+        for alt_name in BlendAltName.objects.order_by("id"):
+            resolver.blends.setdefault(alt_name.name.upper(), blends[alt_name.blend_id])
+
+        blend_components = defaultdict(list)
+        for blend_id, substance_id, percentage in BlendComponents.objects.values_list(
+            "blend_id", "substance_id", "percentage"
+        ):
+            blend_components[blend_id].append((substance_id, percentage))
+        for blend_id in sorted(blend_components):
+            resolver.blends_by_components.setdefault(
+                _get_components_key(blend_components[blend_id]), blends[blend_id]
+            )
+        return resolver
+
+    def find_substance(self, name):
+        """
+        @param name: substance name or alternative name
+        @return: Substance object or None
+        """
+        return self.substances.get(_get_name_key(name))
+
+    def find_blend_by_name(self, name):
+        """
+        @param name: blend name, other name, composition or alternative name
+        @return: Blend object or None
+        """
+        return self.blends.get(_get_name_key(name))
+
+    def get_blend_by_components(self, components_list):
+        """
+        @param components_list: list of tuples (substance_id, percentage), the
+            percentage as a fraction of 1
+        @return: Blend object with exactly these components or None
+        """
+        return self.blends_by_components.get(_get_components_key(components_list))
+
+    def find_blend_by_components(self, components):
+        """
+        @param components: list of tuples (substance_name, percentage)
+        @return: Blend object or None
+        """
+        components_list = []
+        for substance_name, percentage in components:
+            substance = self.find_substance(substance_name)
+            if not substance:
+                return None
+            try:
+                components_list.append((substance.id, float(percentage) / 100))
+            except ValueError:
+                # if the percentage is not a number
+                return None
+        return self.get_blend_by_components(components_list)
+
+    def find_chemical(self, name, components=None):
+        """
+        Get a substance by name or a blend by name or components
+
+        @param name: chemical name
+        @param components: list of tuples (substance_name, percentage) (for blends)
+
+        @return: tuple(object, string) (substance | blend, chemical_type)
+        """
+        substance = self.find_substance(name)
+        if substance:
+            return substance, "substance"
+
+        blend = self.find_blend_by_name(name)
+        if not blend and components:
+            blend = self.find_blend_by_components(components)
+        if blend:
+            return blend, "blend"
+
+        return None, None
+
+
+def _build_usages():
+    return list(Usage.objects.order_by("id"))
+
+
+def _build_group(name):
+    return Group.objects.filter(name=name).first()
+
+
+def _build_country_region_dict():
+    countries = Country.objects.all().select_related("parent__parent")
+    country_region_dict = {}
+    for country in countries:
+        if country.parent_id and country.parent.parent_id:
+            country_region_dict[country.id] = country.parent.parent.name
+        elif country.parent_id:
+            country_region_dict[country.id] = country.parent.name
+        else:
+            country_region_dict[country.id] = country.name
+
+    return country_region_dict
+
+
+def _build_cp_format_rows(year, filter_list):
+    return list(
+        CPReportFormatRow.objects.get_for_year(year)
+        .filter(*filter_list)
+        .select_related("substance__group", "blend")
+        .prefetch_related("blend__components")
+        .order_by("id")
+    )
+
+
+usages = ReferenceData("usages", ["core.Usage"], _build_usages)
+groups = ReferenceData("groups", ["core.Group"], _build_group)
+country_regions = ReferenceData(
+    "country_regions", ["core.Country"], _build_country_region_dict
+)
+cp_format_rows = ReferenceData(
+    "cp_format_rows", CP_FORMAT_ROW_MODELS, _build_cp_format_rows
+)
+chemical_resolver = ReferenceData(
+    "chemical_resolver", CHEMICAL_MODELS, ChemicalResolver.build
+)
+
+
+def get_usages() -> list[Usage]:
+    """
+    @return: list of all the usages, ordered by id
+    """
+    return usages.get()
+
+
+def get_group(name) -> Group | None:
+    """
+    @param name: str - group name (e.g. "F")
+    @return: Group object or None
+    """
+    return groups.get(name)
+
+
+def get_country_region_dict() -> dict[int, str]:
+    """
+    @return: dict {country_id: region name}; for the regions and the
+        countries without a region, the name of the country itself
+    """
+    return country_regions.get()
+
+
+def get_cp_format_rows(year, filter_list=None) -> list[CPReportFormatRow]:
+    """
+    Get the chemicals displayed in the CP report format of a year
+    (with the substance, group and blend components fetched)
+
+    @param year: int - year
+    @param filter_list: list of Q objects to apply to the rows
+
+    @return: list of CPReportFormatRow objects, ordered by id
+    """
+    return cp_format_rows.get(year, tuple(filter_list or ()))
+
+
+def get_chemical_resolver() -> ChemicalResolver:
+    """
+    @return: ChemicalResolver of all the substances and blends
+    """
+    return chemical_resolver.get()
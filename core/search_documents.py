@@ -0,0 +1,97 @@
+"""
+Keep the search documents of the projects and business plan activities up to
+date when the data they are computed from is saved.
+
+The bulk operations do not send these signals; they must refresh the
+documents themselves (see `ProjectManager.copy_projects` and
+`BusinessPlanCreateSerializer`) or be followed by the
+`refresh_search_documents` command.
+"""
+
+from django.db.models.signals import m2m_changed, post_save
+
+from core.models.business_plan import (
+    BPActivity,
+    BPActivitySearchDocument,
+    BPChemicalType,
+)
+from core.models.project import Project, ProjectSearchDocument
+from core.models.substance import Substance
+
+# pylint: disable=W0613
+
+# the Project fields a search document is computed from
+PROJECT_SEARCH_FIELDS = {"title", "code", "legacy_code", "metacode"}
+
+
+def _on_project_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not PROJECT_SEARCH_FIELDS.intersection(
+        update_fields
+    ):
+        return
+    ProjectSearchDocument.objects.refresh([instance.id])
+
+
+def _on_activity_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    BPActivitySearchDocument.objects.refresh([instance.id])
+
+
+def _on_activity_substances_change(
+    sender, instance, action, reverse, pk_set=None, **kwargs
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            BPActivitySearchDocument.objects.refresh([instance.id])
+        return
+
+    # the activities of a substance are not known after they are cleared
+    if action == "pre_clear":
+        instance.cleared_activity_ids = list(
+            instance.bpactivity_set.values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        BPActivitySearchDocument.objects.refresh(
+            instance.__dict__.pop("cleared_activity_ids", [])
+        )
+    elif action in ("post_add", "post_remove"):
+        BPActivitySearchDocument.objects.refresh(pk_set)
+
+
+def _on_chemical_type_save(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    BPActivitySearchDocument.objects.refresh(
+        BPActivity.objects.filter(bp_chemical_type=instance).values("id")
+    )
+
+
+def _on_substance_save(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    BPActivitySearchDocument.objects.refresh(
+        BPActivity.objects.filter(substances=instance).values("id")
+    )
+
+
+for _model, _handler in (
+    (Project, _on_project_save),
+    (BPActivity, _on_activity_save),
+    (BPChemicalType, _on_chemical_type_save),
+    (Substance, _on_substance_save),
+):
+    post_save.connect(
+        _handler,
+        sender=_model,
+        weak=False,
+        dispatch_uid=f"search_documents_{_model._meta.label}",  # pylint: disable=W0212
+    )
+m2m_changed.connect(
+    _on_activity_substances_change,
+    sender=BPActivity.substances.through,
+    weak=False,
+    dispatch_uid="search_documents_bpactivity_substances",
+)
@@ -1,5 +1,6 @@
 # pylint: disable=C0302
 
+import time
 from urllib.parse import urlencode
 from datetime import datetime
 
@@ -11,11 +12,13 @@ from django.core.mail import EmailMultiAlternatives
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
 from django.db import models as django_models
+from django.db.models.functions import Coalesce
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.template import loader
 from django.utils import timezone
 
+from core.api.export_jobs import export_job_heartbeat, render_export_job
 from core.api.filters.annual_project_reports import APRProjectFilter
 from core.api.utils import (
     all_versions_for_year_base_qs,
@@ -23,18 +26,21 @@ from core.api.utils import (
     COUNTRY_USER_GROUP,
     COUNTRY_SUBMITTER_GROUP,
     get_previous_year_project_reports,
-    log_project_history,
+    log_projects_history,
 )
 from core.forms import CountryUserPasswordResetForm
 from core.import_data.utils import parse_date
 from core.models.country_programme import CPComment, CPReport
 from core.models.meeting import Decision, Meeting
+from core.models.project import ProjectVersionTimeline
 from core.models import (
     Agency,
     Project,
     AnnualAgencyProjectReport,
     AnnualProjectReport,
     AnnualProgressReport,
+    APREndorsementJob,
+    ExportJob,
     ProjectStatus,
 )
 
@@ -46,6 +52,8 @@ User = get_user_model()
 # pylint: disable=W0718
 
 APR_VERSIONING_START_YEAR = 2025
+# APR entries processed (and committed) at once after an APR endorsement
+APR_ENDORSEMENT_CHUNK_SIZE = 200
 
 
 def send_html_mail(
@@ -73,66 +81,80 @@ def send_html_mail(
 
 
 # Annual Progress Report
-@app.task()
-def update_project_statuses_after_apr_endorsement(progress_report_id):
+def _apply_apr_status_changes(changes, user, year):
     """
-    When an AnnualProgressReport is endorsed and year >= 2025,
-    create a new version for every project whose status was changed during the APR cycle.
+    Create a new version of a batch of projects with their status changed
+    after an APR endorsement; all or none of the projects are updated
 
-    Single-project failures are logged and admins notified, but other projects
-    continue to be processed.
+    @param changes: list of tuples (project, new ProjectStatus)
+    @param user: User that submitted the APR of the projects
+    @param year: int - APR year
     """
-    try:
-        progress_report = AnnualProgressReport.objects.get(id=progress_report_id)
-    except AnnualProgressReport.DoesNotExist:
-        logger.error(
-            "APR endorsement: AnnualProgressReport %s not found.",
-            progress_report_id,
-        )
-        return
-
-    if progress_report.year < APR_VERSIONING_START_YEAR:
-        return
+    projects = [project for project, _ in changes]
+    with transaction.atomic():
+        Project.objects.increase_versions(projects, user)
+        history = []
+        for project, new_status in changes:
+            history.append(
+                (
+                    project,
+                    f"APR {year}: Status changed from {project.status.name} "
+                    f"to {new_status.name}",
+                )
+            )
+            project.status = new_status
+        Project.objects.bulk_update(projects, ["status"])
+        # increase_versions refreshed the timeline before the status changed
+        ProjectVersionTimeline.objects.refresh(project.id for project in projects)
+        log_projects_history(history, user)
 
-    if not progress_report.endorsed:
-        logger.error(
-            "APR endorsement: AnnualProgressReport %s is not endorsed.",
-            progress_report_id,
-        )
-        return
 
-    year = progress_report.year
+def _get_apr_endorsement_entries(progress_report):
+    """
+    The APR entries deciding the status of each project: the first entry
+    (by id) with a status of every project reported in the APR
 
-    apr_entries = (
-        AnnualProjectReport.objects.filter(
-            report__progress_report=progress_report,
-        )
-        .exclude(status="")
-        .select_related("project__status", "report__submitted_by")
-        .order_by("id")
+    @return: queryset of AnnualProjectReport objects, ordered by id
+    """
+    entries = AnnualProjectReport.objects.filter(
+        report__progress_report=progress_report,
+    ).exclude(status="")
+    first_entry_ids = (
+        entries.order_by("project_id", "id").distinct("project_id").values("id")
     )
+    return AnnualProjectReport.objects.filter(id__in=first_entry_ids).order_by("id")
+
 
-    processed_project_ids = set()
+def _process_apr_endorsement_entries(entries, statuses, year):
+    """
+    Apply the status changes of a chunk of APR entries.
+
+    The projects are versioned in one batch per submitting user; if a batch
+    fails, its projects are retried one at a time.
+
+    @param entries: list of AnnualProjectReport objects
+    @param statuses: dict {name: ProjectStatus}
+    @param year: int - APR year
+
+    @return: list of the ids of the projects that failed to be updated
+    """
+    # {user id: (user, [(project, new status)])}
+    changes_by_user = {}
     failures = []
 
-    for entry in apr_entries:
+    for entry in entries:
         project = entry.project
 
-        if project.id in processed_project_ids:
-            continue
-
         if entry.status == project.status.name:
-            processed_project_ids.add(project.id)
             continue
 
-        new_status = ProjectStatus.objects.filter(name=entry.status).first()
+        new_status = statuses.get(entry.status)
         if new_status is None:
             logger.error(
                 "APR endorsement: Unknown status name '%s' for project %s. Skipping.",
                 entry.status,
                 project.id,
             )
-            processed_project_ids.add(project.id)
             continue
 
         user = entry.report.submitted_by
@@ -143,49 +165,160 @@ def update_project_statuses_after_apr_endorsement(progress_report_id):
                 entry.report.id,
                 project.id,
             )
-            processed_project_ids.add(project.id)
             continue
 
+        changes_by_user.setdefault(user.id, (user, []))[1].append((project, new_status))
+
+    for user, changes in changes_by_user.values():
         try:
-            with transaction.atomic():
-                prev_status_name = project.status.name
-                project.increase_version(user)
-                project.status = new_status
-                project.save(update_fields=["status"])
-                log_project_history(
-                    project,
-                    user,
-                    f"APR {year}: Status changed from {prev_status_name} to {new_status.name}",
-                )
-            processed_project_ids.add(project.id)
+            _apply_apr_status_changes(changes, user, year)
+            continue
         except Exception:
             logger.exception(
-                "APR endorsement: Failed to update project %s for APR year %s.",
-                project.id,
+                "APR endorsement: Failed to update the projects submitted by "
+                "user %s for APR year %s. Retrying one project at a time.",
+                user.id,
                 year,
             )
-            processed_project_ids.add(project.id)
-            failures.append(project.id)
-
-    if failures:
-        recipients = config.APR_AGENCY_SUBMISSION_NOTIFICATIONS_EMAILS
-        if isinstance(recipients, str):
-            recipients = [r.strip() for r in recipients.split(",")]
-        recipients = [r for r in recipients if r]
-
-        if recipients:
-            project_ids_str = ", ".join(str(pid) for pid in failures)
-            send_mail(
-                subject=f"APR {year}: Failed to update project statuses after endorsement",
-                message=(
-                    f"The following project IDs failed to have their status updated "
-                    f"after endorsing APR {year}: {project_ids_str}.\n\n"
-                    f"Please check the application logs for details."
-                ),
-                from_email=None,
-                recipient_list=recipients,
-                fail_silently=True,
-            )
+
+        # isolate the failing projects
+        for project, new_status in changes:
+            try:
+                project.refresh_from_db()
+                _apply_apr_status_changes([(project, new_status)], user, year)
+            except Exception:
+                logger.exception(
+                    "APR endorsement: Failed to update project %s for APR year %s.",
+                    project.id,
+                    year,
+                )
+                failures.append(project.id)
+
+    return failures
+
+
+def _notify_apr_endorsement_failures(year, failures):
+    recipients = config.APR_AGENCY_SUBMISSION_NOTIFICATIONS_EMAILS
+    if isinstance(recipients, str):
+        recipients = [r.strip() for r in recipients.split(",")]
+    recipients = [r for r in recipients if r]
+
+    if recipients:
+        project_ids_str = ", ".join(str(pid) for pid in failures)
+        send_mail(
+            subject=f"APR {year}: Failed to update project statuses after endorsement",
+            message=(
+                f"The following project IDs failed to have their status updated "
+                f"after endorsing APR {year}: {project_ids_str}.\n\n"
+                f"Please check the application logs for details."
+            ),
+            from_email=None,
+            recipient_list=recipients,
+            fail_silently=True,
+        )
+
+
+# acks_late: the task is delivered again if the worker dies while running it
+@app.task(acks_late=True, reject_on_worker_lost=True)
+def update_project_statuses_after_apr_endorsement(progress_report_id):
+    """
+    When an AnnualProgressReport is endorsed and year >= 2025,
+    create a new version for every project whose status was changed during the APR cycle.
+
+    The APR entries are processed in chunks of APR_ENDORSEMENT_CHUNK_SIZE, each
+    chunk in a transaction together with the progress of its APREndorsementJob.
+    A job that was interrupted (or failed) resumes after its last chunk when
+    the task runs again. Single-project failures are logged and admins
+    notified, but other projects continue to be processed.
+    """
+    try:
+        progress_report = AnnualProgressReport.objects.get(id=progress_report_id)
+    except AnnualProgressReport.DoesNotExist:
+        logger.error(
+            "APR endorsement: AnnualProgressReport %s not found.",
+            progress_report_id,
+        )
+        return
+
+    if progress_report.year < APR_VERSIONING_START_YEAR:
+        return
+
+    if not progress_report.endorsed:
+        logger.error(
+            "APR endorsement: AnnualProgressReport %s is not endorsed.",
+            progress_report_id,
+        )
+        return
+
+    year = progress_report.year
+    entries = _get_apr_endorsement_entries(progress_report)
+
+    job, _ = APREndorsementJob.objects.get_or_create(progress_report=progress_report)
+    if job.status == APREndorsementJob.JobStatus.SUCCESS:
+        return
+    update_fields = ["status", "error", "updated_at"]
+    if job.status == APREndorsementJob.JobStatus.PENDING:
+        job.total = entries.count()
+        job.started_at = timezone.now()
+        update_fields += ["total", "started_at"]
+    else:
+        logger.info(
+            "APR endorsement: Resuming APR %s after entry %s (%s/%s processed).",
+            year,
+            job.last_entry_id,
+            job.processed,
+            job.total,
+        )
+    job.status = APREndorsementJob.JobStatus.RUNNING
+    job.error = ""
+    job.save(update_fields=update_fields)
+
+    statuses = {status.name: status for status in ProjectStatus.objects.all()}
+    entries = entries.select_related("project__status", "report__submitted_by")
+
+    try:
+        while True:
+            with transaction.atomic():
+                # another run of the task waits here for the current chunk
+                job = APREndorsementJob.objects.select_for_update().get(id=job.id)
+                chunk = list(
+                    entries.filter(id__gt=job.last_entry_id)[
+                        :APR_ENDORSEMENT_CHUNK_SIZE
+                    ]
+                )
+                if not chunk:
+                    break
+
+                failures = _process_apr_endorsement_entries(chunk, statuses, year)
+                job.processed += len(chunk)
+                job.failed += len(failures)
+                job.failed_project_ids += failures
+                job.last_entry_id = chunk[-1].id
+                job.save(
+                    update_fields=[
+                        "processed",
+                        "failed",
+                        "failed_project_ids",
+                        "last_entry_id",
+                        "updated_at",
+                    ]
+                )
+    except Exception as e:
+        job.status = APREndorsementJob.JobStatus.FAILURE
+        job.error = str(e)
+        job.save(update_fields=["status", "error", "updated_at"])
+        raise
+
+    if job.status != APREndorsementJob.JobStatus.RUNNING:
+        # finished by another run of the task
+        return
+
+    job.status = APREndorsementJob.JobStatus.SUCCESS
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "finished_at", "updated_at"])
+
+    if job.failed_project_ids:
+        _notify_apr_endorsement_failures(year, job.failed_project_ids)
 
 
 @app.task()
@@ -708,8 +841,53 @@ def synchronize_decisions():
     logger.info("Decisions synchronized successfully")
 
 
+def _get_changed_project_ids(since):
+    """
+    @param since: datetime
+
+    @return: set of the ids of the final versions of the projects with any
+        version updated since `since`
+    """
+    return set(
+        Project.objects.really_all()
+        .filter(date_updated__gte=since)
+        .annotate(final_id=Coalesce("latest_project_id", "id"))
+        .values_list("final_id", flat=True)
+    )
+
+
+APR_SYNC_COUNTS = [
+    # number of changed projects, None for the full syncs
+    "projects_count",
+    "updated_count",
+    "changed_count",
+    "added_count",
+    "deleted_count",
+    "agencies_count",
+]
+
+
+def _get_apr_sync_result(mode, t0, message, **counts):
+    """
+    @param mode: "full" or "incremental"
+    @param t0: `time.perf_counter()` at the start of the sync
+    @param message: str
+    @param counts: APR_SYNC_COUNTS values; 0 if not given
+
+    @return: dict - result of `sync_apr_from_projects`
+    """
+    if mode == "full":
+        counts.setdefault("projects_count", None)
+    return {
+        "mode": mode,
+        **{key: counts.get(key, 0) for key in APR_SYNC_COUNTS},
+        "duration_seconds": round(time.perf_counter() - t0, 3),
+        "message": message,
+    }
+
+
 @app.task()
-def sync_apr_from_projects(year, dry_run=False):
+def sync_apr_from_projects(year, dry_run=False, incremental=False):
     """
     Re-synchronize all APR derived fields for a reporting year, for all agencies,
     from the current Project data.
@@ -726,24 +904,54 @@ def sync_apr_from_projects(year, dry_run=False):
       *after* the initial AnnualAgencyProjectReport has been created.
       If there is no AnnualAgencyProjectReport for a specific agency (e.g. the workspace
       has not been accessed yet), it will not create new AnnualProjectReport records.
+
+    With `incremental`, only the projects updated (`date_updated`) since the
+    last sync of the year are synced; without a previous sync, a full sync is
+    run. Changes that do not update the projects themselves (e.g. to their
+    meetings or decisions) and the project changes made with queryset
+    `.update()` calls, which do not bump `date_updated` (e.g. imports, bulk
+    status changes), are only picked up by a full sync.
+
+    All the runs return the same dict of counts, with the sync `mode` and
+    its `duration_seconds`.
     """
-    # pylint: disable=R0914,R0915
+    # pylint: disable=R0912,R0914,R0915
+    started_at = timezone.now()
+    t0 = time.perf_counter()
     progress_report = AnnualProgressReport.objects.get(year=year)
+    is_incremental = bool(incremental and progress_report.projects_synced_at)
+    mode = "incremental" if is_incremental else "full"
 
     if progress_report.endorsed:
-        return {
-            "updated_count": 0,
-            "changed_count": 0,
-            "added_count": 0,
-            "deleted_count": 0,
-            "agencies_count": 0,
-            "message": f"APR for year {year} is already endorsed. No sync performed.",
-        }
+        return _get_apr_sync_result(
+            mode, t0, f"APR for year {year} is already endorsed. No sync performed."
+        )
+
+    changed_project_ids = None
+    if is_incremental:
+        changed_project_ids = _get_changed_project_ids(
+            progress_report.projects_synced_at
+        )
+
+    if changed_project_ids is not None and not changed_project_ids:
+        if not dry_run:
+            AnnualProgressReport.objects.filter(id=progress_report.id).update(
+                projects_synced_at=started_at
+            )
+        return _get_apr_sync_result(
+            mode, t0, "No projects changed since the last sync."
+        )
 
+    project_reports_qs = AnnualProjectReport.objects.filter(
+        report__progress_report=progress_report
+    )
+    if changed_project_ids is not None:
+        project_reports_qs = project_reports_qs.filter(
+            django_models.Q(project_id__in=changed_project_ids)
+            | django_models.Q(project__latest_project_id__in=changed_project_ids)
+        )
     project_reports = list(
-        AnnualProjectReport.objects.filter(
-            report__progress_report=progress_report
-        ).select_related(
+        project_reports_qs.select_related(
             "project",
             "project__agency",
             "project__cluster",
@@ -763,15 +971,9 @@ def sync_apr_from_projects(year, dry_run=False):
         )
     )
 
-    if not project_reports:
-        return {
-            "updated_count": 0,
-            "changed_count": 0,
-            "added_count": 0,
-            "deleted_count": 0,
-            "agencies_count": 0,
-            "message": "No project reports to sync.",
-        }
+    # an incremental sync can still add the reports of new projects
+    if not project_reports and changed_project_ids is None:
+        return _get_apr_sync_result(mode, t0, "No project reports to sync.")
 
     # Build a map of existing *final* project IDs per agency report from
     # already-fetched data, to avoid one DB query per agency in the second phase
@@ -969,6 +1171,8 @@ def sync_apr_from_projects(year, dry_run=False):
             )
             .order_by("code")
         )
+        if changed_project_ids is not None:
+            projects_queryset = projects_queryset.filter(id__in=changed_project_ids)
         filterset = APRProjectFilter(
             data={"year": year, "agency": agency.id},
             queryset=projects_queryset,
@@ -1000,16 +1204,104 @@ def sync_apr_from_projects(year, dry_run=False):
                 project_report.save()
                 added_count += 1
 
-    return {
-        "updated_count": len(project_reports),
-        "changed_count": changed_count,
-        "added_count": added_count,
-        "deleted_count": deleted_count,
-        "agencies_count": agencies_count,
-        "message": (
+    if not dry_run:
+        # projects updated from now on are synced by the next incremental sync
+        AnnualProgressReport.objects.filter(id=progress_report.id).update(
+            projects_synced_at=started_at
+        )
+
+    projects_count = (
+        len(changed_project_ids) if changed_project_ids is not None else None
+    )
+    duration = time.perf_counter() - t0
+    logger.info(
+        "APR %s %s sync: %d project report(s), %d changed, %d added, "
+        "%d deleted in %.2f seconds",
+        year,
+        mode,
+        len(project_reports),
+        changed_count,
+        added_count,
+        deleted_count,
+        duration,
+        extra={
+            "year": year,
+            "mode": mode,
+            "dry_run": dry_run,
+            "projects_count": projects_count,
+            "updated_count": len(project_reports),
+            "changed_count": changed_count,
+            "added_count": added_count,
+            "deleted_count": deleted_count,
+            "duration_seconds": round(duration, 3),
+        },
+    )
+
+    return _get_apr_sync_result(
+        mode,
+        t0,
+        (
             f"Synced {len(project_reports)} project report(s) across "
             f"{agencies_count} agency/agencies; {changed_count} record(s) updated, "
             f"{added_count} new project report(s) added, "
             f"{deleted_count} stale record(s) deleted."
         ),
-    }
+        projects_count=projects_count,
+        updated_count=len(project_reports),
+        changed_count=changed_count,
+        added_count=added_count,
+        deleted_count=deleted_count,
+        agencies_count=agencies_count,
+    )
+
+
+# Export jobs
+@app.task()
+def run_export_job(job_id):
+    job = ExportJob.objects.select_related("created_by").get(id=job_id)
+    if job.status != ExportJob.ExportJobStatus.PENDING:
+        return job.status
+
+    job.status = ExportJob.ExportJobStatus.RUNNING
+    job.started_at = job.heartbeat_at = timezone.now()
+    job.save(update_fields=["status", "started_at", "heartbeat_at"])
+
+    try:
+        with export_job_heartbeat(job):
+            render_export_job(job)
+    except Exception as e:
+        logger.exception("Export job %s failed", job_id)
+        job.status = ExportJob.ExportJobStatus.FAILURE
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+    return job.status
+
+
+@app.task()
+def delete_expired_export_jobs():
+    """
+    Fail the export jobs whose worker died and delete finished export jobs past
+    their TTL, together with their files.
+    """
+    ExportJob.objects.fail_stale()
+    deleted_count = 0
+    for job in ExportJob.objects.expired().iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        deleted_count += 1
+    return deleted_count
+
+
+@app.task()
+def refresh_missing_cp_consumption_facts():
+    """
+    Save the CP consumption facts deleted after a reference data change
+    (see core.cp_consumption_facts) and replace the outdated ones
+    """
+    # core.api.views imports the tasks
+    # pylint: disable-next=import-outside-toplevel
+    from core.api.views.utils import refresh_missing_consumption_facts
+
+    return refresh_missing_consumption_facts()
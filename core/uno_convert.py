@@ -0,0 +1,63 @@
+"""
+Convert a spreadsheet to PDF through a running LibreOffice listener.
+
+Runs under the Python interpreter that ships the LibreOffice UNO bindings
+(python3-uno), not the application's one, so it must only use the standard
+library and `uno`.
+
+Usage: python3 uno_convert.py <pipe name> <source path> <target path> <connect timeout>
+"""
+
+# pylint: disable=import-error
+import sys
+import time
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+
+def _property(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+def _connect(pipe_name, timeout):
+    local_context = uno.getComponentContext()
+    resolver = local_context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_context
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return resolver.resolve(
+                f"uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext"
+            )
+        except NoConnectException:
+            # The office is still starting up
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def convert(pipe_name, source, target, connect_timeout):
+    context = _connect(pipe_name, connect_timeout)
+    desktop = context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.frame.Desktop", context
+    )
+    document = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(source), "_blank", 0, (_property("Hidden", True),)
+    )
+    try:
+        document.storeToURL(
+            uno.systemPathToFileUrl(target),
+            (_property("FilterName", "calc_pdf_Export"),),
+        )
+    finally:
+        document.close(True)
+
+
+if __name__ == "__main__":
+    convert(sys.argv[1], sys.argv[2], sys.argv[3], float(sys.argv[4]))
@@ -528,6 +528,77 @@ CELERY_BEAT_SCHEDULE = {
         "task": "core.tasks.synchronize_decisions",
         "schedule": crontab(minute="0"),
     },
+    "delete_expired_export_jobs": {
+        "task": "core.tasks.delete_expired_export_jobs",
+        "schedule": crontab(minute="30"),
+    },
+    # CP reports changed by bulk operations (imports, scripts)
+    "refresh_missing_cp_consumption_facts": {
+        "task": "core.tasks.refresh_missing_cp_consumption_facts",
+        "schedule": crontab(minute="45"),
+    },
+}
+
+# LibreOffice instances kept by each web/Celery process for PDF exports, up to
+# 250 MB each; see core/pdf_converter.py before raising it
+PDF_CONVERTER_POOL_SIZE = env.int("PDF_CONVERTER_POOL_SIZE", default=1)
+# Seconds; keep the job timeout below the gunicorn worker timeout
+PDF_CONVERTER_JOB_TIMEOUT = env.int("PDF_CONVERTER_JOB_TIMEOUT", default=90)
+# Seconds a conversion waits for a free instance before the request gets a 503
+PDF_CONVERTER_QUEUE_TIMEOUT = env.int("PDF_CONVERTER_QUEUE_TIMEOUT", default=25)
+# Restart an office instance after this many conversions
+PDF_CONVERTER_MAX_JOBS = env.int("PDF_CONVERTER_MAX_JOBS", default=200)
+# Interpreter with the LibreOffice UNO bindings (python3-uno); when missing,
+# each conversion starts its own LibreOffice process
+PDF_CONVERTER_UNO_PYTHON = env.str(
+    "PDF_CONVERTER_UNO_PYTHON", default="/usr/bin/python3"
+)
+
+# How long the files of finished background exports are kept and reused
+EXPORT_JOB_TTL_HOURS = env.int("EXPORT_JOB_TTL_HOURS", default=24)
+# Seconds; a running export job updates its heartbeat this often, and a
+# running job without a heartbeat for EXPORT_JOB_STALE_SECONDS is failed (its
+# worker died), so the export can be started again
+EXPORT_JOB_HEARTBEAT_SECONDS = env.int("EXPORT_JOB_HEARTBEAT_SECONDS", default=30)
+EXPORT_JOB_STALE_SECONDS = env.int("EXPORT_JOB_STALE_SECONDS", default=600)
+# Seconds a pending export job may wait in the Celery queue before it is failed;
+# keep it above the time a busy queue takes to reach the job
+EXPORT_JOB_QUEUE_TIMEOUT_SECONDS = env.int(
+    "EXPORT_JOB_QUEUE_TIMEOUT_SECONDS", default=6 * 60 * 60
+)
+
+# Reference data (usages, regions, CP report formats) shared by all the
+# web/Celery processes; see core/reference_data.py. Required when running more
+# than one process: without it each process has its own cache, which the
+# changes made by the other processes do not invalidate.
+REFERENCE_DATA_CACHE_URL = env.str("REFERENCE_DATA_CACHE_URL", default="")
+# Seconds; the data is also replaced as soon as it changes
+REFERENCE_DATA_CACHE_TIMEOUT = env.int("REFERENCE_DATA_CACHE_TIMEOUT", default=86400)
+# Seconds the version tokens of the cached data are kept (None: until the data
+# changes); without a shared cache, this is how long a process may serve data
+# changed by another process
+REFERENCE_DATA_VERSION_TIMEOUT = (
+    None
+    if REFERENCE_DATA_CACHE_URL
+    else env.int("REFERENCE_DATA_VERSION_TIMEOUT", default=60)
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "reference_data": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REFERENCE_DATA_CACHE_URL,
+            "KEY_PREFIX": "reference_data",
+        }
+        if REFERENCE_DATA_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "reference_data",
+        }
+    ),
 }
 
 # Sentry